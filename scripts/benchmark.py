@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the simulation engines.
+
+Fixed-seed workloads in three groups:
+- quote:    single-call latency (AMM buy, vault OTC, hook fee, full trade,
+            impact-capped sizing, sell routing)
+- grid:     vectorized throughput over 10^6-point grids (including CSV
+            result export)
+- sequence: long stateful streams (sequencer, TWAP oracle, event clock,
+            event-log replay, multi-market portfolio, run_simulations)
+
+Each benchmark reports best and median wall time over `--repeat` runs, plus
+the time per operation. Results are written as JSON. With `--baseline`, any
+benchmark whose best time per op is more than `--threshold` percent slower
+than the baseline, or that the baseline has but this run (under the same
+`--filter`) lacks, makes the run exit with status 1. Quick and full results
+are never compared (status 2).
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --threshold 10
+    python benchmark.py --quick --filter grid
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import simulate_partial_fill as partial_fill
+from simulate_batch import batch_quote
+from simulate_clock import Scheduler, timed_market
+from simulate_exact import EXACT_ENGINE, WAD
+from simulate_gas_backtest import GasBacktest
+from simulate_gas_oracle import GasOracle, synthetic_history
+from simulate_limit_book import run_backtest, seed_book
+from simulate_lp import LPPool, random_lp_stream, run_stream
+from simulate_orderbook import random_book
+from results import ResultWriter, sweep_amm
+from simulate_parimutuel import ParimutuelMarket, random_flow
+from simulate_portfolio import PortfolioConfig, run_portfolio
+from simulate_rebalance import Rebalancer
+from simulate_replay import replay, replay_file, synthetic_log, write_events
+from simulate_resolver import ConditionEngine, random_conditions, synthetic_targets
+from simulate_router import (
+    PoolState, VaultState, calculate_hook_fee, print_header, run_simulations,
+    simulate_amm_buy, simulate_trade, simulate_vault_otc,
+)
+from simulate_sell import batch_quote_sell, quote_sell
+from simulate_sequence import MarketSequencer, random_order_flow
+from simulate_twap import TwapOracle
+from simulate_vault import VaultLedger, run_otc_flow
+
+SEED = 42
+DEFAULT_THRESHOLD_PCT = 10.0
+SCHEMA_VERSION = 1
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    group: str
+    setup: Callable[[bool], Tuple[Callable[[], object], int]]  # quick -> (run, ops)
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str):
+    """Register a setup function returning (zero-arg workload, operation count)"""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, group, setup))
+        return setup
+    return register
+
+
+def _random_pools(rng: random.Random, n: int) -> List[PoolState]:
+    pools = []
+    for _ in range(n):
+        liquidity = rng.uniform(100, 20_000)
+        no = liquidity * rng.uniform(0.05, 0.95)
+        pools.append(PoolState(liquidity - no, no))
+    return pools
+
+
+# =============================================================================
+# Quote Latency (scalar, one call per operation)
+# =============================================================================
+
+@benchmark("quote.amm_buy", "quote")
+def _amm_buy(quick: bool):
+    rng = random.Random(SEED)
+    n = 5_000 if quick else 50_000
+    cases = [(pool, rng.uniform(1, 2_000), rng.random() < 0.5, rng.randint(10, 300))
+             for pool in _random_pools(rng, n)]
+
+    def run():
+        for pool, size, buy_yes, fee in cases:
+            simulate_amm_buy(pool, size, buy_yes, fee)
+    return run, n
+
+
+@benchmark("quote.vault_otc", "quote")
+def _vault_otc(quick: bool):
+    rng = random.Random(SEED)
+    n = 5_000 if quick else 50_000
+    cases = [(VaultState(rng.uniform(0, 5_000), rng.uniform(0, 5_000)), rng.uniform(1, 2_000),
+              rng.random() < 0.5, rng.randint(500, 9_500), rng.uniform(1, 168))
+             for _ in range(n)]
+
+    def run():
+        for vault, size, buy_yes, twap, hours in cases:
+            simulate_vault_otc(vault, size, buy_yes, twap, hours)
+    return run, n
+
+
+@benchmark("quote.hook_fee", "quote")
+def _hook_fee(quick: bool):
+    rng = random.Random(SEED)
+    n = 5_000 if quick else 50_000
+    cases = [(pool, rng.randint(0, 4 * 86400)) for pool in _random_pools(rng, n)]
+
+    def run():
+        for pool, elapsed in cases:
+            calculate_hook_fee(pool, elapsed)
+    return run, n
+
+
+@benchmark("quote.simulate_trade", "quote")
+def _simulate_trade(quick: bool):
+    rng = random.Random(SEED)
+    n = 2_000 if quick else 20_000
+    cases = [(pool, VaultState(rng.uniform(0, 5_000), rng.uniform(0, 5_000)),
+              rng.uniform(1, 2_000), rng.random() < 0.5)
+             for pool in _random_pools(rng, n)]
+
+    def run():
+        for pool, vault, size, buy_yes in cases:
+            simulate_trade(pool, vault, size, buy_yes)
+    return run, n
+
+
+@benchmark("quote.simulate_trade_exact", "quote")
+def _simulate_trade_exact(quick: bool):
+    rng = random.Random(SEED)
+    n = 2_000 if quick else 20_000
+    cases = [(PoolState(int(p.yes_reserve * WAD), int(p.no_reserve * WAD)),
+              VaultState(rng.randint(0, 5_000) * WAD, rng.randint(0, 5_000) * WAD),
+              int(rng.uniform(1, 2_000) * WAD), rng.random() < 0.5)
+             for p in _random_pools(rng, n)]
+
+    def run():
+        for pool, vault, size, buy_yes in cases:
+            simulate_trade(pool, vault, size, buy_yes, engine=EXACT_ENGINE)
+    return run, n
+
+
+@benchmark("quote.find_max_amm_under_impact", "quote")
+def _find_max_amm(quick: bool):
+    rng = random.Random(SEED)
+    n = 5_000 if quick else 50_000
+    cases = [(partial_fill.PoolState(p.yes_reserve, p.no_reserve), rng.random() < 0.5,
+              rng.uniform(1, 20_000), rng.randint(10, 300), rng.choice((300, 600, 1200)))
+             for p in _random_pools(rng, n)]
+
+    def run():
+        for pool, buy_yes, max_coll, fee, cap in cases:
+            partial_fill.find_max_amm_under_impact(pool, buy_yes, max_coll, fee, cap)
+    return run, n
+
+
+@benchmark("quote.sell_routing", "quote")
+def _quote_sell(quick: bool):
+    rng = random.Random(SEED)
+    n = 2_000 if quick else 20_000
+    book = {6800: 50, 6700: 100, 6500: 200}
+    cases = [(pool, VaultState(rng.uniform(0, 5_000), rng.uniform(0, 5_000)),
+              rng.uniform(1, 1_000), rng.random() < 0.5)
+             for pool in _random_pools(rng, n)]
+
+    def run():
+        for pool, vault, shares, sell_yes in cases:
+            quote_sell(pool, vault, shares, sell_yes, budget=100,
+                       bid_pools=book, min_price_bps=6500)
+    return run, n
+
+
+@benchmark("quote.orderbook_best_bid_ask", "quote")
+def _orderbook_best(quick: bool):
+    book = random_book(4_999, seed=SEED)
+    n = 5_000 if quick else 50_000
+
+    def run():
+        for _ in range(n):
+            book.spread(True)
+    return run, n
+
+
+# =============================================================================
+# Grid Throughput (vectorized)
+# =============================================================================
+
+@benchmark("grid.batch_quote", "grid")
+def _batch_quote(quick: bool):
+    rng = np.random.default_rng(SEED)
+    n = 100_000 if quick else 1_000_000
+    liquidity = rng.uniform(10, 20_000, n)
+    no = liquidity * rng.integers(100, 9_900, n) / 10_000
+    args = (liquidity - no, no, rng.uniform(1, 5_000, n),
+            rng.random(n) < 0.5, rng.integers(0, 6 * 86400, n))
+    return (lambda: batch_quote(*args)), n
+
+
+@benchmark("grid.batch_quote_sell", "grid")
+def _batch_quote_sell(quick: bool):
+    rng = np.random.default_rng(SEED)
+    n = 100_000 if quick else 1_000_000
+    shares, sell_yes = rng.uniform(1, 400, n), rng.random(n) < 0.5
+    pool, vault = PoolState(300, 700), VaultState(600, 1_000)
+    book = {6800: 50, 6700: 100, 6500: 200, 6000: 500}
+
+    def run():
+        batch_quote_sell(pool, vault, shares, sell_yes, budget=100,
+                         bid_pools=book, min_price_bps=6500)
+    return run, n
+
+
+@benchmark("grid.export_sweep_csv", "grid")
+def _export_sweep_csv(quick: bool):
+    axes = (np.geomspace(100, 100_000, 10), np.linspace(1000, 9000, 10),
+            np.geomspace(1, 10_000, 50 if quick else 500), np.linspace(0, 3 * 86400, 10),
+            (True, False))
+
+    def run():
+        # The export is ~100 MB at full size; drop it after every repetition
+        with tempfile.TemporaryDirectory() as tmp:
+            with ResultWriter(os.path.join(tmp, "sweep.csv")) as writer:
+                sweep_amm(writer, *axes)
+    return run, int(np.prod([len(a) for a in axes]))
+
+
+@benchmark("grid.gas_window_queries", "grid")
+def _gas_window_queries(quick: bool):
+    t, fee = synthetic_history(262_800, seed=SEED)
+    oracle = GasOracle(t, fee)
+    n = 100_000 if quick else 1_000_000
+    rng = np.random.default_rng(SEED)
+    starts = rng.integers(t[0], t[-1], n)
+    ends = np.minimum(starts + rng.integers(3600, 7 * 86400, n), t[-1])
+
+    def run():
+        oracle.average_since_many(starts, ends)
+        oracle.extremes_since_many(starts, ends)
+    return run, n
+
+
+@benchmark("grid.gas_backtest_surfaces", "grid")
+def _gas_backtest_surfaces(quick: bool):
+    t, fee = synthetic_history(262_800 if quick else 2_628_000, seed=SEED)
+    bt = GasBacktest(GasOracle(t, fee))
+    surfaces = bt.surfaces()
+
+    def run():
+        bt.surfaces()
+    return run, int(sum(s.samples.sum() for s in surfaces))
+
+
+@benchmark("grid.resolver_hit_rates", "grid")
+def _resolver_hit_rates(quick: bool):
+    t, targets = synthetic_targets(2_000 if quick else 8_760, seed=SEED)
+    engine = ConditionEngine(t, targets)
+    conds = random_conditions(engine, 500 if quick else 5_000, seed=SEED)
+    _, opened = engine.hit_rates(conds, 86400)
+
+    def run():
+        engine.hit_rates(conds, 86400)
+    return run, len(conds) * opened
+
+
+# =============================================================================
+# Long Stateful Sequences
+# =============================================================================
+
+@benchmark("sequence.sequencer", "sequence")
+def _sequencer(quick: bool):
+    n = 20_000 if quick else 200_000
+    trades = list(random_order_flow(n, seed=SEED, mean_size=60))
+
+    def run():
+        MarketSequencer(PoolState(2_000, 2_000), VaultState(5_000, 5_000)).run(trades)
+    return run, n
+
+
+@benchmark("sequence.sequencer_twap", "sequence")
+def _sequencer_twap(quick: bool):
+    n = 20_000 if quick else 200_000
+    trades = list(random_order_flow(n, seed=SEED, mean_size=60))
+
+    def run():
+        pool = PoolState(2_000, 2_000)
+        MarketSequencer(pool, VaultState(5_000, 5_000), twap=TwapOracle(pool, 0)).run(trades)
+    return run, n
+
+
+@benchmark("sequence.sequencer_rebalance", "sequence")
+def _sequencer_rebalance(quick: bool):
+    n = 20_000 if quick else 200_000
+    trades = list(random_order_flow(n, seed=SEED, mean_size=60))
+
+    def run():
+        pool = PoolState(2_000, 2_000)
+        MarketSequencer(pool, VaultState(5_000, 5_000), twap=TwapOracle(pool, 0),
+                        rebalancer=Rebalancer(budget_step=5.0, price_step_bps=500)).run(trades)
+    return run, n
+
+
+@benchmark("sequence.clock_market", "sequence")
+def _clock_market(quick: bool):
+    n = 20_000 if quick else 200_000
+
+    def run():
+        sched = Scheduler()
+        timed_market(sched, n * 60, rebalancer=Rebalancer(budget_step=5.0, price_step_bps=500),
+                     seed=SEED).start()
+        sched.run()
+    return run, n
+
+
+@benchmark("sequence.lp_stream_exact", "sequence")
+def _lp_stream_exact(quick: bool):
+    n = 20_000 if quick else 100_000
+    events = list(random_lp_stream(n, 5_000, seed=SEED))
+
+    def run():
+        run_stream(LPPool("ask", 5500, exact=True), events, exact_scale=WAD)
+    return run, n
+
+
+@benchmark("sequence.vault_otc_flow", "sequence")
+def _vault_otc_flow(quick: bool):
+    n = 20_000 if quick else 200_000
+
+    def run():
+        ledger = VaultLedger(close=60 * 86400)
+        ledger.deposit(0, True, 5_000 * WAD)
+        ledger.deposit(0, False, 5_000 * WAD)
+        run_otc_flow(ledger, n, 20_000, seed=SEED, dt=12)
+    return run, n
+
+
+@benchmark("sequence.replay_event_log", "sequence")
+def _replay_event_log(quick: bool):
+    n = 20_000 if quick else 200_000
+    rows = list(synthetic_log(n, seed=SEED))
+
+    def run():
+        replay(rows)
+    return run, n
+
+
+@benchmark("sequence.replay_csv_stream", "sequence")
+def _replay_csv_stream(quick: bool):
+    n = 100_000 if quick else 1_000_000
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "log.csv")
+    write_events(path, synthetic_log(n, seed=SEED))
+
+    def run():
+        # Decode + state-only fold of the file (record batches when pyarrow is installed)
+        replay_file(path, compare=False)
+    weakref.finalize(run, shutil.rmtree, tmp, ignore_errors=True)
+    return run, n
+
+
+@benchmark("sequence.portfolio_ticks", "sequence")
+def _portfolio_ticks(quick: bool):
+    config = PortfolioConfig(live_markets=2_000, orders_per_tick=2_000)
+    n_ticks = 50 if quick else 500
+
+    def run():
+        run_portfolio(n_ticks, config, seed=SEED)
+    return run, int(n_ticks * config.orders_per_tick)
+
+
+@benchmark("sequence.limit_book_backtest", "sequence")
+def _limit_book_backtest(quick: bool):
+    n_resting = 5_000 if quick else 50_000
+    n_events = 5_000 if quick else 50_000
+
+    def run():
+        book = seed_book(n_resting, seed=SEED)
+        run_backtest(book, PoolState(10_000 * WAD, 10_000 * WAD), n_events, seed=SEED)
+    return run, n_events
+
+
+@benchmark("sequence.parimutuel_settle", "sequence")
+def _parimutuel_settle(quick: bool):
+    n_holders = 100_000 if quick else 1_000_000
+    close = 14 * 86400
+    flow = random_flow(n_holders, 3 * n_holders, close, seed=SEED)
+
+    def run():
+        market = ParimutuelMarket(n_holders, close, resolver_fee_bps=200)
+        market.apply(flow)
+        market.resolve(True, close)
+        market.settle()
+    return run, n_holders
+
+
+@benchmark("sequence.run_simulations", "sequence")
+def _run_simulations(quick: bool):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_simulations()
+    return run, 1
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def run_benchmark(bench: Benchmark, quick: bool, repeat: int) -> Dict[str, float]:
+    run, ops = bench.setup(quick)
+    run()  # Warm-up (imports, caches, allocator)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    best = min(times)
+    return {
+        "group": bench.group,
+        "ops": ops,
+        "repeat": repeat,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "per_op_ns": best / ops * 1e9,
+        "ops_per_s": ops / best,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_suite(quick: bool = False, repeat: int = 5, name_filter: str = "") -> dict:
+    results = {}
+    for bench in BENCHMARKS:
+        if name_filter and name_filter not in bench.name:
+            continue
+        results[bench.name] = run_benchmark(bench, quick, repeat)
+        r = results[bench.name]
+        print(f"   {bench.name:<34} {r['per_op_ns']:>14,.0f} ns/op  {r['ops_per_s']:>14,.0f} ops/s")
+    return {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "filter": name_filter,
+            "seed": SEED,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(current: dict, baseline: dict,
+            threshold_pct: float = DEFAULT_THRESHOLD_PCT) -> List[Tuple[str, float]]:
+    """
+    Print per-benchmark change in best time per op against the baseline.
+
+    Returns: [(name, slowdown_pct)] for benchmarks slower than threshold_pct,
+    plus (name, inf) for baseline benchmarks this run's filter selects but
+    that are missing from it
+
+    Raises ValueError when one side ran quick workloads and the other full.
+    """
+    if current["meta"]["quick"] != baseline["meta"]["quick"]:
+        raise ValueError("cannot compare quick and full workloads")
+
+    regressions = []
+    print(f"\n{'Benchmark':<34} | {'Baseline ns/op':>14} | {'Current ns/op':>14} | {'Change':>8}")
+    print("-" * 80)
+    for name, cur in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<34} | {'-':>14} | {cur['per_op_ns']:>14,.0f} | {'new':>8}")
+            continue
+        change_pct = (cur["per_op_ns"] / base["per_op_ns"] - 1) * 100
+        flag = "  REGRESSION" if change_pct > threshold_pct else ""
+        print(f"{name:<34} | {base['per_op_ns']:>14,.0f} | {cur['per_op_ns']:>14,.0f} | "
+              f"{change_pct:>+7.1f}%{flag}")
+        if change_pct > threshold_pct:
+            regressions.append((name, change_pct))
+    name_filter = current["meta"].get("filter", "")
+    for name, base in baseline["benchmarks"].items():
+        if name not in current["benchmarks"] and name_filter in name:
+            print(f"{name:<34} | {base['per_op_ns']:>14,.0f} | {'-':>14} | {'MISSING':>8}")
+            regressions.append((name, float("inf")))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", "-o", help="write results JSON to this path")
+    parser.add_argument("--baseline", "-b", help="results JSON to compare against")
+    parser.add_argument("--threshold", "-t", type=float, default=DEFAULT_THRESHOLD_PCT,
+                        help="max allowed slowdown in percent (default %(default)s)")
+    parser.add_argument("--repeat", "-r", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads (smoke test)")
+    parser.add_argument("--filter", "-k", default="", help="only run benchmarks containing this")
+    args = parser.parse_args(argv)
+
+    print_header(f"Simulation Benchmarks ({'quick' if args.quick else 'full'}, "
+                 f"best of {args.repeat}, seed {SEED})")
+    current = run_suite(args.quick, args.repeat, args.filter)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"\n   Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(current, baseline, args.threshold)
+        except ValueError as e:
+            print(f"\n   Error: {e} (baseline quick={baseline['meta']['quick']})")
+            return 2
+        if regressions:
+            print(f"\n   {len(regressions)} benchmark(s) regressed by more than "
+                  f"{args.threshold:g}% or missing")
+            return 1
+        print(f"\n   No regressions above {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
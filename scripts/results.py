@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Columnar result export for simulation sweeps.
+
+Rows are collected into preallocated NumPy column buffers of `chunk_rows`
+rows. A full buffer is handed to the sink as one batch and then reused, so a
+sweep of any length holds one chunk in memory. Scalar paths append one
+TradeResult at a time; vectorized paths (`sweep_amm`) write whole chunks.
+
+Sinks, picked by file extension:
+- .parquet          pyarrow.parquet.ParquetWriter, one row group per chunk
+- .arrow / .feather Arrow IPC file, one record batch per chunk
+- .csv              stdlib writer; each chunk is converted column-wise by
+                    `str` over `tolist()`, never through per-row f-strings
+
+Without pyarrow, Parquet/Arrow paths fall back to CSV next to the requested
+path (with a warning). Text columns (venue) are stored as dictionary codes.
+
+Requires: numpy (pyarrow optional)
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+import warnings
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+
+from simulate_batch import batch_quote
+from simulate_router import PoolState, TradeResult, VaultState, print_header
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV fallback only
+    pa = pq = None
+
+# =============================================================================
+# Schemas
+# =============================================================================
+
+# Column type: a NumPy dtype, or a tuple of categories (stored as uint8 codes)
+ColumnType = Union[np.dtype, Tuple[str, ...]]
+Columns = Tuple[Tuple[str, ColumnType], ...]
+
+VENUES = ("amm", "otc", "mint", "mult", "rejected")
+F8, I8, I4, B1 = np.dtype(np.float64), np.dtype(np.int64), np.dtype(np.int32), np.dtype(bool)
+
+# Inputs of one simulate_trade call plus every TradeResult field. The free-text
+# rejected_reason is dropped: venue "rejected" with price_impact_bps carries it.
+TRADE_COLUMNS: Columns = (
+    ("yes_reserve", F8),
+    ("no_reserve", F8),
+    ("vault_yes", F8),
+    ("vault_no", F8),
+    ("order_size", F8),
+    ("buy_yes", B1),
+    ("elapsed_seconds", I8),
+    ("venue", VENUES),
+    ("shares_out", F8),
+    ("collateral_in", F8),
+    ("effective_price_bps", I4),
+    ("price_impact_bps", I4),
+    ("fee_bps", I4),
+)
+
+# simulate_partial_fill.simulate_trade_with_partial_fill breakdown
+PARTIAL_FILL_COLUMNS: Columns = (
+    ("yes_reserve", F8),
+    ("no_reserve", F8),
+    ("vault_yes", F8),
+    ("vault_no", F8),
+    ("order_size", F8),
+    ("buy_yes", B1),
+    ("otc_shares", F8),
+    ("otc_collateral", F8),
+    ("amm_shares", F8),
+    ("amm_collateral", F8),
+    ("mint_shares", F8),
+    ("mint_collateral", F8),
+    ("total_shares", F8),
+)
+
+
+def _is_category(kind: ColumnType) -> bool:
+    return isinstance(kind, tuple)
+
+
+# =============================================================================
+# Column Buffer
+# =============================================================================
+
+class ColumnBuffer:
+    """`capacity` preallocated rows per column; reused after every flush"""
+
+    __slots__ = ("columns", "capacity", "arrays", "n", "_codes")
+
+    def __init__(self, columns: Columns, capacity: int):
+        self.columns = columns
+        self.capacity = capacity
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.empty(capacity, np.uint8 if _is_category(kind) else kind)
+            for name, kind in columns
+        }
+        self._codes = {name: {c: i for i, c in enumerate(kind)}
+                       for name, kind in columns if _is_category(kind)}
+        self.n = 0
+
+    def append(self, row: Dict[str, object]):
+        """Write one row (caller flushes when `full`)"""
+        i, codes = self.n, self._codes
+        for name, array in self.arrays.items():
+            value = row[name]
+            array[i] = codes[name][value] if name in codes else value
+        self.n = i + 1
+
+    def fill(self, columns: Dict[str, object], start: int, stop: int) -> int:
+        """Copy rows [start, stop) of array columns (scalars broadcast). Returns rows taken."""
+        take = min(stop - start, self.capacity - self.n)
+        i = self.n
+        for name, array in self.arrays.items():
+            value = columns[name]
+            if name in self._codes and not isinstance(value, np.ndarray):
+                value = self._codes[name][value]
+            if isinstance(value, np.ndarray):
+                value = value[start:start + take]
+            array[i:i + take] = value
+        self.n = i + take
+        return take
+
+    @property
+    def full(self) -> bool:
+        return self.n == self.capacity
+
+    def view(self) -> Dict[str, np.ndarray]:
+        return {name: array[:self.n] for name, array in self.arrays.items()}
+
+
+# =============================================================================
+# Sinks
+# =============================================================================
+
+class CsvSink:
+    """Header once, then one column-wise converted block per chunk"""
+
+    def __init__(self, path: str, columns: Columns):
+        self.columns = columns
+        self._file = open(path, "w", newline="")
+        csv.writer(self._file).writerow([name for name, _ in columns])
+        self._labels = {name: np.asarray(kind) for name, kind in columns if _is_category(kind)}
+
+    def write(self, chunk: Dict[str, np.ndarray]):
+        text = []
+        for name, kind in self.columns:
+            values = chunk[name]
+            if name in self._labels:
+                text.append(self._labels[name][values].tolist())
+            else:
+                # tolist() + str runs the C float repr, ~30% faster than astype(str)
+                text.append(map(str, values.astype(np.uint8 if kind == B1 else kind).tolist()))
+        self._file.write("\n".join(map(",".join, zip(*text))))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowSink:
+    """Parquet (one row group per chunk) or Arrow IPC file (one batch per chunk)"""
+
+    def __init__(self, path: str, columns: Columns, parquet: bool):
+        fields = []
+        for name, kind in columns:
+            if _is_category(kind):
+                fields.append(pa.field(name, pa.dictionary(pa.uint8(), pa.string())))
+            else:
+                fields.append(pa.field(name, pa.from_numpy_dtype(kind)))
+        self.columns = columns
+        self.schema = pa.schema(fields)
+        self._dictionaries = {name: pa.array(kind, pa.string())
+                              for name, kind in columns if _is_category(kind)}
+        self._writer = (pq.ParquetWriter(path, self.schema) if parquet
+                        else pa.ipc.new_file(path, self.schema))
+
+    def write(self, chunk: Dict[str, np.ndarray]):
+        arrays = []
+        for name, _ in self.columns:
+            values = chunk[name]
+            if name in self._dictionaries:
+                arrays.append(pa.DictionaryArray.from_arrays(values, self._dictionaries[name]))
+            else:
+                arrays.append(pa.array(values))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_sink(path: str, columns: Columns):
+    """Sink for `path` by extension. Returns (sink, path actually written)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".arrow", ".feather"):
+        if pa is not None:
+            return ArrowSink(path, columns, parquet=ext == ".parquet"), path
+        fallback = os.path.splitext(path)[0] + ".csv"
+        warnings.warn(f"pyarrow not installed; writing {fallback} instead of {path}")
+        return CsvSink(fallback, columns), fallback
+    if ext == ".csv":
+        return CsvSink(path, columns), path
+    raise ValueError(f"unknown result format: {path}")
+
+
+# =============================================================================
+# Writer
+# =============================================================================
+
+class ResultWriter:
+    """
+    Streaming columnar writer (context manager).
+
+    `append(**row)` adds one row; `extend(**columns)` adds a batch of equal
+    length arrays (scalars broadcast). Chunks go to the sink as they fill.
+    """
+
+    def __init__(self, path: str, columns: Columns = TRADE_COLUMNS, chunk_rows: int = 1 << 16):
+        self.sink, self.path = open_sink(path, columns)
+        self.buffer = ColumnBuffer(columns, chunk_rows)
+        self.rows = 0
+        self.chunks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        buffer = self.buffer
+        if buffer.n:
+            self.sink.write(buffer.view())
+            self.rows += buffer.n
+            self.chunks += 1
+            buffer.n = 0
+
+    def append(self, **row):
+        buffer = self.buffer
+        buffer.append(row)
+        if buffer.full:
+            self.flush()
+
+    def extend(self, **columns):
+        n = max((len(v) for v in columns.values() if isinstance(v, np.ndarray)), default=1)
+        buffer, start = self.buffer, 0
+        while start < n:
+            start += buffer.fill(columns, start, n)
+            if buffer.full:
+                self.flush()
+
+    def append_trade(self, result: TradeResult, pool: PoolState, vault: VaultState,
+                     order_size: float, buy_yes: bool, elapsed_seconds: int):
+        """One simulate_trade call (inputs + TradeResult) as a TRADE_COLUMNS row"""
+        self.append(yes_reserve=pool.yes_reserve, no_reserve=pool.no_reserve,
+                    vault_yes=vault.yes_shares, vault_no=vault.no_shares, order_size=order_size,
+                    buy_yes=buy_yes, elapsed_seconds=elapsed_seconds, venue=result.venue,
+                    shares_out=result.shares_out, collateral_in=result.collateral_in,
+                    effective_price_bps=result.effective_price_bps,
+                    price_impact_bps=result.price_impact_bps, fee_bps=result.fee_bps)
+
+    def append_partial_fill(self, result: dict, pool, vault, order_size: float, buy_yes: bool):
+        """One simulate_trade_with_partial_fill breakdown as a PARTIAL_FILL_COLUMNS row"""
+        self.append(yes_reserve=pool.yes_reserve, no_reserve=pool.no_reserve,
+                    vault_yes=vault.yes_shares, vault_no=vault.no_shares, order_size=order_size,
+                    buy_yes=buy_yes, otc_shares=result["otc_shares"],
+                    otc_collateral=result["otc_collateral"], amm_shares=result["amm_shares"],
+                    amm_collateral=result["amm_collateral"], mint_shares=result["mint_shares"],
+                    mint_collateral=result["mint_collateral"],
+                    total_shares=result["total_shares"])
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+# =============================================================================
+# Vectorized Sweeps
+# =============================================================================
+
+def sweep_amm(writer: ResultWriter, liquidity: Sequence[float], p_yes_bps: Sequence[int],
+              trade_sizes: Sequence[float], elapsed_seconds: Sequence[int],
+              buy_yes: Sequence[bool] = (True, False)) -> int:
+    """
+    AMM-only quotes (batch_quote) over the Cartesian product of the axes,
+    written as TRADE_COLUMNS rows with an empty vault. The grid is walked in
+    writer-sized slices of the flat index, so it is never materialized.
+    Returns rows written.
+    """
+    axes = (np.asarray(liquidity, np.float64), np.asarray(p_yes_bps, np.float64),
+            np.asarray(trade_sizes, np.float64), np.asarray(elapsed_seconds, np.int64),
+            np.asarray(buy_yes, bool))
+    shape = tuple(len(a) for a in axes)
+    total = int(np.prod(shape))
+    step = writer.buffer.capacity
+    for start in range(0, total, step):
+        index = np.unravel_index(np.arange(start, min(start + step, total)), shape)
+        liq, p, size, elapsed, direction = (a[i] for a, i in zip(axes, index))
+        no = liq * p / 10000
+        yes = liq - no
+        shares, impact, fee, ok = batch_quote(yes, no, size, direction, elapsed)
+        effective = np.zeros(len(size), np.int64)
+        np.floor_divide(size * 10000, shares, out=effective, where=ok, casting="unsafe")
+        writer.extend(yes_reserve=yes, no_reserve=no, vault_yes=0.0, vault_no=0.0,
+                      order_size=size, buy_yes=direction, elapsed_seconds=elapsed,
+                      venue=np.where(ok, VENUES.index("amm"), VENUES.index("rejected")),
+                      shares_out=np.where(ok, shares, 0.0), collateral_in=size,
+                      effective_price_bps=effective, price_impact_bps=impact, fee_bps=fee)
+    return total
+
+
+def read_csv_columns(path: str) -> Dict[str, np.ndarray]:
+    """Load a CSV written by CsvSink back into columns (for checks on small files)"""
+    with open(path, newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows)
+        data = list(zip(*rows))
+    return {name: np.asarray(values) for name, values in zip(header, data)}
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(n_rows: int = 10_000_000):
+    import contextlib
+    import io
+
+    import simulate_partial_fill as partial_fill
+    from simulate_router import run_multivenue_demo, run_simulations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print_header("Demo Tables as Rows")
+        targets = [
+            ("run_simulations", run_simulations, TRADE_COLUMNS),
+            ("run_multivenue_demo", run_multivenue_demo, TRADE_COLUMNS),
+            ("partial_fill.main", partial_fill.main, PARTIAL_FILL_COLUMNS),
+        ]
+        for label, demo, columns in targets:
+            with ResultWriter(os.path.join(tmp, f"{label}.csv"), columns) as writer, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                demo(results=writer)
+            print(f"   {label:<22} {writer.rows:>4} rows -> {os.path.basename(writer.path)}")
+
+        print_header(f"Streaming AMM Sweep ({n_rows:,} rows, 65,536-row chunks)")
+        n_sizes = max(n_rows // (50 * 20 * 10 * 2), 1)
+        axes = (np.geomspace(100, 100_000, 50), np.linspace(1000, 9000, 20),
+                np.geomspace(1, 10_000, n_sizes), np.linspace(0, 3 * 86400, 10), (True, False))
+        formats = ["csv"] + (["parquet", "arrow"] if pa is not None else [])
+        print(f"\n{'Format':<10} | {'Rows':>12} | {'Rows/s':>12} | {'Size':>10}")
+        print("-" * 54)
+        for fmt in formats:
+            path = os.path.join(tmp, f"sweep.{fmt}")
+            t0 = time.perf_counter()
+            with ResultWriter(path) as writer:
+                rows = sweep_amm(writer, *axes)
+            secs = time.perf_counter() - t0
+            print(f"{fmt:<10} | {rows:>12,} | {rows / secs:>12,.0f} | "
+                  f"{os.path.getsize(writer.path) / 2**20:>8.1f}MB")
+            os.remove(writer.path)
+        if pa is None:
+            print("\n   pyarrow not installed: Parquet/Arrow requests fall back to CSV")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Vectorized (NumPy) versions of the PMFeeHook fee and AMM buy models.
+
+Evaluates whole grids of (reserves, trade size, elapsed time, direction) in one
+call instead of looping over `simulate_amm_buy` / `calculate_hook_fee` with a
+fresh `PoolState` per trade. Every operation mirrors the scalar code in
+`simulate_router.py` step for step, so float inputs give bit-identical results.
+The per-chunk kernels (p_yes_bps_kernel, fee_kernel, amm_kernel) are public
+for callers that keep their own columns (simulate_portfolio, simulate_optimize).
+
+Requires: numpy
+"""
+
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+
+from simulate_router import (
+    MIN_FEE_BPS, MAX_FEE_BPS, BOOTSTRAP_WINDOW, MAX_PRICE_IMPACT_BPS,
+    MAX_SKEW_FEE_BPS, SKEW_REF_BPS, ASYMMETRIC_FEE_BPS, FEE_CAP_BPS,
+    BASE_RELATIVE_SPREAD_BPS, MAX_IMBALANCE_BOOST_BPS, MAX_TIME_BOOST_BPS, MAX_SPREAD_BPS,
+    MIN_ABSOLUTE_SPREAD_BPS, MAX_VAULT_DEPLETION_PCT,
+    PoolState, calculate_hook_fee, simulate_amm_buy, max_amm_collateral_under_impact,
+)
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+# Grid points per kernel pass. Keeping temporaries cache-resident is worth ~4x
+# over whole-array passes on 10^6-point grids.
+CHUNK = 1 << 14
+
+
+def _f64(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def p_yes_bps_kernel(yes: np.ndarray, no: np.ndarray) -> np.ndarray:
+    """PoolState.p_yes_bps over float64 arrays, as integral float64 (kernel input)"""
+    # int(x) == floor(x) for x >= 0
+    total = yes + no
+    empty = total == 0
+    if empty.any():
+        p_yes = np.divide(no, total, out=np.full(total.shape, 0.5), where=~empty)
+    else:
+        p_yes = np.divide(no, total)
+    p_yes *= 10000
+    return np.floor(p_yes, out=p_yes)
+
+
+def _select(mask: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # np.where(mask, a, b) for float64 as a bitwise select on an all-ones/zero
+    # int64 mask: branch-free, so random directions cost no mispredictions
+    a, b = a.view(np.int64), b.view(np.int64)
+    out = a ^ b
+    out &= mask
+    out ^= b
+    return out.view(np.float64)
+
+
+def batch_p_yes_bps(yes_reserve, no_reserve) -> np.ndarray:
+    """Vectorized PoolState.p_yes_bps"""
+    yes, no = np.broadcast_arrays(_f64(yes_reserve), _f64(no_reserve))
+    return p_yes_bps_kernel(yes, no).astype(np.int64)
+
+
+# =============================================================================
+# Kernels (one chunk of 1-D arrays)
+# =============================================================================
+
+def _skew_fee(p_bps: np.ndarray) -> np.ndarray:
+    # Skew fee (quadratic curve, saturates at SKEW_REF_BPS)
+    skew = np.abs(p_bps - 5000)
+    ratio = skew / SKEW_REF_BPS
+    skew_fee = MAX_SKEW_FEE_BPS * ratio
+    skew_fee *= ratio
+    np.floor(skew_fee, out=skew_fee)
+    np.minimum(skew_fee, MAX_SKEW_FEE_BPS, out=skew_fee)
+
+    # Asymmetric fee (linear)
+    skew *= ASYMMETRIC_FEE_BPS
+    skew /= 5000
+    return skew_fee + np.floor(skew, out=skew)
+
+
+# Skew + asymmetric fee depend only on the integral p_bps: tabulate all 10001
+_SKEW_FEE = _skew_fee(np.arange(10001, dtype=np.float64))
+
+
+def fee_kernel(p_bps: np.ndarray, elapsed: np.ndarray) -> np.ndarray:
+    """calculate_hook_fee from p_yes_bps_kernel output and elapsed seconds (float64)"""
+    # Bootstrap fee (linear decay). Clamping elapsed at the window end yields
+    # MAX_FEE_BPS - (MAX_FEE_BPS - MIN_FEE_BPS) == MIN_FEE_BPS exactly.
+    fee = np.minimum(elapsed, BOOTSTRAP_WINDOW) / BOOTSTRAP_WINDOW
+    fee *= MAX_FEE_BPS - MIN_FEE_BPS
+    np.floor(fee, out=fee)
+    np.subtract(MAX_FEE_BPS, fee, out=fee)
+
+    fee += _SKEW_FEE.take(p_bps.astype(np.intp))
+    return np.minimum(fee, FEE_CAP_BPS, out=fee)
+
+
+def amm_kernel(yes, no, amount_in, buy_yes, fee, p_before,
+               max_impact_bps=MAX_PRICE_IMPACT_BPS):
+    """
+    simulate_amm_buy over equal-length 1-D float64 arrays, given the fee and
+    pre-trade p_yes_bps_kernel. Returns (shares_out, price_impact_bps, ok).
+    """
+    # Swap the opposite side for desired
+    mask = np.negative(buy_yes, dtype=np.int64)
+    reserve_in = _select(mask, no, yes)
+    reserve_out = _select(mask, yes, no)
+
+    # Constant product with fee
+    amount_in_with_fee = 10000 - fee
+    amount_in_with_fee *= amount_in
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * 10000
+    denominator += amount_in_with_fee
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swap_out = np.divide(numerator, denominator, out=numerator)
+
+    valid = (yes != 0) & (no != 0) & (swap_out < reserve_out)
+    if not valid.all():
+        swap_out[~valid] = 0.0
+
+    # Post-trade reserves and price impact (total is direction-independent)
+    reserve_in += amount_in
+    reserve_out -= swap_out
+    total_after = reserve_in + reserve_out
+    price_impact = _select(mask, reserve_in, reserve_out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_impact /= total_after
+    price_impact *= 10000
+    np.floor(price_impact, out=price_impact)
+    price_impact -= p_before
+    np.abs(price_impact, out=price_impact)
+
+    shares_out = np.add(amount_in, swap_out, out=swap_out)
+    would_succeed = price_impact <= max_impact_bps
+    if not valid.all():
+        shares_out[~valid] = 0.0
+        price_impact[~valid] = 0
+        would_succeed &= valid
+
+    return shares_out, price_impact.astype(np.int64), would_succeed
+
+
+def _run_chunked(kernel, n_out: int, *arrays):
+    n = arrays[0].shape[0]
+    if n <= CHUNK:
+        return kernel(*arrays)
+    # Write each chunk straight into preallocated outputs (no concatenate pass)
+    out = None
+    for i in range(0, n, CHUNK):
+        part = kernel(*(a[i:i + CHUNK] for a in arrays))
+        if n_out == 1:
+            part = (part,)
+        if out is None:
+            out = tuple(np.empty(n, dtype=p.dtype) for p in part)
+        for o, p in zip(out, part):
+            o[i:i + CHUNK] = p
+    return out[0] if n_out == 1 else out
+
+
+def _flat(shape, *arrays):
+    return [np.ascontiguousarray(np.broadcast_to(a, shape)).ravel() for a in arrays]
+
+
+# =============================================================================
+# Fee Calculation (PMFeeHook logic)
+# =============================================================================
+
+def batch_hook_fee(yes_reserve, no_reserve, elapsed_seconds=0) -> np.ndarray:
+    """Vectorized calculate_hook_fee over arrays of pools and elapsed times"""
+    yes, no, elapsed = _f64(yes_reserve), _f64(no_reserve), np.asarray(elapsed_seconds, np.int64)
+    shape = np.broadcast_shapes(yes.shape, no.shape, elapsed.shape)
+    yes, no, elapsed = _flat(shape, yes, no, elapsed)
+
+    def kernel(yes, no, elapsed):
+        return fee_kernel(p_yes_bps_kernel(yes, no), elapsed).astype(np.int64)
+
+    return _run_chunked(kernel, 1, yes, no, elapsed).reshape(shape)
+
+
+# =============================================================================
+# AMM Simulation
+# =============================================================================
+
+def batch_amm_buy(yes_reserve, no_reserve, collateral_in, buy_yes,
+                  fee_bps) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized simulate_amm_buy. All arguments broadcast against each other.
+
+    Returns: (shares_out, price_impact_bps, would_succeed)
+    """
+    args = (_f64(yes_reserve), _f64(no_reserve), _f64(collateral_in),
+            np.asarray(buy_yes, bool), _f64(fee_bps))
+    shape = np.broadcast_shapes(*(a.shape for a in args))
+
+    def kernel(yes, no, amount_in, buy_yes, fee):
+        return amm_kernel(yes, no, amount_in, buy_yes, fee, p_yes_bps_kernel(yes, no))
+
+    out = _run_chunked(kernel, 3, *_flat(shape, *args))
+    return tuple(a.reshape(shape) for a in out)
+
+
+def batch_quote(yes_reserve, no_reserve, collateral_in, buy_yes=True,
+                elapsed_seconds=3600) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hook fee + AMM buy for every grid point in one call (fee priced off the
+    pre-trade pool, as in simulate_trade).
+
+    Returns: (shares_out, price_impact_bps, fee_bps, would_succeed)
+    """
+    args = (_f64(yes_reserve), _f64(no_reserve), _f64(collateral_in),
+            np.asarray(buy_yes, bool), np.asarray(elapsed_seconds, np.int64))
+    shape = np.broadcast_shapes(*(a.shape for a in args))
+
+    def kernel(yes, no, amount_in, buy_yes, elapsed):
+        p_before = p_yes_bps_kernel(yes, no)
+        fee = fee_kernel(p_before, elapsed)
+        shares_out, impact, ok = amm_kernel(yes, no, amount_in, buy_yes, fee, p_before)
+        return shares_out, impact, fee.astype(np.int64), ok
+
+    out = _run_chunked(kernel, 4, *_flat(shape, *args))
+    return tuple(a.reshape(shape) for a in out)
+
+
+def batch_max_amm_under_impact(yes_reserve, no_reserve, buy_yes, fee_bps,
+                               max_impact_bps=MAX_PRICE_IMPACT_BPS,
+                               max_collateral=np.inf) -> np.ndarray:
+    """
+    Vectorized max_amm_collateral_under_impact (closed-form, no search),
+    clamped to max_collateral. Empty pools and a zero cap give 0.
+    """
+    yes, no, fee, cap, max_coll = np.broadcast_arrays(
+        _f64(yes_reserve), _f64(no_reserve), _f64(fee_bps),
+        np.asarray(max_impact_bps, np.int64), _f64(max_collateral),
+    )
+    buy_yes = np.broadcast_to(np.asarray(buy_yes, bool), yes.shape)
+
+    p_before = p_yes_bps_kernel(yes, no)
+    target = np.where(buy_yes, p_before + cap + 1, 10000 - p_before + cap) / 10000
+    reserve_in = np.where(buy_yes, no, yes)
+    reserve_out = np.where(buy_yes, yes, no)
+
+    g = (10000 - fee) / 10000
+    a = (1 - target) * g
+    b = (1 - target) * reserve_in * (1 + g)
+    c = (1 - target) * reserve_in * reserve_in - target * reserve_in * reserve_out
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe = -2 * c / (b + np.sqrt(b * b - 4 * a * c))
+
+    safe = np.where(c >= 0, 0.0, safe)
+    safe = np.where(target >= 1, np.inf, safe)
+    safe = np.where((yes == 0) | (no == 0) | (cap == 0), 0.0, safe)
+    return np.minimum(safe, max_coll)
+
+
+def batch_vault_otc(vault_yes, vault_no, collateral_in, buy_yes, twap_p_yes_bps,
+                    hours_to_close=168, base_spread_bps=BASE_RELATIVE_SPREAD_BPS,
+                    max_imbalance_boost_bps=MAX_IMBALANCE_BOOST_BPS,
+                    max_time_boost_bps=MAX_TIME_BOOST_BPS, max_spread_bps=MAX_SPREAD_BPS,
+                    min_absolute_spread_bps=MIN_ABSOLUTE_SPREAD_BPS,
+                    max_depletion_pct=MAX_VAULT_DEPLETION_PCT
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized simulate_vault_otc (spread from calculate_vault_spread). The
+    keyword constants default to PMHookRouter's and can be swept.
+
+    Returns: (shares_out, collateral_used, filled)
+    """
+    vault_yes, vault_no, amount_in, hours = np.broadcast_arrays(
+        _f64(vault_yes), _f64(vault_no), _f64(collateral_in), _f64(hours_to_close))
+    buy_yes = np.broadcast_to(np.asarray(buy_yes, bool), amount_in.shape)
+    twap = np.broadcast_to(np.asarray(twap_p_yes_bps, np.int64), amount_in.shape)
+
+    # Spread: imbalance boost when consuming the scarce side, time boost < 24h
+    total = vault_yes + vault_no
+    consuming_scarce = buy_yes == (vault_yes < vault_no)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        imbalance = np.floor(np.maximum(vault_yes, vault_no) / total * 10000)
+    boosted = consuming_scarce & (total > 0) & (imbalance > 5000)
+    spread = np.where(boosted, np.floor(max_imbalance_boost_bps * (imbalance - 5000) / 5000), 0)
+    spread += base_spread_bps
+    spread += np.where(hours < 24, np.floor(max_time_boost_bps * (24 - hours) / 24), 0)
+    spread = np.minimum(spread, max_spread_bps).astype(np.int64)
+
+    share_price_bps = np.where(buy_yes, twap, 10000 - twap)
+    spread_bps = np.maximum(share_price_bps * spread // 10000, min_absolute_spread_bps)
+    effective_price_bps = np.minimum(share_price_bps + spread_bps, 10000)
+
+    raw_shares = amount_in * 10000 / effective_price_bps
+    available = np.where(buy_yes, vault_yes, vault_no)
+    max_from_vault = available * max_depletion_pct / 100
+    max_from_vault = np.where((max_from_vault < 1) & (available > 0) & (raw_shares > 0),
+                              1.0, max_from_vault)
+    shares_out = np.minimum(np.minimum(raw_shares, max_from_vault), available)
+    collateral_used = np.where(shares_out == raw_shares, amount_in,
+                               np.ceil(shares_out * effective_price_bps / 10000))
+
+    filled = (available != 0) & (shares_out > 0)
+    return np.where(filled, shares_out, 0.0), np.where(filled, collateral_used, 0.0), filled
+
+
+def make_grid(liquidity, trade_sizes, elapsed_seconds, buy_yes=(True, False),
+              p_yes_bps=(5000,)):
+    """
+    Cartesian product of sweep axes, flattened to 1-D arrays.
+
+    Pools are built like run_simulations(): total liquidity split so that
+    NO / (YES + NO) = p_yes_bps.
+
+    Returns: (yes_reserve, no_reserve, collateral_in, elapsed_seconds, buy_yes)
+    """
+    liq, p, size, elapsed, direction = np.meshgrid(
+        _f64(liquidity), _f64(p_yes_bps), _f64(trade_sizes),
+        np.asarray(elapsed_seconds, dtype=np.int64), np.asarray(buy_yes, dtype=bool),
+        indexing="ij",
+    )
+    no = liq * p / 10000
+    yes = liq - no
+    return yes.ravel(), no.ravel(), size.ravel(), elapsed.ravel(), direction.ravel()
+
+
+# =============================================================================
+# Scalar Equivalence + Throughput
+# =============================================================================
+
+def scalar_quote(yes, no, size, elapsed, buy_yes):
+    """Reference loop over the scalar simulate_router functions"""
+    n = len(yes)
+    shares = np.empty(n)
+    impact = np.empty(n, dtype=np.int64)
+    fees = np.empty(n, dtype=np.int64)
+    ok = np.empty(n, dtype=bool)
+    for i in range(n):
+        pool = PoolState(float(yes[i]), float(no[i]))
+        fee = calculate_hook_fee(pool, int(elapsed[i]))
+        shares[i], impact[i], ok[i] = simulate_amm_buy(pool, float(size[i]), bool(buy_yes[i]), fee)
+        fees[i] = fee
+    return shares, impact, fees, ok
+
+
+def count_mismatches(batch, scalar) -> int:
+    return sum(int(np.count_nonzero(b != s)) for b, s in zip(batch, scalar))
+
+
+def main() -> int:
+    print("=" * 80)
+    print(" Vectorized AMM + Fee Engine")
+    print("=" * 80)
+
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    liq = rng.uniform(10, 20_000, n)
+    p = rng.integers(100, 9900, n)
+    no = liq * p / 10000
+    yes = liq - no
+    size = rng.uniform(1, 5_000, n)
+    elapsed = rng.integers(0, 3 * BOOTSTRAP_WINDOW, n)
+    buy_yes = rng.random(n) < 0.5
+
+    batch_secs = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        batch = batch_quote(yes, no, size, buy_yes, elapsed)
+        batch_secs = min(batch_secs, time.perf_counter() - t0)
+
+    # Full scalar baseline over the same grid (no extrapolation from a sample)
+    t0 = time.perf_counter()
+    scalar = scalar_quote(yes, no, size, elapsed, buy_yes)
+    scalar_secs = time.perf_counter() - t0
+
+    mismatches = count_mismatches(batch, scalar)
+    speedup = scalar_secs / batch_secs
+
+    print(f"\n   Grid points:         {n:,}")
+    print(f"   Batch engine:        {batch_secs:.3f}s ({n / batch_secs:,.0f} quotes/s, best of 3)")
+    print(f"   Scalar loop:         {scalar_secs:.1f}s ({n / scalar_secs:,.0f} quotes/s)")
+    target_met = speedup >= 100
+    print(f"   Speedup:             {speedup:.0f}x "
+          f"(target 100x -> {'OK' if target_met else 'MISSED'})")
+    print(f"   Mismatches vs scalar ({n:,} points): {mismatches}")
+    print(f"   Rejected (>{MAX_PRICE_IMPACT_BPS}bps or drain): "
+          f"{np.count_nonzero(~batch[3]) / n * 100:.1f}%")
+
+    t0 = time.perf_counter()
+    safe = batch_max_amm_under_impact(yes, no, buy_yes, batch[2])
+    solver_secs = time.perf_counter() - t0
+    sample = 50_000
+    scalar_safe = np.array([
+        max_amm_collateral_under_impact(PoolState(float(yes[i]), float(no[i])),
+                                        bool(buy_yes[i]), int(batch[2][i]))
+        for i in range(sample)
+    ])
+    solver_mismatches = np.count_nonzero(~np.isclose(safe[:sample], scalar_safe, rtol=1e-12))
+    print(f"\n   Max-size-under-impact solver: {solver_secs:.3f}s for {n:,} pools")
+    print(f"   Mismatches vs scalar ({sample:,} pools, rtol 1e-12): {solver_mismatches}")
+    return 1 if mismatches or solver_mismatches or not target_met else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
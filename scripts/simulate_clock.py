@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Discrete-event clock for one market, from creation to resolution.
+
+The other scripts take time as a fixed argument (`elapsed_seconds=3600`,
+`hours_to_close=168`). Here a Scheduler keeps a heap of events keyed by
+(block, priority, sequence); every event in a block shares that block's
+timestamp (BLOCK_TIME seconds apart) and runs in priority order, so phase
+changes land before keeper actions and keeper actions before trades.
+
+Time-dependent quantities are recomputed only when their inputs change:
+- bootstrap fee: a TimedValue cached until the decay curve's next step
+- volatility fee: cached until a snapshot is recorded or one goes stale
+- TWAP rolls: scheduled at the moment obs1 turns 30 minutes old
+- close window / close / resolution: one event each at their timestamps
+- withdrawal cooldowns: one withdrawal scheduled at the unlock time,
+  moved when a further deposit shifts the weighted deposit time
+"""
+
+import heapq
+import random
+import sys
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Hashable, Optional
+
+from simulate_fee_hook import (
+    BPS, CLOSE_MODE_DYNAMIC, CLOSE_MODE_FIXED, CLOSE_MODE_HALT, CLOSE_MODE_MIN_FEE,
+    DEFAULT_FEE_CONFIG, FLAG_BOOTSTRAP, FLAG_VOLATILITY, HALTED, CompiledFee, FeeConfig, FeeTable,
+    PriceHistory, fee_table, volatility_fee,
+)
+from simulate_rebalance import Rebalancer
+from simulate_router import FLOAT_ENGINE, Engine, PoolState, VaultState, print_header
+from simulate_sequence import MarketSequencer
+from simulate_twap import BLOCK_TIME, MIN_TWAP_UPDATE_INTERVAL, TwapOracle
+from simulate_vault import WAD, VaultLedger
+
+NEVER = float("inf")
+
+# Order of events within one block
+PRIORITY_PHASE = 0    # Close window, close, resolution
+PRIORITY_KEEPER = 1   # TWAP rolls, keeper rebalances
+PRIORITY_TRADE = 2
+PRIORITY_LP = 3       # Vault deposits and withdrawals
+
+
+# =============================================================================
+# Scheduler
+# =============================================================================
+
+class Scheduler:
+    """
+    Heap of pending events over block timestamps.
+
+    `at(t, handler, *args)` runs handler(*args) in the first block whose
+    timestamp is >= t (never earlier than the current block) and returns an
+    event id for `cancel`. Cancelled events stay in the heap and are dropped
+    when popped, so cancelling is O(1).
+    """
+
+    __slots__ = ("genesis", "block_time", "now", "block", "_queue", "_seq", "_cancelled",
+                 "events_run")
+
+    def __init__(self, genesis: int = 0, block_time: int = BLOCK_TIME):
+        self.genesis = genesis
+        self.block_time = block_time
+        self.now = genesis
+        self.block = 0
+        self._queue = []
+        self._seq = 0
+        self._cancelled = set()
+        self.events_run = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def block_at(self, t) -> int:
+        """First block whose timestamp is >= t"""
+        return int(-(-(t - self.genesis) // self.block_time))
+
+    def timestamp(self, block: int) -> int:
+        return self.genesis + block * self.block_time
+
+    def at(self, t, handler: Callable, *args, priority: int = PRIORITY_TRADE) -> int:
+        block = max(self.block_at(t), self.block)
+        self._seq += 1
+        heapq.heappush(self._queue, (block, priority, self._seq, handler, args))
+        return self._seq
+
+    def after(self, delay, handler: Callable, *args, priority: int = PRIORITY_TRADE) -> int:
+        return self.at(self.now + delay, handler, *args, priority=priority)
+
+    def cancel(self, event_id: int):
+        self._cancelled.add(event_id)
+
+    def run(self, until=None) -> int:
+        """Run events up to timestamp `until` (or until the heap is empty). Returns events run."""
+        queue, cancelled = self._queue, self._cancelled
+        last_block = None if until is None else (until - self.genesis) // self.block_time
+        n = 0
+        while queue:
+            if last_block is not None and queue[0][0] > last_block:
+                break
+            block, _, seq, handler, args = heapq.heappop(queue)
+            if cancelled and seq in cancelled:
+                cancelled.discard(seq)
+                continue
+            if block != self.block:
+                self.block = block
+                self.now = self.genesis + block * self.block_time
+            handler(*args)
+            n += 1
+        if last_block is not None and last_block > self.block:
+            self.block = int(last_block)
+            self.now = self.timestamp(self.block)
+        self.events_run += n
+        return n
+
+
+# =============================================================================
+# Cached Time-Dependent Values
+# =============================================================================
+
+class TimedValue:
+    """
+    f(t) cached over [valid_from, valid_until).
+
+    `next_change(t)` returns the first time after t at which f may differ.
+    `get(t, key)` also recomputes whenever `key` (a version of the other
+    inputs, e.g. the price history write position) differs from the last call.
+    """
+
+    __slots__ = ("compute", "next_change", "value", "valid_from", "valid_until", "key",
+                 "reads", "evaluations")
+
+    def __init__(self, compute: Callable[[int], int], next_change: Callable[[int], float]):
+        self.compute = compute
+        self.next_change = next_change
+        self.value = None
+        self.valid_from = NEVER
+        self.valid_until = -NEVER
+        self.key = None
+        self.reads = 0
+        self.evaluations = 0
+
+    def get(self, t: int, key: Hashable = None):
+        self.reads += 1
+        if self.valid_from <= t < self.valid_until and key == self.key:
+            return self.value
+        self.evaluations += 1
+        self.value = self.compute(t)
+        self.valid_from = t
+        self.valid_until = self.next_change(t)
+        self.key = key
+        return self.value
+
+
+def bootstrap_next_change(table: FeeTable) -> Callable[[int], float]:
+    """Next elapsed second at which FeeTable.base_fee can change"""
+    cfg = table.config
+    window = cfg.bootstrap_window if cfg.flags & FLAG_BOOTSTRAP else 0
+    if not window:
+        return lambda elapsed: NEVER
+
+    fees = table.bootstrap
+    steps = [p for p in range(1, BPS) if fees[p] != fees[p - 1]] + [BPS]
+
+    def next_change(elapsed: int) -> float:
+        if elapsed >= window:
+            return NEVER
+        if elapsed <= 0:
+            return 1
+        step = steps[bisect_right(steps, elapsed * BPS // window)]
+        return -(-step * window // BPS)  # First elapsed with progressBps >= step
+
+    return next_change
+
+
+def volatility_next_change(cfg: FeeConfig, history: PriceHistory) -> Callable[[int], float]:
+    """Next time a snapshot leaves the staleness window (new snapshots bump the key)"""
+    window = cfg.volatility_window
+    if not window:
+        return lambda now: NEVER
+
+    def next_change(now: int) -> float:
+        # A snapshot counts while ts >= now - window
+        return min((ts + window + 1 for ts in history.timestamps if ts and ts + window >= now),
+                   default=NEVER)
+
+    return next_change
+
+
+class TimedFee:
+    """
+    PMFeeHook fee for one market on the simulated clock.
+
+    Drop-in for Engine.hook_fee(pool, elapsed_seconds) and equal to
+    CompiledFee(yes, no, elapsed, close - elapsed, history, elapsed). The
+    bootstrap and volatility components are TimedValues; only the skew
+    lookup runs on every call.
+    """
+
+    __slots__ = ("config", "close", "history", "base", "volatility", "_skew", "_cap",
+                 "_close_window", "_close_fee")
+
+    def __init__(self, cfg: FeeConfig = DEFAULT_FEE_CONFIG, close: Optional[int] = None,
+                 history: Optional[PriceHistory] = None):
+        table = fee_table(cfg)
+        self.config = cfg
+        self.close = close
+        self.history = history
+        self.base = TimedValue(table.base_fee, bootstrap_next_change(table))
+        self.volatility = None
+        if cfg.flags & FLAG_VOLATILITY and history is not None:
+            self.volatility = TimedValue(lambda now: volatility_fee(cfg, history, now),
+                                         volatility_next_change(cfg, history))
+        self._skew = table.skew
+        self._cap = cfg.fee_cap_bps
+        self._close_window = cfg.close_window
+        # Fee inside the close window: None = fall through to dynamic (mode 3)
+        self._close_fee = {
+            CLOSE_MODE_HALT: HALTED,
+            CLOSE_MODE_FIXED: min(cfg.close_window_fee_bps, cfg.fee_cap_bps),
+            CLOSE_MODE_MIN_FEE: cfg.min_fee_bps,
+            CLOSE_MODE_DYNAMIC: None,
+        }[cfg.close_window_mode]
+
+    @property
+    def halts_in_close_window(self) -> bool:
+        return self.config.close_window_mode == CLOSE_MODE_HALT
+
+    def __call__(self, pool: PoolState, elapsed_seconds: int) -> int:
+        close = self.close
+        if close is not None:
+            to_close = close - elapsed_seconds
+            if to_close <= 0:
+                return HALTED
+            if self._close_window and to_close <= self._close_window \
+                    and self._close_fee is not None:
+                return self._close_fee
+
+        fee = self.base.get(elapsed_seconds)
+        yes, no = pool.yes_reserve, pool.no_reserve
+        if yes > 0 and no > 0:
+            fee += self._skew[int(no * BPS // (yes + no))]
+        if self.volatility is not None:
+            history = self.history
+            fee += self.volatility.get(elapsed_seconds, (history.index, history.last_block))
+        return self._cap if fee > self._cap else fee
+
+
+def timed_engine(fee: TimedFee, engine: Engine = FLOAT_ENGINE) -> Engine:
+    """`engine` with its hook fee replaced by the clock-cached TimedFee"""
+    return replace(engine, name=f"{engine.name}+clock", hook_fee=fee)
+
+
+# =============================================================================
+# Market Lifecycle
+# =============================================================================
+
+@dataclass
+class ClockStats:
+    """Event counts and phase timestamps for one TimedMarket"""
+    arrivals: int = 0
+    halted: int = 0                       # Arrivals dropped while trading is halted
+    snapshots: int = 0                    # Volatility snapshots recorded
+    twap_rolls: int = 0                   # Rolls by the TWAP keeper event (trades roll too)
+    keeper_retries: int = 0               # Rebalancer retries run on a TWAP roll
+    close_window_at: Optional[int] = None
+    closed_at: Optional[int] = None
+    resolved_at: Optional[int] = None
+    outcome_yes: Optional[bool] = None
+
+
+class TimedMarket:
+    """
+    A MarketSequencer driven by a Scheduler.
+
+    Trades arrive as a Poisson stream (one pending arrival at a time). The
+    TWAP keeper rolls checkpoints exactly when obs1 turns stale and then runs
+    any due Rebalancer retry, so retries happen even when no trade arrives.
+    The close window, close and resolution are single events.
+    """
+
+    __slots__ = ("sched", "market", "fee", "history", "rng", "mean_size", "p_buy_yes",
+                 "seconds_between", "resolve_delay", "next_arrival", "halted", "closed", "stats")
+
+    def __init__(self, sched: Scheduler, market: MarketSequencer, fee: TimedFee, seed: int = 0,
+                 mean_size: float = 60, p_buy_yes: float = 0.5, seconds_between: float = 60,
+                 resolve_delay: int = 0):
+        if market.close_seconds is None:
+            raise ValueError("a timed market needs close_seconds")
+        self.sched = sched
+        self.market = market
+        self.fee = fee
+        self.history = fee.history
+        self.rng = random.Random(seed)
+        self.mean_size = mean_size
+        self.p_buy_yes = p_buy_yes
+        self.seconds_between = seconds_between
+        self.resolve_delay = resolve_delay
+        self.next_arrival = sched.now  # Unrounded, so block rounding doesn't stretch the flow
+        self.halted = False
+        self.closed = False
+        self.stats = ClockStats()
+
+    def start(self):
+        sched, close = self.sched, self.market.close_seconds
+        self._schedule_arrival()
+        if self.market.twap is not None:
+            sched.at(self.market.twap.timestamp1 + MIN_TWAP_UPDATE_INTERVAL, self._on_twap,
+                     priority=PRIORITY_KEEPER)
+        if self.fee.config.close_window:
+            sched.at(close - self.fee.config.close_window, self._on_close_window,
+                     priority=PRIORITY_PHASE)
+        sched.at(close, self._on_close, priority=PRIORITY_PHASE)
+        sched.at(close + self.resolve_delay, self._on_resolve, priority=PRIORITY_PHASE)
+
+    # -------------------------------------------------------------------------
+    # Handlers
+    # -------------------------------------------------------------------------
+
+    def _schedule_arrival(self):
+        self.next_arrival += self.rng.expovariate(1 / self.seconds_between)
+        self.sched.at(self.next_arrival, self._on_trade)
+
+    def _on_trade(self):
+        if self.closed:
+            return
+        rng, sched, stats = self.rng, self.sched, self.stats
+        size = rng.expovariate(1 / self.mean_size)
+        buy_yes = rng.random() < self.p_buy_yes
+        stats.arrivals += 1
+        if self.halted:
+            stats.halted += 1
+        else:
+            market = self.market
+            venue = market.apply(size, buy_yes, sched.now)
+            history = self.history
+            if history is not None and venue in ("amm", "mult") \
+                    and history.last_block != sched.block:
+                history.record(sched.now, market.engine.p_yes_bps(market.pool), sched.block)
+                stats.snapshots += 1
+        self._schedule_arrival()
+
+    def _on_twap(self):
+        if self.closed:
+            return
+        market, sched = self.market, self.sched
+        twap, now = market.twap, sched.now
+        if twap.update(now):
+            self.stats.twap_rolls += 1
+        keeper = market.rebalancer
+        if keeper is not None and keeper.retry_at is not None and now >= keeper.retry_at:
+            keeper.attempt(market, now)
+            self.stats.keeper_retries += 1
+        sched.at(twap.timestamp1 + MIN_TWAP_UPDATE_INTERVAL, self._on_twap,
+                 priority=PRIORITY_KEEPER)
+
+    def _on_close_window(self):
+        self.stats.close_window_at = self.sched.now
+        self.halted = self.fee.halts_in_close_window
+
+    def _on_close(self):
+        self.stats.closed_at = self.sched.now
+        self.halted = self.closed = True
+
+    def _on_resolve(self):
+        self.stats.resolved_at = self.sched.now
+        self.stats.outcome_yes = self.rng.random() < self.market.pool.p_yes
+
+
+def timed_market(sched: Scheduler, close_seconds: int, cfg: FeeConfig = DEFAULT_FEE_CONFIG,
+                 rebalancer: Optional[Rebalancer] = None, liquidity: float = 2_000,
+                 vault_shares: float = 5_000, **flow) -> TimedMarket:
+    """Fresh pool, vault, TWAP oracle and TimedFee wired to `sched` (not yet started)"""
+    pool = PoolState(liquidity, liquidity)
+    history = PriceHistory() if cfg.flags & FLAG_VOLATILITY else None
+    fee = TimedFee(cfg, close_seconds, history)
+    market = MarketSequencer(pool, VaultState(vault_shares, vault_shares),
+                             engine=timed_engine(fee), close_seconds=close_seconds,
+                             twap=TwapOracle(pool, sched.now), rebalancer=rebalancer,
+                             close_window=cfg.close_window)
+    return TimedMarket(sched, market, fee, **flow)
+
+
+# =============================================================================
+# Withdrawal Cooldowns (_checkWithdrawalCooldown)
+# =============================================================================
+
+@dataclass
+class CooldownStats:
+    deposits: int = 0
+    withdrawals: int = 0
+    reverts: int = 0                      # WithdrawalTooSoon (should stay 0)
+    moved: int = 0                        # Withdrawals rescheduled by a later deposit
+    waited_seconds: int = 0               # Sum of cooldown waits
+    max_wait: int = 0
+
+    def polling_checks(self, block_time: int = BLOCK_TIME) -> int:
+        """Cooldown checks a per-block poller would have made over the same waits"""
+        return self.waited_seconds // block_time
+
+
+class CooldownFlow:
+    """
+    LPs deposit into a VaultLedger at random times until `close`, and each
+    withdraws everything as soon as _checkWithdrawalCooldown allows. Instead of
+    polling, one withdrawal per LP is scheduled at its unlock time; a further
+    deposit cancels it and schedules the new unlock.
+    """
+
+    __slots__ = ("sched", "ledger", "n_lps", "close", "rng", "mean_deposit", "seconds_between",
+                 "next_deposit", "pending", "deposited_at", "stats")
+
+    def __init__(self, sched: Scheduler, ledger: VaultLedger, n_lps: int, seed: int = 0,
+                 mean_deposit: int = 500, seconds_between: float = 600):
+        self.sched = sched
+        self.ledger = ledger
+        self.n_lps = n_lps
+        self.close = ledger.close
+        self.rng = random.Random(seed)
+        self.mean_deposit = mean_deposit
+        self.seconds_between = seconds_between
+        self.next_deposit = sched.now
+        self.pending: Dict[int, int] = {}        # lp -> withdrawal event id
+        self.deposited_at: Dict[int, int] = {}   # lp -> first deposit of the pending cycle
+        self.stats = CooldownStats()
+
+    def start(self):
+        self._schedule_deposit()
+
+    def _schedule_deposit(self):
+        self.next_deposit += self.rng.expovariate(1 / self.seconds_between)
+        self.sched.at(self.next_deposit, self._on_deposit, priority=PRIORITY_LP)
+
+    def _on_deposit(self):
+        sched, ledger, rng, stats = self.sched, self.ledger, self.rng, self.stats
+        now = sched.now
+        if now >= self.close:
+            return
+        lp = rng.randrange(self.n_lps)
+        shares = (int(rng.expovariate(1 / self.mean_deposit)) + 1) * WAD
+        try:
+            ledger.deposit(lp, rng.random() < 0.5, shares, now)
+        except ValueError:
+            pass
+        else:
+            stats.deposits += 1
+            event = self.pending.pop(lp, None)
+            if event is not None:
+                sched.cancel(event)
+                stats.moved += 1
+            self.deposited_at.setdefault(lp, now)
+            self.pending[lp] = sched.after(ledger.cooldown_remaining(lp, now), self._on_withdraw,
+                                           lp, priority=PRIORITY_LP)
+        self._schedule_deposit()
+
+    def _on_withdraw(self, lp: int):
+        ledger, stats, now = self.ledger, self.stats, self.sched.now
+        del self.pending[lp]
+        try:
+            for is_yes, side in ((True, 0), (False, 1)):
+                if ledger.vault_shares[side, lp]:
+                    ledger.withdraw(lp, is_yes, 0, now)
+        except ValueError:
+            stats.reverts += 1
+            return
+        stats.withdrawals += 1
+        wait = now - self.deposited_at.pop(lp)
+        stats.waited_seconds += wait
+        if wait > stats.max_wait:
+            stats.max_wait = wait
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def check_timed_fee(cfg: FeeConfig, n: int = 50_000, seed: int = 0, close: int = 4 * 86400) -> int:
+    """Mismatches between TimedFee and CompiledFee over a random walk in time and price"""
+    rng = random.Random(seed)
+    history = PriceHistory()
+    timed, compiled = TimedFee(cfg, close, history), CompiledFee(cfg)
+    t, mismatches = 0, 0
+    while t < close + 3600 and n:
+        t += rng.randrange(1, 180)
+        n -= 1
+        pool = PoolState(rng.uniform(100, 2000), rng.uniform(100, 2000))
+        if rng.random() < 0.3:
+            history.record(t, pool.p_yes_bps, t // BLOCK_TIME)
+        if timed(pool, t) != compiled(pool.yes_reserve, pool.no_reserve, t, close - t, history, t):
+            mismatches += 1
+    return mismatches
+
+
+def main(n_trades: int = 200_000):
+    vol_cfg = FeeConfig(flags=0x37 | FLAG_VOLATILITY, volatility_fee_bps=100,
+                        volatility_window=3600)
+    halt_cfg = replace(DEFAULT_FEE_CONFIG, flags=0x33)
+
+    print_header("TimedFee vs CompiledFee (random walk to 1h past close)")
+    for label, cfg in [("default", DEFAULT_FEE_CONFIG), ("volatility 1h", vol_cfg),
+                       ("sqrt decay, halt", replace(halt_cfg, extra_flags=0x09))]:
+        print(f"   {label:<17} {check_timed_fee(cfg):,} mismatches")
+
+    close = 7 * 86400
+    print_header("One Market, Creation to Resolution (7 days, trade every ~60s)")
+    print(f"\n{'Config':<18} | {'Arrivals':<9} | {'Halted':<7} | {'AMM':<7} | {'OTC':<7} | "
+          f"{'Base fee evals':<15} | {'Vol fee evals':<14} | {'TWAP rolls'}")
+    print("-" * 105)
+    for label, cfg in [("default", DEFAULT_FEE_CONFIG), ("volatility 1h", vol_cfg),
+                       ("halt in window", halt_cfg)]:
+        sched = Scheduler()
+        tm = timed_market(sched, close, cfg, rebalancer=Rebalancer(budget_step=5.0,
+                                                                   price_step_bps=500), seed=1)
+        tm.start()
+        sched.run()
+        fee, s, ms = tm.fee, tm.stats, tm.market.stats
+        base = f"{fee.base.evaluations:,}/{fee.base.reads:,}"
+        vol = f"{fee.volatility.evaluations:,}/{fee.volatility.reads:,}" if fee.volatility else "-"
+        print(f"{label:<18} | {s.arrivals:<9,} | {s.halted:<7,} | {ms.amm:<7,} | "
+              f"{ms.otc + ms.mult:<7,} | {base:<15} | {vol:<14} | {s.twap_rolls:,}")
+    print(f"\n   Phases (last run): close window at {s.close_window_at / 3600:.0f}h, "
+          f"close at {s.closed_at / 3600:.0f}h, resolved {'YES' if s.outcome_yes else 'NO'} "
+          f"at P(YES) {tm.market.pool.p_yes_bps / 100:.2f}%")
+    keeper = tm.market.rebalancer.stats
+    print(f"   Keeper: {keeper.attempts:,} attempts ({s.keeper_retries:,} retries on TWAP rolls, "
+          f"{keeper.rebalanced:,} rebalanced)")
+
+    print_header("Withdrawal Cooldowns (200 LPs, deposits every ~10 minutes until close)")
+    sched = Scheduler()
+    flow = CooldownFlow(sched, VaultLedger(close=close), 200, seed=3)
+    flow.start()
+    sched.run()
+    s = flow.stats
+    print(f"\n   Deposits:          {s.deposits:,} ({s.moved:,} moved a pending withdrawal)")
+    print(f"   Withdrawals:       {s.withdrawals:,}, WithdrawalTooSoon reverts: {s.reverts}")
+    print(f"   Longest wait:      {s.max_wait / 3600:.1f}h (24h cooldown inside the final 12h)")
+    print(f"   Cooldown checks:   {s.withdrawals:,} scheduled vs {s.polling_checks():,} "
+          f"polling every block")
+
+    print_header(f"Throughput ({n_trades:,} arrivals, volatility fee, keeper)")
+    sched = Scheduler()
+    tm = timed_market(sched, n_trades * 60, vol_cfg,
+                      rebalancer=Rebalancer(budget_step=5.0, price_step_bps=500), seed=2)
+    tm.start()
+    t0 = time.perf_counter()
+    sched.run()
+    secs = time.perf_counter() - t0
+    print(f"\n   {sched.events_run:,} events in {secs:.1f}s "
+          f"({sched.events_run / secs:,.0f} events/s, "
+          f"{tm.stats.arrivals / secs:,.0f} trades/s, {sched.now / 86400:,.0f} simulated days)")
+    print(f"   Base fee evaluations: {tm.fee.base.evaluations:,} of {tm.fee.base.reads:,} reads")
+    print(f"   Vol fee evaluations:  {tm.fee.volatility.evaluations:,} of "
+          f"{tm.fee.volatility.reads:,} reads")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+"""
+Exact uint256 integer engine for PMFeeHook / PMHookRouter pricing.
+
+Amounts are wei-denominated Python ints and every division rounds exactly as
+the contracts do:
+- floor division for probabilities, fees, spreads and swap outputs
+- fullMulDiv (floor) for the AMM swap in _quoteAMMBuy
+- ceiling for collateral charged on capped OTC fills in _tryVaultOTCFill
+
+Drop-in for the float model via `EXACT_ENGINE` (see simulate_router.Engine).
+Batched quotes run on fixed-width NumPy arrays of 32-bit limbs (uint64
+products split into halves), so no operation falls back to Python ints.
+
+Throughput target: the scalar exact path must stay within 3x of the scalar
+float engine. main() measures both loops with a fresh PoolState per quote.
+
+Requires: numpy (batched path only)
+"""
+
+import time
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Scalar engine only
+    np = None
+
+from simulate_router import (
+    MIN_FEE_BPS, MAX_FEE_BPS, BOOTSTRAP_WINDOW, MAX_PRICE_IMPACT_BPS,
+    MAX_SKEW_FEE_BPS, SKEW_REF_BPS, ASYMMETRIC_FEE_BPS, FEE_CAP_BPS,
+    MIN_ABSOLUTE_SPREAD_BPS, MAX_SPREAD_BPS, BASE_RELATIVE_SPREAD_BPS,
+    MAX_IMBALANCE_BOOST_BPS, MAX_TIME_BOOST_BPS, MAX_VAULT_DEPLETION_PCT,
+    Engine, FLOAT_ENGINE, PoolState, VaultState,
+    calculate_hook_fee, simulate_amm_buy,
+)
+
+# =============================================================================
+# Constants (cached once, mirror the contracts)
+# =============================================================================
+WAD = 10**18
+BPS = 10000
+BPS_SQUARED = BPS * BPS
+UINT256_MAX = 2**256 - 1
+MAX_COLLATERAL_IN = UINT256_MAX // BPS
+
+FEE_RANGE_BPS = MAX_FEE_BPS - MIN_FEE_BPS
+MAX_VAULT_DEPLETION_BPS = MAX_VAULT_DEPLETION_PCT * 100  # 3000 = 30%
+TIME_BOOST_WINDOW = 86400                                # Last 24 hours
+
+# Default bootstrap decay / skew curve are linear / quadratic (extraFlags = 0x01)
+
+
+# =============================================================================
+# Solidity Math
+# =============================================================================
+
+def mul_div(x: int, y: int, d: int) -> int:
+    """floor(x * y / d); reverts (OverflowError) if x * y overflows uint256"""
+    z = x * y
+    if z > UINT256_MAX or d == 0:
+        raise OverflowError("mulDiv")
+    return z // d
+
+
+def full_mul_div(x: int, y: int, d: int) -> int:
+    """floor(x * y / d) with a 512-bit intermediate; reverts if the result overflows"""
+    if d == 0:
+        raise OverflowError("fullMulDiv")
+    z = x * y // d
+    if z > UINT256_MAX:
+        raise OverflowError("fullMulDiv")
+    return z
+
+
+def ceil_div(x: int, d: int) -> int:
+    return (x + d - 1) // d
+
+
+def exact_p_yes_bps(pool: PoolState) -> int:
+    """_getProbability: NO * 10000 / (YES + NO), 5000 for an empty pool"""
+    total = pool.yes_reserve + pool.no_reserve
+    return 5000 if total == 0 else pool.no_reserve * BPS // total
+
+
+# =============================================================================
+# Fee Calculation (PMFeeHook._computeFee, default config)
+# =============================================================================
+
+def exact_hook_fee(pool: PoolState, elapsed_seconds: int = 0) -> int:
+    """Integer _bootstrapFee + _skewFee + _asymmetricFee, capped at feeCapBps"""
+    # Bootstrap fee (linear decay)
+    if elapsed_seconds <= 0:
+        fee = MAX_FEE_BPS
+    elif elapsed_seconds >= BOOTSTRAP_WINDOW:
+        fee = MIN_FEE_BPS
+    else:
+        progress_bps = elapsed_seconds * BPS // BOOTSTRAP_WINDOW
+        fee = MAX_FEE_BPS - FEE_RANGE_BPS * progress_bps // BPS
+
+    # Skew fee (quadratic curve) + asymmetric fee; both need two-sided reserves
+    if pool.yes_reserve > 0 and pool.no_reserve > 0:
+        p_bps = exact_p_yes_bps(pool)
+        skew = p_bps - 5000 if p_bps > 5000 else 5000 - p_bps
+        if skew >= SKEW_REF_BPS:
+            fee += MAX_SKEW_FEE_BPS
+        else:
+            ratio = skew * BPS // SKEW_REF_BPS
+            fee += MAX_SKEW_FEE_BPS * ratio * ratio // BPS_SQUARED
+        fee += ASYMMETRIC_FEE_BPS * skew // 5000
+
+    return FEE_CAP_BPS if fee > FEE_CAP_BPS else fee
+
+
+# =============================================================================
+# AMM Simulation (PMHookRouter._quoteAMMBuy + PMFeeHook impact check)
+# =============================================================================
+
+def exact_amm_buy(pool: PoolState, collateral_in: int, buy_yes: bool,
+                  fee_bps: int) -> Tuple[int, int, bool]:
+    """
+    Integer AMM buy: split collateral, swap opposite side for desired.
+
+    Returns: (shares_out, price_impact_bps, would_succeed)
+    """
+    yes, no = pool.yes_reserve, pool.no_reserve
+    if yes == 0 or no == 0 or fee_bps >= BPS:
+        return 0, 0, False
+
+    if buy_yes:
+        reserve_in, reserve_out = no, yes
+    else:
+        reserve_in, reserve_out = yes, no
+
+    amount_in_with_fee = collateral_in * (BPS - fee_bps)
+    r_in_scaled = reserve_in * BPS
+    if amount_in_with_fee > UINT256_MAX - r_in_scaled:
+        return 0, 0, False  # Would overflow - impossibly large trade
+    swapped = full_mul_div(amount_in_with_fee, reserve_out, r_in_scaled + amount_in_with_fee)
+
+    # Zero output would donate the split shares; full output would drain
+    if swapped == 0 or swapped >= reserve_out:
+        return 0, 0, False
+
+    p_before = no * BPS // (yes + no)
+    if buy_yes:
+        yes_after, no_after = yes - swapped, no + collateral_in
+    else:
+        yes_after, no_after = yes + collateral_in, no - swapped
+    p_after = no_after * BPS // (yes_after + no_after)
+
+    price_impact = p_after - p_before if p_after > p_before else p_before - p_after
+    return collateral_in + swapped, price_impact, price_impact <= MAX_PRICE_IMPACT_BPS
+
+
+# =============================================================================
+# Vault OTC Simulation (PMHookRouter._tryVaultOTCFill)
+# =============================================================================
+
+def exact_vault_spread(vault: VaultState, buy_yes: bool,
+                       seconds_to_close: int = 168 * 3600) -> int:
+    """Integer _calculateDynamicSpread (relative spread only)"""
+    spread = BASE_RELATIVE_SPREAD_BPS
+
+    yes, no = vault.yes_shares, vault.no_shares
+    total = yes + no
+    if total != 0:
+        yes_scarce = yes < no
+        if buy_yes == yes_scarce:  # Consuming scarce side
+            imbalance = (no if no > yes else yes) * BPS // total
+            if imbalance > 5000:
+                spread += MAX_IMBALANCE_BOOST_BPS * (imbalance - 5000) // 5000
+
+    if 0 < seconds_to_close < TIME_BOOST_WINDOW:
+        spread += MAX_TIME_BOOST_BPS * (TIME_BOOST_WINDOW - seconds_to_close) // TIME_BOOST_WINDOW
+
+    return MAX_SPREAD_BPS if spread > MAX_SPREAD_BPS else spread
+
+
+def exact_vault_otc(vault: VaultState, collateral_in: int, buy_yes: bool,
+                    twap_p_yes_bps: int, seconds_to_close: int = 168 * 3600) -> Tuple[int, int, bool]:
+    """
+    Integer vault OTC fill. Rounds shares down and, when the 30% depletion cap
+    binds, rounds the collateral charged up.
+
+    Returns: (shares_out, collateral_used, filled)
+    """
+    if collateral_in == 0 or collateral_in > MAX_COLLATERAL_IN or twap_p_yes_bps == 0:
+        return 0, 0, False
+
+    available = vault.yes_shares if buy_yes else vault.no_shares
+    if available == 0:
+        return 0, 0, False
+
+    relative_spread_bps = exact_vault_spread(vault, buy_yes, seconds_to_close)
+    share_price_bps = twap_p_yes_bps if buy_yes else BPS - twap_p_yes_bps
+
+    spread_bps = share_price_bps * relative_spread_bps // BPS
+    if spread_bps < MIN_ABSOLUTE_SPREAD_BPS:
+        spread_bps = MIN_ABSOLUTE_SPREAD_BPS
+    effective_price_bps = share_price_bps + spread_bps
+    if effective_price_bps > BPS:
+        effective_price_bps = BPS
+
+    raw_shares = collateral_in * BPS // effective_price_bps
+
+    max_from_vault = available * MAX_VAULT_DEPLETION_BPS // BPS
+    if max_from_vault == 0 and raw_shares != 0:
+        max_from_vault = 1
+
+    shares_out = raw_shares
+    if shares_out > max_from_vault:
+        shares_out = max_from_vault
+    if shares_out > available:
+        shares_out = available
+
+    if shares_out == raw_shares:
+        collateral_used = collateral_in
+    else:
+        collateral_used = ceil_div(shares_out * effective_price_bps, BPS)
+
+    return shares_out, collateral_used, shares_out > 0
+
+
+def _exact_vault_otc_hours(vault: VaultState, collateral_in: int, buy_yes: bool,
+                           twap_p_yes_bps: int, hours_to_close: float = 168) -> Tuple[int, int, bool]:
+    return exact_vault_otc(vault, collateral_in, buy_yes, twap_p_yes_bps,
+                           int(hours_to_close * 3600))
+
+
+EXACT_ENGINE = Engine(
+    name="exact",
+    p_yes_bps=exact_p_yes_bps,
+    hook_fee=exact_hook_fee,
+    amm_buy=exact_amm_buy,
+    vault_otc=_exact_vault_otc_hours,
+)
+
+ENGINES = {e.name: e for e in (FLOAT_ENGINE, EXACT_ENGINE)}
+
+
+# =============================================================================
+# Fixed-Width Limb Arithmetic (NumPy int64 arrays of 32-bit limbs)
+# =============================================================================
+#
+# A batch of uint256 values is a (width, n) int64 array, least significant
+# limb first. Normalized limbs are in [0, 2**32) except the top one, which
+# keeps the sign of intermediate differences. Limb products are taken in
+# uint64 and split into 32-bit halves, so column sums never wrap int64.
+
+LIMB_BITS = 32
+LIMB_MASK = (1 << LIMB_BITS) - 1
+UINT256_LIMBS = 256 // LIMB_BITS
+
+
+def limb_width(values) -> int:
+    """Limbs needed for the largest of values (at least one)"""
+    top = int(max(values, default=0))
+    return max(1, -(-top.bit_length() // LIMB_BITS))
+
+
+def to_limbs(values, width: int = UINT256_LIMBS) -> "np.ndarray":
+    """Non-negative ints below 2**(32 * width) -> (width, n) limbs"""
+    nbytes = 4 * width
+    raw = b"".join([int(v).to_bytes(nbytes, "little") for v in values])
+    return np.frombuffer(raw, dtype="<u4").reshape(-1, width).T.astype(np.int64)
+
+
+def from_limbs(limbs: "np.ndarray") -> "np.ndarray":
+    """Normalized non-negative limbs -> object array of Python ints"""
+    out = np.zeros(limbs.shape[1], dtype=object)
+    for i in range(0, limbs.shape[0], 2):
+        # Two limbs per uint64, then one object-array shift/or per pair
+        word = limbs[i].astype(np.uint64)
+        if i + 1 < limbs.shape[0]:
+            word |= limbs[i + 1].astype(np.uint64) << np.uint64(LIMB_BITS)
+        out |= word.astype(object) << (LIMB_BITS * i)
+    return out
+
+
+def _carry(a: "np.ndarray") -> "np.ndarray":
+    # In place; >> is arithmetic, so negative limbs borrow from the next one
+    for i in range(a.shape[0] - 1):
+        a[i + 1] += a[i] >> LIMB_BITS
+        a[i] &= LIMB_MASK
+    return a
+
+
+def _resize(a: "np.ndarray", width: int) -> "np.ndarray":
+    # Pad with zero limbs, or drop top limbs the caller knows are zero
+    if a.shape[0] >= width:
+        return a[:width]
+    out = np.zeros((width, a.shape[1]), np.int64)
+    out[:a.shape[0]] = a
+    return out
+
+
+def limb_add(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    out = _resize(a, max(a.shape[0], b.shape[0]) + 1).copy()
+    out[:b.shape[0]] += b
+    return _carry(out)
+
+
+def limb_sub(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    """a - b; a negative result has a negative top limb"""
+    out = _resize(a, max(a.shape[0], b.shape[0])).copy()
+    out[:b.shape[0]] -= b
+    return _carry(out)
+
+
+def limb_mul_small(a: "np.ndarray", s) -> "np.ndarray":
+    """a * s for int64 0 <= s < 2**31 (scalar or one per column)"""
+    out = _resize(a, a.shape[0] + 1) * np.asarray(s, np.int64)
+    return _carry(out)
+
+
+def limb_mul(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    """Full product of non-negative a and b (width a + width b)"""
+    out = np.zeros((a.shape[0] + b.shape[0], a.shape[1]), np.int64)
+    bu = b.astype(np.uint64)
+    mask, shift = np.uint64(LIMB_MASK), np.uint64(LIMB_BITS)
+    for i, limb in enumerate(a.astype(np.uint64)):
+        product = limb * bu
+        out[i:i + b.shape[0]] += (product & mask).view(np.int64)
+        out[i + 1:i + 1 + b.shape[0]] += (product >> shift).view(np.int64)
+    return _carry(out)
+
+
+def limb_ge(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    return limb_sub(a, b)[-1] >= 0
+
+
+def limb_is_zero(a: "np.ndarray") -> "np.ndarray":
+    return ~a.any(axis=0)
+
+
+def limb_select(mask, a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    """Per-column np.where over equal-width limb arrays"""
+    return np.where(mask, a, b)
+
+
+def _to_float(a: "np.ndarray") -> "np.ndarray":
+    # Relative error below width * 2**-53
+    f = a[-1].astype(np.float64)
+    for limb in a[-2::-1]:
+        f *= 2.0 ** LIMB_BITS
+        f += limb
+    return f
+
+
+def _from_float(t: "np.ndarray") -> "np.ndarray":
+    # Integral floats >= 0 -> exact limbs (as few as the largest needs): t = mant << shift
+    mant, exp = np.frexp(t)
+    mant = (mant * 2.0 ** 53).astype(np.int64)
+    exp = exp.astype(np.int64) - 53
+    mant >>= np.clip(-exp, 0, 63)  # t < 2**53 is integral: only zero bits drop
+    shift = np.maximum(exp, 0)
+    k, s = shift // LIMB_BITS, shift % LIMB_BITS
+    lo, hi = (mant & LIMB_MASK) << s, (mant >> LIMB_BITS) << s
+
+    out = np.zeros((int(k.max(initial=0)) + 3, t.shape[0]), np.int64)
+    cols = np.arange(t.shape[0])
+    out[k, cols] = lo & LIMB_MASK
+    out[k + 1, cols] = (lo >> LIMB_BITS) + (hi & LIMB_MASK)
+    out[k + 2, cols] = hi >> LIMB_BITS
+    return _trim(_carry(out))
+
+
+def _trim(a: "np.ndarray") -> "np.ndarray":
+    # Drop all-zero top limbs (keeps at least one)
+    width = a.shape[0]
+    while width > 1 and not a[width - 1].any():
+        width -= 1
+    return a[:width]
+
+
+def limb_divmod(num: "np.ndarray", den: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Floor (num // den, num % den) for non-negative num and positive den.
+
+    Each pass adds a float estimate t <= remainder / den (shrunk by 2**-40 to
+    absorb rounding), so the remainder stays non-negative and loses ~39 bits
+    per pass; a last loop subtracts den while the remainder still exceeds it.
+    Both results keep the width of num.
+    """
+    width = num.shape[0]
+    quotient = np.zeros_like(num)
+    rem = _trim(num)
+    den = _trim(den)
+    den_f = _to_float(den)
+    while True:
+        t = np.floor(_to_float(rem) / den_f * (1 - 2.0 ** -40))
+        if not (t >= 1).any():
+            break
+        if t.max() < 2.0 ** 31:  # Small steps skip the limb product
+            step = t.astype(np.int64)
+            quotient[0] += step
+            quotient = _carry(quotient)
+            rem = _trim(limb_sub(rem, limb_mul_small(den, step)))
+            continue
+        step = _from_float(t)
+        quotient = limb_add(quotient, step)[:width]
+        rem = _trim(limb_sub(rem, limb_mul(step, den)))
+
+    while True:
+        diff = limb_sub(rem, den)
+        over = diff[-1] >= 0
+        if not over.any():
+            return quotient, _resize(rem, width)
+        rem = _trim(np.where(over, diff, _resize(rem, diff.shape[0])))
+        quotient = limb_add(quotient, over[None].astype(np.int64))[:width]
+
+
+# =============================================================================
+# Batched Quotes
+# =============================================================================
+
+def batch_exact_quote(yes_reserve, no_reserve, collateral_in, buy_yes=True,
+                      elapsed_seconds=3600):
+    """
+    Exact hook fee + AMM buy over arrays of wei amounts, on fixed-width limb
+    arrays sized for the largest input (uint256 at most), with the same
+    rounding and overflow guard as exact_hook_fee + exact_amm_buy.
+
+    Returns: (shares_out, price_impact_bps, fee_bps, would_succeed); shares_out
+    is an object array of Python ints, the rest int64 / bool.
+    """
+    # Convert each input at its own shape, then broadcast the limbs
+    yes, no, amount_in = (np.asarray(a, dtype=object)
+                          for a in (yes_reserve, no_reserve, collateral_in))
+    shape = np.broadcast_shapes(yes.shape, no.shape, amount_in.shape)
+    n = int(np.prod(shape))
+    width = max(limb_width(a.ravel()) for a in (yes, no, amount_in))
+    yes, no, amount_in = (
+        np.broadcast_to(to_limbs(a.ravel(), width).reshape(
+            width, *(1,) * (len(shape) - a.ndim), *a.shape), (width, *shape)).reshape(width, n)
+        for a in (yes, no, amount_in))
+    buy_yes = np.broadcast_to(np.asarray(buy_yes, dtype=bool), shape).ravel()
+    elapsed = np.broadcast_to(np.asarray(elapsed_seconds, dtype=np.int64), shape).ravel()
+
+    shares_out, impact, fee, ok = limb_exact_quote(yes, no, amount_in, buy_yes, elapsed)
+    return (from_limbs(shares_out).reshape(shape), impact.reshape(shape), fee.reshape(shape),
+            ok.reshape(shape))
+
+
+def limb_exact_quote(yes, no, amount_in, buy_yes, elapsed):
+    """
+    batch_exact_quote on equal-width normalized limbs (see to_limbs) with
+    bool / int64 buy_yes and elapsed columns.
+
+    Returns: (shares_out limbs (width + 1), price_impact_bps, fee_bps, would_succeed)
+    """
+    width = yes.shape[0]
+
+    # _getProbability (5000 for an empty pool)
+    valid = ~limb_is_zero(yes) & ~limb_is_zero(no)
+    total = limb_add(yes, no)
+    empty = limb_is_zero(total)
+    total[0, empty] = 1
+    p_before = limb_divmod(limb_mul_small(no, BPS), total)[0][0]
+    p_before[empty] = 5000
+
+    # Fee: bootstrap (linear) + quadratic skew + asymmetric, capped
+    progress_bps = np.clip(elapsed, 0, BOOTSTRAP_WINDOW) * BPS // BOOTSTRAP_WINDOW
+    fee = MAX_FEE_BPS - FEE_RANGE_BPS * progress_bps // BPS
+    skew = np.abs(p_before - 5000)
+    ratio = np.minimum(skew, SKEW_REF_BPS) * BPS // SKEW_REF_BPS
+    skew_fee = MAX_SKEW_FEE_BPS * ratio * ratio // BPS_SQUARED
+    fee += np.where(valid, skew_fee + ASYMMETRIC_FEE_BPS * skew // 5000, 0)
+    fee = np.minimum(fee, FEE_CAP_BPS)
+
+    # AMM swap: fullMulDiv floor; reverts past uint256 count as failed quotes
+    reserve_in = limb_select(buy_yes, no, yes)
+    reserve_out = limb_select(buy_yes, yes, no)
+    amount_in_with_fee = limb_mul_small(amount_in, BPS - fee)
+    denominator = limb_add(limb_mul_small(reserve_in, BPS), amount_in_with_fee)
+    valid &= limb_is_zero(denominator[UINT256_LIMBS:])
+    denominator[0, limb_is_zero(denominator)] = 1
+    swapped = limb_divmod(limb_mul(amount_in_with_fee, reserve_out), denominator)[0]
+    swapped = _resize(swapped, width)  # swapped <= reserve_out
+    valid &= ~limb_is_zero(swapped) & ~limb_ge(swapped, reserve_out)
+
+    # Post-trade price; failed quotes price an empty pool instead
+    yes, no, amount_in, swapped = (_resize(a, width + 1) for a in (yes, no, amount_in, swapped))
+    yes_after = limb_select(buy_yes, limb_sub(yes, swapped), limb_add(yes, amount_in)[:-1])
+    no_after = limb_select(buy_yes, limb_add(no, amount_in)[:-1], limb_sub(no, swapped))
+    yes_after[:, ~valid] = 0
+    no_after[:, ~valid] = 0
+    total_after = limb_add(yes_after, no_after)
+    total_after[0, ~valid] = 1
+    p_after = limb_divmod(limb_mul_small(no_after, BPS), total_after)[0][0]
+    impact = np.where(valid, np.abs(p_after - p_before), 0)
+
+    shares_out = limb_add(amount_in, swapped)[:width + 1]
+    shares_out[:, ~valid] = 0
+    return shares_out, impact, fee, valid & (impact <= MAX_PRICE_IMPACT_BPS)
+
+
+def limb_vault_otc(yes, no, collateral_in, buy_yes, twap_p_yes_bps, seconds_to_close):
+    """
+    exact_vault_otc on equal-width normalized limbs of the vault and the
+    collateral, with bool / int64 columns for the rest.
+
+    Returns: (shares_out limbs, collateral_used limbs (width + 1), filled)
+    """
+    width = yes.shape[0]
+    available = limb_select(buy_yes, yes, no)
+
+    # _calculateDynamicSpread: imbalance boost when consuming the scarce side
+    total = limb_add(yes, no)
+    scarce = ~limb_is_zero(total) & (buy_yes == ~limb_ge(yes, no))
+    total[0, ~scarce] = 1
+    imbalance = limb_divmod(limb_mul_small(limb_select(limb_ge(no, yes), no, yes), BPS),
+                            total)[0][0]
+    spread = np.full(buy_yes.shape, BASE_RELATIVE_SPREAD_BPS, np.int64)
+    boosted = scarce & (imbalance > 5000)
+    spread[boosted] += MAX_IMBALANCE_BOOST_BPS * (imbalance[boosted] - 5000) // 5000
+    late = (seconds_to_close > 0) & (seconds_to_close < TIME_BOOST_WINDOW)
+    spread[late] += (MAX_TIME_BOOST_BPS * (TIME_BOOST_WINDOW - seconds_to_close[late])
+                     // TIME_BOOST_WINDOW)
+    spread = np.minimum(spread, MAX_SPREAD_BPS)
+
+    share_price_bps = np.where(buy_yes, twap_p_yes_bps, BPS - twap_p_yes_bps)
+    spread_bps = np.maximum(share_price_bps * spread // BPS, MIN_ABSOLUTE_SPREAD_BPS)
+    effective_price_bps = np.minimum(share_price_bps + spread_bps, BPS)
+    scaled = limb_mul_small(collateral_in, BPS)
+    priced = (~limb_is_zero(collateral_in) & limb_is_zero(scaled[UINT256_LIMBS:])
+              & (twap_p_yes_bps != 0) & ~limb_is_zero(available) & (effective_price_bps > 0))
+    effective_price_bps[~priced] = 1
+
+    raw_shares = limb_divmod(scaled, effective_price_bps[None])[0][:width + 1]
+    max_from_vault = limb_divmod(limb_mul_small(available, MAX_VAULT_DEPLETION_BPS),
+                                 np.full((1, buy_yes.size), BPS, np.int64))[0][:width]
+    floor_one = limb_is_zero(max_from_vault) & ~limb_is_zero(raw_shares)
+    max_from_vault[0, floor_one] = 1
+
+    cap = _resize(limb_select(limb_ge(available, max_from_vault), max_from_vault, available),
+                  width + 1)
+    capped = limb_ge(raw_shares, cap) & ~limb_ge(cap, raw_shares)
+    shares_out = limb_select(capped, cap, raw_shares)
+    shares_out[:, ~priced] = 0
+
+    # Ceiling on the collateral charged when a cap binds
+    charged = limb_mul_small(shares_out, effective_price_bps)
+    charged[0] += BPS - 1
+    charged = limb_divmod(_carry(charged), np.full((1, buy_yes.size), BPS, np.int64))[0]
+    collateral_used = limb_select(capped, charged[:width + 1],
+                                  _resize(collateral_in, width + 1))
+    collateral_used[:, ~priced] = 0
+    return shares_out, collateral_used, priced & ~limb_is_zero(shares_out)
+
+
+# =============================================================================
+# Float vs Exact Comparison
+# =============================================================================
+
+def main():
+    print("=" * 80)
+    print(" Exact Integer Engine vs Float Engine")
+    print("=" * 80)
+
+    print("\n   Buy YES in a 500/500 pool (1e18 wei = $1), 1 hour after bootstrap start")
+    print(f"\n{'Trade $':<10} | {'Float shares (wei)':<26} | {'Exact shares (wei)':<26} | {'Dust':<10}")
+    print("-" * 82)
+
+    for size in [10, 25, 50, 100]:
+        float_pool = PoolState(500.0 * WAD, 500.0 * WAD)
+        exact_pool = PoolState(500 * WAD, 500 * WAD)
+        f_fee = calculate_hook_fee(float_pool, 3600)
+        e_fee = exact_hook_fee(exact_pool, 3600)
+        f_shares, _, _ = simulate_amm_buy(float_pool, float(size * WAD), True, f_fee)
+        e_shares, _, _ = exact_amm_buy(exact_pool, size * WAD, True, e_fee)
+        print(f"${size:<9} | {f_shares:<26.0f} | {e_shares:<26} | {int(f_shares) - e_shares:<10}")
+
+    # Throughput: scalar float vs scalar exact over the same trade stream
+    n = 200_000
+    sizes = [(i % 997 + 1) * WAD // 10 for i in range(n)]
+
+    t0 = time.perf_counter()
+    for size in sizes:
+        pool = PoolState(500.0 * WAD, 500.0 * WAD)
+        simulate_amm_buy(pool, float(size), True, calculate_hook_fee(pool, 3600))
+    float_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for size in sizes:
+        pool = PoolState(500 * WAD, 500 * WAD)
+        exact_amm_buy(pool, size, True, exact_hook_fee(pool, 3600))
+    exact_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch_exact_quote(500 * WAD, 500 * WAD, sizes, True, 3600)
+    batch_secs = time.perf_counter() - t0
+
+    print(f"\n   Throughput ({n:,} quotes):")
+    print(f"   Float scalar:  {n / float_secs:>12,.0f} quotes/s")
+    print(f"   Exact scalar:  {n / exact_secs:>12,.0f} quotes/s ({exact_secs / float_secs:.2f}x float time)")
+    print(f"   Exact batched: {n / batch_secs:>12,.0f} quotes/s ({batch_secs / float_secs:.2f}x float time)")
+    print(f"   Target: exact within 3x of float -> {'OK' if exact_secs <= 3 * float_secs else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
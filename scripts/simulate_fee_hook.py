@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Config-driven model of PMFeeHook._computeFee.
+
+Covers every knob of the `Config` struct:
+- bootstrap decay modes (extraFlags bits 2-3): linear / cubic / sqrt / ease-in
+- skew curve exponents (extraFlags bits 0-1): linear / quadratic / cubic / quartic
+- close-window modes (flags bits 2-3): halt / fixed fee / min fee / dynamic
+- asymmetric fee, price impact limit and the volatility fee over the
+  10-slot priceHistory ring buffer
+
+`compile_fee_config` decodes flags once and returns a CompiledFee whose
+__call__ only runs the enabled components, so sweeps over many configs don't
+re-parse flags per evaluation. Integer math and rounding follow the contract.
+
+For a fixed config the skew + asymmetric surface depends only on p_yes_bps
+(0..10000) and the bootstrap fee only on progressBps (0..9999), so both are
+tabulated once per config by `fee_table`, an LRU cache of FeeTables
+(`fee_table.cache_info()` reports hits/misses).
+"""
+
+import time
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from math import isqrt
+from typing import Callable, List, Optional
+
+# =============================================================================
+# Constants (PMFeeHook)
+# =============================================================================
+BPS = 10000
+HALTED = BPS + 1  # Sentinel fee: trading halted (closed/resolved/close window mode 0)
+
+FLAG_SKEW = 0x01
+FLAG_BOOTSTRAP = 0x02
+FLAG_ASYMMETRIC = 0x10
+FLAG_PRICE_IMPACT = 0x20
+FLAG_VOLATILITY = 0x40
+
+CLOSE_MODE_HALT = 0
+CLOSE_MODE_FIXED = 1
+CLOSE_MODE_MIN_FEE = 2
+CLOSE_MODE_DYNAMIC = 3
+
+DECAY_LINEAR, DECAY_CUBIC, DECAY_SQRT, DECAY_EASE_IN = range(4)
+SKEW_LINEAR, SKEW_QUADRATIC, SKEW_CUBIC, SKEW_QUARTIC = range(4)
+
+PRICE_HISTORY_SLOTS = 10
+
+
+@dataclass(frozen=True)
+class FeeConfig:
+    """PMFeeHook.Config (all fees in bps, windows in seconds)"""
+    min_fee_bps: int = 10
+    max_fee_bps: int = 75
+    max_skew_fee_bps: int = 80
+    fee_cap_bps: int = 300
+    skew_ref_bps: int = 4000
+    asymmetric_fee_bps: int = 20
+    close_window: int = 3600
+    close_window_fee_bps: int = 40
+    max_price_impact_bps: int = 1200
+    bootstrap_window: int = 2 * 24 * 3600
+    volatility_fee_bps: int = 0
+    volatility_window: int = 0
+    flags: int = 0x37        # skew + bootstrap + closeMode=1 + asymmetric + priceImpact
+    extra_flags: int = 0x01  # quadratic skew, linear decay
+
+    @property
+    def close_window_mode(self) -> int:
+        return (self.flags >> 2) & 0x03
+
+    @property
+    def skew_curve_exponent(self) -> int:
+        return self.extra_flags & 0x03
+
+    @property
+    def bootstrap_decay_mode(self) -> int:
+        return (self.extra_flags >> 2) & 0x03
+
+
+DEFAULT_FEE_CONFIG = FeeConfig()
+
+
+def validate_config(cfg: FeeConfig):
+    """PMFeeHook._validateConfig; raises ValueError where the contract reverts InvalidConfig"""
+    for f in ("min_fee_bps", "max_fee_bps", "max_skew_fee_bps", "asymmetric_fee_bps",
+              "max_price_impact_bps", "volatility_fee_bps", "close_window_fee_bps"):
+        if getattr(cfg, f) > BPS:
+            raise ValueError(f"InvalidConfig: {f} > {BPS}")
+    if cfg.min_fee_bps > cfg.max_fee_bps:
+        raise ValueError("InvalidConfig: min_fee_bps > max_fee_bps")
+    if cfg.fee_cap_bps == 0 or cfg.fee_cap_bps >= BPS:
+        raise ValueError("InvalidConfig: fee_cap_bps must be in (0, 10000)")
+    if cfg.skew_ref_bps == 0 or cfg.skew_ref_bps > 5000:
+        raise ValueError("InvalidConfig: skew_ref_bps must be in (0, 5000]")
+    if cfg.fee_cap_bps < cfg.min_fee_bps:
+        raise ValueError("InvalidConfig: fee_cap_bps < min_fee_bps")
+    if cfg.close_window_mode == CLOSE_MODE_FIXED and cfg.close_window_fee_bps == 0:
+        raise ValueError("InvalidConfig: close window mode 1 needs close_window_fee_bps")
+    for f in fields(FeeConfig):
+        if getattr(cfg, f.name) < 0:
+            raise ValueError(f"InvalidConfig: {f.name} < 0")
+
+
+# =============================================================================
+# Volatility Price History (PMFeeHook.priceHistory ring buffer)
+# =============================================================================
+
+class PriceHistory:
+    """10-slot circular buffer of (timestamp, priceBps), one snapshot per block"""
+
+    __slots__ = ("timestamps", "prices", "index", "last_block")
+
+    def __init__(self):
+        self.timestamps: List[int] = [0] * PRICE_HISTORY_SLOTS
+        self.prices: List[int] = [0] * PRICE_HISTORY_SLOTS
+        self.index = 0
+        self.last_block = -1
+
+    def record(self, timestamp: int, price_bps: int, block: Optional[int] = None):
+        """_recordPriceSnapshot (block defaults to timestamp, i.e. one per second)"""
+        block = timestamp if block is None else block
+        if block == self.last_block:
+            return  # MEV protection: one snapshot per block
+        i = self.index
+        self.timestamps[i] = timestamp
+        self.prices[i] = price_bps
+        self.index = 0 if i == PRICE_HISTORY_SLOTS - 1 else i + 1
+        self.last_block = block
+
+
+def volatility_fee(cfg: FeeConfig, history: Optional[PriceHistory], now: int) -> int:
+    """PMFeeHook._volatilityFee over snapshots inside the staleness window"""
+    if history is None:
+        return 0
+    vw = cfg.volatility_window
+    cutoff = 0 if (vw == 0 or vw > now) else now - vw
+
+    count = total = total_sq = 0
+    for ts, p in zip(history.timestamps, history.prices):
+        if ts and (cutoff == 0 or ts >= cutoff):
+            total += p
+            total_sq += p * p
+            count += 1
+
+    if count < 3:
+        return 0
+    mean = total // count
+    if mean == 0:
+        return 0
+
+    variance = (total_sq - 2 * mean * total + count * mean * mean) // count
+    volatility_pct = isqrt(variance) * 100 // mean
+
+    if volatility_pct >= 10:
+        return cfg.volatility_fee_bps
+    if volatility_pct <= 2:
+        return 0
+    return cfg.volatility_fee_bps * (volatility_pct - 2) // 8
+
+
+# =============================================================================
+# Component Builders (decode flags once per config)
+# =============================================================================
+
+def _build_decay(cfg: FeeConfig) -> Callable[[int], int]:
+    """Bootstrap fee as a function of progressBps (0..9999) for the config's decay mode"""
+    max_fee = cfg.max_fee_bps
+    fee_range = max_fee - cfg.min_fee_bps
+    mode = cfg.bootstrap_decay_mode
+    if mode == DECAY_LINEAR:
+        curve = lambda x: x
+    elif mode == DECAY_CUBIC:
+        curve = lambda x: BPS - (BPS - x) ** 3 // (BPS * BPS)
+    elif mode == DECAY_SQRT:
+        curve = lambda x: isqrt(x * BPS)
+    else:
+        curve = lambda x: BPS - isqrt((BPS - x) * BPS)
+    return lambda progress_bps: max_fee - fee_range * curve(progress_bps) // BPS
+
+
+def _build_bootstrap(cfg: FeeConfig) -> Callable[[int], int]:
+    min_fee, max_fee, window = cfg.min_fee_bps, cfg.max_fee_bps, cfg.bootstrap_window
+    if not cfg.flags & FLAG_BOOTSTRAP or window == 0:
+        return lambda elapsed: min_fee
+
+    decay = _build_decay(cfg)
+
+    def bootstrap(elapsed: int) -> int:
+        if elapsed <= 0:
+            return max_fee
+        if elapsed >= window:
+            return min_fee
+        return decay(elapsed * BPS // window)
+
+    return bootstrap
+
+
+def _build_skew(cfg: FeeConfig) -> Optional[Callable[[int], int]]:
+    if not cfg.flags & FLAG_SKEW:
+        return None
+    max_skew, ref = cfg.max_skew_fee_bps, cfg.skew_ref_bps
+    exp = cfg.skew_curve_exponent + 1
+    denom = BPS ** exp
+
+    def skew_fee(skew: int) -> int:
+        if skew >= ref:
+            return max_skew
+        return max_skew * (skew * BPS // ref) ** exp // denom
+
+    return skew_fee
+
+
+def _build_asymmetric(cfg: FeeConfig) -> Optional[Callable[[int], int]]:
+    if not cfg.flags & FLAG_ASYMMETRIC:
+        return None
+    asym = cfg.asymmetric_fee_bps
+    return lambda skew: asym * skew // 5000
+
+
+# =============================================================================
+# Lookup Tables (LRU cache keyed by FeeConfig)
+# =============================================================================
+
+FEE_TABLE_CACHE_SIZE = 64
+
+
+class FeeTable:
+    """
+    Per-config lookup tables for the dynamic (non-volatility) fee.
+
+    skew[p_bps]        skew + asymmetric fee for P(YES) = p_bps
+    bootstrap[progress] bootstrap fee at progressBps = elapsed * 10000 / window
+    """
+
+    __slots__ = ("config", "skew", "bootstrap", "_window", "_min_fee", "_max_fee", "_cap",
+                 "_arrays")
+
+    def __init__(self, cfg: FeeConfig):
+        validate_config(cfg)
+        self.config = cfg
+        self._min_fee = cfg.min_fee_bps
+        self._max_fee = cfg.max_fee_bps
+        self._cap = cfg.fee_cap_bps
+        self._arrays = None
+
+        skew_fn = _build_skew(cfg) or (lambda skew: 0)
+        asym_fn = _build_asymmetric(cfg) or (lambda skew: 0)
+        by_skew = [skew_fn(s) + asym_fn(s) for s in range(5001)]
+        self.skew = [by_skew[abs(p - 5000)] for p in range(BPS + 1)]
+
+        # Bootstrap disabled or zero window: constant min fee (window 0 marks it)
+        if cfg.flags & FLAG_BOOTSTRAP and cfg.bootstrap_window:
+            self._window = cfg.bootstrap_window
+            decay = _build_decay(cfg)
+            self.bootstrap = [decay(progress) for progress in range(BPS)]
+        else:
+            self._window = 0
+            self.bootstrap = [cfg.min_fee_bps]
+
+    def base_fee(self, elapsed_seconds: int) -> int:
+        window = self._window
+        if window == 0:
+            return self._min_fee
+        if elapsed_seconds <= 0:
+            return self._max_fee
+        if elapsed_seconds >= window:
+            return self._min_fee
+        return self.bootstrap[elapsed_seconds * BPS // window]
+
+    def fee(self, yes_reserve, no_reserve, elapsed_seconds: int) -> int:
+        """Dynamic fee (bootstrap + skew + asymmetric, capped) by table lookup"""
+        fee = self.base_fee(elapsed_seconds)
+        if yes_reserve > 0 and no_reserve > 0:
+            fee += self.skew[int(no_reserve * BPS // (yes_reserve + no_reserve))]
+        return self._cap if fee > self._cap else fee
+
+    def batch_fee(self, p_yes_bps, elapsed_seconds):
+        """
+        Vectorized fee over arrays of integer P(YES) bps and elapsed seconds
+        (pass p_yes_bps = 5000 for pools with an empty side). Requires numpy.
+        """
+        import numpy as np
+
+        if self._arrays is None:
+            # Every decay curve starts at max_fee (progress 0, i.e. elapsed <= 0);
+            # the extra entry at progress 10000 (elapsed >= window) is min_fee
+            self._arrays = (np.array(self.skew, dtype=np.int64),
+                            np.array(self.bootstrap + [self._min_fee], dtype=np.int64))
+        skew, bootstrap = self._arrays
+
+        p = np.asarray(p_yes_bps, dtype=np.int64)
+        elapsed = np.asarray(elapsed_seconds, dtype=np.int64)
+        if self._window == 0:
+            base = np.full(np.broadcast_shapes(p.shape, elapsed.shape), self._min_fee, np.int64)
+        else:
+            progress = np.clip(elapsed, 0, self._window)
+            progress *= BPS
+            progress //= self._window
+            base = bootstrap[progress]
+        base += skew[p]
+        return np.minimum(base, self._cap, out=base)
+
+
+@lru_cache(maxsize=FEE_TABLE_CACHE_SIZE)
+def fee_table(cfg: FeeConfig) -> FeeTable:
+    """Lazily built, LRU-cached FeeTable for a config"""
+    return FeeTable(cfg)
+
+
+class CompiledFee:
+    """
+    Fee evaluator specialized to one FeeConfig.
+
+    Call with reserves, seconds since bootstrap start and (optionally) seconds
+    until market close plus price history for the volatility component.
+    Returns HALTED when the contract would halt trading.
+    """
+
+    __slots__ = ("config", "max_price_impact_bps", "_table", "_volatility", "_close_window",
+                 "_close_fee", "_cap")
+
+    def __init__(self, cfg: FeeConfig):
+        validate_config(cfg)
+        self.config = cfg
+        self.max_price_impact_bps = (cfg.max_price_impact_bps
+                                     if cfg.flags & FLAG_PRICE_IMPACT else None)
+        self._table = None
+        self._volatility = bool(cfg.flags & FLAG_VOLATILITY)
+        self._close_window = cfg.close_window
+        self._cap = cfg.fee_cap_bps
+
+        # Fee inside the close window: None = fall through to dynamic (mode 3)
+        mode = cfg.close_window_mode
+        self._close_fee = {
+            CLOSE_MODE_HALT: HALTED,
+            CLOSE_MODE_FIXED: min(cfg.close_window_fee_bps, cfg.fee_cap_bps),
+            CLOSE_MODE_MIN_FEE: cfg.min_fee_bps,
+            CLOSE_MODE_DYNAMIC: None,
+        }[mode]
+
+    def __call__(self, yes_reserve, no_reserve, elapsed_seconds: int,
+                 seconds_to_close: Optional[int] = None,
+                 history: Optional[PriceHistory] = None, now: int = 0) -> int:
+        if seconds_to_close is not None:
+            if seconds_to_close <= 0:
+                return HALTED
+            if self._close_window and seconds_to_close <= self._close_window \
+                    and self._close_fee is not None:
+                return self._close_fee
+
+        table = self._table
+        if table is None:
+            table = self._table = fee_table(self.config)
+
+        if not self._volatility:
+            return table.fee(yes_reserve, no_reserve, elapsed_seconds)
+
+        fee = table.base_fee(elapsed_seconds)
+        if yes_reserve > 0 and no_reserve > 0:
+            fee += table.skew[int(no_reserve * BPS // (yes_reserve + no_reserve))]
+        fee += volatility_fee(self.config, history, now)
+        return self._cap if fee > self._cap else fee
+
+
+def compile_fee_config(cfg: FeeConfig = DEFAULT_FEE_CONFIG) -> CompiledFee:
+    return CompiledFee(cfg)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main():
+    from simulate_router import print_header
+
+    print_header("Bootstrap Decay Modes (50/50 pool, no skew)")
+    modes = ["linear", "cubic", "sqrt", "ease-in"]
+    evaluators = [compile_fee_config(FeeConfig(extra_flags=0x01 | (m << 2))) for m in range(4)]
+    print(f"\n{'Elapsed':<10} | " + " | ".join(f"{m:<8}" for m in modes))
+    print("-" * 52)
+    for hours in [0, 6, 12, 24, 36, 47, 48]:
+        fees = [f(500, 500, hours * 3600) for f in evaluators]
+        print(f"{hours:>3}h{'':<6} | " + " | ".join(f"{fee:<8}" for fee in fees))
+
+    print_header("Skew Curve Exponents (post-bootstrap, asymmetric off)")
+    curves = ["linear", "quad", "cubic", "quartic"]
+    evaluators = [compile_fee_config(FeeConfig(flags=0x27, extra_flags=e)) for e in range(4)]
+    print(f"\n{'P(YES)':<10} | " + " | ".join(f"{c:<8}" for c in curves))
+    print("-" * 52)
+    for p in [5000, 6000, 7000, 8000, 9000]:
+        fees = [f(10000 - p, p, 10**9) for f in evaluators]
+        print(f"{p / 100:>5.0f}%{'':<4} | " + " | ".join(f"{fee:<8}" for fee in fees))
+
+    print_header("Close-Window Modes (30 minutes to close, 1h window)")
+    for mode, label in enumerate(["halt", "fixed 0.40%", "min fee", "dynamic"]):
+        f = compile_fee_config(FeeConfig(flags=(0x33 | (mode << 2))))
+        fee = f(400, 600, 10**9, seconds_to_close=1800)
+        print(f"   Mode {mode} ({label:<11}): {'HALTED' if fee == HALTED else f'{fee}bps'}")
+
+    print_header("Volatility Fee (100bps max, 1h staleness window)")
+    f = compile_fee_config(FeeConfig(flags=0x37 | FLAG_VOLATILITY, volatility_fee_bps=100,
+                                     volatility_window=3600))
+    for label, path in [("calm", [5000, 5010, 4995, 5005, 5000]),
+                        ("choppy", [5000, 5300, 4700, 5250, 4750]),
+                        ("wild", [5000, 6000, 4200, 5800, 4400])]:
+        history = PriceHistory()
+        for i, p in enumerate(path):
+            history.record(1000 + 60 * i, p)
+        fee = f(500, 500, 10**9, history=history, now=1000 + 60 * len(path))
+        print(f"   {label:<7} {path}: {fee}bps")
+
+    f = compile_fee_config()
+    n = 200_000
+    t0 = time.perf_counter()
+    for i in range(n):
+        f(400 + i % 200, 600, i)
+    secs = time.perf_counter() - t0
+    print(f"\n   Compiled default config: {n / secs:,.0f} fee evaluations/s")
+
+    info = fee_table.cache_info()
+    print(f"   Fee table cache: {info.hits} hits / {info.misses} misses "
+          f"({info.currsize}/{info.maxsize} configs)")
+
+
+if __name__ == "__main__":
+    main()
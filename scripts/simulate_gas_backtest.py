@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+GasPM market backtester: hit-rate surfaces for every market type over a
+base-fee history, all start offsets x durations x thresholds at once.
+
+A keeper checks markets on a fixed grid (every `step` seconds). A market is
+created at a grid point, closes `duration` grid steps later and resolves as
+Resolver.resolveMarket would:
+
+- at close: YES iff the condition holds on the observable at close
+- canClose: YES as soon as the condition holds at any check in [start, close]
+
+Each observable is laid out as a (starts x offsets) matrix with a sliding
+window view over the grid series, so one kernel pass evaluates every market
+in a chunk of starts:
+
+- all-time TWAP / max / min / spread and spot do not depend on the creation
+  time: the rows are gathered from one strided view of the grid series
+- window TWAP is a difference of the grid cumulative (baseFeeAverageSince),
+  window max / min a running maximum / minimum along the offsets
+- canClose with >= / <= is the same test on the running max / min; range and
+  breakout take the first in/out-of-range check per row
+
+As on-chain, a canClose market whose condition already holds at creation
+resolves YES at the first check (e.g. a window range around the current fee:
+the window TWAP starts at the spot).
+
+Thresholds are relative to the base fee at creation (bps), so one surface
+prices a market type in any fee regime; lower/upper for range and breakout
+markets are bps bands. Values are wei-exact int64 and match the GasOracle
+scalar views (check_against_scalar). Deployment is the first observation of
+the history, and window extrema assume every observation pokes the window
+(see simulate_gas_oracle).
+
+Requires: numpy
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from simulate_gas_oracle import GasOracle, synthetic_history
+from simulate_router import print_header
+
+BPS = 10000
+OP_LTE = 2
+OP_GTE = 3
+OP_EQ = 4
+
+DURATION_HOURS = (1, 6, 24, 72, 168, 336, 720)
+LEVELS_BPS = (5000, 7500, 9000, 11000, 12500, 15000, 20000, 30000)
+BANDS_BPS = ((9000, 11000), (8000, 12500), (6700, 15000), (5000, 20000))
+
+
+# =============================================================================
+# Market Types
+# =============================================================================
+
+@dataclass(frozen=True)
+class MarketType:
+    """One GasPM create* entry point, reduced to its resolution rule"""
+    name: str
+    observable: str             # Grid series: spot, avg, max, min, spread, window_*
+    op: str                     # gte, lte, in (range), out (breakout), up (comparison)
+    can_close: Optional[bool] = None    # Forced by the contract, None = creator's choice
+    creation: str = ""          # below: reverts unless spot < threshold; above: spot > it
+
+
+MARKET_TYPES = (
+    MarketType("directional_gte", "avg", "gte"),
+    MarketType("directional_lte", "avg", "lte"),
+    MarketType("range", "avg", "in"),
+    MarketType("breakout", "avg", "out"),
+    MarketType("peak", "max", "gte"),
+    MarketType("trough", "min", "lte"),
+    MarketType("volatility", "spread", "gte"),
+    MarketType("stability", "spread", "lte"),
+    MarketType("spot", "spot", "gte"),
+    MarketType("comparison", "avg", "up", can_close=False),
+    MarketType("window_gte", "window_avg", "gte"),
+    MarketType("window_lte", "window_avg", "lte"),
+    MarketType("window_range", "window_avg", "in"),
+    MarketType("window_breakout", "window_avg", "out"),
+    MarketType("window_peak", "window_max", "gte", can_close=True, creation="below"),
+    MarketType("window_trough", "window_min", "lte", can_close=True, creation="above"),
+    MarketType("window_volatility", "window_spread", "gte", can_close=True),
+    MarketType("window_stability", "window_spread", "lte"),
+)
+MARKETS = {m.name: m for m in MARKET_TYPES}
+
+
+def close_modes(market: MarketType) -> Tuple[bool, ...]:
+    return (False, True) if market.can_close is None else (market.can_close,)
+
+
+@dataclass
+class Surface:
+    """Hit rates of one market type / canClose mode over durations x thresholds"""
+    market: str
+    can_close: bool
+    durations: np.ndarray       # Seconds
+    thresholds: list            # bps levels, (lower, upper) bps bands, or ["start TWAP"]
+    hit_rate: np.ndarray        # (durations, thresholds), NaN where no market fits
+    samples: np.ndarray         # Creatable markets behind each rate
+
+
+# =============================================================================
+# Backtester
+# =============================================================================
+
+class GasBacktest:
+    """
+    Grid series of every GasPM observable, sampled at the keeper checkpoints
+    oracle.start_time + k * step.
+    """
+
+    __slots__ = ("oracle", "step", "times", "spot", "cumulative", "avg",
+                 "seg_max", "seg_min", "max", "min", "spread")
+
+    def __init__(self, oracle: GasOracle, step: int = 3600):
+        if step <= 0:
+            raise ValueError("step must be positive")
+        self.oracle = oracle
+        self.step = step
+        n = (int(oracle.timestamp[-1]) - oracle.start_time) // step + 1
+        self.times = oracle.start_time + step * np.arange(n, dtype=np.int64)
+        idx = oracle._index_many(self.times)
+        self.spot = oracle.base_fee[idx]
+
+        cumulative = oracle._cumulative_many(self.times, idx)
+        elapsed = self.times - oracle.start_time
+        avg = cumulative // np.maximum(elapsed, 1)
+        avg[0] = self.spot[0]
+        self.avg = avg.astype(np.int64)
+        # Window TWAPs only take differences, so rebase an overflowing cumulative
+        self.cumulative = (cumulative - cumulative[0]).astype(np.int64)
+
+        # Extremum of the observations each grid step adds: (idx[k-1], idx[k]]
+        lo = np.r_[0, np.minimum(idx[:-1] + 1, idx[1:])]
+        self.seg_max = oracle.max_index.query_many(lo, idx)
+        self.seg_min = oracle.min_index.query_many(lo, idx)
+        self.max = np.maximum.accumulate(self.seg_max)
+        self.min = np.minimum.accumulate(self.seg_min)
+        self.spread = self.max - self.min
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    # -------------------------------------------------------------------------
+    # Kernels
+    # -------------------------------------------------------------------------
+
+    def _windows(self, series: np.ndarray, starts: np.ndarray, span: int) -> np.ndarray:
+        # Rows past the end of the grid repeat the last value; callers mask them
+        padded = np.concatenate([series, np.repeat(series[-1:], span)])
+        return sliding_window_view(padded, span + 1)[starts]
+
+    def values(self, observable: str, starts: np.ndarray, span: int) -> np.ndarray:
+        """(len(starts), span + 1) matrix: observable at start + j steps, j = 0..span"""
+        if not observable.startswith("window_"):
+            return self._windows(getattr(self, observable), starts, span)
+        if observable == "window_avg":
+            cum = self._windows(self.cumulative, starts, span)
+            out = (cum - cum[:, :1]) // np.maximum(np.arange(span + 1) * self.step, 1)
+            out[:, 0] = self.spot[starts]
+            return out
+        if observable == "window_spread":
+            return (self.values("window_max", starts, span)
+                    - self.values("window_min", starts, span))
+        # windowMax / windowMin start at the spot at creation
+        is_max = observable == "window_max"
+        out = self._windows(self.seg_max if is_max else self.seg_min, starts, span).copy()
+        out[:, 0] = self.spot[starts]
+        (np.maximum if is_max else np.minimum).accumulate(out, axis=1, out=out)
+        return out
+
+    def outcomes(self, market: MarketType, starts, durations, thresholds,
+                 can_close: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (yes, creatable), both (len(starts), len(durations), len(thresholds))
+        bool, for markets created at grid points `starts` and closing
+        `durations` steps later. Thresholds are bps levels or (lower, upper)
+        bps bands, relative to the spot at creation; ignored by comparison.
+        """
+        if can_close and market.can_close is False or not can_close and market.can_close:
+            raise ValueError(f"{market.name} does not support canClose={can_close}")
+        starts = np.asarray(starts, np.int64)
+        durations = np.asarray(durations, np.int64)
+        span = int(durations.max())
+        m = self.values(market.observable, starts, span)
+        spot = self.spot[starts][:, None]
+
+        if market.op == "up":
+            # baseFeeHigherThanStart: TWAP at close > TWAP at creation (never 0 here)
+            yes = (m[:, durations] > m[:, :1])[:, :, None]
+            return yes, np.ones_like(yes)
+
+        if market.op in ("gte", "lte"):
+            level = spot * np.asarray(thresholds, np.int64)[None, :] // BPS
+            gte = market.op == "gte"
+            if can_close:
+                running = np.maximum if gte else np.minimum
+                m = running.accumulate(m, axis=1)
+            at = m[:, durations][:, :, None]
+            yes = at >= level[:, None, :] if gte else at <= level[:, None, :]
+            if market.creation == "below":
+                creatable = spot < level
+            elif market.creation == "above":
+                creatable = spot > level
+            else:
+                creatable = np.ones(level.shape, bool)
+            creatable = np.broadcast_to(creatable[:, None, :], yes.shape)
+            return yes, creatable
+
+        bands = np.asarray(thresholds, np.int64).reshape(-1, 2)
+        lower = spot * bands[None, :, 0] // BPS
+        upper = spot * bands[None, :, 1] // BPS
+        yes = np.empty((len(starts), len(durations), len(bands)), bool)
+        for b in range(len(bands)):
+            lo, hi = lower[:, b:b + 1], upper[:, b:b + 1]
+            hit = (m >= lo) & (m <= hi) if market.op == "in" else (m < lo) | (m > hi)
+            if can_close:
+                first = np.where(hit.any(axis=1), hit.argmax(axis=1), span + 1)
+                yes[:, :, b] = first[:, None] <= durations[None, :]
+            else:
+                yes[:, :, b] = hit[:, durations]
+        return yes, np.ones_like(yes)
+
+    # -------------------------------------------------------------------------
+    # Surfaces
+    # -------------------------------------------------------------------------
+
+    def surface(self, market: MarketType, can_close: bool,
+                durations_s: Sequence[int] = tuple(h * 3600 for h in DURATION_HOURS),
+                thresholds: Optional[Sequence] = None, start_every: int = 1,
+                chunk: int = 2048) -> Surface:
+        """Hit rates over every start on the grid (every `start_every` points)"""
+        durations = np.asarray(durations_s, np.int64) // self.step
+        if np.any(durations <= 0):
+            raise ValueError("durations must be at least one grid step")
+        if thresholds is None:
+            thresholds = {"in": BANDS_BPS, "out": BANDS_BPS, "up": ("start TWAP",)}.get(
+                market.op, LEVELS_BPS)
+        n_levels = 1 if market.op == "up" else len(thresholds)
+        hits = np.zeros((len(durations), n_levels), np.int64)
+        samples = np.zeros_like(hits)
+
+        n = len(self)
+        starts = np.arange(0, n - durations.min(), start_every, dtype=np.int64)
+        for lo in range(0, len(starts), chunk):
+            block = starts[lo:lo + chunk]
+            yes, creatable = self.outcomes(market, block, durations, thresholds, can_close)
+            # Only markets that close inside the history count
+            counted = creatable & (block[:, None] + durations[None, :] < n)[:, :, None]
+            hits += (yes & counted).sum(axis=0)
+            samples += counted.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(samples > 0, hits / np.maximum(samples, 1), np.nan)
+        return Surface(market.name, can_close, durations * self.step, list(thresholds),
+                       rate, samples)
+
+    def surfaces(self, markets: Sequence[MarketType] = MARKET_TYPES,
+                 **kwargs) -> List[Surface]:
+        """Every market type in every canClose mode the contract allows"""
+        return [self.surface(m, c, **kwargs) for m in markets for c in close_modes(m)]
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def _compare(value: int, op: int, threshold: int) -> bool:
+    # Resolver._compare for the ops GasPM uses
+    if op == OP_LTE:
+        return value <= threshold
+    if op == OP_GTE:
+        return value >= threshold
+    return value == threshold
+
+
+def resolve_scalar(oracle: GasOracle, market: MarketType, t0: int, close: int, step: int,
+                   threshold, can_close: bool) -> Optional[bool]:
+    """
+    One market replayed through the GasOracle scalar views and
+    Resolver.resolveMarket at every keeper check. Returns None if creation
+    reverts. Thresholds are absolute (wei): a level or a (lower, upper) band.
+    """
+    spot0 = oracle.spot(t0)
+    if market.creation == "below" and spot0 >= threshold:
+        return None                 # AlreadyExceeded
+    if market.creation == "above" and spot0 <= threshold:
+        return None                 # AlreadyBelowThreshold
+    start_twap = oracle.average(t0)
+    window = market.observable.startswith("window_")
+
+    def observe(t: int) -> Tuple[int, int, int]:
+        if market.op == "up":
+            return oracle.higher_than_start(start_twap, t), OP_GTE, 1
+        if market.op in ("in", "out"):
+            lower, upper = threshold
+            avg = oracle.average_since(t0, t) if window else oracle.average(t)
+            inside = lower <= avg <= upper
+            return int(inside if market.op == "in" else not inside), OP_EQ, 1
+        name = market.observable.replace("window_", "")
+        if window:
+            view = {"avg": oracle.average_since, "max": oracle.max_since,
+                    "min": oracle.min_since, "spread": oracle.spread_since}[name]
+            value = view(t0, t)
+        else:
+            value = {"avg": oracle.average, "max": oracle.max, "min": oracle.min,
+                     "spread": oracle.spread, "spot": oracle.spot}[name](t)
+        return value, OP_GTE if market.op == "gte" else OP_LTE, threshold
+
+    t = t0
+    while t < close:
+        if can_close and _compare(*observe(t)):
+            return True             # Early close
+        t += step
+    return _compare(*observe(close))
+
+
+def check_against_scalar(n_blocks: int = 60_000, n_markets: int = 600, seed: int = 5,
+                         step: int = 600) -> int:
+    """Kernel outcomes vs resolve_scalar on random markets. Returns mismatches."""
+    t, fee = synthetic_history(n_blocks, seed)
+    rng = np.random.default_rng(seed)
+    # Sparse keeper updates, so grid points fall between observations
+    keep = np.sort(rng.choice(n_blocks, n_blocks // 4, replace=False))
+    oracle = GasOracle(t[keep], fee[keep], block=16)
+    bt = GasBacktest(oracle, step)
+
+    mismatches = 0
+    for _ in range(n_markets):
+        market = MARKET_TYPES[rng.integers(len(MARKET_TYPES))]
+        can_close = bool(rng.choice(close_modes(market)))
+        duration = int(rng.integers(1, 48))
+        start = int(rng.integers(0, len(bt) - duration))
+        if market.op in ("in", "out"):
+            lo = int(rng.integers(7000, 10000))
+            level = (lo, int(rng.integers(10001, 14000)))
+        else:
+            level = int(rng.integers(7000, 14000))
+        yes, creatable = bt.outcomes(market, [start], [duration], [level], can_close)
+
+        spot = int(bt.spot[start])
+        threshold = (tuple(spot * b // BPS for b in level) if isinstance(level, tuple)
+                     else spot * level // BPS)
+        t0 = int(bt.times[start])
+        expected = resolve_scalar(oracle, market, t0, t0 + duration * step, step,
+                                  threshold, can_close)
+        got = bool(yes[0, 0, 0]) if creatable[0, 0, 0] else None
+        mismatches += got != expected
+    return mismatches
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def _label(threshold) -> str:
+    if isinstance(threshold, str):
+        return threshold
+    if isinstance(threshold, tuple):
+        return f"{threshold[0] / BPS:.2f}-{threshold[1] / BPS:.2f}x"
+    return f"{threshold / BPS:.2f}x"
+
+
+def print_surface(s: Surface):
+    labels = [_label(x) for x in s.thresholds]
+    width = max(7, max(len(x) for x in labels))
+    print(f"\n   {s.market} (canClose={s.can_close})")
+    print(f"   {'Hours':>6} | " + " | ".join(f"{x:>{width}}" for x in labels))
+    for d, row in zip(s.durations, s.hit_rate):
+        cells = ["-" if np.isnan(r) else f"{r * 100:.1f}%" for r in row]
+        print(f"   {d // 3600:>6} | " + " | ".join(f"{c:>{width}}" for c in cells))
+
+
+def main(n_blocks: int = 2_628_000, step: int = 3600):
+    print_header("GasPM Backtest: Kernels vs Scalar Resolver Replay")
+    mismatches = check_against_scalar()
+    print(f"\n   600 random markets (all types, both canClose modes): {mismatches} mismatches")
+
+    print_header(f"Base-Fee History: {n_blocks:,} Blocks (~{n_blocks * 12 / 86400:.0f} days)")
+    t, fee = synthetic_history(n_blocks, seed=1)
+    t0 = time.perf_counter()
+    oracle = GasOracle(t, fee)
+    bt = GasBacktest(oracle, step)
+    build_s = time.perf_counter() - t0
+    print(f"\n   Oracle + {len(bt):,} grid points ({step}s keeper checks) in {build_s:.2f}s")
+
+    t0 = time.perf_counter()
+    surfaces = bt.surfaces()
+    elapsed = time.perf_counter() - t0
+    cells = sum(s.samples.sum() for s in surfaces)
+    print(f"   {len(surfaces)} surfaces, {cells:,} markets resolved in {elapsed:.2f}s "
+          f"({cells / elapsed:,.0f} markets/s)")
+
+    print_header("Hit Rates (thresholds relative to the base fee at creation)")
+    shown = {("peak", False), ("window_peak", True), ("window_stability", False),
+             ("window_range", False), ("spot", True), ("comparison", False)}
+    for s in surfaces:
+        if (s.market, s.can_close) in shown:
+            print_surface(s)
+
+    print_header("Scalar Replay Throughput")
+    market = MARKETS["window_range"]
+    band = BANDS_BPS[1]
+    reps = 200
+    t0 = time.perf_counter()
+    for k in range(reps):
+        spot = int(bt.spot[k])
+        resolve_scalar(oracle, market, int(bt.times[k]), int(bt.times[k]) + 168 * 3600, step,
+                       (spot * band[0] // BPS, spot * band[1] // BPS), False)
+    scalar_s = (time.perf_counter() - t0) / reps
+    print(f"\n   resolve_scalar (7-day window range, hourly checks): {scalar_s * 1e3:.2f} ms/market"
+          f" -> {scalar_s * cells / 60:,.0f} min for the same {cells:,} markets")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
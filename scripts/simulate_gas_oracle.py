@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+GasPM base-fee oracle over a recorded history: every window TWAP, peak,
+trough and spread query answered in O(1) after O(n log n) preprocessing.
+
+GasPM.update() appends Observation(timestamp, baseFee, cumulativeBaseFee),
+where the cumulative integrates the previous observation's base fee over the
+elapsed time. GasOracle rebuilds that series from a base-fee history file
+into NumPy arrays and indexes it:
+
+- cumulative (the contract's prefix sum) gives baseFeeAverage /
+  baseFeeAverageSince as one subtraction and one floor division
+- a block sparse table per extremum (blocks of BLOCK observations, in-block
+  prefix/suffix extrema plus a sparse table over block extrema) gives the
+  max/min over any observation range with two or three lookups; ranges inside
+  one block reduce at most BLOCK values
+
+Times map to observations with a binary search (the last observation at or
+before t). Window extrema assume the window is poked at every observation,
+which is the value pokeWindowVolatility converges to; the live contract
+reports the same or a narrower spread if it was poked less often. The spot
+base fee at t is taken to be the last observed one.
+
+History files are CSV (header with `timestamp` and `base_fee` columns, any
+order, optionally gzipped) or .npz with `timestamp` / `base_fee` arrays.
+
+Requires: numpy
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+import numpy as np
+
+from simulate_router import print_header
+
+BLOCK = 64                      # Observations per sparse-table block
+BLOCK_SECONDS = 12              # Mainnet slot time (synthetic histories)
+BASE_FEE_COLUMNS = ("base_fee", "baseFeePerGas", "basefee")
+
+
+# =============================================================================
+# History Files
+# =============================================================================
+
+def load_history(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(timestamps, base fees in wei) as int64 arrays from a .csv[.gz] or .npz file"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return data["timestamp"].astype(np.int64), data["base_fee"].astype(np.int64)
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        header = [name.strip() for name in f.readline().split(",")]
+    fee_col = next((c for c in BASE_FEE_COLUMNS if c in header), None)
+    if "timestamp" not in header or fee_col is None:
+        raise ValueError(f"{path}: need timestamp and base_fee columns, got {header}")
+    data = np.loadtxt(path, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2,
+                      usecols=(header.index("timestamp"), header.index(fee_col)))
+    return data[:, 0].copy(), data[:, 1].copy()
+
+
+def write_history(path: str, timestamps, base_fees):
+    """Inverse of load_history (CSV by default, .npz by extension)"""
+    timestamps = np.asarray(timestamps, np.int64)
+    base_fees = np.asarray(base_fees, np.int64)
+    if path.endswith(".npz"):
+        np.savez(path, timestamp=timestamps, base_fee=base_fees)
+        return
+    rows = zip(map(str, timestamps.tolist()), map(str, base_fees.tolist()))
+    text = "timestamp,base_fee\n" + "\n".join(map(",".join, rows)) + "\n"
+    if path.endswith(".gz"):
+        with gzip.open(path, "wt", compresslevel=1) as f:
+            f.write(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text)
+
+
+def synthetic_history(n_blocks: int, seed: int = 0, start: int = 1_700_000_000,
+                      mean_gwei: float = 20.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One base fee per 12s block: an hourly mean-reverting log level with a
+    daily cycle plus per-block noise, each block's change clipped to the
+    EIP-1559 +/-12.5% and floored at 7 wei.
+    """
+    rng = np.random.default_rng(seed)
+    hour_blocks = 3600 // BLOCK_SECONDS
+    n_hours = n_blocks // hour_blocks + 2
+    level = np.empty(n_hours)
+    x = 0.0
+    for h, shock in enumerate(rng.normal(0, 0.15, n_hours).tolist()):
+        x += -0.05 * x + shock
+        level[h] = x
+
+    blocks = np.arange(n_blocks)
+    target = (np.log(mean_gwei * 1e9)
+              + np.interp(blocks / hour_blocks, np.arange(n_hours), level)
+              + 0.3 * np.sin(2 * np.pi * blocks * BLOCK_SECONDS / 86400)
+              + rng.normal(0, 0.02, n_blocks))
+    steps = np.clip(np.diff(target), np.log(0.875), np.log(1.125))
+    log_fee = target[0] + np.concatenate([[0.0], np.cumsum(steps)])
+    fees = np.maximum(np.exp(log_fee), 7).astype(np.int64)
+    return start + BLOCK_SECONDS * blocks.astype(np.int64), fees
+
+
+# =============================================================================
+# Range Extrema
+# =============================================================================
+
+class RangeExtremum:
+    """
+    Block sparse table for max or min over inclusive index ranges.
+
+    Memory is O(n + n/B log(n/B)); a query spanning blocks costs O(1), one
+    inside a single block reduces at most B values.
+    """
+
+    __slots__ = ("values", "ufunc", "block", "prefix", "suffix", "table")
+
+    def __init__(self, values: np.ndarray, ufunc=np.maximum, block: int = BLOCK):
+        n = len(values)
+        self.values = values
+        self.ufunc = ufunc
+        self.block = block
+        blocks = np.pad(values, (0, -n % block), mode="edge").reshape(-1, block)
+        self.prefix = ufunc.accumulate(blocks, axis=1).ravel()[:n]
+        self.suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:n]
+
+        # table[k, b] = extremum of blocks b .. b + 2^k - 1 (rows padded at the end)
+        level = ufunc.reduce(blocks, axis=1)
+        n_blocks = len(level)
+        rows = [level]
+        span = 1
+        while 2 * span <= n_blocks:
+            level = ufunc(level[:-span], level[span:])
+            rows.append(np.pad(level, (0, n_blocks - len(level)), mode="edge"))
+            level = level[:n_blocks - 2 * span + 1]
+            span *= 2
+        self.table = np.vstack(rows)
+
+    @property
+    def nbytes(self) -> int:
+        return self.prefix.nbytes + self.suffix.nbytes + self.table.nbytes
+
+    def query(self, lo: int, hi: int) -> int:
+        """Extremum of values[lo..hi] (inclusive, lo <= hi)"""
+        b_lo, b_hi = lo // self.block, hi // self.block
+        f = self.ufunc
+        if b_lo == b_hi:
+            return int(f.reduce(self.values[lo:hi + 1]))
+        out = f(self.suffix[lo], self.prefix[hi])
+        if b_hi - b_lo > 1:
+            first, last = b_lo + 1, b_hi - 1
+            k = (last - first + 1).bit_length() - 1
+            out = f(out, f(self.table[k, first], self.table[k, last - (1 << k) + 1]))
+        return int(out)
+
+    def query_many(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Vectorized query over arrays of inclusive ranges"""
+        block, f = self.block, self.ufunc
+        b_lo, b_hi = lo // block, hi // block
+        out = f(self.suffix[lo], self.prefix[hi])
+
+        inner = b_hi - b_lo > 1
+        if inner.any():
+            first, last = b_lo[inner] + 1, b_hi[inner] - 1
+            k = np.frexp((last - first + 1).astype(np.float64))[1] - 1
+            span = f(self.table[k, first], self.table[k, last - (1 << k) + 1])
+            out[inner] = f(out[inner], span)
+
+        same = b_lo == b_hi
+        if same.any():
+            # reduceat over (lo, hi + 1) pairs; every other result is a range
+            values = np.append(self.values, self.values[-1])
+            bounds = np.column_stack([lo[same], hi[same] + 1]).ravel()
+            out[same] = f.reduceat(values, bounds)[::2]
+        return out
+
+
+# =============================================================================
+# Oracle
+# =============================================================================
+
+class GasOracle:
+    """
+    GasPM observation series with prefix-sum and range-extremum indexes.
+
+    Timestamps must be non-decreasing. A repeated timestamp is dropped, as
+    update() returns early when no time has elapsed. Observation 0 is the
+    deployment (cumulative 0).
+    """
+
+    __slots__ = ("timestamp", "base_fee", "cumulative", "max_index", "min_index")
+
+    def __init__(self, timestamps, base_fees, block: int = BLOCK):
+        timestamps = np.asarray(timestamps, np.int64)
+        base_fees = np.asarray(base_fees, np.int64)
+        if len(timestamps) == 0:
+            raise ValueError("empty history")
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("timestamps must be non-decreasing")
+        keep = np.r_[True, np.diff(timestamps) > 0]
+        self.timestamp = timestamps[keep]
+        self.base_fee = base_fees[keep]
+
+        # cumulativeBaseFee += lastBaseFee * elapsed (uint128 on-chain; object ints past int64)
+        elapsed = np.diff(self.timestamp)
+        if float(np.dot(self.base_fee[:-1].astype(np.float64), elapsed)) < 2**62:
+            steps = self.base_fee[:-1] * elapsed
+        else:
+            steps = self.base_fee[:-1].astype(object) * elapsed
+        self.cumulative = np.concatenate([np.zeros(1, steps.dtype), np.cumsum(steps)])
+        self.max_index = RangeExtremum(self.base_fee, np.maximum, block)
+        self.min_index = RangeExtremum(self.base_fee, np.minimum, block)
+
+    @classmethod
+    def from_file(cls, path: str, block: int = BLOCK) -> "GasOracle":
+        return cls(*load_history(path), block=block)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def start_time(self) -> int:
+        return int(self.timestamp[0])
+
+    @property
+    def nbytes(self) -> int:
+        cumulative = self.cumulative.nbytes if self.cumulative.dtype != object else 0
+        return (self.timestamp.nbytes + self.base_fee.nbytes + cumulative
+                + self.max_index.nbytes + self.min_index.nbytes)
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def index_at(self, t: int) -> int:
+        """Last observation at or before t"""
+        i = int(np.searchsorted(self.timestamp, t, side="right")) - 1
+        if i < 0:
+            raise ValueError(f"t={t} precedes the first observation")
+        return i
+
+    def spot(self, t: int) -> int:
+        """block.basefee at t (latest observed)"""
+        return int(self.base_fee[self.index_at(t)])
+
+    def cumulative_at(self, t: int) -> int:
+        """cumulativeBaseFee + lastBaseFee * (t - lastUpdateTime)"""
+        i = self.index_at(t)
+        return int(self.cumulative[i]) + int(self.base_fee[i]) * (t - int(self.timestamp[i]))
+
+    # -------------------------------------------------------------------------
+    # All-Time Views (since deployment)
+    # -------------------------------------------------------------------------
+
+    def average(self, t: int) -> int:
+        """baseFeeAverage"""
+        total = t - self.start_time
+        return self.spot(t) if total == 0 else self.cumulative_at(t) // total
+
+    def max(self, t: int) -> int:
+        """baseFeeMax"""
+        return self.max_index.query(0, self.index_at(t))
+
+    def min(self, t: int) -> int:
+        """baseFeeMin"""
+        return self.min_index.query(0, self.index_at(t))
+
+    def spread(self, t: int) -> int:
+        """baseFeeSpread"""
+        return self.max(t) - self.min(t)
+
+    def higher_than_start(self, start_twap: int, t: int) -> int:
+        """baseFeeHigherThanStart for a comparison market created at TWAP start_twap"""
+        return int(start_twap != 0 and self.average(t) > start_twap)
+
+    # -------------------------------------------------------------------------
+    # Window Views (market created at t0, queried at t1)
+    # -------------------------------------------------------------------------
+
+    def average_since(self, t0: int, t1: int) -> int:
+        """baseFeeAverageSince: (cumulative(t1) - snapshot) / duration"""
+        duration = t1 - t0
+        if duration == 0:
+            return self.spot(t1)
+        return (self.cumulative_at(t1) - self.cumulative_at(t0)) // duration
+
+    def max_since(self, t0: int, t1: int) -> int:
+        """baseFeeMaxSince: windowMax from creation (spot at t0) through t1"""
+        return self.max_index.query(self.index_at(t0), self.index_at(t1))
+
+    def min_since(self, t0: int, t1: int) -> int:
+        """baseFeeMinSince"""
+        return self.min_index.query(self.index_at(t0), self.index_at(t1))
+
+    def spread_since(self, t0: int, t1: int) -> int:
+        """baseFeeSpreadSince"""
+        return self.max_since(t0, t1) - self.min_since(t0, t1)
+
+    def in_range_since(self, t0: int, t1: int, lower: int, upper: int) -> int:
+        """baseFeeInRangeSince: 1 if lower <= window TWAP <= upper"""
+        return int(lower <= self.average_since(t0, t1) <= upper)
+
+    def out_of_range_since(self, t0: int, t1: int, lower: int, upper: int) -> int:
+        """baseFeeOutOfRangeSince: 1 if window TWAP < lower or > upper"""
+        avg = self.average_since(t0, t1)
+        return int(avg < lower or avg > upper)
+
+    # -------------------------------------------------------------------------
+    # Batched Window Views
+    # -------------------------------------------------------------------------
+
+    def _index_many(self, t: np.ndarray) -> np.ndarray:
+        # Sorted needles keep the binary searches cache-friendly
+        order = np.argsort(t, kind="stable")
+        i = np.empty(len(t), np.int64)
+        i[order] = np.searchsorted(self.timestamp, t[order], side="right") - 1
+        if len(i) and i.min() < 0:
+            raise ValueError("a query time precedes the first observation")
+        return i
+
+    def _cumulative_many(self, t: np.ndarray, i: np.ndarray) -> np.ndarray:
+        return self.cumulative[i] + self.base_fee[i] * (t - self.timestamp[i])
+
+    def cumulative_many(self, t) -> np.ndarray:
+        t = np.asarray(t, np.int64)
+        return self._cumulative_many(t, self._index_many(t))
+
+    def average_since_many(self, t0, t1) -> np.ndarray:
+        """baseFeeAverageSince for arrays of (creation, query) times"""
+        t0, t1 = np.asarray(t0, np.int64), np.asarray(t1, np.int64)
+        i0, i1 = self._index_many(t0), self._index_many(t1)
+        duration = t1 - t0
+        delta = self._cumulative_many(t1, i1) - self._cumulative_many(t0, i0)
+        return np.where(duration == 0, self.base_fee[i1], delta // np.maximum(duration, 1))
+
+    def extremes_since_many(self, t0, t1) -> Tuple[np.ndarray, np.ndarray]:
+        """(baseFeeMaxSince, baseFeeMinSince) for arrays of windows"""
+        lo = self._index_many(np.asarray(t0, np.int64))
+        hi = self._index_many(np.asarray(t1, np.int64))
+        return self.max_index.query_many(lo, hi), self.min_index.query_many(lo, hi)
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+class ScalarGasPM:
+    """GasPM.update() / snapshot / poke replayed one observation at a time"""
+
+    def __init__(self, t: int, base_fee: int):
+        self.cumulative = 0
+        self.last_fee = base_fee
+        self.last_update = t
+        self.start = t
+
+    def update(self, t: int, base_fee: int):
+        elapsed = t - self.last_update
+        if elapsed == 0:
+            return
+        self.cumulative += self.last_fee * elapsed
+        self.last_fee = base_fee
+        self.last_update = t
+
+    def current_cumulative(self, t: int) -> int:
+        return self.cumulative + self.last_fee * (t - self.last_update)
+
+
+def check_against_scan(n_blocks: int = 6_000, n_windows: int = 1_000, seed: int = 4,
+                       block: int = 16) -> int:
+    """
+    Indexed queries vs a direct replay of update() with every window poked at
+    each observation. Returns the number of mismatching values.
+    """
+    t, fee = synthetic_history(n_blocks, seed)
+    # Keepers do not update every block: random gaps and repeated timestamps
+    rng = np.random.default_rng(seed)
+    keep = np.sort(rng.choice(n_blocks, n_blocks // 3, replace=False))
+    t, fee = t[keep], fee[keep]
+    t = np.concatenate([t, t[-5:]])
+    fee = np.concatenate([fee, fee[-5:]])
+    order = np.argsort(t, kind="stable")
+    t, fee = t[order], fee[order]
+    oracle = GasOracle(t, fee, block)
+
+    t0 = rng.integers(t[0], t[-1], n_windows)
+    t1 = t0 + rng.integers(0, (t[-1] - t[0]) // 4, n_windows)
+    mismatches = 0
+    batch_avg = oracle.average_since_many(t0, t1)
+    batch_max, batch_min = oracle.extremes_since_many(t0, t1)
+    ts, fees = t.tolist(), fee.tolist()
+    for k, (a, b) in enumerate(zip(t0.tolist(), t1.tolist())):
+        gas = ScalarGasPM(ts[0], fees[0])
+        snapshot = window_max = window_min = None
+        for ti, fi in zip(ts, fees):
+            if ti > b:
+                break
+            if ti > a and snapshot is None:
+                snapshot = gas.current_cumulative(a)
+                window_max = window_min = gas.last_fee
+            gas.update(ti, fi)
+            if snapshot is not None:
+                window_max, window_min = max(window_max, fi), min(window_min, fi)
+        if snapshot is None:
+            snapshot = gas.current_cumulative(a)
+            window_max = window_min = gas.last_fee
+        avg = gas.last_fee if a == b else (gas.current_cumulative(b) - snapshot) // (b - a)
+        expected = (avg, window_max, window_min)
+        scalar = (oracle.average_since(a, b), oracle.max_since(a, b), oracle.min_since(a, b))
+        batch = (int(batch_avg[k]), int(batch_max[k]), int(batch_min[k]))
+        mismatches += (scalar != expected) + (batch != expected)
+    return mismatches
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(n_blocks: int = 2_628_000):
+    print_header("GasPM Oracle: Indexed Queries vs update() Replay")
+    mismatches = check_against_scan()
+    print(f"\n   1,000 windows over 2,000 sparse observations (block 16): "
+          f"{mismatches} mismatches")
+
+    print_header(f"Base-Fee History: {n_blocks:,} Blocks (~{n_blocks * 12 / 86400:.0f} days)")
+    t, fee = synthetic_history(n_blocks, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "basefee.csv.gz")
+        write_history(path, t, fee)
+        t0 = time.perf_counter()
+        oracle = GasOracle.from_file(path)
+        load_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    GasOracle(t, fee)
+    build_s = time.perf_counter() - t0
+    print(f"\n   Loaded CSV.gz + indexed in {load_s:.2f}s (index build alone {build_s:.2f}s), "
+          f"{oracle.nbytes / 1e6:.1f} MB")
+    end = int(t[-1])
+    print(f"   All-time: TWAP {oracle.average(end) / 1e9:.2f} gwei, max "
+          f"{oracle.max(end) / 1e9:.2f}, min {oracle.min(end) / 1e9:.2f}, "
+          f"spread {oracle.spread(end) / 1e9:.2f} gwei")
+
+    print(f"\n{'Window':<8} | {'TWAP gwei':>9} | {'Peak':>8} | {'Trough':>8} | "
+          f"{'Spread':>8} | {'In [15, 25]':>11}")
+    print("-" * 66)
+    for days in (1, 7, 30, 90):
+        start = end - days * 86400
+        print(f"{days:>4}d    | {oracle.average_since(start, end) / 1e9:>9.2f} | "
+              f"{oracle.max_since(start, end) / 1e9:>8.2f} | "
+              f"{oracle.min_since(start, end) / 1e9:>8.2f} | "
+              f"{oracle.spread_since(start, end) / 1e9:>8.2f} | "
+              f"{oracle.in_range_since(start, end, 15 * 10**9, 25 * 10**9):>11}")
+
+    print_header("Query Throughput")
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    starts = rng.integers(t[0], end, n)
+    ends = np.minimum(starts + rng.integers(3600, 30 * 86400, n), end)
+    t0 = time.perf_counter()
+    oracle.average_since_many(starts, ends)
+    avg_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    oracle.extremes_since_many(starts, ends)
+    ext_s = time.perf_counter() - t0
+    reps = 20_000
+    t0 = time.perf_counter()
+    for a, b in zip(starts[:reps].tolist(), ends[:reps].tolist()):
+        oracle.max_since(a, b)
+    scalar_us = (time.perf_counter() - t0) / reps * 1e6
+    i0, i1 = oracle._index_many(starts[:200]), oracle._index_many(ends[:200])
+    t0 = time.perf_counter()
+    for a, b in zip(i0.tolist(), i1.tolist()):
+        fee[a:b + 1].max()
+    scan_us = (time.perf_counter() - t0) / 200 * 1e6
+    print(f"\n   {n:,} windows: TWAP {avg_s * 1e3:.0f} ms, peak+trough {ext_s * 1e3:.0f} ms "
+          f"({n / (avg_s + ext_s):,.0f} windows/s)")
+    print(f"   Scalar max_since {scalar_us:.1f} us/query vs direct slice max "
+          f"{scan_us:.1f} us/query")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_628_000)
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+PMRouter limit orders: per-side price-sorted heaps over the ZAMM-escrowed
+Order book, matched by fillOrdersThenSwap with the remainder swapped on the AMM.
+
+Each (isYes, isBuy) side is a binary heap of (price, seq, order) entries:
+SELL orders (asks) on a min-heap by collateral/shares, BUY orders (bids) on a
+max-heap, FIFO within a price. Cancels and expiries use lazy deletion: the
+order is flagged dead and its heap entry dropped when it surfaces at the top
+(or when dead entries outnumber live ones and the heap is compacted). Each
+fill therefore costs O(log n), and books with 10^5+ resting orders backtest
+in a few seconds.
+
+Amounts are wei-denominated uint96 Python ints and fills round as the
+contracts do:
+- collateralNeeded = collateral * sharesAvail / shares (floor) on buys
+- ZAMM fill slices are mulDiv(amtIn, fillPart, amtOut) (floor); the fill
+  that completes an order delivers all of the remaining escrow
+- a non-partialFill order is skipped unless it can be filled entirely
+
+The remainder leg reuses the simulate_router Engine (EXACT_ENGINE by default)
+and the simulate_sell SellEngine, written back to the pool like
+simulate_sequence.MarketSequencer.
+"""
+
+import heapq
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from simulate_exact import EXACT_ENGINE, WAD
+from simulate_router import Engine, PoolState, print_header
+from simulate_sell import EXACT_SELL_ENGINE, SellEngine
+
+BPS = 10000
+UINT96_MAX = 2**96 - 1
+
+# Heap compaction once dead entries exceed this share of a heap (and its size)
+COMPACT_DEAD_FRACTION = 0.5
+COMPACT_MIN_ENTRIES = 64
+
+# All-or-nothing orders a heap walk may step over before handing the rest to
+# the AMM (the contract walks whatever hash list the caller passes; keepers
+# pass a bounded one)
+MAX_SKIPS = 32
+
+# (is_buy, is_yes, shares, collateral, deadline, partial_fill): the fields the
+# ZAMM order hash commits to for one market (maker is always PMRouter)
+OrderHash = Tuple[bool, bool, int, int, int, bool]
+
+
+# =============================================================================
+# Orders
+# =============================================================================
+
+class LimitOrder:
+    """
+    One PMRouter Order plus its ZAMM fill state (inDone / outDone).
+
+    SELL: escrows `shares` (amtIn), wants `collateral` (amtOut).
+    BUY:  escrows `collateral` (amtIn), wants `shares` (amtOut).
+    """
+
+    __slots__ = ("order_hash", "owner", "is_yes", "is_buy", "shares", "collateral",
+                 "deadline", "partial_fill", "in_done", "out_done", "seq", "live")
+
+    def __init__(self, order_hash: OrderHash, owner: int, seq: int):
+        (self.is_buy, self.is_yes, self.shares, self.collateral,
+         self.deadline, self.partial_fill) = order_hash
+        self.order_hash = order_hash
+        self.owner = owner
+        self.seq = seq
+        self.in_done = 0
+        self.out_done = 0
+        self.live = True            # Entry in its side heap is valid
+
+    @property
+    def amt_in(self) -> int:
+        return self.collateral if self.is_buy else self.shares
+
+    @property
+    def amt_out(self) -> int:
+        return self.shares if self.is_buy else self.collateral
+
+    @property
+    def shares_available(self) -> int:
+        return self.shares - (self.out_done if self.is_buy else self.in_done)
+
+    @property
+    def filled(self) -> bool:
+        """ZAMM deletes the order (deadline -> 0) once outDone reaches amtOut"""
+        return self.out_done >= self.amt_out
+
+    @property
+    def price_bps(self) -> int:
+        return self.collateral * BPS // self.shares
+
+    def escrow_remaining(self) -> int:
+        """Principal refunded by cancelOrder (collateral for BUY, shares for SELL)"""
+        return 0 if self.filled else self.amt_in - self.in_done
+
+    def fill_slice(self, fill_part: int) -> Tuple[int, int]:
+        """
+        ZAMM fillOrder slice for `fill_part` of amtOut.
+
+        Returns: (slice_in, slice_out) = (escrow paid to the taker, amount paid to the maker)
+        """
+        out_left = self.amt_out - self.out_done
+        if fill_part >= out_left:
+            return self.amt_in - self.in_done, out_left
+        return self.amt_in * fill_part // self.amt_out, fill_part
+
+
+def order_sort_key(order: LimitOrder) -> Tuple[float, int]:
+    """Priority within a side: best price first, then time (ascending key)"""
+    price = order.collateral / order.shares
+    return (-price if order.is_buy else price, order.seq)
+
+
+@dataclass
+class BookStats:
+    """Running totals for one LimitBook (constant size)"""
+    placed: int = 0
+    cancelled: int = 0
+    expired: int = 0            # Dropped from a heap at/after their deadline
+    dust: int = 0               # Dropped because no fill of them can round above zero
+    fills: int = 0
+    fully_filled: int = 0
+    dead_pops: int = 0          # Lazily deleted entries discarded at a heap top
+    compactions: int = 0
+
+
+@dataclass
+class HybridFill:
+    """Result of fill_orders_then_swap"""
+    amount_out: int             # Shares (buy) or collateral (sell) received in total
+    book_out: int               # Part of amount_out filled by resting orders
+    book_in: int                # Collateral (buy) or shares (sell) spent on orders
+    orders_filled: int
+    amm_in: int = 0
+    amm_out: int = 0
+    fee_bps: int = 0
+    price_impact_bps: int = 0
+    refund: int = 0             # Unsold shares returned by the sell-side merge
+    reverted: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.reverted is None
+
+
+# =============================================================================
+# Heap Book
+# =============================================================================
+
+class LimitBook:
+    """
+    All PMRouter orders of one market, indexed by four lazy-deletion heaps.
+
+    `orders` maps order hash -> LimitOrder for every order that has not been
+    cancelled (fully filled or expired orders stay until cancelled, exactly as
+    PMRouter keeps them for claimProceeds / cancelOrder). The heaps only hold
+    orders that can still be matched.
+    """
+
+    __slots__ = ("close", "opened_at", "orders", "heaps", "dead", "stats", "_seq")
+
+    def __init__(self, close: int, opened_at: int = 0):
+        self.close = close
+        self.opened_at = opened_at
+        self.orders: Dict[OrderHash, LimitOrder] = {}
+        # (is_yes, is_buy) -> [(price key, seq, order)]
+        self.heaps: Dict[Tuple[bool, bool], list] = {
+            (y, b): [] for y in (True, False) for b in (True, False)
+        }
+        self.dead = {side: 0 for side in self.heaps}
+        self.stats = BookStats()
+        self._seq = 0
+
+    # -------------------------------------------------------------------------
+    # placeOrder / cancelOrder
+    # -------------------------------------------------------------------------
+
+    def place_order(self, owner: int, is_yes: bool, is_buy: bool, shares: int,
+                    collateral: int, deadline: int, partial_fill: bool,
+                    now: int) -> OrderHash:
+        """placeOrder: validates, clamps the deadline to close, returns the order hash"""
+        if shares == 0 or collateral == 0:
+            raise ValueError("AmountZero")
+        if shares > UINT96_MAX or collateral > UINT96_MAX:
+            raise OverflowError("uint96")
+        if deadline <= now:
+            raise ValueError("DeadlineExpired")
+        if now >= self.close:
+            raise ValueError("MarketClosed")
+        deadline = min(deadline, self.close)
+
+        order_hash = (is_buy, is_yes, shares, collateral, deadline, partial_fill)
+        if order_hash in self.orders:
+            raise ValueError("OrderExists")
+
+        self._seq += 1
+        order = LimitOrder(order_hash, owner, self._seq)
+        self.orders[order_hash] = order
+        heapq.heappush(self.heaps[is_yes, is_buy], (*order_sort_key(order), order))
+        self.stats.placed += 1
+        return order_hash
+
+    def cancel_order(self, order_hash: OrderHash, owner: int) -> int:
+        """cancelOrder: returns the refunded escrow (proceeds are paid at fill time)"""
+        order = self.orders.get(order_hash)
+        if order is None:
+            raise ValueError("OrderNotFound")
+        if order.owner != owner:
+            raise ValueError("NotOrderOwner")
+        del self.orders[order_hash]
+        self._kill(order)
+        self.stats.cancelled += 1
+        return order.escrow_remaining()
+
+    def _kill(self, order: LimitOrder):
+        """Lazy delete: flag the heap entry dead, compact once dead entries dominate"""
+        if not order.live:
+            return
+        order.live = False
+        side = (order.is_yes, order.is_buy)
+        self.dead[side] += 1
+        heap = self.heaps[side]
+        if (len(heap) >= COMPACT_MIN_ENTRIES
+                and self.dead[side] > len(heap) * COMPACT_DEAD_FRACTION):
+            self.heaps[side] = [entry for entry in heap if entry[2].live]
+            heapq.heapify(self.heaps[side])
+            self.dead[side] = 0
+            self.stats.compactions += 1
+
+    def prune(self, now: int) -> int:
+        """Drop every expired entry from the heaps now (O(n)); returns the count"""
+        expired = 0
+        for side, heap in self.heaps.items():
+            keep = []
+            for entry in heap:
+                order = entry[2]
+                if order.live and now > order.deadline:
+                    order.live = False
+                    expired += 1
+                elif order.live:
+                    keep.append(entry)
+            heapq.heapify(keep)
+            self.heaps[side] = keep
+            self.dead[side] = 0
+        self.stats.expired += expired
+        return expired
+
+    # -------------------------------------------------------------------------
+    # Best Order
+    # -------------------------------------------------------------------------
+
+    def _top(self, is_yes: bool, is_buy: bool, now: int) -> Optional[LimitOrder]:
+        """Best matchable order of a side; discards dead and expired entries on the way"""
+        side = (is_yes, is_buy)
+        heap = self.heaps[side]
+        stats = self.stats
+        while heap:
+            order = heap[0][2]
+            if not order.live:
+                heapq.heappop(heap)
+                self.dead[side] -= 1
+                stats.dead_pops += 1
+            elif now > order.deadline:
+                heapq.heappop(heap)
+                order.live = False
+                stats.expired += 1
+            else:
+                return order
+        return None
+
+    def best_ask(self, is_yes: bool, now: int) -> Optional[LimitOrder]:
+        """Cheapest live SELL order"""
+        return self._top(is_yes, False, now)
+
+    def best_bid(self, is_yes: bool, now: int) -> Optional[LimitOrder]:
+        """Highest live BUY order"""
+        return self._top(is_yes, True, now)
+
+    def depth(self, is_yes: bool, is_buy: bool) -> int:
+        """Heap entries still flagged live (expired ones count until they surface)"""
+        side = (is_yes, is_buy)
+        return len(self.heaps[side]) - self.dead[side]
+
+    def live_orders(self, is_yes: bool, is_buy: bool, now: int) -> List[LimitOrder]:
+        """Matchable orders of a side in priority order (O(n log n), for checks)"""
+        out = [e[2] for e in self.heaps[is_yes, is_buy]
+               if e[2].live and now <= e[2].deadline]
+        return sorted(out, key=order_sort_key)
+
+    # -------------------------------------------------------------------------
+    # Matching
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _plan(order: LimitOrder, remaining: int) -> Tuple[int, int]:
+        """
+        fillOrdersThenSwap loop body for one order.
+
+        Returns: (fill_part, taker_in); fill_part == 0 means the order is skipped.
+        """
+        avail = order.shares_available
+        if avail <= 0:
+            return 0, 0
+        if order.is_buy:
+            # Taker sells shares: fillPart = shares to the maker
+            to_fill = remaining if remaining < avail else avail
+            if not order.partial_fill and to_fill != avail:
+                return 0, 0
+            return to_fill, to_fill
+        # Taker buys shares: fillPart = collateral to the maker
+        needed = order.collateral * avail // order.shares
+        use = remaining if remaining < needed else needed
+        if use == 0 or (not order.partial_fill and use != needed):
+            return 0, 0
+        return use, use
+
+    @staticmethod
+    def _unfillable(order: LimitOrder) -> bool:
+        """A SELL order whose remaining shares are worth 0 wei can never be matched"""
+        return not order.is_buy and order.collateral * order.shares_available // order.shares == 0
+
+    def match(self, is_yes: bool, taker_buys: bool, amount: int, now: int,
+              limit_bps: Optional[int] = None,
+              order_hashes: Optional[Sequence[OrderHash]] = None,
+              max_skips: Optional[int] = MAX_SKIPS
+              ) -> Tuple[List[Tuple[LimitOrder, int, int]], int]:
+        """
+        Plan the order leg of fillOrdersThenSwap without touching order state.
+
+        Orders come from the heap (best price first, stopping at `limit_bps`
+        or after `max_skips` all-or-nothing orders too large to take) or, with
+        `order_hashes`, from that explicit list as the contract does.
+
+        Returns: ([(order, slice_in, slice_out)], amount left for the AMM)
+        """
+        fills = []
+        remaining = amount
+        if order_hashes is not None:
+            for h in order_hashes:
+                if remaining <= 0:
+                    break
+                order = self.orders.get(h)
+                if (order is None or order.is_yes != is_yes or order.is_buy == taker_buys
+                        or order.filled or now > order.deadline):
+                    continue
+                fill_part, _ = self._plan(order, remaining)
+                if fill_part:
+                    slice_in, slice_out = order.fill_slice(fill_part)
+                    fills.append((order, slice_in, slice_out))
+                    remaining -= slice_out
+            return fills, remaining
+
+        # Heap walk: matched and skipped entries are popped, then restored by commit
+        side = (is_yes, not taker_buys)
+        heap = self.heaps[side]
+        popped = []
+        skips = 0
+        while remaining > 0:
+            order = self._top(is_yes, not taker_buys, now)
+            if order is None:
+                break
+            if limit_bps is not None and (
+                    order.collateral * BPS > limit_bps * order.shares if taker_buys
+                    else order.collateral * BPS < limit_bps * order.shares):
+                break
+            entry = heapq.heappop(heap)
+            if self._unfillable(order):
+                order.live = False
+                self.stats.dust += 1
+                continue
+            popped.append(entry)
+            fill_part, _ = self._plan(order, remaining)
+            if fill_part:
+                slice_in, slice_out = order.fill_slice(fill_part)
+                fills.append((order, slice_in, slice_out))
+                remaining -= slice_out
+            else:
+                skips += 1
+                if max_skips is not None and skips > max_skips:
+                    break
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        return fills, remaining
+
+    def commit(self, fills: Sequence[Tuple[LimitOrder, int, int]]):
+        """Apply planned fills; completed orders leave their heap lazily"""
+        stats = self.stats
+        for order, slice_in, slice_out in fills:
+            order.in_done += slice_in
+            order.out_done += slice_out
+            stats.fills += 1
+            if order.filled:
+                stats.fully_filled += 1
+                self._kill(order)
+
+    # -------------------------------------------------------------------------
+    # fillOrdersThenSwap
+    # -------------------------------------------------------------------------
+
+    def fill_orders_then_swap(self, pool: PoolState, is_yes: bool, is_buy: bool,
+                              total_amount: int, now: int, min_output: int = 0,
+                              limit_bps: Optional[int] = None,
+                              order_hashes: Optional[Sequence[OrderHash]] = None,
+                              max_skips: Optional[int] = MAX_SKIPS,
+                              engine: Engine = EXACT_ENGINE,
+                              sell_engine: SellEngine = EXACT_SELL_ENGINE) -> HybridFill:
+        """
+        Fill resting orders, then swap the remainder on the AMM, then check
+        minOutput. Orders and the pool are only updated if nothing reverts.
+
+        The contract swaps the remainder through a collateral/share ZAMM pool;
+        here it goes through the market's YES/NO pool via the router engines
+        (split + swap for buys, swap + merge for sells).
+        """
+        if now >= self.close:
+            return HybridFill(0, 0, 0, 0, reverted="TradingNotOpen")
+
+        fills, remaining = self.match(is_yes, is_buy, total_amount, now,
+                                      limit_bps, order_hashes, max_skips)
+        # Buys: slice_in = shares out, slice_out = collateral in; sells the reverse
+        book_out = sum(f[1] for f in fills)
+        result = HybridFill(book_out, book_out, total_amount - remaining, len(fills))
+
+        if remaining > 0:
+            fee = engine.hook_fee(pool, now - self.opened_at)
+            result.fee_bps = fee
+            if is_buy:
+                shares, impact, ok = engine.amm_buy(pool, remaining, is_yes, fee)
+                swapped, swap_out = remaining, shares - remaining
+            else:
+                shares, swapped, impact, ok = sell_engine.amm_sell(
+                    pool, remaining, is_yes, fee)
+                # Opposite-side output of the swap leg (integer _quoteAMMSell swap)
+                r_in, r_out = ((pool.yes_reserve, pool.no_reserve) if is_yes
+                               else (pool.no_reserve, pool.yes_reserve))
+                amount_in_with_fee = swapped * (BPS - fee)
+                swap_out = amount_in_with_fee * r_out // (r_in * BPS + amount_in_with_fee)
+            if not ok:
+                result.reverted = "PriceImpact"
+                return result
+            result.amm_in, result.amm_out = remaining, shares
+            result.price_impact_bps = impact
+            result.amount_out += shares
+            if not is_buy:
+                result.refund = remaining - swapped - shares
+        if result.amount_out < min_output:
+            result.reverted = "SlippageExceeded"
+            return result
+
+        self.commit(fills)
+        if result.amm_in and swapped:
+            # Reserve write-back: swap `swapped` of the sold side in, `swap_out` out
+            if is_yes == is_buy:
+                pool.no_reserve += swapped
+                pool.yes_reserve -= swap_out
+            else:
+                pool.yes_reserve += swapped
+                pool.no_reserve -= swap_out
+        return result
+
+
+# =============================================================================
+# Backtest
+# =============================================================================
+
+@dataclass
+class BacktestStats:
+    """Totals of run_backtest"""
+    takers: int = 0
+    reverted: int = 0
+    book_volume: int = 0        # Taker input matched against resting orders
+    amm_volume: int = 0         # Taker input routed to the AMM
+    orders_touched: int = 0
+    placed: int = 0
+    cancelled: int = 0
+    seconds: float = 0.0
+
+    @property
+    def book_share(self) -> float:
+        total = self.book_volume + self.amm_volume
+        return self.book_volume / total if total else 0.0
+
+
+def random_order(rng: random.Random, mid_bps: int, now: int, close: int,
+                 spread_bps: int = 1500):
+    """(is_yes, is_buy, shares, collateral, deadline, partial_fill) around mid"""
+    is_yes = rng.random() < 0.5
+    is_buy = rng.random() < 0.5
+    side_mid = mid_bps if is_yes else BPS - mid_bps
+    offset = rng.randint(1, spread_bps)
+    price = side_mid - offset if is_buy else side_mid + offset
+    price = min(max(price, 1), BPS - 1)
+    shares = rng.randint(1, 500) * WAD // 10
+    collateral = shares * price // BPS
+    deadline = now + rng.randint(3600, 14 * 86400)
+    return is_yes, is_buy, shares, max(collateral, 1), min(deadline, close), rng.random() < 0.8
+
+
+def seed_book(n_orders: int, seed: int = 0, mid_bps: int = 5000,
+              close: int = 30 * 86400) -> LimitBook:
+    """A book with n_orders resting orders spread over both sides"""
+    rng = random.Random(seed)
+    book = LimitBook(close)
+    while book.stats.placed < n_orders:
+        try:
+            book.place_order(rng.randrange(1000), *random_order(rng, mid_bps, 0, close), now=0)
+        except ValueError:      # OrderExists: same terms drawn twice
+            pass
+    return book
+
+
+def run_backtest(book: LimitBook, pool: PoolState, n_events: int, seed: int = 1,
+                 step_seconds: int = 20, place_share: float = 0.3,
+                 cancel_share: float = 0.2) -> BacktestStats:
+    """
+    Random event stream: takers (fillOrdersThenSwap with the AMM's post-fee spot
+    as the limit), new orders and cancels, with the clock advancing each event.
+    """
+    rng = random.Random(seed)
+    stats = BacktestStats()
+    hashes = list(book.orders)
+    now = 0
+    t0 = time.perf_counter()
+    for _ in range(n_events):
+        now += step_seconds
+        if now >= book.close:
+            break
+        draw = rng.random()
+        if draw < place_share:
+            mid = pool.no_reserve * BPS // (pool.yes_reserve + pool.no_reserve)
+            try:
+                hashes.append(book.place_order(rng.randrange(1000),
+                                               *random_order(rng, mid, now, book.close),
+                                               now=now))
+                stats.placed += 1
+            except ValueError:
+                pass
+        elif draw < place_share + cancel_share and hashes:
+            i = rng.randrange(len(hashes))
+            hashes[i], hashes[-1] = hashes[-1], hashes[i]
+            order = book.orders.get(hashes.pop())
+            if order is not None:
+                book.cancel_order(order.order_hash, order.owner)
+                stats.cancelled += 1
+        else:
+            is_yes = rng.random() < 0.5
+            is_buy = rng.random() < 0.5
+            amount = rng.randint(1, 200) * WAD // 10
+            p_yes = pool.no_reserve * BPS // (pool.yes_reserve + pool.no_reserve)
+            p_side = p_yes if is_yes else BPS - p_yes
+            limit = p_side + 300 if is_buy else p_side - 300
+            r = book.fill_orders_then_swap(pool, is_yes, is_buy, amount, now,
+                                           limit_bps=limit)
+            stats.takers += 1
+            if not r.succeeded:
+                stats.reverted += 1
+                continue
+            stats.book_volume += r.book_in
+            stats.amm_volume += r.amm_in
+            stats.orders_touched += r.orders_filled
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+
+def check_against_scan(n_orders: int = 2000, n_takers: int = 400, seed: int = 7) -> int:
+    """
+    Heap matching vs the contract loop over an explicit, freshly sorted hash
+    list. Returns the number of takers whose fills or outputs differ.
+    """
+    heap_book = seed_book(n_orders, seed)
+    scan_book = seed_book(n_orders, seed)
+    heap_pool = PoolState(1000 * WAD, 1000 * WAD)
+    scan_pool = PoolState(1000 * WAD, 1000 * WAD)
+    rng = random.Random(seed)
+    mismatches = 0
+    for i in range(n_takers):
+        now = i * 600
+        is_yes, is_buy = rng.random() < 0.5, rng.random() < 0.5
+        amount = rng.randint(1, 2000) * WAD // 10
+
+        listed = [o.order_hash for o in scan_book.live_orders(is_yes, not is_buy, now)]
+        a = heap_book.fill_orders_then_swap(heap_pool, is_yes, is_buy, amount, now,
+                                            max_skips=None)
+        b = scan_book.fill_orders_then_swap(scan_pool, is_yes, is_buy, amount, now,
+                                            order_hashes=listed)
+        if (a.amount_out, a.book_in, a.orders_filled, a.reverted) != (
+                b.amount_out, b.book_in, b.orders_filled, b.reverted):
+            mismatches += 1
+        if i % 50 == 0 and listed:
+            h = listed[rng.randrange(len(listed))]
+            owner = scan_book.orders[h].owner
+            heap_book.cancel_order(h, owner)
+            scan_book.cancel_order(h, owner)
+
+    same_state = all(
+        (o.in_done, o.out_done) == (scan_book.orders[h].in_done, scan_book.orders[h].out_done)
+        for h, o in heap_book.orders.items()
+    ) and heap_book.orders.keys() == scan_book.orders.keys()
+    same_pool = (heap_pool.yes_reserve, heap_pool.no_reserve) == (
+        scan_pool.yes_reserve, scan_pool.no_reserve)
+    return mismatches + (not same_state) + (not same_pool)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(n_resting: int = 100_000, n_events: int = 100_000):
+    print_header("PMRouter Limit Book: fillOrdersThenSwap (1e18 wei = $1)")
+    book = LimitBook(close=7 * 86400)
+    pool = PoolState(1000 * WAD, 1000 * WAD)
+    for price, shares, partial in [(4800, 100, True), (4900, 50, False), (5100, 80, True)]:
+        book.place_order(1, True, False, shares * WAD, shares * WAD * price // BPS,
+                         86400, partial, now=0)
+    book.place_order(2, True, True, 200 * WAD, 200 * WAD * 4500 // BPS, 86400, True, now=0)
+    ask = book.best_ask(True, 0)
+    bid = book.best_bid(True, 0)
+    print(f"\n   YES book: best bid {bid.price_bps}bps, best ask {ask.price_bps}bps "
+          f"({ask.shares / WAD:.0f} shares)")
+
+    for label, is_buy, amount, limit in [("Buy $70 YES, limit 5000bps", True, 70, 5000),
+                                         ("Buy $200 YES, no limit", True, 200, None),
+                                         ("Sell 150 YES, no limit", False, 150, None)]:
+        r = book.fill_orders_then_swap(pool, True, is_buy, amount * WAD, 3600,
+                                       limit_bps=limit)
+        unit_out, unit_in = ("shares", "coll") if is_buy else ("coll", "shares")
+        print(f"   {label}: {r.book_out / WAD:.2f} {unit_out} from {r.orders_filled} orders "
+              f"for {r.book_in / WAD:.2f} {unit_in}, +{r.amm_out / WAD:.2f} via AMM "
+              f"(fee {r.fee_bps}bps, impact {r.price_impact_bps}bps) -> "
+              f"{r.amount_out / WAD:.2f} {unit_out}")
+    r = book.fill_orders_then_swap(pool, True, True, 10 * WAD, 3600, min_output=100 * WAD)
+    print(f"   Buy $10 YES, minOutput 100 shares: reverted={r.reverted}")
+
+    print_header("Heap Matching vs Sorted-List Scan")
+    mismatches = check_against_scan()
+    print(f"\n   2000 resting orders, 400 takers with cancels and expiries: "
+          f"{mismatches} mismatches")
+
+    print_header(f"Backtest: {n_resting:,} Resting Orders, {n_events:,} Events")
+    t0 = time.perf_counter()
+    book = seed_book(n_resting)
+    seed_s = time.perf_counter() - t0
+    pool = PoolState(10_000 * WAD, 10_000 * WAD)
+    stats = run_backtest(book, pool, n_events)
+    s = book.stats
+    print(f"\n   Seeded in {seed_s:.2f}s; {stats.takers:,} takers, {stats.placed:,} placed, "
+          f"{stats.cancelled:,} cancelled in {stats.seconds:.2f}s "
+          f"({n_events / stats.seconds:,.0f} events/s)")
+    print(f"   Fills: {s.fills:,} ({s.fully_filled:,} completed), "
+          f"{stats.orders_touched / max(stats.takers, 1):.2f} orders/taker, "
+          f"book share of volume {stats.book_share:.1%}, {stats.reverted:,} reverted")
+    print(f"   Lazy deletion: {s.dead_pops:,} dead pops, {s.expired:,} expired, "
+          f"{s.dust:,} dust, {s.compactions} compactions")
+    depth = {f"{'YES' if y else 'NO'} {'bids' if b else 'asks'}": book.depth(y, b)
+             for y, b in book.heaps}
+    print(f"   Heap depth after: {depth}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+MasterRouter LP accounting: accumulator (reward-debt) model for ask and bid pools.
+
+Each price level is one pool. Pool fields:
+    totalDepth   shares for sale (ask, totalShares) or collateral to spend (bid, totalCollateral)
+    totalScaled  LP units outstanding
+    acc          reward per LP unit x 1e18 (accCollPerScaled / accSharesPerScaled)
+
+Each LP holds (scaled, debt). Operations:
+    deposit   mint units at totalScaled / totalDepth (1:1 for the first LP, round down)
+              and add debt for the new units only
+    fill      depth -= taken; acc += reward * ACC / totalScaled          O(1), no per-LP work
+    claim     pending = scaled * acc / ACC - debt; debt = scaled * acc / ACC
+    withdraw  auto-claim, then burn mulDivUp(out, totalScaled, totalDepth) units
+              and remove their share of debt
+
+A level filled down to zero depth while LPs still hold units is exhausted:
+deposits revert and there is nothing left to withdraw, so its LPs can only
+claim.
+
+Positions are stored struct-of-arrays (one NumPy column per field, indexed by
+LP id), so pending rewards, withdrawable depth and PnL for every LP of a level
+come out of a single vectorized expression. Float mode uses float64 columns.
+Exact mode uses object columns of Python ints and the contract's mulDiv /
+mulDivUp rounding.
+
+Requires: numpy
+"""
+
+import random
+import time
+from typing import Tuple, Union
+
+import numpy as np
+
+from simulate_exact import ceil_div
+from simulate_router import print_header
+
+BPS = 10000
+ACC = 10**18                     # Accumulator precision
+
+Amount = Union[int, float]
+
+
+# =============================================================================
+# Pool
+# =============================================================================
+
+class LPPool:
+    """
+    One MasterRouter Pool (side="ask": LPs sell shares for collateral) or
+    BidPool (side="bid": LPs spend collateral on shares) at a fixed price.
+
+    LPs are dense integer ids. Columns grow by doubling as new ids appear.
+    """
+
+    __slots__ = ("side", "price_bps", "exact", "total_depth", "total_scaled", "acc", "earned",
+                 "n_lps", "scaled", "debt", "deposited", "withdrawn", "claimed")
+
+    def __init__(self, side: str, price_bps: int, exact: bool = False, capacity: int = 64):
+        if side not in ("ask", "bid"):
+            raise ValueError(f"side must be 'ask' or 'bid', got {side!r}")
+        if not 0 < price_bps < BPS:
+            raise ValueError(f"price must be in [1, 9999] bps, got {price_bps}")
+        self.side = side
+        self.price_bps = price_bps
+        self.exact = exact
+        zero = 0 if exact else 0.0
+        self.total_depth = zero       # totalShares / totalCollateral
+        self.total_scaled = zero
+        self.acc = zero               # accCollPerScaled / accSharesPerScaled
+        self.earned = zero            # collateralEarned / sharesAcquired
+
+        self.n_lps = 0
+        self.scaled = self._column(capacity)
+        self.debt = self._column(capacity)        # collDebt / sharesDebt
+        self.deposited = self._column(capacity)   # Depth units put in
+        self.withdrawn = self._column(capacity)   # Depth units taken back out
+        self.claimed = self._column(capacity)     # Reward units paid out
+
+    def _column(self, n: int) -> np.ndarray:
+        if self.exact:
+            col = np.empty(n, dtype=object)
+            col.fill(0)
+            return col
+        return np.zeros(n, dtype=np.float64)
+
+    def _ensure(self, lp: int):
+        if lp < self.n_lps:
+            return
+        capacity = self.scaled.shape[0]
+        if lp >= capacity:
+            capacity = max(capacity * 2, lp + 1)
+            for name in ("scaled", "debt", "deposited", "withdrawn", "claimed"):
+                old = getattr(self, name)
+                new = self._column(capacity)
+                new[:self.n_lps] = old[:self.n_lps]
+                setattr(self, name, new)
+        self.n_lps = lp + 1
+
+    def _acc_value(self, scaled: Amount) -> Amount:
+        """mulDiv(scaled, acc, ACC)"""
+        if self.exact:
+            return scaled * self.acc // ACC
+        return scaled * self.acc / ACC
+
+    # -------------------------------------------------------------------------
+    # Per-LP operations (all O(1))
+    # -------------------------------------------------------------------------
+
+    def deposit(self, lp: int, amount: Amount) -> Amount:
+        """_deposit / _depositToBidPool. Returns LP units minted."""
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        if self.total_scaled == 0:
+            minted = amount                                   # First depositor: 1:1
+        elif self.total_depth == 0:
+            raise ValueError("pool exhausted but LPs have not withdrawn")
+        elif self.exact:
+            minted = amount * self.total_scaled // self.total_depth
+            if minted == 0:
+                raise ValueError("deposit too small")
+        else:
+            minted = amount * self.total_scaled / self.total_depth
+
+        self.total_depth += amount
+        self.total_scaled += minted
+
+        self._ensure(lp)
+        self.scaled[lp] += minted
+        # Debt for the NEW units only, so existing pending rewards are preserved
+        self.debt[lp] += self._acc_value(minted)
+        self.deposited[lp] += amount
+        return minted
+
+    def fill(self, shares: Amount) -> Amount:
+        """
+        A taker trades `shares` against the pool at its price (fillFromPool /
+        sellToPool). Returns the collateral that changes hands, mulDivUp for
+        exact pools.
+        """
+        if self.total_scaled == 0:
+            raise ValueError("empty pool")
+        collateral = (ceil_div(shares * self.price_bps, BPS) if self.exact
+                      else shares * self.price_bps / BPS)
+        if self.side == "ask":
+            taken, reward = shares, collateral
+        else:
+            taken, reward = collateral, shares
+        if taken > self.total_depth:
+            raise ValueError(f"only {self.total_depth} available")
+
+        self.total_depth -= taken
+        self.earned += reward
+        if self.exact:
+            self.acc += reward * ACC // self.total_scaled
+        else:
+            self.acc += reward * ACC / self.total_scaled
+        return collateral
+
+    def max_fill(self) -> Amount:
+        """Largest fill the pool can absorb, in shares"""
+        if self.side == "ask":
+            return self.total_depth
+        if self.exact:
+            return self.total_depth * BPS // self.price_bps
+        return self.total_depth * BPS / self.price_bps
+
+    def pending(self, lp: int) -> Amount:
+        """getUserPosition / getBidPosition pending reward"""
+        if lp >= self.n_lps:
+            return 0
+        accumulated = self._acc_value(self.scaled[lp])
+        return max(accumulated - self.debt[lp], 0)
+
+    def claim(self, lp: int) -> Amount:
+        """_claim / _claimBidShares"""
+        if lp >= self.n_lps:
+            return 0
+        accumulated = self._acc_value(self.scaled[lp])
+        if accumulated <= self.debt[lp]:
+            return 0
+        claimable = accumulated - self.debt[lp]
+        self.debt[lp] = accumulated
+        self.claimed[lp] += claimable
+        return claimable
+
+    def withdrawable(self, lp: int) -> Amount:
+        """LP's share of unfilled depth"""
+        if lp >= self.n_lps or self.total_scaled == 0:
+            return 0
+        if self.exact:
+            return self.scaled[lp] * self.total_depth // self.total_scaled
+        return self.scaled[lp] * self.total_depth / self.total_scaled
+
+    def withdraw(self, lp: int, amount: Amount = 0) -> Tuple[Amount, Amount]:
+        """
+        withdrawFromPool / withdrawFromBidPool: auto-claim, then withdraw
+        `amount` of unfilled depth (0 = all). Returns (depth out, reward claimed).
+        """
+        claimed = self.claim(lp)
+        user_max = self.withdrawable(lp)
+        if user_max == 0:
+            raise ValueError("nothing to withdraw")
+        out = user_max if amount == 0 else amount
+        if out > user_max:
+            raise ValueError(f"only {user_max} withdrawable")
+
+        if self.exact:
+            burn = ceil_div(out * self.total_scaled, self.total_depth)
+        else:
+            burn = out * self.total_scaled / self.total_depth
+        burn = min(burn, self.scaled[lp])                    # Safety cap
+
+        self.total_depth -= out
+        self.total_scaled -= burn
+
+        # Remove the burned units' share of debt, preserving pending
+        debt_removed = self._acc_value(burn)
+        self.scaled[lp] -= burn
+        self.debt[lp] = max(self.debt[lp] - debt_removed, 0)
+        self.withdrawn[lp] += out
+        return out, claimed
+
+    # -------------------------------------------------------------------------
+    # Batched views over every LP
+    # -------------------------------------------------------------------------
+
+    def pending_all(self) -> np.ndarray:
+        """Pending reward for every LP, one vectorized pass"""
+        n = self.n_lps
+        scaled, debt = self.scaled[:n], self.debt[:n]
+        if self.exact:
+            accumulated = scaled * self.acc // ACC
+        else:
+            accumulated = scaled * self.acc / ACC
+        return np.maximum(accumulated - debt, 0)
+
+    def claim_all(self) -> np.ndarray:
+        """Claim for every LP at once. Returns the per-LP amounts paid."""
+        n = self.n_lps
+        claimable = self.pending_all()
+        self.debt[:n] = self.debt[:n] + claimable
+        self.claimed[:n] = self.claimed[:n] + claimable
+        return claimable
+
+    def withdrawable_all(self) -> np.ndarray:
+        n = self.n_lps
+        if self.total_scaled == 0:
+            return self._column(n)
+        if self.exact:
+            return self.scaled[:n] * self.total_depth // self.total_scaled
+        return self.scaled[:n] * self.total_depth / self.total_scaled
+
+    def pnl_all(self, mark_bps: Amount) -> np.ndarray:
+        """
+        Per-LP PnL in collateral, marking shares at `mark_bps` (e.g. 10000 or 0
+        at resolution): claimed + pending + withdrawn + withdrawable - deposited,
+        with share-denominated columns converted at the mark.
+        """
+        n = self.n_lps
+        reward = self.claimed[:n] + self.pending_all()
+        depth = self.withdrawn[:n] + self.withdrawable_all() - self.deposited[:n]
+        mark = mark_bps / BPS
+        if self.side == "ask":
+            return reward + depth * mark
+        return reward * mark + depth
+
+
+# =============================================================================
+# Reference (per-LP pro-rata on every fill, for checking)
+# =============================================================================
+
+class NaiveLPPool:
+    """Same pool with rewards pushed to every LP on each fill. O(LPs) per fill."""
+
+    def __init__(self, side: str, price_bps: int):
+        self.side, self.price_bps = side, price_bps
+        self.total_depth = self.total_scaled = 0.0
+        self.scaled, self.reward = {}, {}
+
+    def deposit(self, lp: int, amount: float):
+        minted = amount if self.total_scaled == 0 else amount * self.total_scaled / self.total_depth
+        self.total_depth += amount
+        self.total_scaled += minted
+        self.scaled[lp] = self.scaled.get(lp, 0.0) + minted
+        self.reward.setdefault(lp, 0.0)
+
+    def fill(self, shares: float):
+        collateral = shares * self.price_bps / BPS
+        taken, reward = (shares, collateral) if self.side == "ask" else (collateral, shares)
+        self.total_depth -= taken
+        for lp, units in self.scaled.items():
+            self.reward[lp] += reward * units / self.total_scaled
+
+    def max_fill(self) -> float:
+        return self.total_depth if self.side == "ask" else self.total_depth * BPS / self.price_bps
+
+    def withdrawable(self, lp: int) -> float:
+        units = self.scaled.get(lp, 0.0)
+        return units * self.total_depth / self.total_scaled if units else 0.0
+
+    def withdraw(self, lp: int) -> float:
+        out = self.withdrawable(lp)
+        self.total_depth -= out
+        self.total_scaled -= self.scaled[lp]
+        self.scaled[lp] = 0.0
+        return out
+
+
+# =============================================================================
+# Order Stream
+# =============================================================================
+
+def random_lp_stream(n_events: int, n_lps: int, seed: int = 0, p_deposit: float = 0.3,
+                     p_withdraw: float = 0.05, mean_deposit: float = 50.0,
+                     mean_fill: float = 15.0):
+    """
+    (kind, lp, size) events against one level: deposits and full withdrawals
+    by random LPs, taker fills of `size` shares otherwise.
+    """
+    rng = random.Random(seed)
+    for _ in range(n_events):
+        r = rng.random()
+        if r < p_deposit:
+            yield "deposit", rng.randrange(n_lps), rng.expovariate(1 / mean_deposit)
+        elif r < p_deposit + p_withdraw:
+            yield "withdraw", rng.randrange(n_lps), 0
+        else:
+            yield "fill", -1, rng.expovariate(1 / mean_fill)
+
+
+def run_stream(pool, events, exact_scale: int = 0) -> int:
+    """
+    Apply a random_lp_stream to an LPPool or NaiveLPPool, skipping events the
+    contract would revert. Returns the number applied. `exact_scale` converts
+    float sizes to wei for exact pools.
+    """
+    applied = 0
+    for kind, lp, amount in events:
+        if kind == "deposit":
+            if pool.total_scaled and not pool.total_depth:
+                continue                              # Exhausted level
+            pool.deposit(lp, int(amount * exact_scale) + 1 if exact_scale else amount)
+        elif kind == "withdraw":
+            if not pool.withdrawable(lp):
+                continue
+            pool.withdraw(lp)
+        else:
+            if not pool.total_scaled:
+                continue
+            shares = int(amount * exact_scale) if exact_scale else amount
+            if not shares or shares > pool.max_fill():
+                continue                              # ERR_LIQUIDITY
+            pool.fill(shares)
+        applied += 1
+    return applied
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main():
+    print_header("Late Joiner: ask pool @ 6000bps")
+    pool = LPPool("ask", 6000)
+    pool.deposit(0, 100)
+    pool.fill(50)
+    pool.deposit(1, 100)
+    pool.fill(50)
+    print(f"\n   Alice deposits 100, 50 filled, Bob deposits 100, 50 filled "
+          f"(acc = {pool.acc / ACC:.4f} per unit)")
+    print(f"\n{'LP':<6} | {'Units':<8} | {'Pending $':<10} | {'Withdrawable':<12} | {'PnL if YES wins'}")
+    print("-" * 62)
+    pnl = pool.pnl_all(BPS)
+    for lp, name in enumerate(["Alice", "Bob"]):
+        print(f"{name:<6} | {pool.scaled[lp]:<8.2f} | {pool.pending(lp):<10.2f} | "
+              f"{pool.withdrawable(lp):<12.2f} | {pnl[lp]:+.2f}")
+
+    print_header("Accumulator vs Per-LP Pro-Rata (float, 2,000 LPs, 20,000 events)")
+    print(f"\n{'Side':<5} | {'Accumulator':<12} | {'Pro-rata':<12} | {'Speedup':<8} | "
+          f"{'Max rel. diff':<15} | {'Depth diff'}")
+    print("-" * 80)
+    for side in ("ask", "bid"):
+        events = list(random_lp_stream(20_000, 2_000, seed=1))
+        fast, slow = LPPool(side, 4000), NaiveLPPool(side, 4000)
+
+        t0 = time.perf_counter()
+        run_stream(fast, events)
+        fast_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        run_stream(slow, events)
+        slow_s = time.perf_counter() - t0
+
+        # Rewards: accumulator pending + claimed vs pushed per-LP
+        got = fast.claimed[:fast.n_lps] + fast.pending_all()
+        want = np.array([slow.reward.get(lp, 0.0) for lp in range(fast.n_lps)])
+        diff = np.max(np.abs(got - want) / np.maximum(want, 1))
+        print(f"{side:<5} | {fast_s * 1e3:>9.1f} ms | {slow_s * 1e3:>9.1f} ms | "
+              f"{slow_s / fast_s:>6.0f}x | {diff:>15.2e} | "
+              f"{abs(fast.total_depth - slow.total_depth):.2e}")
+
+    print_header("Exact Accounting (1e18 wei, 5,000 LPs, 100,000 events)")
+    print(f"\n{'Side':<5} | {'Mean fill':<9} | {'Earned (wei)':<26} | {'Unpaid':<10} | "
+          f"{'Units/depth':<11} | {'Check'}")
+    print("-" * 85)
+    for mean_fill in (3, 15):
+        for side in ("ask", "bid"):
+            pool = LPPool(side, 5500, exact=True)
+            run_stream(pool, random_lp_stream(100_000, 5_000, seed=2, mean_fill=mean_fill),
+                       exact_scale=10**18)
+            owed = sum(pool.claimed[:pool.n_lps]) + sum(pool.pending_all())
+            unpaid = pool.earned - owed
+            ok = unpaid >= 0 and sum(pool.withdrawable_all()) <= pool.total_depth
+            print(f"{side:<5} | {mean_fill:<9} | {pool.earned:<26} | {unpaid / pool.earned:<10.2e} | "
+                  f"{pool.total_scaled / max(pool.total_depth, 1):<11.2e} | {'ok' if ok else 'FAIL'}")
+    print("\n   Refilling a level after deep fills mints units at totalScaled / totalDepth, so")
+    print("   units per unit of depth compound. Once totalScaled exceeds reward * 1e18 the acc")
+    print("   increment floors to zero and fills stop paying LPs (deep-fill ask row).")
+
+    print_header("Batched Claims and PnL (float, 50,000 LPs on one level)")
+    rng = np.random.default_rng(3)
+    pool = LPPool("ask", 5000)
+    n = 50_000
+    for lp, amount in enumerate(rng.uniform(1, 100, n)):
+        pool.deposit(lp, float(amount))
+        if lp % 100 == 0:
+            pool.fill(pool.total_depth * 0.01)
+
+    t0 = time.perf_counter()
+    loop_pending = [pool.pending(lp) for lp in range(n)]
+    loop_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch_pending = pool.pending_all()
+    batch_s = time.perf_counter() - t0
+    print(f"\n   Pending for {n:,} LPs: loop {loop_s * 1e3:.1f} ms, batched {batch_s * 1e3:.2f} ms "
+          f"({loop_s / batch_s:.0f}x), mismatches {int(np.sum(batch_pending != loop_pending))}")
+
+    paid = pool.claim_all()
+    print(f"   claim_all paid ${paid.sum():,.2f} of ${pool.earned:,.2f} earned; "
+          f"pending after: ${pool.pending_all().sum():.2e}")
+    for mark in (10000, 5000, 0):
+        pnl = pool.pnl_all(mark)
+        print(f"   PnL marked at {mark:>5}bps: total ${pnl.sum():>+12,.2f}, "
+              f"median ${np.median(pnl):+.4f}, best ${pnl.max():+.2f}, worst ${pnl.min():+.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo order-flow simulator on top of the stateful router model.
+
+Each path draws a true P(YES), streams random buys through a
+MarketSequencer, resolves the market and reports one small PathSummary
+(LP PnL, vault PnL/inventory, fee revenue, rejection rate). Paths are sharded
+across a ProcessPoolExecutor; each shard folds its summaries into mergeable
+accumulators, so only O(metrics) data crosses process boundaries.
+
+Seeding is per path (derived from the base seed and path index) and shards
+merge in shard order, so results are identical for any worker count. The
+shard size changes the merge tree, so moments can differ in the last bits.
+"""
+
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Dict, Optional
+
+from simulate_router import PoolState, VaultState, print_header
+from simulate_sequence import MarketSequencer, random_order_flow
+
+
+@dataclass(frozen=True)
+class MonteCarloConfig:
+    pool_liquidity: float = 1000     # Split 50/50 into YES/NO reserves
+    vault_liquidity: float = 1000    # Split 50/50 into vault YES/NO shares
+    trades_per_path: int = 500
+    mean_size: float = 25
+    seconds_between: float = 300
+    min_p_true: float = 0.05
+    max_p_true: float = 0.95
+
+
+@dataclass
+class PathSummary:
+    """Per-path outcome (all that is sent back from a worker per path)"""
+    lp_pnl: float
+    vault_pnl: float
+    vault_inventory: float
+    fee_revenue: float
+    rejection_rate: float
+    final_p_yes: float
+
+
+# =============================================================================
+# Mergeable Accumulators
+# =============================================================================
+
+@dataclass
+class Moments:
+    """Streaming count/mean/variance/min/max (Welford; Chan et al. merge)"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other: "Moments"):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.mean += delta * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+METRICS = tuple(f.name for f in fields(PathSummary))
+
+
+@dataclass
+class MonteCarloResult:
+    """One Moments per PathSummary field, plus the resolved-YES count"""
+    metrics: Dict[str, Moments] = field(default_factory=lambda: {m: Moments() for m in METRICS})
+    yes_outcomes: int = 0
+
+    @property
+    def paths(self) -> int:
+        return self.metrics[METRICS[0]].count
+
+    def add(self, summary: PathSummary, outcome_yes: bool):
+        for name in METRICS:
+            self.metrics[name].add(getattr(summary, name))
+        self.yes_outcomes += outcome_yes
+
+    def merge(self, other: "MonteCarloResult"):
+        for name in METRICS:
+            self.metrics[name].merge(other.metrics[name])
+        self.yes_outcomes += other.yes_outcomes
+
+
+# =============================================================================
+# Paths and Shards
+# =============================================================================
+
+def path_rng(seed: int, path_index: int) -> random.Random:
+    """Independent, reproducible stream per path (str seeds hash via SHA-512)"""
+    return random.Random(f"pm-mc:{seed}:{path_index}")
+
+
+def run_path(config: MonteCarloConfig, seed: int, path_index: int):
+    """
+    Simulate one path: random informed order flow, then resolution.
+
+    Returns: (PathSummary, outcome_yes)
+    """
+    rng = path_rng(seed, path_index)
+    p_true = rng.uniform(config.min_p_true, config.max_p_true)
+    outcome_yes = rng.random() < p_true
+
+    half_pool = config.pool_liquidity / 2
+    half_vault = config.vault_liquidity / 2
+    market = MarketSequencer(PoolState(half_pool, half_pool), VaultState(half_vault, half_vault),
+                             close_seconds=int(config.trades_per_path * config.seconds_between) + 86400)
+
+    flow = random_order_flow(config.trades_per_path, seed=rng.getrandbits(64),
+                             mean_size=config.mean_size, p_buy_yes=p_true,
+                             seconds_between=config.seconds_between)
+    stats = market.run(flow)
+
+    # Resolution: winning shares redeem 1:1, losing shares are worthless.
+    # LPs deposited half_pool collateral for half_pool YES + half_pool NO.
+    pool, vault = market.pool, market.vault
+    lp_value = pool.yes_reserve if outcome_yes else pool.no_reserve
+    vault_value = (vault.yes_shares if outcome_yes else vault.no_shares) + stats.otc_collateral
+
+    summary = PathSummary(
+        lp_pnl=lp_value - half_pool,
+        vault_pnl=vault_value - half_vault,
+        vault_inventory=vault.yes_shares + vault.no_shares,
+        fee_revenue=stats.amm_fees,
+        rejection_rate=stats.rejection_rate,
+        final_p_yes=pool.p_yes,
+    )
+    return summary, outcome_yes
+
+
+def run_shard(config: MonteCarloConfig, seed: int, start: int, stop: int) -> MonteCarloResult:
+    """Worker entry point: fold paths [start, stop) into one accumulator"""
+    result = MonteCarloResult()
+    for path_index in range(start, stop):
+        result.add(*run_path(config, seed, path_index))
+    return result
+
+
+def run_monte_carlo(n_paths: int, config: MonteCarloConfig = MonteCarloConfig(),
+                    seed: int = 0, workers: Optional[int] = None,
+                    shard_size: int = 64) -> MonteCarloResult:
+    """
+    Run n_paths across a process pool (workers=1 runs in-process).
+
+    Shards are merged in shard order (a float merge is not associative), so
+    the result does not depend on which worker finishes first.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = MonteCarloResult()
+    shards = [(start, min(start + shard_size, n_paths)) for start in range(0, n_paths, shard_size)]
+
+    if workers == 1:
+        for start, stop in shards:
+            result.merge(run_shard(config, seed, start, stop))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        starts, stops = zip(*shards)
+        for shard in pool.map(run_shard, [config] * len(shards), [seed] * len(shards),
+                              starts, stops):
+            result.merge(shard)
+    return result
+
+
+# =============================================================================
+# Demo + Benchmark
+# =============================================================================
+
+def main(n_paths: int = 2000):
+    config = MonteCarloConfig()
+    print_header(f"Monte Carlo Order Flow ({n_paths:,} paths x {config.trades_per_path} trades)")
+    print(f"   Pool ${config.pool_liquidity:.0f}, vault ${config.vault_liquidity:.0f}, "
+          f"mean trade ${config.mean_size:.0f}, flow biased toward the true outcome")
+
+    cores = os.cpu_count() or 1
+    timings = {}
+    result = None
+    for workers in sorted({1, cores}):
+        t0 = time.perf_counter()
+        result = run_monte_carlo(n_paths, config, seed=42, workers=workers)
+        timings[workers] = time.perf_counter() - t0
+
+    print(f"\n{'Metric':<18} | {'Mean':>10} | {'Std':>10} | {'Min':>10} | {'Max':>10}")
+    print("-" * 70)
+    for name in METRICS:
+        m = result.metrics[name]
+        print(f"{name:<18} | {m.mean:>10.3f} | {m.std:>10.3f} | {m.min:>10.3f} | {m.max:>10.3f}")
+    print(f"\n   Resolved YES: {result.yes_outcomes / result.paths * 100:.1f}% of paths")
+
+    print(f"\n{'Workers':<10} | {'Paths/sec':>12} | {'Speedup':>8}")
+    print("-" * 36)
+    for workers, secs in timings.items():
+        print(f"{workers:<10} | {n_paths / secs:>12,.0f} | {timings[1] / secs:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep over PMFeeHook Config and PMHookRouter spread constants.
+
+A SweepSpace maps any FeeConfig field (min_fee_bps, max_skew_fee_bps,
+skew_ref_bps, max_price_impact_bps, ...) or RouterParams field
+(base_relative_spread_bps, max_vault_depletion_pct, ...) to the values to
+try; unlisted fields keep their defaults. Combinations that
+PMFeeHook._validateConfig would reject (`validate_config`) are dropped
+before anything is evaluated.
+
+Each candidate routes one fixed batch of orders (a Workload: random pools,
+vaults, sizes, times) through the vectorized router and scores:
+- revenue       AMM fees + vault OTC spread captured, in collateral
+- fill_rate     share of requested collateral filled (impact cap, close-window
+                halt and the vault depletion cap all leave orders unfilled)
+- slippage_bps  volume-weighted price paid over the pre-trade share price
+
+Work is shared across candidates: the AMM leg depends only on the FeeConfig
+and the vault leg only on RouterParams, so each is computed once per distinct
+value and cached; only the OTC remainder top-up is per candidate. Candidates
+are first screened on a prefix of the workload, and those epsilon-dominated
+by the screening frontier are pruned before the full run. Candidates are
+sharded across a ProcessPoolExecutor, grouped by FeeConfig so the AMM cache
+stays hot; each worker rebuilds the workload from the seed.
+
+Requires: numpy
+"""
+
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from simulate_batch import amm_kernel, batch_vault_otc, p_yes_bps_kernel
+from simulate_fee_hook import (
+    CLOSE_MODE_DYNAMIC, CLOSE_MODE_FIXED, CLOSE_MODE_HALT, CLOSE_MODE_MIN_FEE,
+    FLAG_PRICE_IMPACT, FeeConfig, fee_table, validate_config,
+)
+from simulate_router import (
+    BASE_RELATIVE_SPREAD_BPS, MAX_IMBALANCE_BOOST_BPS, MAX_SPREAD_BPS, MAX_TIME_BOOST_BPS,
+    MAX_VAULT_DEPLETION_PCT, MIN_ABSOLUTE_SPREAD_BPS, PoolState, VaultState,
+    fee_config_engine, print_header, simulate_trade,
+)
+
+# =============================================================================
+# Parameters
+# =============================================================================
+
+@dataclass(frozen=True)
+class RouterParams:
+    """PMHookRouter vault OTC constants (compile-time in the contract)"""
+    base_relative_spread_bps: int = BASE_RELATIVE_SPREAD_BPS
+    max_imbalance_boost_bps: int = MAX_IMBALANCE_BOOST_BPS
+    max_time_boost_bps: int = MAX_TIME_BOOST_BPS
+    max_spread_bps: int = MAX_SPREAD_BPS
+    min_absolute_spread_bps: int = MIN_ABSOLUTE_SPREAD_BPS
+    max_vault_depletion_pct: int = MAX_VAULT_DEPLETION_PCT
+
+
+def validate_router_params(params: RouterParams):
+    """Raises ValueError for constants the router math cannot take"""
+    for f in fields(RouterParams):
+        value = getattr(params, f.name)
+        if not 0 <= value <= 10000:
+            raise ValueError(f"{f.name} must be in [0, 10000]")
+    if not 0 < params.max_vault_depletion_pct <= 100:
+        raise ValueError("max_vault_depletion_pct must be in (0, 100]")
+    if params.base_relative_spread_bps > params.max_spread_bps:
+        raise ValueError("base_relative_spread_bps > max_spread_bps")
+
+
+FEE_FIELDS = frozenset(f.name for f in fields(FeeConfig))
+ROUTER_FIELDS = frozenset(f.name for f in fields(RouterParams))
+
+# Field name -> values to try
+SweepSpace = Dict[str, Sequence[int]]
+
+
+@dataclass(frozen=True)
+class Candidate:
+    fee: FeeConfig
+    router: RouterParams
+
+
+def expand(space: SweepSpace, base_fee: FeeConfig = FeeConfig(),
+           base_router: RouterParams = RouterParams()) -> Tuple[List[Candidate], int]:
+    """
+    Cartesian product of the space. Returns (valid candidates, number rejected
+    by validate_config / validate_router_params).
+    """
+    unknown = set(space) - FEE_FIELDS - ROUTER_FIELDS
+    if unknown:
+        raise ValueError(f"unknown sweep fields: {sorted(unknown)}")
+    names = list(space)
+    candidates, invalid = [], 0
+    for values in itertools.product(*(space[n] for n in names)):
+        chosen = dict(zip(names, values))
+        fee = replace(base_fee, **{k: v for k, v in chosen.items() if k in FEE_FIELDS})
+        router = replace(base_router, **{k: v for k, v in chosen.items() if k in ROUTER_FIELDS})
+        try:
+            validate_config(fee)
+            validate_router_params(router)
+        except ValueError:
+            invalid += 1
+            continue
+        candidates.append(Candidate(fee, router))
+    return candidates, invalid
+
+
+# =============================================================================
+# Workload
+# =============================================================================
+
+@dataclass(frozen=True)
+class Workload:
+    """One batch of independent orders, each against its own pool + vault"""
+    yes: np.ndarray
+    no: np.ndarray
+    vault_yes: np.ndarray
+    vault_no: np.ndarray
+    size: np.ndarray
+    buy_yes: np.ndarray
+    elapsed: np.ndarray            # Seconds since bootstrap start
+    seconds_to_close: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.size)
+
+    def head(self, n: int) -> "Workload":
+        return Workload(*(getattr(self, f.name)[:n] for f in fields(Workload)))
+
+
+def make_workload(n: int, seed: int = 0) -> Workload:
+    """Pools from $100 to ~$50k at 5-95% P(YES), vaults up to 3x imbalanced"""
+    rng = np.random.default_rng(seed)
+    liquidity = rng.lognormal(np.log(2_000), 1.0, n)
+    p = rng.uniform(0.05, 0.95, n)
+    vault = liquidity * rng.uniform(0, 0.5, n)
+    tilt = rng.uniform(0.25, 0.75, n)
+    return Workload(
+        yes=liquidity * (1 - p),
+        no=liquidity * p,
+        vault_yes=vault * tilt,
+        vault_no=vault * (1 - tilt),
+        size=rng.exponential(liquidity * 0.03),
+        buy_yes=rng.random(n) < p,
+        elapsed=rng.integers(0, 6 * 86400, n),
+        seconds_to_close=rng.integers(600, 14 * 86400, n),
+    )
+
+
+# =============================================================================
+# Evaluation
+# =============================================================================
+
+@dataclass(frozen=True)
+class Objectives:
+    revenue: float
+    fill_rate: float
+    slippage_bps: float
+
+    def vector(self) -> Tuple[float, float, float]:
+        """All objectives as maximized quantities"""
+        return self.revenue, self.fill_rate, -self.slippage_bps
+
+
+class Evaluator:
+    """
+    Scores candidates on one workload, caching the AMM leg per FeeConfig and
+    the vault leg per RouterParams.
+    """
+
+    __slots__ = ("workload", "p_before", "share_price", "_amm", "_vault", "hits", "misses")
+
+    def __init__(self, workload: Workload):
+        self.workload = workload
+        self.p_before = p_yes_bps_kernel(workload.yes, workload.no)
+        self.share_price = np.where(workload.buy_yes, self.p_before, 10000 - self.p_before)
+        self._amm: Dict[FeeConfig, tuple] = {}
+        self._vault: Dict[RouterParams, tuple] = {}
+        self.hits = self.misses = 0
+
+    def _amm_leg(self, cfg: FeeConfig):
+        cached = self._amm.get(cfg)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        w = self.workload
+        fee = fee_table(cfg).batch_fee(self.p_before.astype(np.int64), w.elapsed)
+        fee = fee.astype(np.float64)
+
+        # Close window (PMFeeHook._computeFee), then a hard halt at close
+        halted = w.seconds_to_close <= 0
+        if cfg.close_window:
+            inside = w.seconds_to_close <= cfg.close_window
+            mode = cfg.close_window_mode
+            if mode == CLOSE_MODE_HALT:
+                halted = halted | inside
+            elif mode == CLOSE_MODE_FIXED:
+                fee = np.where(inside, min(cfg.close_window_fee_bps, cfg.fee_cap_bps), fee)
+            elif mode == CLOSE_MODE_MIN_FEE:
+                fee = np.where(inside, cfg.min_fee_bps, fee)
+            else:
+                assert mode == CLOSE_MODE_DYNAMIC
+
+        max_impact = cfg.max_price_impact_bps if cfg.flags & FLAG_PRICE_IMPACT else 10000
+        shares, impact, ok = amm_kernel(w.yes, w.no, w.size, w.buy_yes, fee, self.p_before,
+                                        max_impact)
+        cached = self._amm[cfg] = (fee, shares, ok & ~halted, max_impact, halted)
+        return cached
+
+    def _vault_leg(self, params: RouterParams):
+        cached = self._vault.get(params)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        w = self.workload
+        cached = self._vault[params] = batch_vault_otc(
+            w.vault_yes, w.vault_no, w.size, w.buy_yes, self.p_before.astype(np.int64),
+            w.seconds_to_close / 3600,
+            base_spread_bps=params.base_relative_spread_bps,
+            max_imbalance_boost_bps=params.max_imbalance_boost_bps,
+            max_time_boost_bps=params.max_time_boost_bps, max_spread_bps=params.max_spread_bps,
+            min_absolute_spread_bps=params.min_absolute_spread_bps,
+            max_depletion_pct=params.max_vault_depletion_pct)
+        return cached
+
+    def evaluate(self, candidate: Candidate) -> Objectives:
+        """Route every order as simulate_trade does (best venue, OTC remainder on the AMM)"""
+        w = self.workload
+        fee, amm_shares, amm_ok, max_impact, halted = self._amm_leg(candidate.fee)
+        otc_shares, otc_collateral, otc_ok = self._vault_leg(candidate.router)
+        otc_ok = otc_ok & ~halted
+
+        use_otc = otc_ok & (~amm_ok | ((otc_shares >= amm_shares) & (otc_collateral <= w.size)))
+        use_amm = amm_ok & ~use_otc
+        amm_in = np.where(use_amm, w.size, 0.0)
+        shares = np.where(use_amm, amm_shares, np.where(use_otc, otc_shares, 0.0))
+        spent = np.where(use_amm, w.size, np.where(use_otc, otc_collateral, 0.0))
+
+        remaining = w.size - otc_collateral
+        top_up = np.flatnonzero(use_otc & amm_ok & (remaining > 0))
+        if len(top_up):
+            t = top_up
+            shares2, _, ok2 = amm_kernel(w.yes[t], w.no[t], remaining[t], w.buy_yes[t], fee[t],
+                                         self.p_before[t], max_impact)
+            t, shares2 = t[ok2], shares2[ok2]
+            amm_in[t] = remaining[t]
+            shares[t] += shares2
+            spent[t] = w.size[t]
+
+        fair = shares * self.share_price / 10000
+        otc_spread = np.where(use_otc, otc_collateral - otc_shares * self.share_price / 10000, 0.0)
+        total_spent = float(spent.sum())
+        return Objectives(
+            revenue=float((amm_in * fee).sum() / 10000 + otc_spread.sum()),
+            fill_rate=total_spent / float(w.size.sum()),
+            slippage_bps=(total_spent - float(fair.sum())) / total_spent * 10000
+            if total_spent else 0.0,
+        )
+
+
+def evaluate_shard(candidates: List[Candidate], n_orders: int, seed: int, limit: int
+                   ) -> Tuple[List[Objectives], int, int]:
+    """Worker entry point: score on the first `limit` orders; returns (objectives, hits, misses)"""
+    evaluator = Evaluator(make_workload(n_orders, seed).head(limit))
+    scores = [evaluator.evaluate(c) for c in candidates]
+    return scores, evaluator.hits, evaluator.misses
+
+
+# =============================================================================
+# Pareto Frontier
+# =============================================================================
+
+def pareto_front(points: np.ndarray) -> np.ndarray:
+    """Indices of non-dominated rows (every column maximized)"""
+    points = np.asarray(points, np.float64)
+    order = np.lexsort(points.T[::-1])[::-1]    # Descending by first column
+    front: List[int] = []
+    for i in order.tolist():
+        p = points[i]
+        if front:
+            kept = points[front]
+            if np.any(np.all(kept >= p, axis=1) & np.any(kept > p, axis=1)):
+                continue
+            if np.any(np.all(kept == p, axis=1)):
+                continue
+        front.append(i)
+    return np.array(sorted(front), np.int64)
+
+
+def epsilon_dominated(points: np.ndarray, front: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    Rows beaten by some frontier row by more than epsilon x (column range) in
+    every column. Such rows are pruned after screening: a gap that wide on the
+    prefix workload is unlikely to close on the full one.
+    """
+    points = np.asarray(points, np.float64)
+    margin = epsilon * (points.max(axis=0) - points.min(axis=0))
+    dominated = np.zeros(len(points), bool)
+    for f in points[front]:
+        dominated |= np.all(f - margin >= points, axis=1)
+    return dominated
+
+
+# =============================================================================
+# Sweep
+# =============================================================================
+
+@dataclass
+class SweepResult:
+    candidates: List[Candidate]
+    objectives: List[Optional[Objectives]]   # None for pruned candidates
+    front: np.ndarray                        # Indices into candidates
+    invalid: int
+    pruned: int
+    cache_hits: int
+    cache_misses: int
+    seconds: float
+
+
+def _score(candidates: List[Candidate], n_orders: int, seed: int, limit: int, workers: int
+           ) -> Tuple[List[Objectives], int, int]:
+    # Shard whole FeeConfig groups so each worker's AMM cache gets reused
+    groups: Dict[FeeConfig, List[int]] = {}
+    for i, c in enumerate(candidates):
+        groups.setdefault(c.fee, []).append(i)
+    shards: List[List[int]] = [[] for _ in range(max(1, min(workers, len(groups))))]
+    for members in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(members)
+
+    scores: List[Optional[Objectives]] = [None] * len(candidates)
+    hits = misses = 0
+    if len(shards) == 1:
+        batches = [(shards[0], evaluate_shard([candidates[i] for i in shards[0]], n_orders, seed,
+                                              limit))]
+    else:
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = {pool.submit(evaluate_shard, [candidates[i] for i in shard], n_orders, seed,
+                                   limit): shard for shard in shards}
+            batches = [(futures[f], f.result()) for f in as_completed(futures)]
+    for shard, (shard_scores, shard_hits, shard_misses) in batches:
+        for i, s in zip(shard, shard_scores):
+            scores[i] = s
+        hits += shard_hits
+        misses += shard_misses
+    return scores, hits, misses
+
+
+def optimize(space: SweepSpace, n_orders: int = 100_000, seed: int = 0,
+             workers: Optional[int] = None, screen_fraction: float = 0.1,
+             epsilon: float = 0.02) -> SweepResult:
+    """
+    Validate and expand `space`, screen every candidate on the first
+    screen_fraction of the workload, prune the epsilon-dominated, score the
+    rest on the full workload and return the Pareto frontier.
+    """
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    candidates, invalid = expand(space)
+    if not candidates:
+        raise ValueError("no valid configs in the sweep space")
+
+    survivors = np.arange(len(candidates))
+    hits = misses = 0
+    screen_orders = int(n_orders * screen_fraction)
+    if 0 < screen_orders < n_orders and len(candidates) > 1:
+        scores, h, m = _score(candidates, n_orders, seed, screen_orders, workers)
+        hits, misses = hits + h, misses + m
+        points = np.array([s.vector() for s in scores])
+        survivors = np.flatnonzero(~epsilon_dominated(points, pareto_front(points), epsilon))
+
+    scores, h, m = _score([candidates[i] for i in survivors], n_orders, seed, n_orders, workers)
+    objectives: List[Optional[Objectives]] = [None] * len(candidates)
+    for i, s in zip(survivors.tolist(), scores):
+        objectives[i] = s
+    front = survivors[pareto_front(np.array([s.vector() for s in scores]))]
+    return SweepResult(candidates, objectives, front, invalid, len(candidates) - len(survivors),
+                       hits + h, misses + m, time.perf_counter() - t0)
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def check_against_router(n_orders: int = 5_000, seed: int = 5) -> float:
+    """
+    Evaluator vs scalar simulate_trade (hook fee from the same FeeTable, no
+    close window) on the default candidate. Returns the largest relative
+    difference across fill_rate and slippage.
+    """
+    cfg = FeeConfig(close_window=0)
+    w = make_workload(n_orders, seed)
+    scores = Evaluator(w).evaluate(Candidate(cfg, RouterParams()))
+    engine = fee_config_engine(cfg)
+    spent = fair = 0.0
+    for i in range(n_orders):
+        pool = PoolState(float(w.yes[i]), float(w.no[i]))
+        vault = VaultState(float(w.vault_yes[i]), float(w.vault_no[i]))
+        buy_yes = bool(w.buy_yes[i])
+        r = simulate_trade(pool, vault, float(w.size[i]), buy_yes, int(w.elapsed[i]),
+                           float(w.seconds_to_close[i]) / 3600, engine=engine)
+        if r.succeeded:
+            price = pool.p_yes_bps if buy_yes else 10000 - pool.p_yes_bps
+            spent += r.collateral_in
+            fair += r.shares_out * price / 10000
+    fill_rate = spent / float(w.size.sum())
+    slippage = (spent - fair) / spent * 10000
+    return max(abs(scores.fill_rate - fill_rate) / fill_rate,
+               abs(scores.slippage_bps - slippage) / slippage)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+DEMO_SPACE: SweepSpace = {
+    "min_fee_bps": [5, 10, 20, 30],
+    "max_skew_fee_bps": [0, 40, 80, 160],
+    "skew_ref_bps": [2000, 4000, 5000, 6000],   # 6000 fails _validateConfig
+    "max_price_impact_bps": [600, 1200, 2400],
+    "base_relative_spread_bps": [50, 100, 200],
+    "max_vault_depletion_pct": [10, 30, 50],
+}
+
+
+def _describe(c: Candidate) -> str:
+    f, r = c.fee, c.router
+    return (f"{f.min_fee_bps:>4} {f.max_skew_fee_bps:>5} {f.skew_ref_bps:>5} "
+            f"{f.max_price_impact_bps:>6} {r.base_relative_spread_bps:>6} "
+            f"{r.max_vault_depletion_pct:>5}%")
+
+
+def main(n_orders: int = 100_000):
+    print_header(f"Config Sweep: {n_orders:,} Orders per Candidate")
+    result = optimize(DEMO_SPACE, n_orders, seed=42)
+    total = len(result.candidates) + result.invalid
+    evaluated = len(result.candidates) - result.pruned
+    print(f"\n   Combinations:        {total:,}")
+    print(f"   Rejected by _validateConfig / router checks: {result.invalid:,}")
+    print(f"   Pruned after screening (epsilon-dominated):   {result.pruned:,}")
+    print(f"   Scored on full workload: {evaluated:,}")
+    print(f"   Leg cache: {result.cache_hits:,} hits / {result.cache_misses:,} misses")
+    print(f"   Time: {result.seconds:.1f}s")
+
+    default = Evaluator(make_workload(n_orders, 42)).evaluate(Candidate(FeeConfig(),
+                                                                        RouterParams()))
+    front = sorted(result.front.tolist(), key=lambda i: -result.objectives[i].revenue)
+    print_header(f"Pareto Frontier ({len(front)} configs; default: revenue "
+                 f"${default.revenue:,.0f}, fill {default.fill_rate * 100:.2f}%, "
+                 f"slippage {default.slippage_bps:.0f}bps)")
+    print(f"\n{'min skew  ref impact spread depl':<33} | {'Revenue $':>11} | {'Fill':>7} | "
+          f"{'Slippage':>9}")
+    print("-" * 70)
+    for i in front[:25]:
+        o = result.objectives[i]
+        print(f"{_describe(result.candidates[i]):<33} | {o.revenue:>11,.0f} | "
+              f"{o.fill_rate * 100:>6.2f}% | {o.slippage_bps:>7.1f}bp")
+    if len(front) > 25:
+        print(f"   ... {len(front) - 25} more")
+
+    print(f"\n   Evaluator vs scalar simulate_trade (5,000 orders): "
+          f"max relative difference {check_against_router():.1e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+MasterRouter pooled orderbook: ask/bid pools per price level, indexed by the
+priceBitmap, swept by buyWithSweep / sellWithSweep before falling through to
+PMHookRouter.
+
+Bitmap layout (per market, side, ask/bid):
+    40 x uint256 words, bucket = price >> 8, bit = price & 0xff,
+    covering 0-10239 bps (valid prices 1-9999)
+
+Words are Python ints. Best-level discovery uses the contract's
+_lowestSetBit / _highestSetBit via int.bit_length. A scan therefore costs
+O(40 words + levels touched) rather than a pass over all 9999 prices, and
+books with thousands of active levels stay cheap.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from simulate_exact import ceil_div
+from simulate_router import (
+    Engine, FLOAT_ENGINE, PoolState, TradeResult, VaultState, print_header, simulate_trade,
+)
+from simulate_sell import FLOAT_SELL_ENGINE, SellEngine, SellResult, quote_sell
+
+BPS = 10000
+BITMAP_WORDS = 40
+MAX_PRICE_BPS = BITMAP_WORDS * 256 - 1    # 10239, highest representable bit
+
+
+# =============================================================================
+# Price Bitmap
+# =============================================================================
+
+def lowest_set_bit(x: int) -> int:
+    """_lowestSetBit (x != 0)"""
+    return (x & -x).bit_length() - 1
+
+
+def highest_set_bit(x: int) -> int:
+    """_highestSetBit (x != 0)"""
+    return x.bit_length() - 1
+
+
+class PriceBitmap:
+    """One uint256[40] priceBitmap entry"""
+
+    __slots__ = ("words",)
+
+    def __init__(self):
+        self.words = [0] * BITMAP_WORDS
+
+    def set(self, price_bps: int, active: bool):
+        """_setPriceBit"""
+        bucket, bit = price_bps >> 8, price_bps & 0xFF
+        if active:
+            self.words[bucket] |= 1 << bit
+        else:
+            self.words[bucket] &= ~(1 << bit)
+
+    def is_set(self, price_bps: int) -> bool:
+        return bool(self.words[price_bps >> 8] >> (price_bps & 0xFF) & 1)
+
+    def ascending(self, min_price_bps: int = 0) -> Iterator[int]:
+        """Set prices from low to high (ask sweep / getBestAsk order)"""
+        words = self.words
+        for bucket in range(min_price_bps >> 8, BITMAP_WORDS):
+            word = words[bucket]
+            if bucket == min_price_bps >> 8:
+                word &= ~((1 << (min_price_bps & 0xFF)) - 1)
+            while word:
+                bit = lowest_set_bit(word)
+                word &= word - 1
+                yield (bucket << 8) | bit
+
+    def descending(self, max_price_bps: int = MAX_PRICE_BPS) -> Iterator[int]:
+        """Set prices from high to low (bid sweep / getBestBid order)"""
+        words = self.words
+        top = max_price_bps >> 8
+        for bucket in range(top, -1, -1):
+            word = words[bucket]
+            if bucket == top:
+                word &= (1 << ((max_price_bps & 0xFF) + 1)) - 1
+            while word:
+                bit = highest_set_bit(word)
+                word ^= 1 << bit
+                yield (bucket << 8) | bit
+
+
+# =============================================================================
+# Pooled Orderbook (one market)
+# =============================================================================
+
+Amount = Union[int, float]
+
+
+class PooledOrderbook:
+    """
+    Ask pools (shares for sale) and bid pools (collateral to spend) for both
+    sides of one market. A price bit is set exactly while its pool has depth.
+
+    `exact=True` applies the contract's integer rounding (mulDiv floor for
+    shares bought, mulDivUp for collateral charged or paid on partial fills).
+    """
+
+    __slots__ = ("exact", "asks", "bids", "ask_bitmaps", "bid_bitmaps")
+
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        # is_yes -> price_bps -> depth (shares for asks, collateral for bids)
+        self.asks: Dict[bool, Dict[int, Amount]] = {True: {}, False: {}}
+        self.bids: Dict[bool, Dict[int, Amount]] = {True: {}, False: {}}
+        self.ask_bitmaps = {True: PriceBitmap(), False: PriceBitmap()}
+        self.bid_bitmaps = {True: PriceBitmap(), False: PriceBitmap()}
+
+    # -------------------------------------------------------------------------
+    # Liquidity
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _check_price(price_bps: int):
+        if not 0 < price_bps < BPS:
+            raise ValueError(f"price must be in [1, 9999] bps, got {price_bps}")
+
+    def _add(self, levels, bitmap, price_bps: int, amount: Amount):
+        self._check_price(price_bps)
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        depth = levels.get(price_bps, 0)
+        if depth == 0:
+            bitmap.set(price_bps, True)
+        levels[price_bps] = depth + amount
+
+    def _remove(self, levels, bitmap, price_bps: int, amount: Amount):
+        depth = levels.get(price_bps, 0)
+        if amount > depth:
+            raise ValueError(f"only {depth} available at {price_bps} bps")
+        self._take(levels, bitmap, price_bps, amount)
+
+    @staticmethod
+    def _take(levels, bitmap, price_bps: int, amount: Amount):
+        depth = levels[price_bps] - amount
+        if depth <= 0:
+            del levels[price_bps]
+            bitmap.set(price_bps, False)
+        else:
+            levels[price_bps] = depth
+
+    def add_ask(self, is_yes: bool, price_bps: int, shares: Amount):
+        """mintAndPool / depositSharesToPool"""
+        self._add(self.asks[is_yes], self.ask_bitmaps[is_yes], price_bps, shares)
+
+    def add_bid(self, is_yes: bool, price_bps: int, collateral: Amount):
+        """createBidPool"""
+        self._add(self.bids[is_yes], self.bid_bitmaps[is_yes], price_bps, collateral)
+
+    def remove_ask(self, is_yes: bool, price_bps: int, shares: Amount):
+        self._remove(self.asks[is_yes], self.ask_bitmaps[is_yes], price_bps, shares)
+
+    def remove_bid(self, is_yes: bool, price_bps: int, collateral: Amount):
+        self._remove(self.bids[is_yes], self.bid_bitmaps[is_yes], price_bps, collateral)
+
+    # -------------------------------------------------------------------------
+    # Discovery
+    # -------------------------------------------------------------------------
+
+    def best_ask(self, is_yes: bool) -> Tuple[int, Amount]:
+        """getBestAsk: (lowest ask price, shares), (0, 0) if none"""
+        for price in self.ask_bitmaps[is_yes].ascending():
+            return price, self.asks[is_yes][price]
+        return 0, 0
+
+    def best_bid(self, is_yes: bool) -> Tuple[int, Amount]:
+        """getBestBid: (highest bid price, collateral), (0, 0) if none"""
+        for price in self.bid_bitmaps[is_yes].descending():
+            return price, self.bids[is_yes][price]
+        return 0, 0
+
+    def spread(self, is_yes: bool) -> Tuple[int, Amount, int, Amount]:
+        """getSpread: (bid price, bid depth, ask price, ask depth)"""
+        return self.best_bid(is_yes) + self.best_ask(is_yes)
+
+    def bid_book(self, is_yes: bool) -> Dict[int, Amount]:
+        """Snapshot in simulate_sell.BidBook form"""
+        return dict(self.bids[is_yes])
+
+    # -------------------------------------------------------------------------
+    # Sweeps (mutate the book; O(levels touched))
+    # -------------------------------------------------------------------------
+
+    def sweep_asks(self, buy_yes: bool, collateral_in: Amount,
+                   max_price_bps: int) -> Tuple[Amount, Amount, int]:
+        """
+        buyWithSweep step 1: buy from the cheapest asks up to max_price_bps.
+
+        Returns: (shares_out, collateral_spent, levels_filled)
+        """
+        levels, bitmap = self.asks[buy_yes], self.ask_bitmaps[buy_yes]
+        remaining = collateral_in
+        shares_out = 0
+        filled = 0
+        # Clearing an emptied level is safe mid-scan: the scan holds a copy of the word
+        for price in bitmap.ascending(1):
+            if remaining <= 0 or price > max_price_bps:
+                break
+            depth = levels[price]
+            if self.exact:
+                cost = ceil_div(depth * price, BPS)
+                if remaining >= cost:
+                    shares, spent = depth, cost
+                else:
+                    shares = remaining * BPS // price
+                    if shares == 0:
+                        continue
+                    spent = ceil_div(shares * price, BPS)
+            else:
+                cost = depth * price / BPS
+                if remaining >= cost:
+                    shares, spent = depth, cost
+                else:
+                    shares, spent = remaining * BPS / price, remaining
+
+            self._take(levels, bitmap, price, shares)
+            shares_out += shares
+            remaining -= spent
+            filled += 1
+        return shares_out, collateral_in - remaining, filled
+
+    def sweep_bids(self, sell_yes: bool, shares_in: Amount,
+                   min_price_bps: int) -> Tuple[Amount, Amount, int]:
+        """
+        sellWithSweep step 1: sell into the highest bids down to min_price_bps.
+
+        Returns: (shares_sold, collateral_out, levels_filled)
+        """
+        levels, bitmap = self.bids[sell_yes], self.bid_bitmaps[sell_yes]
+        remaining = shares_in
+        collateral_out = 0
+        filled = 0
+        for price in bitmap.descending(BPS - 1):
+            if remaining <= 0 or price < min_price_bps:
+                break
+            depth = levels[price]
+            max_shares = depth * BPS // price if self.exact else depth * BPS / price
+            if remaining >= max_shares:
+                sold, received = max_shares, depth
+            else:
+                sold = remaining
+                received = ceil_div(sold * price, BPS) if self.exact else sold * price / BPS
+            if sold == 0 or received == 0:
+                continue
+
+            self._take(levels, bitmap, price, received)
+            collateral_out += received
+            remaining -= sold
+            filled += 1
+        return shares_in - remaining, collateral_out, filled
+
+
+# =============================================================================
+# Full Routing (pools first, then PMHookRouter)
+# =============================================================================
+
+@dataclass
+class SweepResult:
+    """Result of buy_with_sweep / sell_with_sweep"""
+    amount_out: Amount           # Shares (buy) or collateral (sell) received in total
+    pool_out: Amount             # Part of amount_out filled by pools
+    pool_in: Amount              # Collateral (buy) or shares (sell) spent on pools
+    levels_filled: int
+    router: Optional[Union[TradeResult, SellResult]] = None
+    refund: Amount = 0           # Unspent collateral (buy) or unsold shares (sell)
+
+    @property
+    def sources(self) -> Tuple[str, ...]:
+        out = ("pool",) if self.levels_filled else ()
+        if self.router is not None:
+            out += (self.router.venue if isinstance(self.router, TradeResult) else self.router.source,)
+        return out
+
+
+def buy_with_sweep(book: PooledOrderbook, pool: PoolState, vault: VaultState,
+                   collateral_in: Amount, buy_yes: bool, max_price_bps: int,
+                   elapsed_seconds: int = 3600, hours_to_close: float = 168,
+                   engine: Engine = FLOAT_ENGINE) -> SweepResult:
+    """MasterRouter.buyWithSweep: asks up to max_price_bps, remainder via simulate_trade"""
+    shares = spent = levels = 0
+    if 0 < max_price_bps < BPS:
+        shares, spent, levels = book.sweep_asks(buy_yes, collateral_in, max_price_bps)
+
+    result = SweepResult(shares, shares, spent, levels)
+    remaining = collateral_in - spent
+    if remaining > 0:
+        trade = simulate_trade(pool, vault, remaining, buy_yes, elapsed_seconds,
+                               hours_to_close, engine=engine)
+        result.router = trade
+        if trade.succeeded:
+            result.amount_out += trade.shares_out
+            result.refund = remaining - trade.collateral_in
+        else:
+            result.refund = remaining
+    return result
+
+
+def sell_with_sweep(book: PooledOrderbook, pool: PoolState, vault: VaultState,
+                    shares_in: Amount, sell_yes: bool, min_price_bps: int,
+                    budget: Amount = 0, elapsed_seconds: int = 3600,
+                    seconds_to_close: Optional[int] = None,
+                    engine: SellEngine = FLOAT_SELL_ENGINE) -> SweepResult:
+    """MasterRouter.sellWithSweep: bids down to min_price_bps, remainder via quote_sell"""
+    sold = received = levels = 0
+    if 0 < min_price_bps < BPS:
+        sold, received, levels = book.sweep_bids(sell_yes, shares_in, min_price_bps)
+
+    result = SweepResult(received, received, sold, levels)
+    remaining = shares_in - sold
+    if remaining > 0:
+        quote = quote_sell(pool, vault, remaining, sell_yes, budget, elapsed_seconds,
+                           seconds_to_close, engine=engine)
+        result.router = quote
+        result.amount_out += quote.collateral_out
+        result.refund = quote.shares_returned
+    return result
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def random_book(n_levels: int, seed: int = 0, mid_bps: int = 5000,
+                exact: bool = False) -> PooledOrderbook:
+    """n_levels asks above mid and n_levels bids below mid on the YES side"""
+    rng = random.Random(seed)
+    book = PooledOrderbook(exact)
+    for price in rng.sample(range(mid_bps + 1, BPS), min(n_levels, BPS - 1 - mid_bps)):
+        book.add_ask(True, price, rng.randint(1, 50) if exact else rng.uniform(1, 50))
+    for price in rng.sample(range(1, mid_bps), min(n_levels, mid_bps - 1)):
+        book.add_bid(True, price, rng.randint(1, 50) if exact else rng.uniform(1, 50))
+    return book
+
+
+def main():
+    print_header("Pooled Orderbook: buyWithSweep / sellWithSweep")
+    book = PooledOrderbook()
+    for price, shares in [(5200, 100), (5300, 200), (5500, 300), (6500, 1000)]:
+        book.add_ask(True, price, shares)
+    for price, collateral in [(4900, 50), (4800, 100), (4500, 300)]:
+        book.add_bid(True, price, collateral)
+    bid, bid_depth, ask, ask_depth = book.spread(True)
+    print(f"   YES book: best bid {bid}bps (${bid_depth:.0f}), best ask {ask}bps ({ask_depth:.0f} shares)")
+
+    pool, vault = PoolState(500, 500), VaultState(500, 500)
+    r = buy_with_sweep(book, pool, vault, 400, True, max_price_bps=5500)
+    print(f"\n   Buy $400 YES, max 5500bps: {r.pool_out:.1f} shares from {r.levels_filled} levels "
+          f"for ${r.pool_in:.2f}, +{r.amount_out - r.pool_out:.1f} via router "
+          f"({r.router.venue}) -> {r.amount_out:.1f} shares, sources {r.sources}")
+    r = sell_with_sweep(book, pool, vault, 500, True, min_price_bps=4600)
+    print(f"   Sell 500 YES, min 4600bps: ${r.pool_out:.2f} from {r.levels_filled} levels "
+          f"for {r.pool_in:.1f} shares, +${r.amount_out - r.pool_out:.2f} via router "
+          f"({r.router.source}) -> ${r.amount_out:.2f}, sources {r.sources}")
+    bid, _, ask, _ = book.spread(True)
+    print(f"   After: best bid {bid}bps, best ask {ask}bps")
+
+    print_header("Deep Books (bitmap scan vs full price scan)")
+    print(f"\n{'Levels':<8} | {'Best ask (bitmap)':<18} | {'Best ask (scan)':<16} | "
+          f"{'Sweep 20 lvls':<14} | {'Order check':<11}")
+    print("-" * 78)
+    for n_levels in [100, 1000, 4999]:
+        book = random_book(n_levels, seed=n_levels)
+        asks = book.asks[True]
+        reps = 2000
+
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            book.best_ask(True)
+        bitmap_us = (time.perf_counter() - t0) / reps * 1e6
+
+        t0 = time.perf_counter()
+        for _ in range(reps // 20):
+            next(p for p in range(1, BPS) if p in asks)
+        scan_us = (time.perf_counter() - t0) / (reps // 20) * 1e6
+
+        # Sweep ~20 levels, then restore them, repeatedly
+        prices = sorted(asks)[:20]
+        cost = sum(asks[p] * p / BPS for p in prices)
+        saved = {p: asks[p] for p in prices}
+        t0 = time.perf_counter()
+        for _ in range(200):
+            book.sweep_asks(True, cost, BPS - 1)
+            for p, d in saved.items():
+                depth = asks.get(p, 0)
+                if depth < d:
+                    book.add_ask(True, p, d - depth)
+        sweep_us = (time.perf_counter() - t0) / 200 * 1e6
+
+        ok = (list(book.ask_bitmaps[True].ascending()) == sorted(book.asks[True])
+              and list(book.bid_bitmaps[True].descending()) == sorted(book.bids[True], reverse=True))
+        print(f"{n_levels:<8} | {bitmap_us:>14.2f} us | {scan_us:>12.1f} us | "
+              f"{sweep_us:>11.1f} us | {'ok' if ok else 'MISMATCH':<11}")
+
+    print_header("Exact Integer Sweep (1e18 wei = $1)")
+    book = PooledOrderbook(exact=True)
+    for price, shares in [(5201, 100 * 10**18), (5333, 7 * 10**18 + 3)]:
+        book.add_ask(True, price, shares)
+    shares, spent, levels = book.sweep_asks(True, 30 * 10**18, 9999)
+    print(f"\n   $30 into asks @5201/5333: {shares} shares for {spent} wei over {levels} levels")
+    print(f"   Remaining depth: {book.asks[True]}")
+
+
+if __name__ == "__main__":
+    main()
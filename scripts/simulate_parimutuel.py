@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+PM parimutuel markets: wstETH buys/sells at par into a shared pot, resolved
+pro rata (payoutPerShare, Q = 1e18) after the resolver fee.
+
+Every holder's YES/NO balance lives in one int64 column per side, so an
+order flow is applied, and a market settled, with whole-array operations:
+
+- buys and sells are at par, so the pot always equals yesSupply + noSupply
+  before resolution, and impliedYesOdds is a cumulative sum over the flow
+- a sell only depends on its holder's own balance, so the flow is split into
+  rounds (round r = each holder/side's r-th order) and each round checks and
+  applies its sells in one vectorized pass, exactly as sequential calls would
+- settlement computes every winner's claim (mulDiv(shares, payoutPerShare, Q))
+  at once: exact over NumPy object arrays of Python ints, or float64 for speed
+
+Balances are kept in gwei (1e9 wei), so int64 holds up to ~9.2e9 wstETH per
+holder; the pot, fee and payoutPerShare are wei-exact Python ints.
+
+Requires: numpy
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+import numpy as np
+
+from simulate_router import PoolState, VaultState, print_header
+from simulate_sequence import MarketSequencer
+
+Q = 10**18
+GWEI = 10**9
+BPS = 10000
+MAX_RESOLVER_FEE_BPS = 1_000    # setResolverFeeBps cap (10%)
+
+
+# =============================================================================
+# Order Flow
+# =============================================================================
+
+@dataclass
+class OrderFlow:
+    """Chronological PM calls (buyYes / buyNo / sellYes / sellNo), amounts in gwei"""
+    time: np.ndarray            # int64 seconds
+    holder: np.ndarray          # int64 holder index
+    is_yes: np.ndarray          # bool
+    is_buy: np.ndarray          # bool
+    amount: np.ndarray          # int64 gwei
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+@dataclass
+class FlowResult:
+    """Outcome of ParimutuelMarket.apply, one entry per order"""
+    ok: np.ndarray              # bool, False = reverted (market closed, zero, oversell)
+    yes_supply: np.ndarray      # int64 gwei after each order
+    no_supply: np.ndarray
+
+    @property
+    def odds_bps(self) -> np.ndarray:
+        """impliedYesOdds after each order, floored to bps (0 while the pot is empty)"""
+        total = self.yes_supply + self.no_supply
+        return np.where(total > 0, self.yes_supply * BPS // np.maximum(total, 1), 0)
+
+
+@dataclass
+class Settlement:
+    """Result of ParimutuelMarket.settle (as if every holder claims)"""
+    payout: np.ndarray          # Per holder, wei (object ints) or float64 wei
+    winners: int
+    paid: int                   # Sum of claims, wei
+    dust: int                   # pot - paid: rounding left in the contract, wei
+
+
+# =============================================================================
+# Market
+# =============================================================================
+
+class ParimutuelMarket:
+    """
+    One PM market with `n_holders` accounts.
+
+    Mirrors buyYes/buyNo/sellYes/sellNo (trading only before close),
+    closeMarket, resolve (resolver fee on the pot, payoutPerShare = pot * Q /
+    winning supply, or a par refund when either side is empty) and claim
+    (settle, as if every holder claims).
+    """
+
+    __slots__ = ("close", "can_close", "resolver_fee_bps", "yes", "no", "yes_supply",
+                 "no_supply", "resolved", "outcome", "pot", "payout_per_share", "fee_paid")
+
+    def __init__(self, n_holders: int, close: int, resolver_fee_bps: int = 0,
+                 can_close: bool = False):
+        if not 0 <= resolver_fee_bps <= MAX_RESOLVER_FEE_BPS:
+            raise ValueError("FeeOverflow")
+        self.close = close
+        self.can_close = can_close
+        self.resolver_fee_bps = resolver_fee_bps
+        self.yes = np.zeros(n_holders, np.int64)
+        self.no = np.zeros(n_holders, np.int64)
+        self.yes_supply = 0         # gwei
+        self.no_supply = 0
+        self.resolved = False
+        self.outcome = False
+        self.pot = 0                # wei, set at resolution (par pot before that)
+        self.payout_per_share = 0
+        self.fee_paid = 0
+
+    @property
+    def n_holders(self) -> int:
+        return len(self.yes)
+
+    def implied_yes_odds(self):
+        """impliedYesOdds: (numerator, denominator) in wei"""
+        return self.yes_supply * GWEI, (self.yes_supply + self.no_supply) * GWEI
+
+    def par_pot(self) -> int:
+        """Pot before resolution (wei): every buy and sell moves it at par"""
+        return (self.yes_supply + self.no_supply) * GWEI
+
+    # -------------------------------------------------------------------------
+    # Trading
+    # -------------------------------------------------------------------------
+
+    def apply(self, flow: OrderFlow) -> FlowResult:
+        """Apply a chronological flow; reverted calls leave balances untouched"""
+        n = len(flow)
+        amount = flow.amount
+        ok = (flow.time < self.close) & (amount > 0) & (not self.resolved)
+
+        # Round r holds each (holder, side)'s r-th order, so keys are unique per round
+        key = flow.holder * 2 + flow.is_yes
+        index = np.flatnonzero(ok)
+        by_key = index[np.argsort(key[index], kind="stable")]
+        sorted_keys = key[by_key]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        rank = np.arange(len(by_key)) - np.repeat(starts, np.diff(np.r_[starts, len(by_key)]))
+        by_round = by_key[np.argsort(rank, kind="stable")]
+
+        start = 0
+        for stop in np.cumsum(np.bincount(rank)).tolist():
+            i = by_round[start:stop]
+            start = stop
+            for side, balances in ((True, self.yes), (False, self.no)):
+                j = i[flow.is_yes[i] == side]
+                buy = flow.is_buy[j]
+                holders, size = flow.holder[j], amount[j]
+                fits = buy | (balances[holders] >= size)
+                ok[j[~fits]] = False
+                balances[holders[fits]] += np.where(buy[fits], size[fits], -size[fits])
+
+        signed = np.where(ok, np.where(flow.is_buy, amount, -amount), 0)
+        yes_supply = self.yes_supply + np.cumsum(np.where(flow.is_yes, signed, 0))
+        no_supply = self.no_supply + np.cumsum(np.where(flow.is_yes, 0, signed))
+        if n:
+            self.yes_supply, self.no_supply = int(yes_supply[-1]), int(no_supply[-1])
+        return FlowResult(ok, yes_supply, no_supply)
+
+    def close_market(self, now: int):
+        """closeMarket: early close by the resolver (canClose markets only)"""
+        if not self.can_close:
+            raise ValueError("CannotClose")
+        if self.resolved:
+            raise ValueError("MarketResolved")
+        if now >= self.close:
+            raise ValueError("MarketClosed")
+        self.close = now
+
+    # -------------------------------------------------------------------------
+    # Resolution
+    # -------------------------------------------------------------------------
+
+    def resolve(self, outcome: bool, now: int):
+        """resolve: takes the resolver fee and fixes payoutPerShare"""
+        if self.resolved:
+            raise ValueError("AlreadyResolved")
+        if now < self.close:
+            raise ValueError("MarketNotClosed")
+        self.resolved = True
+        self.pot = self.par_pot()
+        if self.yes_supply == 0 or self.no_supply == 0:
+            # One-sided market: no fee, every share is refunded at par
+            self.outcome = False
+            self.payout_per_share = 0
+            return
+
+        fee = self.pot * self.resolver_fee_bps // BPS
+        self.pot -= fee
+        self.fee_paid = fee
+        winning = (self.yes_supply if outcome else self.no_supply) * GWEI
+        self.payout_per_share = self.pot * Q // winning
+        self.outcome = outcome
+
+    def settle(self, exact: bool = True) -> Settlement:
+        """
+        Every holder's claim after resolve. `exact` rounds each claim as
+        mulDiv(shares, payoutPerShare, Q) over Python ints; otherwise claims
+        are float64 wei (relative error ~1e-16, dust not meaningful).
+        """
+        if not self.resolved:
+            raise ValueError("MarketNotResolved")
+        pps = self.payout_per_share
+        if pps == 0:
+            shares = self.yes + self.no                     # Par refund of either side
+            factor = GWEI
+        else:
+            shares = self.yes if self.outcome else self.no
+            factor = GWEI * pps                             # shares are gwei
+        winners = int(np.count_nonzero(shares))
+
+        if exact:
+            payout = shares.astype(object) * factor
+            if pps:
+                payout //= Q
+            paid = int(payout.sum())
+        else:
+            payout = shares * (factor / Q if pps else float(factor))
+            paid = int(round(float(payout.sum())))
+        return Settlement(payout, winners, paid, self.pot - paid)
+
+
+# =============================================================================
+# Flow Generation
+# =============================================================================
+
+def random_flow(n_holders: int, n_orders: int, close: int, seed: int = 0,
+                p_yes: float = 0.55, sell_share: float = 0.15,
+                mean_wsteth: float = 0.5) -> OrderFlow:
+    """
+    Poisson-timed buys over [0, close) with a share of sells; sells are sized
+    off the buy distribution, so some exceed the holder's balance and revert.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.sort(rng.integers(0, close, n_orders))
+    holder = rng.integers(0, n_holders, n_orders)
+    is_yes = rng.random(n_orders) < p_yes
+    is_buy = rng.random(n_orders) >= sell_share
+    amount = np.maximum(rng.exponential(mean_wsteth * GWEI, n_orders), 1).astype(np.int64)
+    return OrderFlow(t, holder, is_yes, is_buy, amount)
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def check_against_calls(n_holders: int = 300, n_orders: int = 5_000, seed: int = 5) -> int:
+    """
+    Vectorized apply/settle vs one scalar call at a time (PM.sol logic on
+    Python ints). Returns the number of mismatching orders and claims.
+    """
+    close = 86400
+    flow = random_flow(n_holders, n_orders, close + 3600, seed, sell_share=0.35)
+    market = ParimutuelMarket(n_holders, close, resolver_fee_bps=250)
+    result = market.apply(flow)
+
+    bal = {}
+    yes_supply = no_supply = 0
+    mismatches = 0
+    for k in range(n_orders):
+        h, side, buy = int(flow.holder[k]), bool(flow.is_yes[k]), bool(flow.is_buy[k])
+        amount = int(flow.amount[k])
+        ok = flow.time[k] < close and amount > 0 and (buy or bal.get((h, side), 0) >= amount)
+        if ok:
+            bal[h, side] = bal.get((h, side), 0) + (amount if buy else -amount)
+            if side:
+                yes_supply += amount if buy else -amount
+            else:
+                no_supply += amount if buy else -amount
+        if (ok != bool(result.ok[k]) or yes_supply != result.yes_supply[k]
+                or no_supply != result.no_supply[k]):
+            mismatches += 1
+
+    market.resolve(True, close)
+    settlement = market.settle()
+    pot = (yes_supply + no_supply) * GWEI
+    pot -= pot * 250 // BPS
+    pps = pot * Q // (yes_supply * GWEI)
+    for h in range(n_holders):
+        claim = bal.get((h, True), 0) * GWEI * pps // Q
+        if claim != settlement.payout[h]:
+            mismatches += 1
+    return mismatches + (settlement.dust < 0)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def compare_with_pamm(n_orders: int = 20_000, liquidity: float = 200.0, seed: int = 2):
+    """Same buy-only flow into PM (par) and a PAMM pool + vault (MarketSequencer)"""
+    close = 7 * 86400
+    flow = random_flow(n_orders, n_orders, close, seed, sell_share=0.0, mean_wsteth=0.05)
+    pm = ParimutuelMarket(n_orders, close, resolver_fee_bps=100)
+    pm.apply(flow)
+
+    seq = MarketSequencer(PoolState(liquidity, liquidity), VaultState(liquidity / 4, liquidity / 4),
+                          close_seconds=close)
+    amm_shares = np.zeros(n_orders)
+    stake = flow.amount / GWEI
+    for k, (size, buy_yes, t) in enumerate(zip(stake.tolist(), flow.is_yes.tolist(),
+                                               flow.time.tolist())):
+        before = seq.stats.shares_out
+        if seq.apply(size, buy_yes, t) != "rejected":
+            amm_shares[k] = seq.stats.shares_out - before
+
+    print(f"\n{'Outcome':<8} | {'Side':<5} | {'Stake':>9} | {'PM payout':>10} | "
+          f"{'PAMM payout':>11} | {'PM ROI':>7} | {'PAMM ROI':>8}")
+    print("-" * 76)
+    for outcome in (True, False):
+        market = ParimutuelMarket(n_orders, close, resolver_fee_bps=100)
+        market.yes_supply, market.no_supply = pm.yes_supply, pm.no_supply
+        market.resolve(outcome, close)
+        per_share = market.payout_per_share / Q      # Par shares: one per wstETH staked
+        for side in (True, False):
+            mask = flow.is_yes == side
+            staked = stake[mask].sum()
+            pm_paid = staked * per_share if side == outcome else 0.0
+            pamm_paid = amm_shares[mask].sum() if side == outcome else 0.0
+            print(f"{'YES' if outcome else 'NO':<8} | {'YES' if side else 'NO':<5} | "
+                  f"{staked:>9.2f} | {pm_paid:>10.2f} | {pamm_paid:>11.2f} | "
+                  f"{pm_paid / staked - 1:>+7.1%} | {pamm_paid / staked - 1:>+8.1%}")
+    odds = pm.yes_supply / (pm.yes_supply + pm.no_supply)
+    print(f"\n   PM implied odds at close {odds:.1%}; PAMM P(YES) at close "
+          f"{seq.pool.p_yes:.1%}")
+
+
+def main(n_holders: int = 1_000_000, n_orders: int = 3_000_000):
+    print_header("PM Parimutuel: Vectorized Scalar-Call Check")
+    mismatches = check_against_calls()
+    print(f"\n   300 holders, 5000 orders (35% sells, late orders), 2.5% resolver fee: "
+          f"{mismatches} mismatches")
+
+    print_header(f"Order Flow: {n_holders:,} Holders, {n_orders:,} Orders")
+    close = 14 * 86400
+    flow = random_flow(n_holders, n_orders, close)
+    market = ParimutuelMarket(n_holders, close, resolver_fee_bps=200)
+    t0 = time.perf_counter()
+    result = market.apply(flow)
+    apply_s = time.perf_counter() - t0
+    odds = result.odds_bps
+    reverted = int(np.count_nonzero(~result.ok))
+    print(f"\n   Applied in {apply_s:.2f}s ({n_orders / apply_s:,.0f} orders/s), "
+          f"{reverted:,} reverted sells")
+    print(f"   Pot {market.par_pot() / 1e18:,.2f} wstETH; implied YES odds over time:")
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 1.0):
+        k = max(int(n_orders * q) - 1, 0)
+        print(f"      day {flow.time[k] / 86400:>5.1f}: {odds[k] / 100:>6.2f}%")
+
+    print_header("Resolution and Settlement")
+    market.resolve(True, close)
+    for exact in (True, False):
+        t0 = time.perf_counter()
+        s = market.settle(exact)
+        elapsed = time.perf_counter() - t0
+        print(f"   {'exact (object ints)' if exact else 'float64':<20}: {elapsed * 1e3:>7.1f} ms "
+              f"for {n_holders:,} holders, {s.winners:,} winners, paid {s.paid / 1e18:,.6f}, "
+              f"dust {s.dust} wei")
+    print(f"   Resolver fee {market.fee_paid / 1e18:.6f} wstETH, "
+          f"payoutPerShare {market.payout_per_share / Q:.6f}")
+
+    print_header("Parimutuel vs PAMM on the Same Buy Flow")
+    compare_with_pamm()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -11,6 +11,10 @@ Shows how large trades now succeed across all three venues:
 from dataclasses import dataclass
 from typing import Tuple
 import math
+import random
+import sys
+
+from simulate_router import max_amm_collateral_under_impact
 
 # =============================================================================
 # Config (matches PMFeeHook and PMHookRouter defaults)
@@ -85,7 +89,24 @@ def calculate_price_impact(pool: PoolState, buy_yes: bool, collateral_in: float,
 
 def find_max_amm_under_impact(pool: PoolState, buy_yes: bool, max_collateral: float,
                                fee_bps: int, max_impact_bps: int) -> float:
-    """Binary search for max collateral under impact limit (matches router logic)"""
+    """Max collateral under impact limit via the closed-form impact inverse (O(1))"""
+    if max_impact_bps == 0:
+        return 0
+
+    safe = max_amm_collateral_under_impact(pool, buy_yes, fee_bps, max_impact_bps)
+    if safe >= max_collateral:
+        return max_collateral
+
+    # Router gives up on dust remainders (maxColl < 2) rather than searching
+    if max_collateral <= 1:
+        return 0
+
+    return safe
+
+
+def bisect_max_amm_under_impact(pool: PoolState, buy_yes: bool, max_collateral: float,
+                                fee_bps: int, max_impact_bps: int) -> float:
+    """Binary search for max collateral under impact limit (mirrors the router's loop)"""
     if max_impact_bps == 0:
         return 0
 
@@ -207,7 +228,44 @@ def simulate_trade_with_partial_fill(pool: PoolState, vault: VaultState, collate
     return result
 
 
-def main():
+def check_closed_form_vs_bisection(trials: int = 20000, seed: int = 0) -> Tuple[int, float]:
+    """
+    Property check: on random pools the closed-form solver lands inside the
+    final bisection bracket, i.e. within (max_collateral - 1) / 2^16.
+
+    Returns: (failures, worst error as a fraction of the tolerance)
+    """
+    rng = random.Random(seed)
+    failures = 0
+    worst = 0.0
+
+    for _ in range(trials):
+        liq = rng.uniform(10, 100_000)
+        no = liq * rng.uniform(0.02, 0.98)
+        pool = PoolState(liq - no, no)
+        buy_yes = rng.random() < 0.5
+        fee_bps = rng.randint(0, 300)
+        max_impact_bps = rng.randint(1, 3000)
+        max_collateral = rng.uniform(2, 3 * liq)
+
+        closed = find_max_amm_under_impact(pool, buy_yes, max_collateral, fee_bps, max_impact_bps)
+        bisect = bisect_max_amm_under_impact(pool, buy_yes, max_collateral, fee_bps, max_impact_bps)
+
+        # Bisection never probes below 1, so it reports 1 when the true cap is under it
+        tolerance = max((max_collateral - 1) / 65536, 1.0 if closed < 1 else 0.0)
+        error = abs(closed - bisect)
+        worst = max(worst, error / tolerance)
+        if error > tolerance * (1 + 1e-9):
+            failures += 1
+
+    return failures, worst
+
+
+def main(results=None) -> int:
+    """
+    Print the demo tables; `results` (a results.ResultWriter) also gets each
+    breakdown. Returns 1 if the closed-form solver check fails, else 0.
+    """
     print("=" * 80)
     print(" Partial AMM Fill + Mint Fallback Simulation")
     print(" New Router Logic Demonstration")
@@ -235,6 +293,8 @@ def main():
 
     for size in trade_sizes:
         result = simulate_trade_with_partial_fill(pool, vault, size, buy_yes=True)
+        if results is not None:
+            results.append_partial_fill(result, pool, vault, size, True)
 
         otc_str = f"{result['otc_shares']:.1f} (${result['otc_collateral']:.0f})" if result['otc_shares'] > 0 else "-"
         amm_str = f"{result['amm_shares']:.1f} (${result['amm_collateral']:.0f})" if result['amm_shares'] > 0 else "-"
@@ -284,6 +344,9 @@ def main():
     for pool, vault, label in pools:
         r100 = simulate_trade_with_partial_fill(pool, vault, 100, buy_yes=True)
         r500 = simulate_trade_with_partial_fill(pool, vault, 500, buy_yes=True)
+        if results is not None:
+            results.append_partial_fill(r100, pool, vault, 100, True)
+            results.append_partial_fill(r500, pool, vault, 500, True)
 
         v100 = "+".join(r100['venues']) if r100['venues'] else "none"
         v500 = "+".join(r500['venues']) if r500['venues'] else "none"
@@ -293,6 +356,17 @@ def main():
 
         print(f"{label:<10} | {t100:<35} | {t500:<35}")
 
+    print("\n" + "=" * 80)
+    print(" Closed-Form Impact Solver vs 16-Step Bisection")
+    print("=" * 80)
+
+    trials = 20000
+    failures, worst = check_closed_form_vs_bisection(trials)
+    print(f"\n   Random pools checked: {trials}")
+    print(f"   Outside bisection tolerance: {failures}")
+    print(f"   Worst error: {worst:.2f}x tolerance")
+    return 1 if failures else 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
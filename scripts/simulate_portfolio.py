@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Portfolio simulation: thousands of concurrent markets, one merged order stream.
+
+GasPM and Resolver both mass-create markets, so the scripts that simulate a
+single pool (simulate_sequence, simulate_clock) do not show what an operator
+sees across the book. Portfolio keeps every live market's pool and vault in
+PoolArray / VaultArray columns (simulate_state) and routes a tick's orders
+with the batch kernels:
+
+- orders are addressed by market id; a sorted id index maps them to slots
+- a tick may hold several orders for one market, which must fill in order, so
+  the tick is split into rounds (round r = each market's r-th order) and each
+  round is one vectorized pass over distinct markets
+- routing mirrors MarketSequencer.apply with the float engine (TWAP ~ spot):
+  best of vault OTC vs AMM, OTC remainder topped up on the AMM, vault OTC off
+  inside the close window; fills are written back to the columns
+
+Markets stop trading at close and are settled by `resolve`, which folds
+their totals into PortfolioStats and returns the slot to a free list. New
+markets reuse freed slots, so memory tracks the peak number of live markets,
+not the number ever opened.
+
+Requires: numpy
+"""
+
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from simulate_batch import amm_kernel, batch_vault_otc, fee_kernel, p_yes_bps_kernel
+from simulate_montecarlo import Moments
+from simulate_router import PoolState, VaultState, print_header
+from simulate_sequence import MarketSequencer
+from simulate_state import PoolArray, VaultArray
+
+# Per-market settlement columns (float64, one row per slot)
+MARKET_COLUMNS = ("amm_fees", "amm_collateral", "otc_collateral", "collateral_in")
+
+# =============================================================================
+# Stats
+# =============================================================================
+
+@dataclass
+class PortfolioStats:
+    """Running totals across every market (constant size)"""
+    markets_opened: int = 0
+    markets_resolved: int = 0
+    peak_live: int = 0
+    trades: int = 0
+    amm: int = 0
+    otc: int = 0
+    mult: int = 0
+    rejected: int = 0
+    dropped: int = 0              # Orders for unknown or closed markets
+    collateral_in: float = 0
+    shares_out: float = 0
+    amm_collateral: float = 0
+    amm_fees: float = 0           # Collateral-equivalent fees paid to the AMM
+    otc_collateral: float = 0     # Proceeds paid into vaults
+    otc_shares: float = 0
+    vault_payout: float = 0       # Winning vault shares redeemed at resolution
+    max_fee_bps: int = 0
+    max_price_impact_bps: int = 0
+    market_fees: Moments = field(default_factory=Moments)  # AMM fees per resolved market
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.rejected / self.trades if self.trades else 0.0
+
+
+@dataclass
+class Exposure:
+    """Vault inventory across live markets, marked at spot P(YES)"""
+    live: int
+    yes_shares: float
+    no_shares: float
+    mark_value: float             # sum(yes * p + no * (1 - p))
+    net_directional: float        # sum(|yes - no|): payout at risk on one outcome
+
+
+# =============================================================================
+# Portfolio
+# =============================================================================
+
+class Portfolio:
+    """
+    Live markets in struct-of-arrays form, routed a tick at a time.
+
+    Time is in seconds; each market records when it opened and how long it
+    trades for (close_seconds), matching MarketSequencer's elapsed-since-start
+    convention. `close_window` turns vault OTC off in the final seconds.
+    """
+
+    __slots__ = ("capacity", "close_window", "pools", "vaults", "market_id", "opened",
+                 "close_seconds", "live", "columns", "stats", "_free", "_next_id", "_ids",
+                 "_id_slots")
+
+    def __init__(self, capacity: int = 1024, close_window: Optional[int] = None):
+        self.capacity = 0
+        self.close_window = close_window
+        self.pools = PoolArray.zeros(0)
+        self.vaults = VaultArray.zeros(0)
+        self.market_id = np.zeros(0, np.int64)
+        self.opened = np.zeros(0, np.int64)
+        self.close_seconds = np.zeros(0, np.int64)
+        self.live = np.zeros(0, bool)
+        self.columns = {name: np.zeros(0) for name in MARKET_COLUMNS}
+        self.stats = PortfolioStats()
+        self._free: List[int] = []
+        self._next_id = 1
+        self._ids = np.zeros(0, np.int64)        # Sorted ids of open + closed, unresolved
+        self._id_slots = np.zeros(0, np.int64)
+        self._grow(capacity)
+
+    # -------------------------------------------------------------------------
+    # Slots
+    # -------------------------------------------------------------------------
+
+    def _grow(self, capacity: int):
+        extra = capacity - self.capacity
+
+        def pad(a):
+            return np.concatenate([a, np.zeros(extra, a.dtype)])
+
+        self.pools = PoolArray(pad(self.pools.yes_reserve), pad(self.pools.no_reserve), copy=False)
+        self.vaults = VaultArray(pad(self.vaults.yes_shares), pad(self.vaults.no_shares),
+                                 copy=False)
+        self.market_id, self.opened = pad(self.market_id), pad(self.opened)
+        self.close_seconds, self.live = pad(self.close_seconds), pad(self.live)
+        self.columns = {name: pad(c) for name, c in self.columns.items()}
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    @property
+    def n_live(self) -> int:
+        return len(self._ids)
+
+    def open_markets(self, now: int, yes_reserve, no_reserve, vault_yes, vault_no,
+                     close_seconds) -> np.ndarray:
+        """Open len(yes_reserve) markets; returns their ids (increasing)"""
+        yes_reserve = np.atleast_1d(np.asarray(yes_reserve, np.float64))
+        n = len(yes_reserve)
+        if n > len(self._free):
+            self._grow(max(2 * self.capacity, self.n_live + n))
+        slots = np.array([self._free.pop() for _ in range(n)], np.int64)
+        ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+        self._next_id += n
+
+        self.pools.yes_reserve[slots] = yes_reserve
+        self.pools.no_reserve[slots] = no_reserve
+        self.vaults.yes_shares[slots] = vault_yes
+        self.vaults.no_shares[slots] = vault_no
+        self.market_id[slots] = ids
+        self.opened[slots] = now
+        self.close_seconds[slots] = close_seconds
+        self.live[slots] = True
+        for column in self.columns.values():
+            column[slots] = 0
+
+        # New ids are the largest yet, so appending keeps the index sorted
+        self._ids = np.concatenate([self._ids, ids])
+        self._id_slots = np.concatenate([self._id_slots, slots])
+        stats = self.stats
+        stats.markets_opened += n
+        stats.peak_live = max(stats.peak_live, self.n_live)
+        return ids
+
+    def slots_of(self, ids) -> np.ndarray:
+        """Slots of unresolved market ids (KeyError for unknown ids)"""
+        ids = np.asarray(ids, np.int64)
+        pos = np.searchsorted(self._ids, ids)
+        if np.any(pos >= len(self._ids)) or np.any(self._ids[pos] != ids):
+            raise KeyError("unknown market id")
+        return self._id_slots[pos]
+
+    def trading(self, now: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, slots) of markets still open for trading at `now`"""
+        slots = self._id_slots
+        is_open = now - self.opened[slots] < self.close_seconds[slots]
+        return self._ids[is_open], slots[is_open]
+
+    def p_yes_bps(self, slots) -> np.ndarray:
+        return p_yes_bps_kernel(self.pools.yes_reserve[slots], self.pools.no_reserve[slots])
+
+    def due(self, now: int, resolve_delay: int = 0) -> np.ndarray:
+        """Ids of markets closed for at least resolve_delay seconds"""
+        slots = self._id_slots
+        return self._ids[now - self.opened[slots] >= self.close_seconds[slots] + resolve_delay]
+
+    def resolve(self, ids, yes_wins) -> int:
+        """Settle markets: pay out winning vault shares, fold totals, free slots"""
+        ids = np.asarray(ids, np.int64)
+        if not len(ids):
+            return 0
+        slots = self.slots_of(ids)
+
+        stats = self.stats
+        payout = np.where(yes_wins, self.vaults.yes_shares[slots], self.vaults.no_shares[slots])
+        stats.vault_payout += float(payout.sum())
+        stats.markets_resolved += len(slots)
+        for fees in self.columns["amm_fees"][slots].tolist():
+            stats.market_fees.add(fees)
+
+        self.live[slots] = False
+        self.pools.yes_reserve[slots] = self.pools.no_reserve[slots] = 0
+        self.vaults.yes_shares[slots] = self.vaults.no_shares[slots] = 0
+        keep = ~np.isin(self._ids, ids)
+        self._ids, self._id_slots = self._ids[keep], self._id_slots[keep]
+        self._free.extend(slots.tolist())
+        return len(slots)
+
+    # -------------------------------------------------------------------------
+    # Routing
+    # -------------------------------------------------------------------------
+
+    def tick(self, now: int, market_ids, collateral_in, buy_yes) -> np.ndarray:
+        """
+        Route a batch of orders at time `now`, in stream order per market.
+
+        Returns: per-order venue codes (index into simulate_sequence.VENUES,
+        -1 for dropped orders)
+        """
+        market_ids = np.asarray(market_ids, np.int64)
+        collateral_in = np.asarray(collateral_in, np.float64)
+        buy_yes = np.asarray(buy_yes, bool)
+        venues = np.full(len(market_ids), -1, np.int8)
+
+        ids = self._ids
+        pos = np.minimum(np.searchsorted(ids, market_ids), max(len(ids) - 1, 0))
+        known = (ids[pos] == market_ids) if len(ids) else np.zeros(len(market_ids), bool)
+        slots = self._id_slots[pos] if len(ids) else pos
+        tradable = known & (now - self.opened[slots] < self.close_seconds[slots])
+        self.stats.dropped += int(np.count_nonzero(~tradable))
+
+        # Rank each order within its market; round r routes every r-th order
+        order = np.flatnonzero(tradable)
+        if not len(order):
+            return venues
+        by_slot = order[np.argsort(slots[order], kind="stable")]
+        sorted_slots = slots[by_slot]
+        starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+        rank = np.arange(len(by_slot)) - np.repeat(starts, np.diff(np.r_[starts, len(by_slot)]))
+        by_round = by_slot[np.argsort(rank, kind="stable")]
+        bounds = np.cumsum(np.bincount(rank))
+
+        start = 0
+        for stop in bounds.tolist():
+            index = by_round[start:stop]
+            venues[index] = self._route(now, slots[index], collateral_in[index], buy_yes[index])
+            start = stop
+        return venues
+
+    def _route(self, now: int, slots: np.ndarray, size: np.ndarray,
+               buy_yes: np.ndarray) -> np.ndarray:
+        # One order per market: gather, quote every venue, pick, scatter back
+        pools, vaults, stats = self.pools, self.vaults, self.stats
+        yes, no = pools.yes_reserve[slots], pools.no_reserve[slots]
+        vault_yes, vault_no = vaults.yes_shares[slots], vaults.no_shares[slots]
+        elapsed = now - self.opened[slots]
+        close = self.close_seconds[slots]
+
+        p_before = p_yes_bps_kernel(yes, no)
+        fee = fee_kernel(p_before, elapsed)
+        amm_shares, amm_impact, amm_ok = amm_kernel(yes, no, size, buy_yes, fee, p_before)
+
+        twap = p_before.astype(np.int64)     # TWAP ~ spot, as in simulate_trade
+        otc_on = twap != 0
+        if self.close_window is not None:
+            otc_on &= close - elapsed >= self.close_window
+        otc_shares, otc_collateral, otc_ok = batch_vault_otc(
+            vault_yes, vault_no, size, buy_yes, twap, (close - elapsed) / 3600)
+        otc_ok &= otc_on
+
+        use_otc = otc_ok & (~amm_ok | ((otc_shares >= amm_shares) & (otc_collateral <= size)))
+        use_amm = amm_ok & ~use_otc
+        remaining = size - otc_collateral
+        top_up = np.flatnonzero(use_otc & amm_ok & (remaining > 0))
+        mult = np.zeros(len(slots), bool)
+        amm_in = np.where(use_amm, size, 0.0)
+        amm_out = np.where(use_amm, amm_shares, 0.0)
+        impact = np.where(use_amm, amm_impact, 0)
+        if len(top_up):
+            # Vault fill leaves the pool untouched, so quote the remainder as-is
+            t = top_up
+            shares2, impact2, ok2 = amm_kernel(yes[t], no[t], remaining[t], buy_yes[t],
+                                               fee[t], p_before[t])
+            t = t[ok2]
+            mult[t] = True
+            amm_in[t], amm_out[t], impact[t] = remaining[t], shares2[ok2], impact2[ok2]
+
+        # AMM legs: split mints amm_in of each side; the opposite side is swapped in
+        swap_out = amm_out - amm_in
+        pools.yes_reserve[slots] = np.where(buy_yes, yes - swap_out, yes + amm_in)
+        pools.no_reserve[slots] = np.where(buy_yes, no + amm_in, no - swap_out)
+
+        # Vault legs
+        otc_out = np.where(use_otc, otc_shares, 0.0)
+        otc_in = np.where(use_otc, otc_collateral, 0.0)
+        vaults.yes_shares[slots] = np.where(buy_yes, vault_yes - otc_out, vault_yes)
+        vaults.no_shares[slots] = np.where(buy_yes, vault_no, vault_no - otc_out)
+
+        spent = np.where(mult | use_amm, size, otc_in)
+        fees = amm_in * fee / 10000
+        columns = self.columns
+        columns["amm_fees"][slots] += fees
+        columns["amm_collateral"][slots] += amm_in
+        columns["otc_collateral"][slots] += otc_in
+        columns["collateral_in"][slots] += spent
+
+        n_mult = int(np.count_nonzero(mult))
+        n_otc = int(np.count_nonzero(use_otc)) - n_mult
+        n_amm = int(np.count_nonzero(use_amm))
+        stats.trades += len(slots)
+        stats.amm += n_amm
+        stats.otc += n_otc
+        stats.mult += n_mult
+        stats.rejected += len(slots) - n_amm - n_otc - n_mult
+        stats.collateral_in += float(spent.sum())
+        stats.shares_out += float(amm_out.sum() + otc_out.sum())
+        stats.amm_collateral += float(amm_in.sum())
+        stats.amm_fees += float(fees.sum())
+        stats.otc_collateral += float(otc_in.sum())
+        stats.otc_shares += float(otc_out.sum())
+        stats.max_fee_bps = max(stats.max_fee_bps, int(fee.max()))
+        stats.max_price_impact_bps = max(stats.max_price_impact_bps, int(impact.max()))
+
+        # simulate_sequence.VENUES codes: amm 0, otc 1, mult 2, rejected 3
+        return np.select([mult, use_otc, use_amm], [2, 1, 0], 3).astype(np.int8)
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+
+    def exposure(self) -> Exposure:
+        slots = self._id_slots
+        yes, no = self.vaults.yes_shares[slots], self.vaults.no_shares[slots]
+        p = self.p_yes_bps(slots) / 10000
+        return Exposure(
+            live=len(slots),
+            yes_shares=float(yes.sum()),
+            no_shares=float(no.sum()),
+            mark_value=float((yes * p + no * (1 - p)).sum()),
+            net_directional=float(np.abs(yes - no).sum()),
+        )
+
+    def nbytes(self) -> int:
+        arrays = [self.market_id, self.opened, self.close_seconds, self.live, self._ids,
+                  self._id_slots, *self.columns.values()]
+        return self.pools.nbytes + self.vaults.nbytes + sum(a.nbytes for a in arrays)
+
+
+# =============================================================================
+# Order Flow
+# =============================================================================
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    live_markets: int = 5_000
+    lifetime_seconds: int = 7 * 86400
+    resolve_delay: int = 86400
+    tick_seconds: int = 300
+    orders_per_tick: float = 2_000     # Poisson mean, spread uniformly over open markets
+    mean_size: float = 100
+    mean_liquidity: float = 2_000      # Lognormal per market
+    vault_fraction: float = 0.5        # Vault inventory per side / pool reserve per side
+    close_window: Optional[int] = 3600
+
+
+Tick = Tuple[int, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _new_markets(portfolio: Portfolio, rng, config: PortfolioConfig, now: int, n: int,
+                 close_seconds):
+    liquidity = rng.lognormal(np.log(config.mean_liquidity), 0.75, n)
+    p = rng.uniform(0.2, 0.8, n)
+    yes, no = liquidity * (1 - p), liquidity * p
+    vault = liquidity / 2 * config.vault_fraction
+    portfolio.open_markets(now, yes, no, vault, vault, close_seconds)
+
+
+def run_portfolio(n_ticks: int, config: PortfolioConfig = PortfolioConfig(), seed: int = 0,
+                  on_tick=None) -> Portfolio:
+    """
+    Steady-state book: `live_markets` open at any time with staggered closes,
+    replacements launched as markets close, resolution `resolve_delay` after
+    close (outcome drawn from the final pool price). Each tick draws a Poisson
+    number of orders on uniformly chosen open markets; buy direction follows
+    the market's current P(YES).
+    """
+    rng = np.random.default_rng(seed)
+    portfolio = Portfolio(config.live_markets, close_window=config.close_window)
+    lifetime = config.lifetime_seconds
+    _new_markets(portfolio, rng, config, 0, config.live_markets,
+                 rng.integers(config.tick_seconds, lifetime, config.live_markets))
+
+    for tick in range(1, n_ticks + 1):
+        now = tick * config.tick_seconds
+
+        # Settle and replace
+        due = portfolio.due(now, config.resolve_delay)
+        if len(due):
+            p = portfolio.p_yes_bps(portfolio.slots_of(due)) / 10000
+            portfolio.resolve(due, rng.random(len(due)) < p)
+        open_ids, open_slots = portfolio.trading(now)
+        launch = config.live_markets - len(open_ids)
+        if launch > 0:
+            _new_markets(portfolio, rng, config, now, launch, lifetime)
+            open_ids, open_slots = portfolio.trading(now)
+
+        # Orders
+        n = rng.poisson(config.orders_per_tick)
+        pick = rng.integers(0, len(open_ids), n)
+        p = portfolio.p_yes_bps(open_slots[pick]) / 10000
+        sizes = rng.exponential(config.mean_size, n)
+        portfolio.tick(now, open_ids[pick], sizes, rng.random(n) < p)
+        if on_tick is not None:
+            on_tick(tick, portfolio)
+    return portfolio
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def check_against_sequencer(n_markets: int = 40, n_ticks: int = 200, seed: int = 3) -> int:
+    """
+    Portfolio.tick vs one MarketSequencer per market fed the same orders in
+    the same order (several per market per tick). Returns the number of
+    venue / pool / vault mismatches (0 = bit-identical).
+    """
+    rng = np.random.default_rng(seed)
+    close_seconds, close_window = n_ticks * 60 + 30, 1800
+    portfolio = Portfolio(8, close_window=close_window)
+    yes, no = rng.uniform(50, 2_000, (2, n_markets))
+    vault_yes, vault_no = rng.uniform(0, 800, (2, n_markets))
+    ids = portfolio.open_markets(0, yes, no, vault_yes, vault_no, close_seconds)
+    sequencers = {
+        int(i): MarketSequencer(PoolState(float(y), float(x)), VaultState(float(a), float(b)),
+                                close_seconds=close_seconds, close_window=close_window)
+        for i, y, x, a, b in zip(ids, yes, no, vault_yes, vault_no)
+    }
+    codes = {"amm": 0, "otc": 1, "mult": 2, "rejected": 3}
+
+    mismatches = 0
+    for tick in range(1, n_ticks + 1):
+        now = tick * 60
+        n = rng.poisson(3 * n_markets)
+        order_ids = rng.choice(ids, n)
+        sizes = rng.exponential(40, n)
+        buy = rng.random(n) < 0.5
+        venues = portfolio.tick(now, order_ids, sizes, buy)
+        for i, size, b, venue in zip(order_ids.tolist(), sizes.tolist(), buy.tolist(), venues):
+            mismatches += codes[sequencers[i].apply(size, b, now)] != venue
+
+    for i, slot in zip(portfolio._ids.tolist(), portfolio._id_slots.tolist()):
+        seq = sequencers[i]
+        mismatches += (seq.pool.yes_reserve, seq.pool.no_reserve) != (
+            portfolio.pools.yes_reserve[slot], portfolio.pools.no_reserve[slot])
+        mismatches += (seq.vault.yes_shares, seq.vault.no_shares) != (
+            portfolio.vaults.yes_shares[slot], portfolio.vaults.no_shares[slot])
+    return mismatches
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(live_markets: int = 5_000, n_ticks: int = 4_032):
+    config = PortfolioConfig(live_markets=live_markets)
+    days = n_ticks * config.tick_seconds / 86400
+    print_header(f"Portfolio: {live_markets:,} Live Markets, {n_ticks:,} Ticks ({days:.0f} Days)")
+
+    samples = []
+
+    def sample(tick, portfolio):
+        if tick % (n_ticks // 6 or 1) == 0:
+            samples.append((tick, portfolio.exposure(), portfolio.capacity,
+                            portfolio.stats.markets_opened, portfolio.nbytes()))
+
+    t0 = time.perf_counter()
+    portfolio = run_portfolio(n_ticks, config, seed=42, on_tick=sample)
+    secs = time.perf_counter() - t0
+    stats = portfolio.stats
+
+    print(f"\n{'Day':>6} | {'Live':>7} | {'Opened':>8} | {'Capacity':>8} | {'Memory':>9} | "
+          f"{'Vault mark $':>13} | {'Net |Y-N|':>11}")
+    print("-" * 84)
+    for tick, exp, capacity, opened, nbytes in samples:
+        day = tick * config.tick_seconds / 86400
+        print(f"{day:>6.1f} | {exp.live:>7,} | {opened:>8,} | {capacity:>8,} | "
+              f"{nbytes / 2**20:>7.2f}MB | {exp.mark_value:>13,.0f} | {exp.net_directional:>11,.0f}")
+
+    print(f"\n   Orders routed:       {stats.trades:,} ({stats.trades / secs:,.0f}/s)")
+    print(f"   Dropped (closed):    {stats.dropped:,}")
+    print(f"   Venues:              amm {stats.amm:,} / otc {stats.otc:,} / mult {stats.mult:,}")
+    print(f"   Rejection rate:      {stats.rejection_rate * 100:.2f}%")
+    print(f"   Collateral in:       ${stats.collateral_in:,.0f}")
+    print(f"   AMM fee revenue:     ${stats.amm_fees:,.0f} "
+          f"({stats.amm_fees / max(stats.amm_collateral, 1) * 1e4:.1f}bps of AMM volume)")
+    print(f"   Vault OTC proceeds:  ${stats.otc_collateral:,.0f} "
+          f"for {stats.otc_shares:,.0f} shares")
+    print(f"   Markets resolved:    {stats.markets_resolved:,} "
+          f"(vault payout {stats.vault_payout:,.0f} shares)")
+    print(f"   Fees per resolved:   mean ${stats.market_fees.mean:,.2f}, "
+          f"std ${stats.market_fees.std:,.2f}, max ${stats.market_fees.max:,.2f}")
+    print(f"   Peak live markets:   {stats.peak_live:,} (capacity {portfolio.capacity:,})")
+
+    print_header("Equivalence: Portfolio.tick vs Per-Market MarketSequencer")
+    print(f"\n   Mismatched venues / final states: {check_against_sequencer()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4_032)
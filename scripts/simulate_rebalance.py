@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Rebalance budget and keeper model (rebalanceCollateralBudget / rebalanceBootstrapVault).
+
+Budget accrues from the non-LP share of vault OTC spreads (_calculateFeeSplit:
+10%, or 30% once the vault is more than 75% one-sided). A rebalance:
+1. rolls the TWAP if obs1 is 30+ minutes old and skips inside the close window
+2. requires a TWAP and spot within 500 bps of it (SpotDeviantFromTWAP otherwise)
+3. merges the balanced part of the inventory (proceeds split to LPs / budget)
+4. spends min(budget, gap x fair price), less a 0.1% keeper bounty, splitting
+   the collateral and swapping the abundant side into the scarce one on the AMM
+
+Attempts are event-driven. A Rebalancer attached to a MarketSequencer is asked
+after every trade, but it evaluates only when the budget has grown by
+`budget_step`, spot has moved `price_step_bps` since the last attempt, or a
+retry time has come (the next TWAP roll after a deviation failure). Any other
+trade costs one comparison, so long streams are not dominated by polling.
+
+Works with float or exact-int pools/vaults (floor division for ints).
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from simulate_router import PoolState, VaultState, print_header
+from simulate_twap import (
+    MAX_SPOT_TWAP_DEVIATION_BPS, MIN_TWAP_UPDATE_INTERVAL, TwapOracle, spot_twap_deviation_bps,
+)
+from simulate_vault import calculate_fee_split
+
+BPS = 10000
+KEEPER_BOUNTY_BPS = 10            # 0.1% of collateral used
+CLOSE_WINDOW_SECONDS = 3600       # _isInCloseWindow default
+HALTED_FEE_BPS = 10000
+
+OUTCOMES = ("rebalanced", "close_window", "no_twap", "deviant", "nothing_to_do")
+
+
+def _mul_div(x, y, d):
+    """floor(x * y / d) for ints, x * y / d for floats"""
+    if isinstance(x, int) and isinstance(y, int):
+        return x * y // d
+    return x * y / d
+
+
+@dataclass
+class RebalanceStats:
+    """Running totals for one market's budget and keeper (constant size)"""
+    checks: int = 0              # Trades seen
+    attempts: int = 0            # rebalanceBootstrapVault calls evaluated
+    rebalanced: int = 0
+    close_window: int = 0
+    no_twap: int = 0
+    deviant: int = 0             # SpotDeviantFromTWAP
+    nothing_to_do: int = 0       # No budget, balanced vault or zero swap
+    budget_in: float = 0
+    budget_spent: float = 0
+    bounties: float = 0
+    merged: float = 0            # Sets merged back to collateral
+    lp_fees: float = 0           # LP share of spreads and merges
+    shares_acquired: float = 0
+    budget_seconds: float = 0    # Integral of idle budget over time
+    max_budget: float = 0
+
+    def idle_budget(self, seconds: float) -> float:
+        """Time-weighted mean budget sitting unspent"""
+        return self.budget_seconds / seconds if seconds else 0.0
+
+
+class Rebalancer:
+    """
+    rebalanceCollateralBudget plus an event-driven keeper for one market.
+
+    `budget_step`: re-attempt once the budget has grown by this much.
+    `price_step_bps`: re-attempt once spot has moved this far from the last attempt.
+    `poll`: attempt after every trade (reference behaviour).
+    """
+
+    __slots__ = ("budget", "budget_step", "price_step_bps", "poll", "close_window",
+                 "armed_budget", "anchor_bps", "retry_at", "last_t", "stats")
+
+    def __init__(self, budget=0, budget_step=1.0, price_step_bps: int = 100,
+                 poll: bool = False, close_window: int = CLOSE_WINDOW_SECONDS):
+        self.budget = budget
+        self.budget_step = budget_step
+        self.price_step_bps = price_step_bps
+        self.poll = poll
+        self.close_window = close_window
+        self.armed_budget = budget        # Attempt once budget >= this
+        self.anchor_bps = None            # Spot at the last attempt
+        self.retry_at = None              # Next forced attempt (TWAP roll)
+        self.last_t = 0
+        self.stats = RebalanceStats()
+
+    # -------------------------------------------------------------------------
+    # Budget accrual
+    # -------------------------------------------------------------------------
+
+    def _accrue_time(self, t: int):
+        if t > self.last_t:
+            self.stats.budget_seconds += self.budget * (t - self.last_t)
+            self.last_t = t
+
+    def on_otc_fill(self, pre_yes, pre_no, buy_yes: bool, shares_out, collateral_used,
+                    twap_bps: int):
+        """_accountVaultOTCProceeds: spread above TWAP principal, split LPs / budget"""
+        fair_bps = min(twap_bps, BPS - 1) if buy_yes else BPS - min(twap_bps, BPS - 1)
+        if isinstance(shares_out, int):
+            principal = (shares_out * fair_bps + BPS - 1) // BPS
+        else:
+            principal = shares_out * fair_bps / BPS
+        spread = collateral_used - principal
+        if spread <= 0:
+            return
+        to_lps, to_budget = calculate_fee_split(pre_yes, pre_no, buy_yes, spread)
+        self._add_budget(to_budget)
+        self.stats.lp_fees += to_lps
+
+    def _add_budget(self, amount):
+        self.budget += amount
+        stats = self.stats
+        stats.budget_in += amount
+        if self.budget > stats.max_budget:
+            stats.max_budget = self.budget
+
+    # -------------------------------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------------------------------
+
+    def after_trade(self, market, t: int):
+        """Called by MarketSequencer after every trade; attempts only on a trigger"""
+        self._accrue_time(t)
+        self.stats.checks += 1
+        if not self.poll:
+            spot = market.engine.p_yes_bps(market.pool)
+            if not (self.budget >= self.armed_budget
+                    or (self.anchor_bps is not None and abs(spot - self.anchor_bps) >= self.price_step_bps)
+                    or (self.retry_at is not None and t >= self.retry_at)):
+                return None
+        return self.attempt(market, t)
+
+    def _rearm(self, market, outcome: str, t: int):
+        self.anchor_bps = market.engine.p_yes_bps(market.pool)
+        self.armed_budget = self.budget + self.budget_step
+        # A TWAP-side failure can clear without any trade-side trigger; retry on the next roll
+        if outcome in ("no_twap", "deviant"):
+            self.retry_at = market.twap.timestamp1 + MIN_TWAP_UPDATE_INTERVAL
+            if self.retry_at <= t:
+                self.retry_at = t + MIN_TWAP_UPDATE_INTERVAL
+        else:
+            self.retry_at = None
+
+    # -------------------------------------------------------------------------
+    # rebalanceBootstrapVault
+    # -------------------------------------------------------------------------
+
+    def attempt(self, market, t: int) -> str:
+        """One rebalanceBootstrapVault call at time t. Returns its outcome."""
+        outcome = self._rebalance(market, t)
+        stats = self.stats
+        stats.attempts += 1
+        setattr(stats, outcome, getattr(stats, outcome) + 1)
+        self._rearm(market, outcome, t)
+        return outcome
+
+    def _rebalance(self, market, t: int) -> str:
+        pool, vault, twap, engine = market.pool, market.vault, market.twap, market.engine
+        twap.update(t)
+        if market.close_seconds is not None and 0 < market.close_seconds - t < self.close_window:
+            return "close_window"
+        twap_bps = twap.price(t)
+        if twap_bps == 0:
+            return "no_twap"
+        if spot_twap_deviation_bps(pool, twap_bps) > MAX_SPOT_TWAP_DEVIATION_BPS:
+            return "deviant"
+        if vault.yes_shares == 0 and vault.no_shares == 0:
+            return "nothing_to_do"
+
+        yes_lower = vault.yes_shares < vault.no_shares
+        pre_yes, pre_no = vault.yes_shares, vault.no_shares
+        merge = pre_yes if yes_lower else pre_no
+        if merge:
+            vault.yes_shares -= merge
+            vault.no_shares -= merge
+            to_lps, to_budget = calculate_fee_split(pre_yes, pre_no, pre_yes < pre_no, merge)
+            self._add_budget(to_budget)
+            self.stats.merged += merge
+            self.stats.lp_fees += to_lps
+
+        if not self.budget:
+            return "nothing_to_do"
+        gap = vault.no_shares - vault.yes_shares if yes_lower else vault.yes_shares - vault.no_shares
+        needed = _mul_div(gap, twap_bps if yes_lower else BPS - twap_bps, BPS)
+        used = min(self.budget, needed)
+        bounty = _mul_div(used, KEEPER_BOUNTY_BPS, BPS)
+        swap_in = used - bounty
+        if not swap_in:
+            return "nothing_to_do"
+
+        fee_bps = engine.hook_fee(pool, t)
+        if fee_bps >= HALTED_FEE_BPS:
+            return "nothing_to_do"
+        # Split swap_in into YES + NO, sell the abundant side for the scarce one
+        r_in, r_out = (pool.no_reserve, pool.yes_reserve) if yes_lower \
+            else (pool.yes_reserve, pool.no_reserve)
+        in_with_fee = swap_in * (BPS - fee_bps)
+        swapped = _mul_div(in_with_fee, r_out, r_in * BPS + in_with_fee)
+        if not swapped:
+            return "nothing_to_do"
+        if yes_lower:
+            pool.no_reserve += swap_in
+            pool.yes_reserve -= swapped
+            vault.yes_shares += swap_in + swapped
+        else:
+            pool.yes_reserve += swap_in
+            pool.no_reserve -= swapped
+            vault.no_shares += swap_in + swapped
+        twap.sync(pool, t)
+
+        self.budget -= used
+        stats = self.stats
+        stats.budget_spent += used
+        stats.bounties += bounty
+        stats.shares_acquired += swap_in + swapped
+        return "rebalanced"
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def run_market(n_trades: int, rebalancer: Optional[Rebalancer], seed: int = 1,
+               p_buy_yes: float = 0.5, deposit_every: int = 500, deposit=250.0):
+    """
+    One market with a TWAP oracle and the given keeper over a random stream.
+    LPs add `deposit` shares to each vault side every `deposit_every` trades.
+    """
+    from simulate_sequence import MarketSequencer, random_order_flow
+
+    pool = PoolState(2_000, 2_000)
+    market = MarketSequencer(pool, VaultState(5_000, 5_000), twap=TwapOracle(pool, 0),
+                             close_seconds=n_trades * 60 + 86400, rebalancer=rebalancer)
+    vault, apply = market.vault, market.apply
+    t0 = time.perf_counter()
+    for i, (collateral_in, buy_yes, t) in enumerate(
+            random_order_flow(n_trades, seed=seed, mean_size=60, p_buy_yes=p_buy_yes)):
+        if i % deposit_every == 0:
+            vault.yes_shares += deposit
+            vault.no_shares += deposit
+        apply(collateral_in, buy_yes, t)
+    return market, time.perf_counter() - t0
+
+
+def main(n_trades: int = 1_000_000):
+    print_header("Keeper Scheduling (100,000 trades, LPs add 250/250 every 500 trades)")
+    print(f"\n{'Keeper':<22} | {'Attempts':<9} | {'Rebalanced':<10} | {'Deviant':<8} | "
+          f"{'OTC fills':<9} | {'Spent':<10} | {'Idle budget':<11} | {'Time'}")
+    print("-" * 105)
+    keepers = [
+        ("none", None),
+        ("poll every trade", Rebalancer(poll=True)),
+        ("events $1 / 100bps", Rebalancer(budget_step=1.0, price_step_bps=100)),
+        ("events $1 / 250bps", Rebalancer(budget_step=1.0, price_step_bps=250)),
+        ("events $5 / 500bps", Rebalancer(budget_step=5.0, price_step_bps=500)),
+    ]
+    for label, keeper in keepers:
+        market, secs = run_market(100_000, keeper)
+        otc = market.stats.otc + market.stats.mult
+        if keeper is None:
+            print(f"{label:<22} | {'-':<9} | {'-':<10} | {'-':<8} | {otc:<9,} | {'-':<10} | "
+                  f"{'-':<11} | {secs:.2f}s")
+            continue
+        s, horizon = keeper.stats, market.twap.last_timestamp
+        print(f"{label:<22} | {s.attempts:<9,} | {s.rebalanced:<10,} | {s.deviant:<8,} | "
+              f"{otc:<9,} | ${s.budget_spent:<9,.2f} | ${s.idle_budget(horizon):<10,.2f} | "
+              f"{secs:.2f}s")
+    print("\n   Each rebalance merges the vault's paired inventory back to collateral, so an")
+    print("   eager keeper also strips the OTC venue of fresh LP deposits.")
+
+    print_header(f"Budget Over a Long Run ({n_trades:,} trades, events $5 / 500bps)")
+    keeper = Rebalancer(budget_step=5.0, price_step_bps=500)
+    market, secs = run_market(n_trades, keeper, seed=2)
+    s, horizon = keeper.stats, market.twap.last_timestamp
+    print(f"\n   Throughput:        {n_trades / secs:,.0f} trades/s ({secs:.1f}s, "
+          f"{horizon / 86400:,.0f} simulated days)")
+    print(f"   Attempts:          {s.attempts:,} of {s.checks:,} trades "
+          f"({s.attempts / s.checks * 100:.2f}%)")
+    for outcome in OUTCOMES:
+        print(f"     {outcome:<16} {getattr(s, outcome):,}")
+    print(f"   Budget in:         ${s.budget_in:,.2f} (spreads and merges), "
+          f"LP share ${s.lp_fees:,.2f}")
+    print(f"   Budget spent:      ${s.budget_spent:,.2f} (bounties ${s.bounties:,.2f}) "
+          f"for {s.shares_acquired:,.0f} scarce-side shares")
+    print(f"   Idle budget:       mean ${s.idle_budget(horizon):,.2f}, max ${s.max_budget:,.2f}, "
+          f"final ${keeper.budget:,.2f}")
+    print(f"   Final vault:       {market.vault.yes_shares:,.0f} YES / {market.vault.no_shares:,.0f} NO "
+          f"(merged {s.merged:,.0f} sets)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,1782 @@
+#!/usr/bin/env python3
+"""
+Streaming replay of exported on-chain event logs through the exact engine.
+
+Logs are JSONL (one object per line) or CSV (header `event,market,block,
+timestamp,f1..f5`, fields in EVENT_FIELDS order), optionally gzipped. Both
+readers are generators yielding positional rows, so memory stays constant
+however large the file. Per market the replay rebuilds:
+- pool reserves (ZAMM Sync rows; router Swap rows apply their own deltas)
+- bootstrap vault inventory (VaultDeposit / VaultWithdraw / VaultOTCFill /
+  Rebalanced, plus VaultSync snapshots of bootstrapVaults for unevented merges)
+- the MasterRouter ask/bid pools as a PooledOrderbook
+
+and quotes every realized fill against the state just before it: AMM buys
+with the default PMFeeHook config, vault OTC fills at the TWAP implied by the
+logged principal, pool fills at the pool's price with contract rounding.
+
+Files are decoded with pyarrow into record batches and each batch is folded
+column-wise in NumPy, fill quotes included (on the limb columns of
+simulate_exact); installs without pyarrow dispatch per row.
+
+Multi-process replays partition every input log by a stable hash of the
+market into per-worker streams, so a multi-market log (or a market spread over
+several files) fans out; logs must be in block order.
+
+Requires: nothing beyond the stdlib (numpy + pyarrow for the columnar path)
+"""
+
+import csv
+import gzip
+import heapq
+import json
+import math
+import operator
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from fractions import Fraction
+from itertools import islice, repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from simulate_exact import (
+    BPS, WAD, ceil_div, exact_amm_buy, exact_hook_fee, exact_p_yes_bps, exact_vault_otc,
+    exact_vault_spread, from_limbs, limb_add, limb_divmod, limb_exact_quote, limb_mul_small,
+    limb_vault_otc,
+)
+from simulate_montecarlo import Moments
+from simulate_orderbook import PooledOrderbook, PriceBitmap
+from simulate_router import MIN_ABSOLUTE_SPREAD_BPS, PoolState, VaultState, print_header
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.json as pa_json
+except ImportError:  # Row readers only
+    np = pa = pc = pa_csv = pa_json = None
+
+# =============================================================================
+# Log Schema
+# =============================================================================
+
+# Fields after (event, market, block, timestamp). Pool ids are opaque strings;
+# sides are decoded by the exporter (`is_yes` for SharesDeposited comes from the
+# getPoolId inputs). Amounts are wei.
+EVENT_FIELDS = {
+    # PMFeeHook / PAMM lifecycle
+    "MarketRegistered": ("close",),
+    "Closed": (),
+    "Resolved": ("outcome",),
+    # ZAMM (decoded to YES/NO)
+    "Sync": ("yes_reserve", "no_reserve"),
+    "Swap": ("buy_yes", "collateral_in", "shares_out"),      # Router AMM buy (split + swap)
+    # PMHookRouter bootstrap vault
+    "VaultDeposit": ("is_yes", "shares"),
+    "VaultWithdraw": ("is_yes", "shares"),                    # sharesReturned
+    "VaultOTCFill": ("buy_yes", "collateral_in", "shares_out", "effective_price_bps",
+                     "principal"),
+    "Rebalanced": ("collateral_used", "shares_acquired", "yes_was_lower"),
+    "VaultSync": ("yes_shares", "no_shares"),                 # bootstrapVaults(marketId) read
+    # MasterRouter pools
+    "MintAndPool": ("pool", "keep_yes", "price_bps", "collateral_in"),
+    "SharesDeposited": ("pool", "is_yes", "price_bps", "shares"),
+    "SharesWithdrawn": ("pool", "shares"),
+    "PoolFilled": ("pool", "shares", "collateral"),
+    "BidPoolCreated": ("pool", "buy_yes", "price_bps", "collateral_in"),
+    "BidPoolFilled": ("pool", "shares", "collateral"),
+    "BidCollateralWithdrawn": ("pool", "collateral"),
+}
+CSV_HEADER = ("event", "market", "block", "timestamp", "f1", "f2", "f3", "f4", "f5")
+
+# Field kinds for typed (columnar) decoding; every other field is a wei amount
+FLAG_FIELDS = frozenset(("outcome", "buy_yes", "is_yes", "keep_yes", "yes_was_lower"))
+INT_FIELDS = frozenset(("close", "price_bps", "effective_price_bps"))
+
+EVENT_NAMES = tuple(EVENT_FIELDS)
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+UNKNOWN_CODE = len(EVENT_NAMES)
+
+# Venues whose realized fills are checked against a quote
+CHECKS = ("amm", "otc", "ask_pool", "bid_pool")
+
+
+def _open_text(path: str, mode: str = "rt"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def read_jsonl(path: str) -> Iterator[list]:
+    """Positional rows [event, market, block, timestamp, *fields] from a JSONL log"""
+    loads, schema = json.loads, EVENT_FIELDS
+    with _open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            obj = loads(line)
+            name = obj["event"]
+            row = [name, str(obj.get("market") or ""), obj.get("block", 0), obj["timestamp"]]
+            row.extend(obj[k] for k in schema.get(name, ()))
+            yield row
+
+
+def read_csv(path: str) -> Iterator[list]:
+    """
+    Positional rows from a CSV log (the header row is skipped). Exported
+    fields are numbers and ids, so lines are split directly; a line with a
+    quote goes through the csv module. Rows may be padded to the header width
+    or stop after their last field.
+    """
+    with _open_text(path) as f:
+        next(f, None)
+        for line in f:
+            if '"' in line:
+                yield next(csv.reader([line]))
+            elif len(line) > 2:
+                yield line.rstrip("\r\n").split(",")
+
+
+def read_arrow(path: str) -> Iterator[list]:
+    """Positional rows from an Arrow IPC shard (see partition_file)"""
+    for batch in read_batches(path):
+        yield from _batch_rows(batch)
+
+
+def read_events(path: str) -> Iterator[list]:
+    """Dispatch on extension: .jsonl / .csv, optionally .gz, or an .arrow shard"""
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith(".jsonl"):
+        return read_jsonl(path)
+    if base.endswith(".csv"):
+        return read_csv(path)
+    if base.endswith(".arrow"):
+        return read_arrow(path)
+    raise ValueError(f"unknown log format: {path}")
+
+
+def _csv_row(row: Sequence) -> list:
+    """A positional row as written to CSV: bools as 0/1, padded to the header width"""
+    out = [int(x) if isinstance(x, bool) else x for x in row]
+    out.extend([""] * (len(CSV_HEADER) - len(out)))
+    return out
+
+
+def write_events(path: str, rows: Iterable[Sequence]) -> int:
+    """Write positional rows as JSONL or CSV (by extension). Returns rows written."""
+    base = path[:-3] if path.endswith(".gz") else path
+    n = 0
+    with _open_text(path, "wt") as f:
+        if base.endswith(".csv"):
+            out = csv.writer(f)
+            out.writerow(CSV_HEADER)
+            for row in rows:
+                out.writerow(_csv_row(row))
+                n += 1
+        else:
+            dumps, schema = json.dumps, EVENT_FIELDS
+            for row in rows:
+                obj = {"event": row[0], "market": row[1], "block": row[2], "timestamp": row[3]}
+                obj.update(zip(schema[row[0]], row[4:]))
+                f.write(dumps(obj, separators=(",", ":")))
+                f.write("\n")
+                n += 1
+    return n
+
+
+# =============================================================================
+# Columnar Decoding (pyarrow)
+# =============================================================================
+
+# Bytes of text per decoded record batch (~50k CSV rows)
+BATCH_BYTES = 1 << 22
+
+
+def _log_types():
+    """(CSV column types, JSONL schema); amounts decode to decimal128 (exact wei)"""
+    amount = pa.decimal128(38, 0)
+    # f1 carries pool ids as well as numbers; f2..f5 are always numeric
+    csv_types = {"event": pa.string(), "market": pa.string(), "block": pa.int64(),
+                 "timestamp": pa.int64(), "f1": pa.string()}
+    csv_types.update((f"f{i}", amount) for i in range(2, 6))
+    fields = {"event": pa.string(), "market": pa.string(), "block": pa.int64(),
+              "timestamp": pa.int64()}
+    for name in (name for names in EVENT_FIELDS.values() for name in names):
+        fields[name] = (pa.string() if name == "pool" else pa.bool_() if name in FLAG_FIELDS
+                        else pa.int64() if name in INT_FIELDS else amount)
+    return csv_types, pa.schema(list(fields.items()))
+
+
+if pa is not None:
+    AMOUNT = pa.decimal128(38, 0)
+    CSV_TYPES, JSON_SCHEMA = _log_types()
+    _EVENT_NAME_ARRAY = pa.array(EVENT_NAMES)
+
+
+def read_batches(path: str, block: bool = True) -> Iterator["pa.RecordBatch"]:
+    """
+    Record batches of a log (requires pyarrow): CSV columns typed by CSV_TYPES,
+    JSONL by JSON_SCHEMA (optionally .gz), or an Arrow IPC shard. Decoding
+    raises pyarrow.ArrowInvalid on rows the typed readers reject, e.g. CSV rows
+    not padded to the header width. block=False skips the block column, which
+    no handler reads (rows then carry block 0).
+    """
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith(".arrow"):
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+    elif base.endswith(".csv"):
+        names = [name for name in CSV_HEADER if block or name != "block"]
+        yield from pa_csv.open_csv(
+            path, read_options=pa_csv.ReadOptions(block_size=BATCH_BYTES),
+            convert_options=pa_csv.ConvertOptions(column_types=CSV_TYPES,
+                                                  include_columns=names))
+    elif base.endswith(".jsonl"):
+        schema = JSON_SCHEMA if block else JSON_SCHEMA.remove(JSON_SCHEMA.get_field_index("block"))
+        yield from pa_json.open_json(
+            path, read_options=pa_json.ReadOptions(block_size=BATCH_BYTES),
+            parse_options=pa_json.ParseOptions(explicit_schema=schema,
+                                               unexpected_field_behavior="ignore"))
+    else:
+        raise ValueError(f"unknown log format: {path}")
+
+
+def _batch_rows(batch: "pa.RecordBatch") -> Iterator[Sequence]:
+    """Positional rows of a record batch, amounts as decimal strings (as read_csv)"""
+    columns = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        if pa.types.is_decimal(column.type):
+            column = column.cast(pa.string())
+        columns[name] = column.to_pylist()
+    if "block" not in columns:
+        columns["block"] = [0] * batch.num_rows
+    if "f1" in columns:
+        yield from zip(*(columns[name] for name in CSV_HEADER))
+        return
+    schema = EVENT_FIELDS
+    for i, (name, market) in enumerate(zip(columns["event"], columns["market"])):
+        row = [name, market or "", columns["block"][i] or 0, columns["timestamp"][i]]
+        row.extend(columns[k][i] for k in schema.get(name, ()))
+        yield row
+
+
+class _RowFallback(Exception):
+    """A batch the column-wise fold can't apply exactly; its rows go through the handlers"""
+
+
+# Wei amounts exceed int64, so columns are split into three int64 limbs
+# v = l2 * 2**64 + l1 * 2**32 + l0 with 0 <= l0, l1 < 2**32 and |l2| < 2**31:
+# (prefix) sums over up to 2**31 rows stay exact, and limbs may go negative.
+_M32 = (1 << 32) - 1
+_L2_BOUND = 1 << 31
+
+
+def _words(values: "pa.Array") -> Tuple["np.ndarray", "np.ndarray", Optional["np.ndarray"]]:
+    """
+    (low, high) 64-bit words of an integer column (decimal128 or int64;
+    strings are cast) and its validity mask, None without nulls
+    """
+    if not (pa.types.is_decimal(values.type) or pa.types.is_integer(values.type)):
+        try:
+            values = values.cast(AMOUNT)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise _RowFallback from None
+    n = len(values)
+    valid = values.is_valid().to_numpy(zero_copy_only=False) if values.null_count else None
+    if pa.types.is_decimal(values.type):
+        words = np.frombuffer(values.buffers()[1], np.int64, 2 * n, 16 * values.offset)
+        return words[0::2], words[1::2], valid
+    low = values.cast(pa.int64()).fill_null(0).to_numpy()
+    return low, low >> 63, valid
+
+
+def _limbs(low: "np.ndarray", high: "np.ndarray") -> "np.ndarray":
+    """(3, n) limbs of (low, high) words; values beyond the limb bound fall back"""
+    out = np.empty((3, low.size), np.int64)
+    np.bitwise_and(low, _M32, out=out[0])
+    np.right_shift(low, 32, out=out[1])
+    out[1] &= _M32
+    out[2] = high
+    if high.size and (high.max() >= _L2_BOUND or high.min() < -_L2_BOUND):
+        raise _RowFallback
+    return out
+
+
+def _flags(values: "pa.Array") -> "np.ndarray":
+    """CSV flag strings as the row handlers' int(x) != 0 reads them"""
+    if values.null_count:
+        raise _RowFallback
+    if len(values):
+        # Exported flags are "0" / "1": read the bytes in place
+        offsets, data = _string_buffers(values)
+        if (np.diff(offsets) == 1).all():
+            chars = data[offsets[:-1]]
+            if ((chars == 48) | (chars == 49)).all():
+                return chars == 49
+    values = values.dictionary_encode()
+    try:
+        lut = np.array([int(x) != 0 for x in values.dictionary.to_pylist()] or [False])
+    except ValueError:
+        raise _RowFallback from None
+    return lut[values.indices.to_numpy()]
+
+
+def _string_buffers(values: "pa.Array") -> Tuple["np.ndarray", "np.ndarray"]:
+    """(offsets, bytes) of a string array"""
+    _, offsets, data = values.buffers()
+    offsets = np.frombuffer(offsets, np.int32, len(values) + 1, 4 * values.offset)
+    return offsets, np.frombuffer(data, np.uint8) if data is not None else np.zeros(0, np.uint8)
+
+
+def _digit_limbs(values: "pa.Array", at: Optional["np.ndarray"]) -> "np.ndarray":
+    """
+    Limbs of numeric strings at `at` (all if None). The others only need to
+    be integers: values superseded later in the batch are checked, not cast.
+    """
+    if values.null_count:
+        raise _RowFallback
+    if at is not None and len(values):
+        offsets, data = _string_buffers(values)
+        lengths = np.diff(offsets)
+        digits = data[offsets[0]:offsets[-1]]
+        if not (((lengths > 0) & (lengths < 39)).all() and ((digits >= 48) & (digits <= 57)).all()):
+            raise _RowFallback
+        values = values.take(pa.array(at))
+    low, high, _ = _words(values)
+    return _limbs(low, high)
+
+
+def _prices(limbs: "np.ndarray") -> "np.ndarray":
+    """Pool prices, all within [1, 9999] bps (PooledOrderbook rejects the rest)"""
+    if limbs[1:].any() or not ((limbs[0] > 0) & (limbs[0] < BPS)).all():
+        raise _RowFallback
+    return limbs[0]
+
+
+def _positive(limbs: "np.ndarray", strict: bool = False):
+    if _negative(limbs).any() or (strict and not limbs.any(axis=0).all()):
+        raise _RowFallback
+
+
+def _split(value: int) -> Tuple[int, int, int]:
+    if not -(1 << 95) <= value < 1 << 95:
+        raise _RowFallback
+    return value & _M32, (value >> 32) & _M32, value >> 64
+
+
+def _join(limbs) -> int:
+    return (int(limbs[2]) << 64) + (int(limbs[1]) << 32) + int(limbs[0])
+
+
+def _split_all(values: list) -> "np.ndarray":
+    """(3, n) limbs of Python ints"""
+    if not values:
+        return np.zeros((3, 0), np.int64)
+    if min(values) < -(1 << 95) or max(values) >= 1 << 95:
+        raise _RowFallback
+    values = np.array(values, object)
+    return np.stack([(values & _M32).astype(np.int64), ((values >> 32) & _M32).astype(np.int64),
+                     (values >> 64).astype(np.int64)])
+
+
+def _join_all(limbs: "np.ndarray") -> list:
+    """Python ints of (3, n) limbs"""
+    return ((limbs[2].astype(object) << 64) + (limbs[1].astype(object) << 32)
+            + limbs[0].astype(object)).tolist()
+
+
+def _normalized(limbs: "np.ndarray") -> "np.ndarray":
+    """Carry the low limbs back into [0, 2**32)"""
+    carry = limbs[1] + (limbs[0] >> 32)
+    return np.stack([limbs[0] & _M32, carry & _M32, limbs[2] + (carry >> 32)])
+
+
+def _negative(limbs: "np.ndarray") -> "np.ndarray":
+    """Sign of each value: after carrying the low limbs, that of the high limb"""
+    carry = limbs[1] + (limbs[0] >> 32)
+    return limbs[2] + (carry >> 32) < 0
+
+
+def _last_of(keys: "np.ndarray") -> Tuple[List[int], List[int]]:
+    """Distinct keys (ascending) and the index of each one's last occurrence"""
+    if not keys.size:
+        return keys, keys
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+    return keys[last], order[last]
+
+
+def _sums(keys: "np.ndarray", values: "np.ndarray") -> Tuple[list, list]:
+    """Per distinct key, the exact sum of its value columns (as ints)"""
+    if not keys.size:
+        return [], []
+    if keys[0] == keys[-1] and (keys == keys[0]).all():
+        return [int(keys[0])], [_join(values.sum(axis=1))]
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    sums = np.add.reduceat(values[:, order], starts, axis=1)
+    return keys[starts].tolist(), [_join(sums[:, i]) for i in range(starts.size)]
+
+
+def _running(first: "np.ndarray", base: "np.ndarray", delta: "np.ndarray") -> "np.ndarray":
+    """Per-segment running totals: segments start at `first`, from `base` columns"""
+    total = np.cumsum(delta, axis=1)
+    offset = base - total[:, first] + delta[:, first]
+    return total + np.repeat(offset, np.diff(np.append(first, delta.shape[1])), axis=1)
+
+
+def _fold(keys: "np.ndarray", rows: "np.ndarray", values: "np.ndarray",
+          resets: Optional["np.ndarray"],
+          base_of) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Registers keyed by `keys` over distinct batch rows `rows`, in row order:
+    entry i adds values[:, i] to register keys[i], or sets it where resets[i].
+    base_of(keys) gives the registers' limbs before the batch, one column per key.
+
+    Returns: (value after every entry, grouped by key; each key's last index;
+    keys; the entry at each grouped position)
+    """
+    # One sort by (key, row); rows are distinct, so it needn't be stable
+    order = np.argsort(keys * (int(rows.max()) + 1) + rows)
+    keys, values = keys[order], values[:, order]
+    new_key = np.empty(keys.size, bool)
+    new_key[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=new_key[1:])
+    if resets is None:
+        starts = new_key
+    else:
+        resets = resets[order]
+        starts = new_key | resets
+    first = np.flatnonzero(starts)
+    base = np.zeros((values.shape[0], first.size), np.int64)
+    if resets is not None:
+        at_reset = resets[first]
+        base[:, at_reset] = values[:, first[at_reset]]
+        values[:, resets] = 0
+        carried = np.flatnonzero(~at_reset)
+        if carried.size:
+            base[:, carried] = base_of(keys[first[carried]])
+    else:
+        base = base_of(keys[first])
+    last = np.append(np.flatnonzero(new_key)[1:] - 1, keys.size - 1)
+    return _running(first, base, values), last, keys[last], order
+
+
+def _before(running: "np.ndarray", order: "np.ndarray", values: "np.ndarray") -> "np.ndarray":
+    """Registers before each (non-reset) entry of a _fold, in entry order"""
+    out = np.empty_like(running)
+    out[:, order] = running
+    out -= values
+    return out
+
+
+def _int64(limbs: "np.ndarray") -> "np.ndarray":
+    """Integer fields (timestamps, bps) of non-negative limbs below 2**63"""
+    limbs = _normalized(limbs)
+    if limbs[2].any() or (limbs[1] >= 1 << 31).any():
+        raise _RowFallback
+    return limbs[0] | limbs[1] << 32
+
+
+def _tally(checks: list, venue: str, markets: "np.ndarray", checked: "np.ndarray",
+           at: "np.ndarray", quoted: "np.ndarray", realized: "np.ndarray"):
+    """
+    Append one venue's fill checks per market: rows not `checked` are skipped;
+    the checked ones (indices `at`) compare quoted limbs to realized ones.
+    """
+    width = max(quoted.shape[0], realized.shape[0])
+    match = (_widened(quoted, width) == _widened(realized, width)).all(axis=0)
+    miss = np.flatnonzero(~match)
+    quoted_ints = from_limbs(quoted[:, miss]).tolist()
+    realized_ints = _join_all(realized[:, miss])
+    tallies = {}
+    for code, n in zip(*np.unique(markets[~checked], return_counts=True)):
+        tallies[int(code)] = [int(n), 0, [], []]
+    for code, n in zip(*np.unique(markets[at[match]], return_counts=True)):
+        tallies.setdefault(int(code), [0, 0, [], []])[1] = int(n)
+    for code, q, r in zip(markets[at[miss]].tolist(), quoted_ints, realized_ints):
+        entry = tallies.setdefault(code, [0, 0, [], []])
+        entry[2].append(q)
+        entry[3].append(r)
+    checks.extend((code, venue, *entry) for code, entry in tallies.items())
+
+
+def _widened(limbs: "np.ndarray", width: int) -> "np.ndarray":
+    if limbs.shape[0] == width:
+        return limbs
+    out = np.zeros((width, limbs.shape[1]), np.int64)
+    out[:limbs.shape[0]] = limbs
+    return out
+
+
+# Book events: (event, side field, side inverted, is_bid, amount field). An add
+# registers its pool id; a removal's side and price come from the registered
+# pool, and its event whether the ask or bid levels are drawn down.
+_BOOK_ADDS = (
+    ("MintAndPool", "keep_yes", True, False, "collateral_in"),
+    ("SharesDeposited", "is_yes", False, False, "shares"),
+    ("BidPoolCreated", "buy_yes", False, True, "collateral_in"),
+)
+_BOOK_REMOVES = (
+    ("SharesWithdrawn", False, "shares"),
+    ("PoolFilled", False, "shares"),
+    ("BidPoolFilled", True, "collateral"),
+    ("BidCollateralWithdrawn", True, "collateral"),
+)
+# Events whose row handler creates the market it names (removals look it up)
+CREATES_MARKET = tuple(name for name in EVENT_NAMES
+                       if name not in {event for event, *_ in _BOOK_REMOVES})
+
+
+class _EventColumns:
+    """One record batch as event codes, market codes and typed field lookups"""
+
+    __slots__ = ("batch", "positional", "kind", "markets", "market_names", "timestamps",
+                 "_order", "_bounds", "_cache")
+
+    def __init__(self, batch: "pa.RecordBatch"):
+        events, markets = batch.column("event"), batch.column("market")
+        if events.null_count or batch.column("timestamp").null_count:
+            raise _RowFallback
+        self.batch = batch
+        self.positional = "f1" in batch.schema.names
+        kind = pc.index_in(events, value_set=_EVENT_NAME_ARRAY)
+        self.kind = kind.fill_null(UNKNOWN_CODE).to_numpy().astype(np.int8)
+        markets = (markets.fill_null("") if markets.null_count else markets).dictionary_encode()
+        self.market_names = markets.dictionary.to_pylist()
+        self.markets = markets.indices.to_numpy()
+        self.timestamps = batch.column("timestamp").to_numpy()
+        self._order = np.argsort(self.kind, kind="stable")
+        self._bounds = np.searchsorted(self.kind[self._order], np.arange(UNKNOWN_CODE + 2))
+        self._cache = {}
+
+    def rows(self, *names: str) -> "np.ndarray":
+        """Row indices of the named events, in stream order"""
+        if len(names) == 1:
+            code = EVENT_CODES[names[0]]
+            return self._order[self._bounds[code]:self._bounds[code + 1]]
+        lut = np.zeros(UNKNOWN_CODE + 1, bool)
+        lut[[EVENT_CODES[name] for name in names]] = True
+        return np.flatnonzero(lut[self.kind])
+
+    @property
+    def unknown(self) -> int:
+        return int(self._bounds[UNKNOWN_CODE + 1] - self._bounds[UNKNOWN_CODE])
+
+    def _column(self, event: str, name: str) -> str:
+        return f"f{EVENT_FIELDS[event].index(name) + 1}" if self.positional else name
+
+    def field(self, event: str, name: str, rows: "np.ndarray") -> "pa.Array":
+        return self.batch.column(self._column(event, name)).take(pa.array(rows))
+
+    def amounts(self, event: str, name: str, rows: "np.ndarray",
+                at: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """
+        Limbs of a field at rows (or at rows[at], once all rows are checked).
+        Typed columns are viewed as words once per batch.
+        """
+        column = self._column(event, name)
+        values = self.batch.column(column)
+        if pa.types.is_string(values.type):
+            return _digit_limbs(values.take(pa.array(rows)), at)
+        if column not in self._cache:
+            self._cache[column] = _words(values)
+        low, high, valid = self._cache[column]
+        if valid is not None and not valid[rows].all():
+            raise _RowFallback
+        if at is not None:
+            rows = rows[at]
+        return _limbs(low[rows], high[rows])
+
+    def flags(self, event: str, name: str, rows: "np.ndarray") -> "np.ndarray":
+        values = self.batch.column(self._column(event, name))
+        if pa.types.is_string(values.type):
+            return _flags(values.take(pa.array(rows)))
+        if not pa.types.is_boolean(values.type):
+            return self.amounts(event, name, rows).any(axis=0)
+        values = values.take(pa.array(rows))
+        if values.null_count:
+            raise _RowFallback
+        return values.to_numpy(zero_copy_only=False)
+
+
+class _BookColumns:
+    """
+    Every market's price levels as arrays, while record batches fold them
+    (see Replayer._fold_books). Level keys are
+    ((market * 2 + is_bid) * 2 + is_yes) * BPS + price over market codes;
+    store() writes the changes back before row handlers or finish() read the
+    books. Pools register straight into the replayer's registry.
+    """
+
+    __slots__ = ("names", "codes", "keys", "depths", "changed", "pools")
+
+    def __init__(self, markets: Dict[str, "MarketReplay"], pools: Dict[str, tuple]):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        keys, depths = [], []
+        for market, m in markets.items():
+            code = self.code(market)
+            for is_bid, book in ((0, m.book.asks), (1, m.book.bids)):
+                for is_yes, levels in book.items():
+                    base = ((code * 2 + is_bid) * 2 + is_yes) * BPS
+                    keys.extend(base + price for price in levels)
+                    depths.extend(levels.values())
+        keys = np.array(keys, np.int64)
+        order = np.argsort(keys)
+        self.keys, self.depths = keys[order], _split_all(depths)[:, order]
+        self.changed = np.zeros(keys.size, bool)
+        self.pools = pools
+
+    def code(self, market: str) -> int:
+        code = self.codes.get(market)
+        if code is None:
+            code = self.codes[market] = len(self.names)
+            self.names.append(market)
+        return code
+
+    def depth_limbs(self, keys: "np.ndarray") -> "np.ndarray":
+        """Depths of level keys (0 for empty levels)"""
+        if not self.keys.size:
+            return np.zeros((3, keys.size), np.int64)
+        at = np.minimum(np.searchsorted(self.keys, keys), self.keys.size - 1)
+        return np.where(self.keys[at] == keys, self.depths[:, at], 0)
+
+    def set_depths(self, keys: "np.ndarray", depths: "np.ndarray"):
+        """Set levels by sorted, distinct keys"""
+        at = np.searchsorted(self.keys, keys)
+        found = at < self.keys.size
+        found[found] = self.keys[at[found]] == keys[found]
+        self.depths[:, at[found]] = depths[:, found]
+        self.changed[at[found]] = True
+        if not found.all():
+            new, at = ~found, at[~found]
+            self.keys = np.insert(self.keys, at, keys[new])
+            self.depths = np.insert(self.depths, at, depths[:, new], axis=1)
+            self.changed = np.insert(self.changed, at, True)
+
+    def find_pools(self, ids: List[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(known mask, (market, is_yes, price_bps) columns) of registered pool ids"""
+        entries = list(map(self.pools.get, ids))
+        known = np.fromiter(map(operator.is_not, entries, repeat(None)), bool, len(entries))
+        columns = np.zeros((3, len(ids)), np.int64)
+        if known.any():
+            markets, is_yes, prices, _ = zip(*filter(None, entries))
+            columns[:, known] = list(map(self.code, markets)), is_yes, prices
+        return known, columns
+
+    def add_pools(self, ids: List[str], columns: "np.ndarray"):
+        """Register pools from (market, is_yes, price_bps, is_bid) columns, in stream order"""
+        self.pools.update(zip(ids, zip(
+            list(map(self.names.__getitem__, columns[0].tolist())), (columns[1] != 0).tolist(),
+            columns[2].tolist(), (columns[3] != 0).tolist())))
+
+    def store(self, markets: Dict[str, "MarketReplay"]):
+        changed = np.flatnonzero(self.changed)
+        books = self.keys[changed] // BPS
+        starts = np.flatnonzero(np.diff(books, prepend=-1)).tolist()
+        prices = (self.keys[changed] % BPS).tolist()
+        depths = _join_all(self.depths[:, changed])
+        for start, end in zip(starts, starts[1:] + [changed.size]):
+            book = int(books[start])
+            m, is_yes = markets[self.names[book >> 2]].book, bool(book & 1)
+            if book & 2:
+                levels, bitmap = m.bids[is_yes], m.bid_bitmaps[is_yes]
+            else:
+                levels, bitmap = m.asks[is_yes], m.ask_bitmaps[is_yes]
+            active = [depth != 0 for depth in depths[start:end]]
+            levels.update(zip(prices[start:end], depths[start:end]))
+            for price, live in zip(prices[start:end], active):
+                if not live:
+                    del levels[price]
+            _set_bits(bitmap, prices[start:end], active)
+
+
+def _set_bits(bitmap: PriceBitmap, prices: List[int], active: List[bool]):
+    """PriceBitmap.set over many prices, a word at a time"""
+    on = np.zeros(len(bitmap.words) * 256, bool)
+    off = np.zeros(len(bitmap.words) * 256, bool)
+    prices = np.array(prices, np.int64)
+    active = np.array(active, bool)
+    on[prices[active]] = True
+    off[prices[~active]] = True
+    for bucket in np.unique(prices >> 8).tolist():
+        window = slice(bucket * 256, (bucket + 1) * 256)
+        set_bits = int.from_bytes(np.packbits(on[window], bitorder="little").tobytes(), "little")
+        clear = int.from_bytes(np.packbits(off[window], bitorder="little").tobytes(), "little")
+        bitmap.words[bucket] = bitmap.words[bucket] & ~clear | set_bits
+
+
+# =============================================================================
+# Replay State
+# =============================================================================
+
+# Fill errors are summed exactly as fixed-point ints (every float64 is a multiple
+# of 2**-1074), so the moments do not depend on the order fills are checked or
+# merged in: row-by-row, column-wise and sharded replays agree bit for bit.
+_FIXED_BITS = 1074
+
+
+def _fixed(x: float) -> int:
+    numerator, denominator = x.as_integer_ratio()
+    return numerator << (_FIXED_BITS + 1 - denominator.bit_length())
+
+
+@dataclass
+class FillCheck:
+    """Quote vs realized for one venue: error moments in bps, exact matches"""
+    count: int = 0
+    exact: int = 0
+    skipped: int = 0              # No state to quote against (e.g. pool before first Sync)
+    error_sum: int = 0            # Fixed-point sums of the errors and of their squares
+    error_sum_sq: int = 0
+    error_min: float = math.inf
+    error_max: float = -math.inf
+
+    def add(self, quoted: int, realized: int):
+        self.count += 1
+        if quoted == realized:
+            self.exact += 1
+            error = 0.0
+        else:
+            error = (quoted - realized) * BPS / realized if realized else float(BPS)
+            fixed = _fixed(error)
+            self.error_sum += fixed
+            self.error_sum_sq += fixed * fixed
+        if error < self.error_min:
+            self.error_min = error
+        if error > self.error_max:
+            self.error_max = error
+
+    def add_all(self, exact: int, quoted: List[int], realized: List[int]):
+        """`exact` matching fills plus mismatched (quoted, realized) pairs"""
+        if exact:
+            self.count += exact
+            self.exact += exact
+            self.error_min = min(self.error_min, 0.0)
+            self.error_max = max(self.error_max, 0.0)
+        for q, r in zip(quoted, realized):
+            self.add(q, r)
+
+    def merge(self, other: "FillCheck"):
+        self.count += other.count
+        self.exact += other.exact
+        self.skipped += other.skipped
+        self.error_sum += other.error_sum
+        self.error_sum_sq += other.error_sum_sq
+        self.error_min = min(self.error_min, other.error_min)
+        self.error_max = max(self.error_max, other.error_max)
+
+    @property
+    def error_bps(self) -> Moments:
+        """Error moments in bps, each correctly rounded from the exact sums"""
+        n = self.count
+        if not n:
+            return Moments()
+        scale = 1 << _FIXED_BITS
+        m2 = Fraction(n * self.error_sum_sq - self.error_sum ** 2, n * scale * scale)
+        return Moments(n, self.error_sum / (n * scale), float(m2),
+                       self.error_min, self.error_max)
+
+
+class MarketReplay:
+    """Reconstructed state and fill checks for one market"""
+
+    __slots__ = ("start", "close", "pool", "vault", "book", "closed", "outcome", "checks")
+
+    def __init__(self, start: int, close: Optional[int] = None):
+        self.start = start
+        self.close = close
+        self.pool = PoolState(0, 0)
+        self.vault = VaultState(0, 0)
+        self.book = PooledOrderbook(exact=True)
+        self.closed = False
+        self.outcome: Optional[bool] = None
+        self.checks = {venue: FillCheck() for venue in CHECKS}
+
+    def seconds_to_close(self, timestamp: int) -> int:
+        return 168 * 3600 if self.close is None else self.close - timestamp
+
+
+@dataclass
+class MarketSummary:
+    """What a shard sends back per market"""
+    yes_reserve: int
+    no_reserve: int
+    vault_yes: int
+    vault_no: int
+    ask_levels: int
+    bid_levels: int
+    outcome: Optional[bool]
+    checks: Dict[str, FillCheck]
+
+
+@dataclass
+class ReplayResult:
+    events: int = 0
+    unknown: int = 0              # Event names outside EVENT_FIELDS
+    desyncs: int = 0              # Removals exceeding reconstructed depth, unknown pools
+    markets: Dict[str, MarketSummary] = field(default_factory=dict)
+
+    def merge(self, other: "ReplayResult"):
+        self.events += other.events
+        self.unknown += other.unknown
+        self.desyncs += other.desyncs
+        for market, summary in other.markets.items():
+            if market in self.markets:
+                raise ValueError(f"market {market} replayed by two shards")
+            self.markets[market] = summary
+
+    def checks(self) -> Dict[str, FillCheck]:
+        """Fill checks merged over all markets"""
+        total = {venue: FillCheck() for venue in CHECKS}
+        for summary in self.markets.values():
+            for venue, check in summary.checks.items():
+                total[venue].merge(check)
+        return total
+
+
+# =============================================================================
+# Replayer
+# =============================================================================
+
+class Replayer:
+    """
+    Folds positional rows into per-market state.
+
+    Handlers take the raw row and convert with int(), so CSV strings and JSON
+    numbers/booleans go through the same path; rows from one market usually
+    arrive in runs, so the last market looked up is kept at hand.
+    `compare=False` only rebuilds state (no quotes).
+    """
+
+    __slots__ = ("compare", "markets", "pools", "result", "_handlers", "_last_key", "_last",
+                 "_books")
+
+    def __init__(self, compare: bool = True):
+        self.compare = compare
+        self.markets: Dict[str, MarketReplay] = {}
+        self.pools: Dict[str, tuple] = {}   # pool id -> (market, is_yes, price_bps, is_bid)
+        self.result = ReplayResult()
+        self._last_key = None
+        self._last = None
+        self._books: Optional[_BookColumns] = None  # While record batches fold the books
+        self._handlers = {
+            "MarketRegistered": self._registered,
+            "Closed": self._closed,
+            "Resolved": self._resolved,
+            "Sync": self._sync,
+            "Swap": self._swap,
+            "VaultDeposit": self._vault_deposit,
+            "VaultWithdraw": self._vault_withdraw,
+            "VaultOTCFill": self._vault_otc_fill,
+            "Rebalanced": self._rebalanced,
+            "VaultSync": self._vault_sync,
+            "MintAndPool": self._mint_and_pool,
+            "SharesDeposited": self._shares_deposited,
+            "SharesWithdrawn": self._shares_withdrawn,
+            "PoolFilled": self._pool_filled,
+            "BidPoolCreated": self._bid_pool_created,
+            "BidPoolFilled": self._bid_pool_filled,
+            "BidCollateralWithdrawn": self._bid_withdrawn,
+        }
+
+    def _market(self, key: str, timestamp) -> MarketReplay:
+        if key == self._last_key:
+            return self._last
+        m = self.markets.get(key)
+        if m is None:
+            m = self.markets[key] = MarketReplay(int(timestamp))
+        self._last_key, self._last = key, m
+        return m
+
+    def run(self, rows: Iterable[list]) -> ReplayResult:
+        """Consume a row stream in one pass"""
+        if self._books is not None:
+            self._store_books()
+        handlers, result = self._handlers, self.result
+        n = unknown = 0
+        for row in rows:
+            n += 1
+            handler = handlers.get(row[0])
+            if handler is None:
+                unknown += 1
+            else:
+                handler(row)
+        result.events += n
+        result.unknown += unknown
+        return result
+
+    def finish(self) -> ReplayResult:
+        """Summarize every market into the result"""
+        if self._books is not None:
+            self._store_books()
+        result = self.result
+        for market, m in self.markets.items():
+            result.markets[market] = MarketSummary(
+                m.pool.yes_reserve, m.pool.no_reserve, m.vault.yes_shares, m.vault.no_shares,
+                sum(len(m.book.asks[side]) for side in (True, False)),
+                sum(len(m.book.bids[side]) for side in (True, False)),
+                m.outcome, m.checks)
+        return result
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def _registered(self, row):
+        m = self._market(row[1], row[3])
+        m.start, m.close = int(row[3]), int(row[4])
+
+    def _closed(self, row):
+        m = self._market(row[1], row[3])
+        m.closed = True
+        m.close = int(row[3])
+
+    def _resolved(self, row):
+        self._market(row[1], row[3]).outcome = bool(int(row[4]))
+
+    # -------------------------------------------------------------------------
+    # AMM
+    # -------------------------------------------------------------------------
+
+    def _sync(self, row):
+        pool = self._market(row[1], row[3]).pool
+        pool.yes_reserve = int(row[4])
+        pool.no_reserve = int(row[5])
+
+    def _swap(self, row):
+        m = self._market(row[1], row[3])
+        buy_yes, collateral_in, shares_out = int(row[4]) != 0, int(row[5]), int(row[6])
+        pool = m.pool
+        if self.compare:
+            if pool.yes_reserve and pool.no_reserve:
+                fee = exact_hook_fee(pool, int(row[3]) - m.start)
+                m.checks["amm"].add(exact_amm_buy(pool, collateral_in, buy_yes, fee)[0], shares_out)
+            else:
+                m.checks["amm"].skipped += 1
+        swapped = shares_out - collateral_in
+        if buy_yes:
+            pool.yes_reserve -= swapped
+            pool.no_reserve += collateral_in
+        else:
+            pool.no_reserve -= swapped
+            pool.yes_reserve += collateral_in
+
+    # -------------------------------------------------------------------------
+    # Bootstrap vault
+    # -------------------------------------------------------------------------
+
+    def _vault_deposit(self, row):
+        vault = self._market(row[1], row[3]).vault
+        if int(row[4]):
+            vault.yes_shares += int(row[5])
+        else:
+            vault.no_shares += int(row[5])
+
+    def _vault_withdraw(self, row):
+        vault = self._market(row[1], row[3]).vault
+        shares = int(row[5])
+        if int(row[4]):
+            vault.yes_shares = self._debit(vault.yes_shares, shares)
+        else:
+            vault.no_shares = self._debit(vault.no_shares, shares)
+
+    def _debit(self, balance: int, amount: int) -> int:
+        if amount > balance:
+            self.result.desyncs += 1
+            return 0
+        return balance - amount
+
+    def _vault_otc_fill(self, row):
+        m = self._market(row[1], row[3])
+        buy_yes, collateral_in, shares_out = int(row[4]) != 0, int(row[5]), int(row[6])
+        vault = m.vault
+        if self.compare:
+            # principal = ceil(sharesOut * fair / BPS): floor inverts it exactly for wei-sized fills
+            fair = int(row[8]) * BPS // shares_out if shares_out else 0
+            twap = fair if buy_yes else BPS - fair
+            if 0 < twap < BPS and (vault.yes_shares if buy_yes else vault.no_shares):
+                quoted = exact_vault_otc(vault, collateral_in, buy_yes, twap,
+                                         m.seconds_to_close(int(row[3])))
+                m.checks["otc"].add(quoted[0], shares_out)
+            else:
+                m.checks["otc"].skipped += 1
+        if buy_yes:
+            vault.yes_shares = self._debit(vault.yes_shares, shares_out)
+        else:
+            vault.no_shares = self._debit(vault.no_shares, shares_out)
+
+    def _rebalanced(self, row):
+        vault = self._market(row[1], row[3]).vault
+        if int(row[6]):
+            vault.yes_shares += int(row[5])
+        else:
+            vault.no_shares += int(row[5])
+
+    def _vault_sync(self, row):
+        vault = self._market(row[1], row[3]).vault
+        vault.yes_shares = int(row[4])
+        vault.no_shares = int(row[5])
+
+    # -------------------------------------------------------------------------
+    # MasterRouter pools
+    # -------------------------------------------------------------------------
+
+    def _add_pool(self, row, is_yes: bool, is_bid: bool):
+        book = self._market(row[1], row[3]).book
+        price = int(row[6])
+        self.pools[row[4]] = (row[1], is_yes, price, is_bid)
+        if is_bid:
+            book.add_bid(is_yes, price, int(row[7]))
+        else:
+            book.add_ask(is_yes, price, int(row[7]))
+
+    def _mint_and_pool(self, row):
+        # Mint a full set, keep one side, pool the other as an ask
+        self._add_pool(row, not int(row[5]), False)
+
+    def _shares_deposited(self, row):
+        self._add_pool(row, bool(int(row[5])), False)
+
+    def _bid_pool_created(self, row):
+        self._add_pool(row, bool(int(row[5])), True)
+
+    def _pool(self, row):
+        """(MarketReplay, is_yes, price_bps) for a known pool id, else None"""
+        entry = self.pools.get(row[4])
+        if entry is None:
+            self.result.desyncs += 1
+            return None
+        market, is_yes, price, _ = entry
+        return self._market(market, row[3]), is_yes, price
+
+    def _remove(self, m: MarketReplay, is_yes: bool, price: int, amount: int, is_bid: bool):
+        levels = m.book.bids[is_yes] if is_bid else m.book.asks[is_yes]
+        depth = levels.get(price, 0)
+        if amount > depth:
+            self.result.desyncs += 1
+            amount = depth
+        if amount:
+            (m.book.remove_bid if is_bid else m.book.remove_ask)(is_yes, price, amount)
+
+    def _shares_withdrawn(self, row):
+        entry = self._pool(row)
+        if entry is not None:
+            m, is_yes, price = entry
+            self._remove(m, is_yes, price, int(row[5]), False)
+
+    def _pool_filled(self, row):
+        entry = self._pool(row)
+        if entry is None:
+            return
+        m, is_yes, price = entry
+        shares, collateral = int(row[5]), int(row[6])
+        if self.compare:
+            m.checks["ask_pool"].add(ceil_div(shares * price, BPS), collateral)
+        self._remove(m, is_yes, price, shares, False)
+
+    def _bid_pool_filled(self, row):
+        entry = self._pool(row)
+        if entry is None:
+            return
+        m, is_yes, price = entry
+        shares, collateral = int(row[5]), int(row[6])
+        if self.compare:
+            m.checks["bid_pool"].add(shares * price // BPS, collateral)
+        self._remove(m, is_yes, price, collateral, True)
+
+    def _bid_withdrawn(self, row):
+        entry = self._pool(row)
+        if entry is not None:
+            m, is_yes, price = entry
+            self._remove(m, is_yes, price, int(row[5]), True)
+
+
+    # -------------------------------------------------------------------------
+    # Record batches
+    # -------------------------------------------------------------------------
+
+    def run_file(self, path: str) -> ReplayResult:
+        """
+        Consume a log file, folding it batch by batch (installs without pyarrow
+        dispatch per row). A file the typed decoders reject is finished by the
+        row readers.
+        """
+        if pa is None:
+            return self.run(read_events(path))
+        batches, done = read_batches(path, block=False), 0
+        while True:
+            try:
+                batch = next(batches, None)
+            except pa.ArrowInvalid:
+                return self.run(islice(read_events(path), done, None))
+            if batch is None:
+                return self.result
+            self.run_batch(batch)
+            done += batch.num_rows
+
+    def run_batch(self, batch: "pa.RecordBatch") -> ReplayResult:
+        """Consume one record batch (see read_batches)"""
+        try:
+            self._apply_columns(_EventColumns(batch))
+        except _RowFallback:
+            self.run(_batch_rows(batch))
+        return self.result
+
+    def _apply_columns(self, cols: _EventColumns):
+        """
+        Fold a batch column-wise to the state run() would reach row by row.
+        Every check comes before the first write: a batch with a removal the
+        row handlers would clamp (a desync), an invalid pool or a missing field
+        raises _RowFallback with the state untouched.
+        """
+        if self._books is None:
+            self._books = _BookColumns(self.markets, self.pools)
+        books = self._books
+        cols.markets = np.array([books.code(market) for market in cols.market_names],
+                                np.int64)[cols.markets]
+        names = books.names
+        created = {}  # Market code -> the row creating it, for markets new in this batch
+        rows = cols.rows(*CREATES_MARKET)
+        if rows.size:
+            _, first = np.unique(cols.markets[rows], return_index=True)
+            for row in rows[np.sort(first)].tolist():
+                code = int(cols.markets[row])
+                if names[code] not in self.markets:
+                    created[code] = row
+        pools, swaps = self._fold_pools(cols)
+        vaults, otc_fills = self._fold_vaults(cols)
+        levels, registry, missing, removals = self._fold_books(cols)
+        checks = self._quote_checks(cols, created, swaps, otc_fills, removals) \
+            if self.compare else []
+
+        for code, row in created.items():
+            self.markets[names[code]] = MarketReplay(int(cols.timestamps[row]))
+        for market, yes, no in pools:
+            pool = self.markets[market].pool
+            pool.yes_reserve, pool.no_reserve = yes, no
+        for market, yes, no in vaults:
+            vault = self.markets[market].vault
+            vault.yes_shares, vault.no_shares = yes, no
+        if levels is not None:
+            books.set_depths(*levels)
+        if registry is not None:
+            books.add_pools(*registry)
+        for code, venue, skipped, exact, quoted, realized in checks:
+            check = self.markets[names[code]].checks[venue]
+            check.skipped += skipped
+            check.add_all(exact, quoted, realized)
+
+        rows = cols.rows("MarketRegistered", "Closed", "Resolved")
+        if rows.size:
+            handlers = self._handlers
+            for row in _batch_rows(cols.batch.take(pa.array(rows))):
+                handlers[row[0]](row)
+        self.result.events += len(cols.kind)
+        self.result.unknown += cols.unknown
+        self.result.desyncs += missing
+
+    def _lifecycle(self, cols: _EventColumns, rows: "np.ndarray",
+                   created: Dict[int, int]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        (start, seconds to close) of each row's market as the row handlers see
+        them at that row: set by MarketRegistered / Closed rows earlier in the
+        batch, else as before it (a new market starts at its first row).
+        """
+        names, timestamps = self._books.names, cols.timestamps
+
+        def base_of(codes):
+            out = []
+            for code in codes.tolist():
+                m = self.markets.get(names[code])
+                if m is None:
+                    out.append((timestamps[created[code]], 0, 0))
+                else:
+                    out.append((m.start, 0 if m.close is None else m.close, m.close is not None))
+            return np.array(out, np.int64).reshape(-1, 3).T
+
+        markets = cols.markets[rows]
+        registered, closed = cols.rows("MarketRegistered"), cols.rows("Closed")
+        if not registered.size and not closed.size:
+            codes, inverse = np.unique(markets, return_inverse=True)
+            start, close, has_close = base_of(codes)[:, inverse]
+        else:
+            # Start resets at MarketRegistered; close (and has close) at Closed too
+            queries = np.zeros((3, rows.size), np.int64)
+            lifecycle = np.concatenate([registered, closed])
+            values = np.ones((3, lifecycle.size), np.int64)
+            values[0, :registered.size] = timestamps[registered]
+            values[1] = np.concatenate([_int64(cols.amounts("MarketRegistered", "close",
+                                                            registered)), timestamps[closed]])
+            start = np.empty(rows.size, np.int64)
+            close = np.empty((2, rows.size), np.int64)
+            for out, at, n_resets in ((start, slice(0, 1), registered.size),
+                                      (close, slice(1, 3), lifecycle.size)):
+                entries = np.concatenate([lifecycle[:n_resets], rows])
+                running, _, _, order = _fold(
+                    cols.markets[entries], entries,
+                    np.concatenate([values[at, :n_resets], queries[at]], axis=1),
+                    np.arange(entries.size) < n_resets, lambda codes: base_of(codes)[at])
+                out[...] = _before(running, order, np.zeros_like(running))[:, n_resets:]
+            close, has_close = close
+        return start, np.where(has_close != 0, close - timestamps[rows], 168 * 3600)
+
+    def _quote_checks(self, cols: _EventColumns, created: Dict[int, int],
+                      swaps: tuple, otc_fills: tuple, removals: Optional[tuple]) -> list:
+        """
+        Quote every realized fill against the state just before it, as the row
+        handlers do, over limb columns (see simulate_exact.limb_exact_quote).
+        Returns [(market code, venue, skipped, exact, mismatched quotes, their
+        realized values)]; only mismatches become Python ints.
+        """
+        checks = []
+        rows, before, buy_yes, collateral, shares = swaps
+        if rows.size:
+            yes, no = _normalized(before[:3]), _normalized(before[3:])
+            if (yes[2] < 0).any() or (no[2] < 0).any():
+                raise _RowFallback
+            checked = yes.any(axis=0) & no.any(axis=0)
+            at = np.flatnonzero(checked)
+            collateral = _normalized(collateral[:, at])
+            _positive(collateral)
+            start, _ = self._lifecycle(cols, rows[at], created)
+            quoted = limb_exact_quote(yes[:, at], no[:, at], collateral, buy_yes[at],
+                                      cols.timestamps[rows[at]] - start)[0]
+            _tally(checks, "amm", cols.markets[rows], checked, at, quoted,
+                   _normalized(shares[:, at]))
+
+        rows, buy_yes, shares, before = otc_fills
+        if rows.size:
+            yes, no = _normalized(before[:3]), _normalized(before[3:])
+            principal = cols.amounts("VaultOTCFill", "principal", rows)
+            _positive(principal)
+            _positive(shares)
+            # principal = ceil(sharesOut * fair / BPS): floor inverts it for wei-sized fills
+            shares = _normalized(shares)
+            filled = shares.any(axis=0)
+            divisor = shares.copy()
+            divisor[0, ~filled] = 1
+            fair = limb_divmod(limb_mul_small(_normalized(principal), BPS), divisor)[0]
+            priced = filled & ~fair[1:].any(axis=0) & (fair[0] > 0) & (fair[0] < BPS)
+            checked = priced & np.where(buy_yes, yes.any(axis=0), no.any(axis=0))
+            at = np.flatnonzero(checked)
+            collateral = _normalized(cols.amounts("VaultOTCFill", "collateral_in", rows[at]))
+            _positive(collateral)
+            _, to_close = self._lifecycle(cols, rows[at], created)
+            twap = np.where(buy_yes[at], fair[0, at], BPS - fair[0, at])
+            quoted = limb_vault_otc(yes[:, at], no[:, at], collateral, buy_yes[at], twap,
+                                    to_close)[0]
+            _tally(checks, "otc", cols.markets[rows], checked, at, quoted, shares[:, at])
+
+        if removals is not None:
+            rows, markets, prices = removals
+            for event, venue, ceil in (("PoolFilled", "ask_pool", True),
+                                       ("BidPoolFilled", "bid_pool", False)):
+                at = np.flatnonzero(cols.kind[rows] == EVENT_CODES[event])
+                if not at.size:
+                    continue
+                shares = cols.amounts(event, "shares", rows[at])
+                _positive(shares)
+                value = limb_mul_small(_normalized(shares), prices[at])
+                if ceil:
+                    value = limb_add(value, np.full((1, at.size), BPS - 1, np.int64))
+                quoted = limb_divmod(value, np.full((1, at.size), BPS, np.int64))[0]
+                _tally(checks, venue, markets[at], np.ones(at.size, bool), np.arange(at.size),
+                       quoted, _normalized(cols.amounts(event, "collateral", rows[at])))
+        return checks
+
+    def _fold_sides(self, cols: _EventColumns, rows: "np.ndarray", values: "np.ndarray",
+                    resets: "np.ndarray", state, debits: bool) -> tuple:
+        """
+        Fold (yes, no) registers per market: values holds yes limbs over no
+        limbs per row, reset rows set both. state(m) reads a market's pair.
+        Returns ([(market, yes, no)] after the batch, each row's (yes, no) limbs
+        before it, or None when not comparing).
+        """
+        if not rows.size:
+            return [], None
+        names = self._books.names
+
+        def base_of(codes):
+            pairs = [state(self.markets[names[code]]) if names[code] in self.markets else (0, 0)
+                     for code in codes.tolist()]
+            return np.array([_split(yes) + _split(no) for yes, no in pairs], np.int64).T
+
+        running, last, keys, order = _fold(cols.markets[rows], rows, values, resets, base_of)
+        if debits:
+            # A debit beyond the balance is clamped by the row handlers
+            _positive(running[:3])
+            _positive(running[3:])
+        return ([(names[k], _join(running[:3, i]), _join(running[3:, i]))
+                 for k, i in zip(keys.tolist(), last.tolist())],
+                _before(running, order, values) if self.compare else None)
+
+    def _fold_pools(self, cols: _EventColumns) -> tuple:
+        """
+        Reserves never clamp: Syncs set them, Swaps apply their deltas.
+        Returns (_fold_sides result, Swap rows, buy_yes, collateral, shares_out).
+        """
+        sync, swap = cols.rows("Sync"), cols.rows("Swap")
+        if not sync.size and not swap.size:
+            return [], (swap, None, None, None, None)
+        collateral = cols.amounts("Swap", "collateral_in", swap)
+        shares = cols.amounts("Swap", "shares_out", swap)
+        buy_yes = cols.flags("Swap", "buy_yes", swap)
+        # The bought side pays out shares - collateral; the other takes the collateral
+        paid_out = collateral - shares
+        deltas = np.concatenate([np.where(buy_yes, paid_out, collateral),
+                                 np.where(buy_yes, collateral, paid_out)])
+        synced = np.concatenate([cols.amounts("Sync", "yes_reserve", sync),
+                                 cols.amounts("Sync", "no_reserve", sync)])
+        rows = np.concatenate([sync, swap])
+        folded, before = self._fold_sides(
+            cols, rows, np.concatenate([synced, deltas], axis=1), np.arange(rows.size) < sync.size,
+            lambda m: (m.pool.yes_reserve, m.pool.no_reserve), debits=False)
+        if before is not None:
+            before = before[:, sync.size:]
+        return folded, (swap, before, buy_yes, collateral, shares)
+
+    def _fold_vaults(self, cols: _EventColumns) -> tuple:
+        """
+        Returns (_fold_sides result, VaultOTCFill rows, buy_yes, shares_out,
+        vault limbs before each fill or None).
+        """
+        sync = cols.rows("VaultSync")
+        parts = [(sync, np.concatenate([cols.amounts("VaultSync", "yes_shares", sync),
+                                        cols.amounts("VaultSync", "no_shares", sync)]))]
+        fills = None
+        for event, side, amount, sign in (("VaultOTCFill", "buy_yes", "shares_out", -1),
+                                          ("VaultDeposit", "is_yes", "shares", 1),
+                                          ("VaultWithdraw", "is_yes", "shares", -1),
+                                          ("Rebalanced", "yes_was_lower", "shares_acquired", 1)):
+            rows = cols.rows(event)
+            if not rows.size:
+                fills = fills or (rows, None, None)
+                continue
+            is_yes = cols.flags(event, side, rows)
+            shares = cols.amounts(event, amount, rows)
+            fills = fills or (rows, is_yes, shares)
+            shares = shares * sign
+            parts.append((rows, np.concatenate([shares * is_yes, shares * ~is_yes])))
+        rows = np.concatenate([rows for rows, _ in parts])
+        folded, before = self._fold_sides(
+            cols, rows, np.concatenate([values for _, values in parts], axis=1),
+            np.arange(rows.size) < sync.size,
+            lambda m: (m.vault.yes_shares, m.vault.no_shares), debits=True)
+        if before is not None:
+            # OTC fills come right after the syncs
+            before = before[:, sync.size:sync.size + fills[0].size]
+        return folded, (*fills, before)
+
+    def _fold_books(self, cols: _EventColumns) -> tuple:
+        """
+        Fold pool adds and removals into price levels, keyed
+        ((market * 2 + is_bid) * 2 + is_yes) * BPS + price. Returns ((keys,
+        depth limbs) after the batch or None, pool registry updates, removals
+        of unknown pools, (rows, market, price_bps) of the known removals).
+        """
+        add_rows, ids, markets, sides, bids, prices, amounts = [], [], [], [], [], [], []
+        for event, side, inverted, is_bid, amount in _BOOK_ADDS:
+            rows = cols.rows(event)
+            if rows.size:
+                add_rows.append(rows)
+                ids.append(cols.field(event, "pool", rows))
+                markets.append(cols.markets[rows])
+                sides.append(cols.flags(event, side, rows) != inverted)
+                bids.append(np.full(rows.size, is_bid))
+                prices.append(_prices(cols.amounts(event, "price_bps", rows)))
+                amounts.append(cols.amounts(event, amount, rows))
+        removes = []
+        for event, is_bid, amount in _BOOK_REMOVES:
+            rows = cols.rows(event)
+            if rows.size:
+                ids.append(cols.field(event, "pool", rows))
+                removes.append((rows, is_bid, cols.amounts(event, amount, rows)))
+        if not ids:
+            return None, None, 0, None
+        ids = pa.concat_arrays([column.cast(pa.string()) for column in ids])
+        if ids.null_count:
+            raise _RowFallback
+        ids = ids.dictionary_encode()
+        id_names, id_codes = np.array(ids.dictionary.to_pylist(), object), ids.indices.to_numpy()
+
+        parts = []
+        registry = None
+        n_adds = sum(rows.size for rows in add_rows)
+        if n_adds:
+            add_rows, markets, sides, bids, prices = (
+                np.concatenate(column) for column in (add_rows, markets, sides, bids, prices))
+            amounts = np.concatenate(amounts, axis=1)
+            _positive(amounts, strict=True)
+            parts.append((add_rows, markets, bids, sides, prices, amounts))
+            order = np.argsort(add_rows)
+            registry = (id_names[id_codes[order]].tolist(),
+                        np.stack([markets, sides, prices, bids])[:, order])
+        else:
+            add_rows = np.zeros(0, np.int64)
+
+        # Resolve each removal to the latest add of its pool id before it
+        missing = 0
+        known = None
+        if removes:
+            ref_rows = np.concatenate([rows for rows, _, _ in removes])
+            ref_bids = np.concatenate([np.full(rows.size, is_bid) for rows, is_bid, _ in removes])
+            ref_amounts = np.concatenate([amount for _, _, amount in removes], axis=1)
+            _positive(ref_amounts)
+            order = np.lexsort((np.concatenate([add_rows, ref_rows]), id_codes))
+            index = np.arange(order.size)
+            new_id = np.ones(order.size, bool)
+            sorted_codes = id_codes[order]
+            np.not_equal(sorted_codes[1:], sorted_codes[:-1], out=new_id[1:])
+            latest_add = np.maximum.accumulate(np.where(order < n_adds, index, -1))
+            group = np.maximum.accumulate(np.where(new_id, index, 0))
+            is_ref = np.flatnonzero(order >= n_adds)
+            source = latest_add[is_ref]
+            found = source >= group[is_ref]
+            refs = order[is_ref] - n_adds
+            entries = np.empty((3, refs.size), np.int64)  # market, is_yes, price
+            live = np.ones(refs.size, bool)
+            if found.any():
+                adds = order[source[found]]
+                entries[:, found] = markets[adds], sides[adds], prices[adds]
+            earlier = np.flatnonzero(~found)
+            if earlier.size:
+                # Pools added before this batch
+                pool_codes, inverse = np.unique(sorted_codes[is_ref[earlier]],
+                                                return_inverse=True)
+                known, columns = self._books.find_pools(id_names[pool_codes].tolist())
+                live[earlier] = known[inverse]
+                entries[:, earlier] = columns[:, inverse]
+            missing = refs.size - int(live.sum())
+            refs = refs[live]
+            known = ref_rows[refs], entries[0, live], entries[2, live]
+            parts.append((ref_rows[refs], entries[0, live], ref_bids[refs],
+                          entries[1, live] != 0, entries[2, live], -ref_amounts[:, refs]))
+        if not parts:
+            return None, registry, missing, known
+
+        rows, markets, bids, sides, prices = (np.concatenate([part[i] for part in parts])
+                                              for i in range(5))
+        amounts = np.concatenate([part[5] for part in parts], axis=1)
+        keys = ((markets * 2 + bids) * 2 + sides) * BPS + prices
+        running, last, keys, _ = _fold(keys, rows, amounts, None, self._books.depth_limbs)
+        # A removal beyond the level's depth is clamped by the row handlers
+        _positive(running)
+        return (keys, _normalized(running[:, last])), registry, missing, known
+
+    def _store_books(self):
+        """Write batch-folded levels back, before anything reads them"""
+        books, self._books = self._books, None
+        books.store(self.markets)
+
+
+def replay(rows: Iterable[list], compare: bool = True) -> ReplayResult:
+    """Replay one row stream (any iterable of positional rows)"""
+    replayer = Replayer(compare)
+    replayer.run(rows)
+    return replayer.finish()
+
+
+def replay_file(path: str, compare: bool = True) -> ReplayResult:
+    """Replay one log file (record batches when state-only, see Replayer.run_file)"""
+    return replay_parts([path], compare)
+
+
+def replay_parts(paths: List[str], compare: bool = True) -> ReplayResult:
+    """Worker entry point: one shard = its parts of every input file, in order"""
+    replayer = Replayer(compare)
+    for path in paths:
+        replayer.run_file(path)
+    return replayer.finish()
+
+
+def shard_of(market: str, n_shards: int) -> int:
+    """Stable across processes and runs (unlike hash())"""
+    return zlib.crc32(market.encode()) % n_shards
+
+
+def partition_file(path: str, directory: str, n_shards: int, tag: str) -> List[List[str]]:
+    """
+    Split one log by market into n_shards streams under `directory`: Arrow IPC
+    files when pyarrow is installed, padded CSV otherwise (and for the rest of
+    a file the typed decoders reject). Pool ids resolve within their market,
+    so each stream replays on its own.
+
+    Returns: per shard, its part files in stream order
+    """
+    parts: List[List[str]] = [[] for _ in range(n_shards)]
+    done = 0
+    if pa is not None:
+        writers = [None] * n_shards
+        batches = read_batches(path)
+        try:
+            while True:
+                try:
+                    batch = next(batches, None)
+                except pa.ArrowInvalid:
+                    break
+                if batch is None:
+                    return parts
+                markets = batch.column("market").fill_null("").dictionary_encode()
+                lut = np.array([shard_of(market, n_shards)
+                                for market in markets.dictionary.to_pylist()] or [0])
+                shard = lut[markets.indices.to_numpy()]
+                for s in np.unique(shard).tolist():
+                    if writers[s] is None:
+                        parts[s].append(os.path.join(directory, f"{tag}-{s}.arrow"))
+                        writers[s] = pa.ipc.new_file(parts[s][-1], batch.schema)
+                    writers[s].write_batch(batch.filter(pa.array(shard == s)))
+                done += batch.num_rows
+        finally:
+            for writer in writers:
+                if writer is not None:
+                    writer.close()
+
+    files, outs = [None] * n_shards, [None] * n_shards
+    try:
+        for row in islice(read_events(path), done, None):
+            s = shard_of(str(row[1]), n_shards)
+            if outs[s] is None:
+                parts[s].append(os.path.join(directory, f"{tag}-{s}-rows.csv"))
+                files[s] = _open_text(parts[s][-1], "wt")
+                outs[s] = csv.writer(files[s])
+                outs[s].writerow(CSV_HEADER)
+            outs[s].writerow(_csv_row(row))
+    finally:
+        for f in files:
+            if f is not None:
+                f.close()
+    return parts
+
+
+def replay_files(paths: List[str], compare: bool = True,
+                 workers: Optional[int] = None) -> ReplayResult:
+    """
+    Replay logs across a process pool (workers=1 runs in-process). Each file
+    is partitioned by market into one stream per worker, so a multi-market
+    log fans out too; shards are merged as they complete.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return replay_parts(paths, compare)
+
+    result = ReplayResult()
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(max_workers=workers) as pool:
+        shards: List[List[str]] = [[] for _ in range(workers)]
+        tags = [f"part{i}" for i in range(len(paths))]
+        for parts in pool.map(partition_file, paths, repeat(tmp), repeat(workers), tags):
+            for shard, files in zip(shards, parts):
+                shard.extend(files)
+        futures = [pool.submit(replay_parts, shard, compare) for shard in shards if shard]
+        for future in as_completed(futures):
+            result.merge(future.result())
+    return result
+
+
+# =============================================================================
+# Synthetic Logs
+# =============================================================================
+
+def synthetic_log(n_events: int, market: str = "1", seed: int = 0, fee_offset_bps: int = 0,
+                  start: int = 1_700_000_000, days: int = 14) -> Iterator[list]:
+    """
+    Event rows for one market as the contracts would emit them, generated with
+    the exact engine. `fee_offset_bps` is added to the AMM fee (a production
+    config differing from the default) so the replay has something to find.
+    """
+    rng = random.Random(seed)
+    close = start + days * 86400
+    pool = PoolState(2_000 * WAD, 2_000 * WAD)
+    vault = VaultState(5_000 * WAD, 5_000 * WAD)
+    asks: Dict[str, list] = {}   # pool id -> [is_yes, price, depth]
+    bids: Dict[str, list] = {}
+    block, t = 18_000_000, start
+    n_pools = 0
+
+    yield ["MarketRegistered", market, block, t, close]
+    yield ["Sync", market, block, t, pool.yes_reserve, pool.no_reserve]
+    yield ["VaultSync", market, block, t, vault.yes_shares, vault.no_shares]
+    n = 3
+    step = max((close - start) // max(n_events, 1), 1)
+    while n < n_events:
+        t += rng.randrange(1, 2 * step + 1)
+        block = 18_000_000 + (t - start) // 12
+        x = rng.random()
+        buy_yes = rng.random() < 0.5
+        size = int(rng.expovariate(1 / 40) * WAD) + WAD
+
+        if x < 0.55:
+            fee = exact_hook_fee(pool, t - start) + fee_offset_bps
+            shares, _, ok = exact_amm_buy(pool, size, buy_yes, fee)
+            if not ok:
+                continue
+            swapped = shares - size
+            if buy_yes:
+                pool.yes_reserve -= swapped
+                pool.no_reserve += size
+            else:
+                pool.no_reserve -= swapped
+                pool.yes_reserve += size
+            yield ["Swap", market, block, t, buy_yes, size, shares]
+            if rng.random() < 0.5:
+                yield ["Sync", market, block, t, pool.yes_reserve, pool.no_reserve]
+                n += 1
+        elif x < 0.7:
+            twap = exact_p_yes_bps(pool)
+            shares, used, ok = exact_vault_otc(vault, size, buy_yes, twap, close - t)
+            if not ok:
+                continue
+            fair = twap if buy_yes else BPS - twap
+            spread = max(fair * exact_vault_spread(vault, buy_yes, close - t) // BPS,
+                         MIN_ABSOLUTE_SPREAD_BPS)
+            if buy_yes:
+                vault.yes_shares -= shares
+            else:
+                vault.no_shares -= shares
+            yield ["VaultOTCFill", market, block, t, buy_yes, used, shares,
+                   min(fair + spread, BPS), ceil_div(shares * fair, BPS)]
+        elif x < 0.75:
+            vault.yes_shares += size
+            vault.no_shares += size
+            yield ["VaultDeposit", market, block, t, True, size]
+            yield ["VaultDeposit", market, block, t, False, size]
+            n += 1
+        elif x < 0.85:
+            n_pools += 1
+            pool_id = f"{market}-{n_pools}"
+            price = rng.randrange(500, 9500)
+            is_yes = rng.random() < 0.5
+            if rng.random() < 0.5:
+                asks[pool_id] = [is_yes, price, size]
+                yield ["MintAndPool", market, block, t, pool_id, not is_yes, price, size]
+            else:
+                bids[pool_id] = [is_yes, price, size]
+                yield ["BidPoolCreated", market, block, t, pool_id, is_yes, price, size]
+        elif x < 0.95 and (asks or bids):
+            book = asks if (rng.random() < 0.5 and asks) or not bids else bids
+            pool_id = rng.choice(list(book)) if len(book) < 64 else next(iter(book))
+            is_yes, price, depth = book[pool_id]
+            if book is asks:
+                shares = min(size, depth)
+                yield ["PoolFilled", market, block, t, pool_id, shares,
+                       ceil_div(shares * price, BPS)]
+                depth -= shares
+            else:
+                shares = min(size, depth * BPS // price)
+                paid = shares * price // BPS
+                if not paid:
+                    continue
+                yield ["BidPoolFilled", market, block, t, pool_id, shares, paid]
+                depth -= paid
+            if depth:
+                book[pool_id][2] = depth
+            else:
+                del book[pool_id]
+        else:
+            continue
+        n += 1
+    p_yes = pool.no_reserve / (pool.yes_reserve + pool.no_reserve)
+    yield ["Closed", market, block, close]
+    yield ["Resolved", market, block, close, rng.random() < p_yes]
+
+
+def write_shards(directory: str, n_markets: int, events_per_market: int, fmt: str = "jsonl",
+                 seed: int = 0, fee_offset_bps: int = 0) -> List[str]:
+    """One synthetic per-market log file per market. Returns the paths."""
+    paths = []
+    for i in range(n_markets):
+        path = os.path.join(directory, f"market-{i + 1}.{fmt}")
+        write_events(path, synthetic_log(events_per_market, str(i + 1), seed + i, fee_offset_bps))
+        paths.append(path)
+    return paths
+
+
+def interleaved_log(n_markets: int, events_per_market: int, seed: int = 0) -> Iterator[list]:
+    """One block-ordered log of n_markets synthetic markets, as a chain export looks."""
+    logs = [synthetic_log(events_per_market, str(i + 1), seed + i) for i in range(n_markets)]
+    return heapq.merge(*logs, key=lambda row: row[2])
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def _print_checks(result: ReplayResult):
+    print(f"\n{'Venue':<10} | {'Fills':>8} | {'Exact':>8} | {'Mean err':>9} | {'Max |err|':>9} | "
+          f"{'Skipped':>7}")
+    print("-" * 66)
+    for venue, check in result.checks().items():
+        m = check.error_bps
+        worst = max(abs(m.min), abs(m.max)) if m.count else 0.0
+        print(f"{venue:<10} | {m.count:>8,} | {check.exact:>8,} | {m.mean:>7.2f}bp | "
+              f"{worst:>7.2f}bp | {check.skipped:>7,}")
+
+
+def main(n_events: int = 200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        print_header("Replay vs Realized Fills (one market, exact engine)")
+        for label, offset in [("default config", 0), ("production +5bps AMM fee", 5)]:
+            result = replay(synthetic_log(20_000, seed=1, fee_offset_bps=offset))
+            print(f"\n   {label}: {result.events:,} events, {result.desyncs} desyncs")
+            _print_checks(result)
+
+        print_header(f"Streaming One File ({n_events:,} events)")
+        print(f"\n{'Format':<10} | {'Size':>9} | {'State only':>12} | {'Quote+state':>12} | "
+              f"{'Peak memory':>11}")
+        print("-" * 68)
+        rows = list(synthetic_log(n_events, seed=2))
+        for fmt in ("csv", "jsonl", "jsonl.gz"):
+            path = os.path.join(tmp, f"log.{fmt}")
+            write_events(path, rows)
+            rates = []
+            for compare in (False, True):
+                t0 = time.perf_counter()
+                result = replay_file(path, compare)
+                rates.append(result.events / (time.perf_counter() - t0))
+            tracemalloc.start()
+            replay(read_events(path), compare=False)
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            print(f"{fmt:<10} | {os.path.getsize(path) / 2**20:>7.1f}MB | {rates[0]:>9,.0f}/s | "
+                  f"{rates[1]:>9,.0f}/s | {peak:>9.2f}MB")
+
+        t0 = time.perf_counter()
+        result = replay(rows, compare=False)
+        secs = time.perf_counter() - t0
+        print(f"\n   In-memory rows, state only: {result.events / secs:,.0f} events/s")
+        print("   File replays fold pyarrow record batches, quotes included"
+              + ("" if pa is not None else " (pyarrow missing: per-row)") + ".")
+        print("   Peak memory is the per-row reader's; it does not grow with the file.")
+        del rows
+
+        n_markets = max(os.cpu_count() or 1, 4)
+        per_market = max(n_events // n_markets, 1_000)
+        print_header(f"Partitioned Log ({n_markets} markets x {per_market:,} events, one CSV)")
+        path = os.path.join(tmp, "markets.csv")
+        write_events(path, interleaved_log(n_markets, per_market, seed=10))
+        print(f"\n{'Workers':<10} | {'Events/s':>12} | {'Speedup':>8}")
+        print("-" * 36)
+        base = None
+        for workers in sorted({1, os.cpu_count() or 1}):
+            t0 = time.perf_counter()
+            result = replay_files([path], workers=workers)
+            secs = time.perf_counter() - t0
+            base = base or secs
+            print(f"{workers:<10} | {result.events / secs:>12,.0f} | {base / secs:>7.2f}x")
+        print(f"\n   {len(result.markets)} markets, {result.desyncs} desyncs, "
+              f"{sum(s.outcome is not None for s in result.markets.values())} resolved")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
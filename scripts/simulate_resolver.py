@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Resolver condition backtester: thousands of numeric and ratio conditions
+evaluated against local target time series, plus _buyToSkewOdds seeding.
+
+Resolver reads a uint from a target (_readUint), or the ratio
+mulDiv(a, 1e18, b) of two reads (uint256 max when b == 0), and compares it
+with a threshold (_compare). Here every target is a column sampled at the
+same keeper check times, and a ConditionSet holds one row per condition
+(target(s), op, threshold, canClose):
+
+- each distinct (targetA, targetB) pair's value series is computed once,
+  wei-exact: int64 when every value and threshold fits, Python ints otherwise
+- condTrue for a chunk of conditions is one (conditions x checks) comparison
+  per operator
+- resolve() replays resolveMarket at every check (early YES under canClose,
+  YES/NO at the first check at or after close); hit_rates() does the same for
+  a market opened at every check, via a next-hit index per row
+
+Bulk-created markets are seeded like createNumericMarketSeedAndBuy: a fresh
+pool of `seed` YES/NO shares, then buyYes / buyNo with collateralForSwap.
+skew_pools() applies the swaps in exact integer math and calibrate_swaps()
+finds the smallest swap that moves P(YES) to a target, e.g. the backtested
+hit rate, for every market in one vectorized bisection.
+
+Requires: numpy
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Sequence, Tuple
+
+import numpy as np
+
+from simulate_exact import exact_amm_buy
+from simulate_router import PoolState, print_header
+
+WAD = 10**18
+BPS = 10000
+UINT256_MAX = 2**256 - 1
+INT64_MAX = 2**63 - 1
+CHUNK_CELLS = 1 << 23           # Condition x check cells per kernel pass
+
+# Resolver.Op
+OP_LT, OP_GT, OP_LTE, OP_GTE, OP_EQ, OP_NEQ = range(6)
+OP_SYMBOLS = ("<", ">", "<=", ">=", "==", "!=")
+OP_UFUNCS = (np.less, np.greater, np.less_equal, np.greater_equal, np.equal, np.not_equal)
+
+
+# =============================================================================
+# Conditions
+# =============================================================================
+
+@dataclass
+class ConditionSet:
+    """Resolver.Condition rows; target_b == -1 marks a scalar (non-ratio) condition"""
+    target_a: np.ndarray        # int64 column index
+    target_b: np.ndarray        # int64 column index or -1
+    op: np.ndarray              # int8 Op
+    threshold: np.ndarray       # object, uint256 Python ints
+    can_close: np.ndarray       # bool
+
+    def __len__(self) -> int:
+        return len(self.op)
+
+    @property
+    def is_ratio(self) -> np.ndarray:
+        return self.target_b >= 0
+
+    def take(self, rows) -> "ConditionSet":
+        return ConditionSet(self.target_a[rows], self.target_b[rows], self.op[rows],
+                            self.threshold[rows], self.can_close[rows])
+
+
+@dataclass
+class Resolution:
+    """resolveMarket outcome per condition"""
+    outcome: np.ndarray         # int8: 1 YES, 0 NO, -1 still pending at the end of the series
+    resolved_at: np.ndarray     # int64 check index (-1 while pending)
+    early: np.ndarray           # bool, closed early under canClose
+
+
+def describe(observable: str, op: int, threshold: int, close: int, can_close: bool) -> str:
+    """_buildDescription"""
+    text = f"{observable} {OP_SYMBOLS[op]} {threshold} by {close} Unix time."
+    if can_close:
+        text += " Note: market may close early once condition is met."
+    return text
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+class ConditionEngine:
+    """
+    Target value columns sampled at non-decreasing check times. Columns are
+    uint reads (Python ints or int64 arrays), one value per check.
+    """
+
+    __slots__ = ("times", "names", "columns")
+
+    def __init__(self, times, targets: Dict[str, Sequence[int]]):
+        self.times = np.asarray(times, np.int64)
+        if np.any(np.diff(self.times) < 0):
+            raise ValueError("check times must be non-decreasing")
+        self.names = {name: i for i, name in enumerate(targets)}
+        self.columns = []
+        for name, values in targets.items():
+            col = np.array([int(v) for v in values], dtype=object)
+            if len(col) != len(self.times):
+                raise ValueError(f"target {name!r} has {len(col)} values, expected "
+                                 f"{len(self.times)}")
+            if len(col) and (min(col) < 0 or max(col) > UINT256_MAX):
+                raise ValueError(f"target {name!r} is not a uint256 series")
+            self.columns.append(col)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def conditions(self, specs) -> ConditionSet:
+        """
+        ConditionSet from (target, op, threshold, can_close) specs, where
+        target is a column name or a (numerator, denominator) pair of names.
+        """
+        a, b, ops, thresholds, close = [], [], [], [], []
+        for target, op, threshold, can_close in specs:
+            if not 0 <= op < len(OP_SYMBOLS):
+                raise ValueError(f"unknown op {op}")
+            if isinstance(target, tuple):
+                a.append(self.names[target[0]])
+                b.append(self.names[target[1]])
+            else:
+                a.append(self.names[target])
+                b.append(-1)
+            ops.append(op)
+            thresholds.append(int(threshold))
+            close.append(bool(can_close))
+        threshold = np.empty(len(thresholds), dtype=object)
+        threshold[:] = thresholds
+        return ConditionSet(np.array(a, np.int64), np.array(b, np.int64),
+                            np.array(ops, np.int8), threshold, np.array(close, bool))
+
+    # -------------------------------------------------------------------------
+    # Values
+    # -------------------------------------------------------------------------
+
+    def values(self, target_a: int, target_b: int = -1) -> np.ndarray:
+        """_currentValue at every check, as Python ints"""
+        a = self.columns[target_a]
+        if target_b < 0:
+            return a
+        b = self.columns[target_b]
+        zero = b == 0
+        ratio = a * WAD // np.where(zero, 1, b)
+        return np.where(zero, UINT256_MAX, ratio)
+
+    def _pair_rows(self, conds: ConditionSet):
+        """
+        (exact rows, int64 rows, pair index per condition): one row per
+        distinct (targetA, targetB) as Python ints, plus an int64 copy (None
+        if a finite value does not fit). uint256 max (undefined ratio) becomes
+        INT64_MAX in the copy: it still sorts above every threshold that fits.
+        """
+        pairs, index = np.unique(np.column_stack([conds.target_a, conds.target_b]),
+                                 axis=0, return_inverse=True)
+        exact, fast = [], []
+        for a, b in pairs.tolist():
+            values = self.values(a, b)
+            undefined = values == UINT256_MAX
+            finite = np.where(undefined, 0, values)
+            exact.append(values)
+            fast.append(np.where(undefined, INT64_MAX, finite).astype(np.int64)
+                        if finite.max(initial=0) < INT64_MAX else None)
+        return exact, fast, index.ravel()
+
+    def iter_cond_true(self, conds: ConditionSet) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (rows, condTrue) for chunks of conditions, condTrue being (rows,
+        checks) bool. Conditions whose values and threshold fit int64 are
+        compared in int64, the rest over Python ints.
+        """
+        if len(conds) == 0:
+            return
+        exact_rows, fast_rows, pair = self._pair_rows(conds)
+        fits = np.array([v is not None for v in fast_rows])[pair]
+        fits &= np.array([t < INT64_MAX for t in conds.threshold.tolist()], bool)
+        step = max(1, CHUNK_CELLS // max(len(self), 1))
+        for exact in (False, True):
+            group = np.flatnonzero(fits != exact)
+            for lo in range(0, len(group), step):
+                rows = group[lo:lo + step]
+                source = exact_rows if exact else fast_rows
+                matrix = np.stack([source[k] for k in pair[rows]])
+                thr = conds.threshold[rows]
+                thr = (thr if exact else thr.astype(np.int64))[:, None]
+                op = conds.op[rows]
+                out = np.empty(matrix.shape, bool)
+                for o in np.unique(op).tolist():
+                    sel = op == o
+                    out[sel] = OP_UFUNCS[o](matrix[sel], thr[sel])
+                yield rows, out
+
+    def cond_true(self, conds: ConditionSet) -> np.ndarray:
+        """(conditions, checks) bool: _compare(_currentValue) at every check"""
+        out = np.empty((len(conds), len(self)), bool)
+        for rows, chunk in self.iter_cond_true(conds):
+            out[rows] = chunk
+        return out
+
+    # -------------------------------------------------------------------------
+    # Resolution
+    # -------------------------------------------------------------------------
+
+    def resolve(self, conds: ConditionSet, created, close) -> Resolution:
+        """
+        resolveMarket at every check from creation on, for markets created at
+        `created` and closing at `close` (seconds, per condition).
+        """
+        n, checks = len(conds), len(self)
+        start = np.searchsorted(self.times, np.asarray(created, np.int64), side="left")
+        at_close = np.searchsorted(self.times, np.asarray(close, np.int64), side="left")
+        outcome = np.full(n, -1, np.int8)
+        resolved_at = np.full(n, -1, np.int64)
+        early = np.zeros(n, bool)
+        k = np.arange(checks)
+        for rows, hit in self.iter_cond_true(conds):
+            s, c = start[rows, None], at_close[rows]
+            # Early close: condTrue at a check before close
+            live = hit & (k >= s) & (k < c[:, None]) & conds.can_close[rows, None]
+            first = np.where(live.any(axis=1), live.argmax(axis=1), -1)
+            # Otherwise the first check at or after close decides
+            closed = c < checks
+            final = np.zeros(len(c), bool)
+            final[closed] = hit[np.flatnonzero(closed), c[closed]]
+            is_early = first >= 0
+            outcome[rows] = np.where(is_early | final, 1, np.where(closed, 0, -1))
+            resolved_at[rows] = np.where(is_early, first, np.where(closed, c, -1))
+            early[rows] = is_early
+        return Resolution(outcome, resolved_at, early)
+
+    def hit_rates(self, conds: ConditionSet, duration: int) -> Tuple[np.ndarray, int]:
+        """
+        (P(YES) per condition, markets per condition) for a market opened at
+        every check and closing `duration` seconds later, over every opening
+        whose close falls inside the series.
+        """
+        at_close = np.searchsorted(self.times, self.times + duration, side="left")
+        starts = np.flatnonzero(at_close < len(self))
+        c = at_close[starts]
+        rates = np.zeros(len(conds))
+        if len(starts) == 0:
+            return rates, 0
+        k = np.arange(len(self))
+        for rows, hit in self.iter_cond_true(conds):
+            # Next check at or after each index where the condition holds
+            next_hit = np.where(hit, k, len(self))
+            next_hit = np.minimum.accumulate(next_hit[:, ::-1], axis=1)[:, ::-1]
+            any_time = next_hit[:, starts] <= c
+            at_end = hit[:, c]
+            yes = np.where(conds.can_close[rows, None], any_time, at_end)
+            rates[rows] = yes.mean(axis=1)
+        return rates, len(starts)
+
+
+# =============================================================================
+# Seeding (_seedLiquidity + _buyToSkewOdds)
+# =============================================================================
+
+@dataclass
+class SeedResult:
+    """Fresh pools after the skew swap (object arrays of Python ints)"""
+    yes_reserve: np.ndarray
+    no_reserve: np.ndarray
+    shares_out: np.ndarray      # Split shares + swap output sent to SwapParams.recipient
+    p_yes_bps: np.ndarray       # NO * 10000 / (YES + NO)
+    impact_bps: np.ndarray      # Against the 50/50 seed (PMFeeHook caps hooked pools)
+
+
+def _objects(*arrays):
+    return [np.asarray(a, dtype=object) for a in np.broadcast_arrays(*arrays)]
+
+
+def _skew(seed, swap, yes_for_no, fee_bps):
+    # Fresh pool holds `seed` of each side; buyYes swaps the split NO into YES
+    amount_in_with_fee = swap * (BPS - fee_bps)
+    out = amount_in_with_fee * seed // (seed * BPS + amount_in_with_fee)
+    traded = np.where(yes_for_no, seed + swap, seed - out)       # YES reserve
+    other = np.where(yes_for_no, seed - out, seed + swap)        # NO reserve
+    return traded, other, out
+
+
+def skew_pools(seed, swap, yes_for_no, fee_bps) -> SeedResult:
+    """
+    splitAndAddLiquidity(seed) then buyYes / buyNo(swap) on the new pool
+    (yes_for_no = True buys NO, as SwapParams). fee_bps is the pool fee tier,
+    or PMFeeHook's fee for the fresh pool when feeOrHook is a hook.
+    """
+    seed, swap, fee_bps = _objects(seed, swap, fee_bps)
+    yes_for_no = np.broadcast_to(np.asarray(yes_for_no, bool), seed.shape)
+    if np.any(seed <= 0):
+        raise ValueError("seed collateral must be positive (AmountZero)")
+    yes, no, out = _skew(seed, swap, yes_for_no, fee_bps)
+    p = no * BPS // (yes + no)
+    return SeedResult(yes, no, np.where(swap > 0, swap + out, 0), p, np.abs(p - 5000))
+
+
+def calibrate_swaps(seed, target_bps, fee_bps) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (collateralForSwap, yesForNo): the smallest swap per market that moves
+    P(YES) of a fresh `seed` pool to at least target_bps (buyYes) or at most
+    it (buyNo). Targets are clamped to [1, 9999]; 5000 needs no swap.
+    """
+    seed, target, fee_bps = _objects(seed, np.clip(np.asarray(target_bps, np.int64), 1, 9999),
+                                     fee_bps)
+    yes_for_no = target < 5000
+    g = (BPS - fee_bps.astype(np.float64)) / BPS
+    # Closed form in floats: with u = seed + x, P = u / (seed^2 / (seed + g x) + u)
+    p = np.where(yes_for_no, BPS - target, target).astype(np.float64) / BPS
+    s = seed.astype(np.float64)
+    a, b, c = (1 - p) * g, (1 - p) * s * (1 - g), -p * s * s
+    u = (-b + np.sqrt(b * b - 4 * a * c)) / (2 * a)
+    hi = np.array([int(x) for x in np.maximum(u - s, 0) * 1.001 + 2], dtype=object)
+
+    def reached(x):
+        yes, no, _ = _skew(seed, x, yes_for_no, fee_bps)
+        p = no * BPS // (yes + no)
+        return np.where(yes_for_no, p <= target, p >= target)
+
+    # Widen any bracket the float estimate missed, then bisect exactly
+    while True:
+        short = ~reached(hi)
+        if not short.any():
+            break
+        hi = np.where(short, hi * 2, hi)
+    lo = np.zeros(len(hi), dtype=object)
+    done = target == 5000
+    hi = np.where(done, 0, hi)
+    while True:
+        open_ = hi - lo > 1
+        if not open_.any():
+            break
+        mid = (lo + hi) // 2
+        ok = reached(mid)
+        hi = np.where(open_ & ok, mid, hi)
+        lo = np.where(open_ & ~ok, mid, lo)
+    # lo never reaches the target (except 0 at 5000), hi always does
+    swap = np.where(done | reached(lo), lo, hi)
+    return swap, yes_for_no
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def _compare(value: int, op: int, threshold: int) -> bool:
+    if op == OP_LT:
+        return value < threshold
+    if op == OP_GT:
+        return value > threshold
+    if op == OP_LTE:
+        return value <= threshold
+    if op == OP_GTE:
+        return value >= threshold
+    if op == OP_EQ:
+        return value == threshold
+    return value != threshold
+
+
+def _current_value(columns, k: int, a: int, b: int) -> int:
+    if b < 0:
+        return int(columns[a][k])
+    x, y = int(columns[a][k]), int(columns[b][k])
+    return UINT256_MAX if y == 0 else x * WAD // y
+
+
+def synthetic_targets(n_checks: int, seed: int = 0, step: int = 3600,
+                      start: int = 1_700_000_000) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Hourly reads of a few typical targets: two Chainlink-style 8-decimal
+    prices (geometric random walks), a wei TVL and a wei balance that is
+    sometimes drained to zero (undefined ratios).
+    """
+    rng = np.random.default_rng(seed)
+    t = start + step * np.arange(n_checks, dtype=np.int64)
+    walk = np.cumsum(rng.normal(0, 0.01, (3, n_checks)), axis=1)
+    eth = (2_500e8 * np.exp(walk[0])).astype(np.int64)
+    btc = (60_000e8 * np.exp(0.6 * walk[0] + 0.8 * walk[1])).astype(np.int64)
+    # Wei amounts past int64 exercise the Python-int path
+    tvl = (1e6 * np.exp(0.5 * walk[2])).astype(np.int64).astype(object) * WAD
+    balance = (rng.gamma(2.0, 50.0, n_checks) * 1e3).astype(np.int64).astype(object) * 10**15
+    balance[rng.random(n_checks) < 0.02] = 0
+    return t, {"ethUsd": eth, "btcUsd": btc, "tvl": tvl, "treasury": balance}
+
+
+def random_conditions(engine: ConditionEngine, n: int, seed: int = 0) -> ConditionSet:
+    """Thresholds drawn near each target's observed values, every op, a third ratios"""
+    rng = np.random.default_rng(seed)
+    names = list(engine.names)
+    specs = []
+    for _ in range(n):
+        if rng.random() < 1 / 3:
+            i, j = rng.choice(len(names), 2, replace=False)
+            target = (names[i], names[j])
+            values = engine.values(engine.names[names[i]], engine.names[names[j]])
+        else:
+            target = names[rng.integers(len(names))]
+            values = engine.columns[engine.names[target]]
+        op = int(rng.integers(6))
+        # EQ / NEQ against a value the series actually takes
+        threshold = int(values[rng.integers(len(values))])
+        if op < OP_EQ and threshold != UINT256_MAX:
+            threshold = int(threshold * rng.uniform(0.8, 1.25))
+        specs.append((target, op, threshold, bool(rng.random() < 0.5)))
+    return engine.conditions(specs)
+
+
+def check_against_scalar(n_checks: int = 400, n_conditions: int = 300, seed: int = 6) -> int:
+    """
+    Batched condTrue / resolve / hit rates / seeding vs direct scalar replays
+    of _currentValue, _compare, resolveMarket and exact_amm_buy. Returns the
+    number of mismatches.
+    """
+    t, targets = synthetic_targets(n_checks, seed)
+    engine = ConditionEngine(t, targets)
+    conds = random_conditions(engine, n_conditions, seed)
+    rng = np.random.default_rng(seed)
+    created = rng.integers(t[0], t[-1], n_conditions)
+    close = created + rng.integers(0, 200 * 3600, n_conditions)
+    duration = 48 * 3600
+
+    hit = engine.cond_true(conds)
+    res = engine.resolve(conds, created, close)
+    rates, _ = engine.hit_rates(conds, duration)
+    ts = t.tolist()
+    mismatches = 0
+    for i in range(n_conditions):
+        a, b, op = int(conds.target_a[i]), int(conds.target_b[i]), int(conds.op[i])
+        thr, can_close = int(conds.threshold[i]), bool(conds.can_close[i])
+        cond = [_compare(_current_value(engine.columns, k, a, b), op, thr)
+                for k in range(n_checks)]
+        mismatches += cond != hit[i].tolist()
+
+        # resolveMarket at every check from creation on
+        expected = (-1, -1, False)
+        for k in range(n_checks):
+            if ts[k] < created[i]:
+                continue
+            if ts[k] < close[i]:
+                if cond[k] and can_close:
+                    expected = (1, k, True)
+                    break
+                continue            # Pending
+            expected = (int(cond[k]), k, False)
+            break
+        got = (int(res.outcome[i]), int(res.resolved_at[i]), bool(res.early[i]))
+        mismatches += got != expected
+
+        yes = opened = 0
+        for s in range(n_checks):
+            c = next((k for k in range(s, n_checks) if ts[k] >= ts[s] + duration), None)
+            if c is None:
+                break
+            opened += 1
+            yes += any(cond[s:c + 1]) if can_close else cond[c]
+        mismatches += abs(rates[i] - yes / opened) > 1e-12
+
+    seed_amount = rng.integers(1, 10**6, 200).astype(object) * 10**15
+    swap = rng.integers(0, 10**6, 200).astype(object) * 10**15
+    buy_no = rng.random(200) < 0.5
+    fee = rng.integers(0, 300, 200)
+    seeded = skew_pools(seed_amount, swap, buy_no, fee)
+    for k in range(200):
+        s, x = int(seed_amount[k]), int(swap[k])
+        if x == 0:
+            continue
+        shares, _, _ = exact_amm_buy(PoolState(s, s), x, not buy_no[k], int(fee[k]))
+        mismatches += shares != seeded.shares_out[k]
+
+    target = rng.integers(1, 10000, 200)
+    calibrated, side = calibrate_swaps(seed_amount, target, fee)
+    p = skew_pools(seed_amount, calibrated, side, fee).p_yes_bps
+    short = skew_pools(seed_amount, np.maximum(calibrated - 1, 0), side, fee).p_yes_bps
+    for k in range(200):
+        goal = int(target[k])
+        if goal == 5000:
+            mismatches += calibrated[k] != 0
+        elif side[k]:
+            mismatches += not (p[k] <= goal < short[k])
+        else:
+            mismatches += not (p[k] >= goal > short[k])
+    return mismatches
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def main(n_conditions: int = 5_000, n_checks: int = 8_760):
+    print_header("Resolver Conditions: Batched vs Scalar Replay")
+    mismatches = check_against_scalar()
+    print(f"\n   300 conditions x 400 checks, resolve, hit rates, 400 seeded pools: "
+          f"{mismatches} mismatches")
+
+    print_header(f"{n_conditions:,} Conditions x {n_checks:,} Hourly Checks")
+    t, targets = synthetic_targets(n_checks, seed=1)
+    engine = ConditionEngine(t, targets)
+    conds = random_conditions(engine, n_conditions, seed=1)
+    ratio = int(conds.is_ratio.sum())
+    print(f"\n   {n_conditions - ratio:,} numeric + {ratio:,} ratio conditions over "
+          f"{', '.join(engine.names)}")
+
+    t0 = time.perf_counter()
+    cells = sum(chunk.sum() for _, chunk in engine.iter_cond_true(conds))
+    eval_s = time.perf_counter() - t0
+    evaluated = n_conditions * n_checks
+    print(f"   condTrue at every check: {evaluated / 1e6:.1f}M evaluations in {eval_s:.2f}s "
+          f"({evaluated / eval_s / 1e6:.0f}M/s), {cells / evaluated * 100:.1f}% true")
+
+    rng = np.random.default_rng(1)
+    created = rng.integers(t[0], t[-1], n_conditions)
+    close = created + rng.integers(24, 30 * 24, n_conditions) * 3600
+    t0 = time.perf_counter()
+    res = engine.resolve(conds, created, close)
+    resolve_s = time.perf_counter() - t0
+    print(f"   resolveMarket replay: {resolve_s * 1e3:.0f} ms -> "
+          f"{(res.outcome == 1).sum():,} YES ({res.early.sum():,} early), "
+          f"{(res.outcome == 0).sum():,} NO, {(res.outcome == -1).sum():,} pending")
+
+    duration = 7 * 86400
+    t0 = time.perf_counter()
+    rates, opened = engine.hit_rates(conds, duration)
+    rates_s = time.perf_counter() - t0
+    print(f"   7-day hit rates over {opened:,} openings each: {rates_s:.2f}s "
+          f"({n_conditions * opened / rates_s / 1e6:.0f}M markets/s)")
+
+    print_header("Seeding Bulk-Created Markets at Their Backtested Odds")
+    # Certain outcomes would need unbounded swaps; seed them at 5% / 95%
+    target = np.clip(np.rint(rates * BPS).astype(np.int64), 500, 9500)
+    seed_amount = np.full(n_conditions, 100 * WAD, dtype=object)
+    fee = 30
+    t0 = time.perf_counter()
+    swap, buy_no = calibrate_swaps(seed_amount, target, fee)
+    calibrate_s = time.perf_counter() - t0
+    seeded = skew_pools(seed_amount, swap, buy_no, fee)
+    error = np.abs(seeded.p_yes_bps - target).astype(np.int64)
+    print(f"\n   Calibrated {n_conditions:,} swaps (100 wstETH seed, 30 bps pools) in "
+          f"{calibrate_s:.2f}s; max |P(YES) - target| {error.max()} bps, "
+          f"{(target != np.rint(rates * BPS)).sum():,} targets clamped to 5-95%")
+    print(f"\n{'Target P(YES)':>14} | {'Markets':>7} | {'Mean swap':>10} | {'buyNo':>6}")
+    print("-" * 48)
+    swap_eth = swap.astype(np.float64) / 1e18
+    for lo, hi in ((500, 1000), (1000, 4000), (4000, 6000), (6000, 9000), (9000, 9501)):
+        sel = (target >= lo) & (target < hi)
+        if sel.any():
+            print(f"{lo / 100:>5.0f}-{min(hi, 10000) / 100:>3.0f}%     | {sel.sum():>7,} | "
+                  f"{swap_eth[sel].mean():>10.2f} | {buy_no[sel].mean() * 100:>5.0f}%")
+    i = int(np.argmax(conds.is_ratio))
+    names = list(engine.names)
+    observable = f"{names[conds.target_a[i]]}/{names[conds.target_b[i]]}"
+    text = describe(observable, int(conds.op[i]), int(conds.threshold[i]), int(close[i]),
+                    bool(conds.can_close[i]))
+    print(f'\n   e.g. "{text}"')
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
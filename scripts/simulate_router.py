@@ -9,10 +9,13 @@ Models:
 - 30% vault depletion cap per fill
 """
 
-from dataclasses import dataclass
-from typing import Tuple, Optional
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Callable, Tuple, Optional
 import math
 
+from simulate_fee_hook import FeeConfig, fee_table
+
 # =============================================================================
 # PMFeeHook Default Config
 # =============================================================================
@@ -25,6 +28,13 @@ SKEW_REF_BPS = 4000       # 90/10 triggers max
 ASYMMETRIC_FEE_BPS = 20   # 0.20%
 FEE_CAP_BPS = 300         # 3%
 
+# The constants above as a PMFeeHook.Config; the router model has no close window
+ROUTER_FEE_CONFIG = FeeConfig(
+    min_fee_bps=MIN_FEE_BPS, max_fee_bps=MAX_FEE_BPS, max_skew_fee_bps=MAX_SKEW_FEE_BPS,
+    fee_cap_bps=FEE_CAP_BPS, skew_ref_bps=SKEW_REF_BPS, asymmetric_fee_bps=ASYMMETRIC_FEE_BPS,
+    close_window=0, max_price_impact_bps=MAX_PRICE_IMPACT_BPS, bootstrap_window=BOOTSTRAP_WINDOW,
+)
+
 # =============================================================================
 # PMHookRouter Default Config
 # =============================================================================
@@ -39,6 +49,18 @@ MAX_VAULT_DEPLETION_PCT = 30   # 30%
 # Simulation Classes
 # =============================================================================
 
+def reserves_p_yes(yes_reserve: float, no_reserve: float) -> float:
+    """P(YES) = NO / (YES + NO), 0.5 for an empty pool"""
+    total = yes_reserve + no_reserve
+    if total == 0:
+        return 0.5
+    return no_reserve / total
+
+
+def reserves_p_yes_bps(yes_reserve: float, no_reserve: float) -> int:
+    return int(reserves_p_yes(yes_reserve, no_reserve) * 10000)
+
+
 @dataclass
 class PoolState:
     """AMM pool state (YES/NO reserves)"""
@@ -52,13 +74,11 @@ class PoolState:
     @property
     def p_yes(self) -> float:
         """P(YES) = NO / (YES + NO)"""
-        if self.total == 0:
-            return 0.5
-        return self.no_reserve / self.total
+        return reserves_p_yes(self.yes_reserve, self.no_reserve)
 
     @property
     def p_yes_bps(self) -> int:
-        return int(self.p_yes * 10000)
+        return reserves_p_yes_bps(self.yes_reserve, self.no_reserve)
 
 
 @dataclass
@@ -100,8 +120,19 @@ class TradeResult:
 # Fee Calculation (PMFeeHook logic)
 # =============================================================================
 
-def calculate_hook_fee(pool: PoolState, elapsed_seconds: int = 0) -> int:
-    """Calculate dynamic AMM fee based on hook config"""
+def calculate_hook_fee(pool: PoolState, elapsed_seconds: int = 0,
+                       config: Optional[FeeConfig] = None) -> int:
+    """
+    Calculate dynamic AMM fee based on hook config.
+
+    With a FeeConfig, the fee is read from that config's lazily built lookup
+    tables (LRU-cached, contract integer rounding); pass ROUTER_FEE_CONFIG for
+    table-backed fees of the constants above. Without one, the float model of
+    those constants is used.
+    """
+    if config is not None:
+        return fee_table(config).fee(pool.yes_reserve, pool.no_reserve, elapsed_seconds)
+
     # Bootstrap fee (linear decay)
     if elapsed_seconds < BOOTSTRAP_WINDOW:
         progress = elapsed_seconds / BOOTSTRAP_WINDOW
@@ -177,8 +208,7 @@ def simulate_amm_buy(pool: PoolState, collateral_in: float, buy_yes: bool,
         new_yes = pool.yes_reserve + amount_in
         new_no = pool.no_reserve - swap_out
 
-    new_pool = PoolState(new_yes, new_no)
-    p_after = new_pool.p_yes_bps
+    p_after = reserves_p_yes_bps(new_yes, new_no)
 
     price_impact = abs(p_after - p_before)
 
@@ -188,6 +218,56 @@ def simulate_amm_buy(pool: PoolState, collateral_in: float, buy_yes: bool,
     return shares_out, price_impact, would_succeed
 
 
+def impact_target(p_before_bps: int, buy_yes: bool, max_impact_bps: int) -> float:
+    """
+    Probability of the input-side outcome at which price impact hits the cap.
+
+    Buying YES pushes P(YES) up, and impact floor(p * 10000) - p_before stays
+    within the cap while P(YES) < (p_before + cap + 1) / 10000. Buying NO pushes
+    P(NO) up, with P(YES) >= (p_before - cap) / 10000 at the cap.
+    """
+    if buy_yes:
+        return (p_before_bps + max_impact_bps + 1) / 10000
+    return (10000 - p_before_bps + max_impact_bps) / 10000
+
+
+def max_amm_collateral_under_impact(pool: PoolState, buy_yes: bool, fee_bps: int,
+                                    max_impact_bps: int = MAX_PRICE_IMPACT_BPS) -> float:
+    """
+    Closed-form inverse of the AMM price impact curve.
+
+    With rIn the reserve being paid in, rOut the one paid out and g the
+    post-fee fraction, buying with c collateral leaves
+        rOut' = rIn * rOut / (rIn + g*c),  rIn' = rIn + c
+    so the input-side probability rIn' / (rIn' + rOut') reaches a target T when
+        (1 - T) * (rIn + c) * (rIn + g*c) = T * rIn * rOut
+    which is a quadratic in c with a single positive root.
+
+    Returns: max collateral (inf if the cap can never bind, 0 if no liquidity)
+    """
+    if pool.yes_reserve == 0 or pool.no_reserve == 0 or max_impact_bps == 0:
+        return 0
+
+    target = impact_target(pool.p_yes_bps, buy_yes, max_impact_bps)
+    if target >= 1:
+        return math.inf
+
+    if buy_yes:
+        reserve_in, reserve_out = pool.no_reserve, pool.yes_reserve
+    else:
+        reserve_in, reserve_out = pool.yes_reserve, pool.no_reserve
+
+    g = (10000 - fee_bps) / 10000
+    a = (1 - target) * g
+    b = (1 - target) * reserve_in * (1 + g)
+    c = (1 - target) * reserve_in * reserve_in - target * reserve_in * reserve_out
+    if c >= 0:
+        return 0  # Already at/over the target probability
+
+    # Cancellation-free form of (-b + sqrt(b^2 - 4ac)) / 2a, also valid for a == 0
+    return -2 * c / (b + math.sqrt(b * b - 4 * a * c))
+
+
 # =============================================================================
 # Vault OTC Simulation
 # =============================================================================
@@ -260,26 +340,63 @@ def simulate_vault_otc(vault: VaultState, collateral_in: float, buy_yes: bool,
     return shares_out, collateral_used, shares_out > 0
 
 
+# =============================================================================
+# Engine Selection
+# =============================================================================
+
+@dataclass(frozen=True)
+class Engine:
+    """Venue pricing functions used by simulate_trade (float or exact integer)"""
+    name: str
+    p_yes_bps: Callable[[PoolState], int]
+    hook_fee: Callable[..., int]
+    amm_buy: Callable[..., Tuple[float, int, bool]]
+    vault_otc: Callable[..., Tuple[float, float, bool]]
+
+
+FLOAT_ENGINE = Engine(
+    name="float",
+    p_yes_bps=lambda pool: pool.p_yes_bps,
+    hook_fee=calculate_hook_fee,
+    amm_buy=simulate_amm_buy,
+    vault_otc=simulate_vault_otc,
+)
+
+
+def fee_config_engine(cfg: FeeConfig, engine: Engine = FLOAT_ENGINE) -> Engine:
+    """`engine` with hook fees read from `cfg`'s cached lookup tables"""
+    return replace(engine, name=f"{engine.name}+fees", hook_fee=partial(calculate_hook_fee,
+                                                                           config=cfg))
+
+
 # =============================================================================
 # Full Trade Simulation
 # =============================================================================
 
 def simulate_trade(pool: PoolState, vault: VaultState, collateral_in: float,
                    buy_yes: bool, elapsed_seconds: int = 3600,
-                   hours_to_close: float = 168) -> TradeResult:
+                   hours_to_close: float = 168,
+                   engine: Engine = FLOAT_ENGINE,
+                   twap_p_yes_bps: Optional[int] = None) -> TradeResult:
     """
     Simulate full trade through router logic.
+
+    twap_p_yes_bps prices the vault leg (see simulate_twap.TwapOracle); None
+    assumes TWAP ~ spot, 0 means no TWAP yet (vault OTC unavailable).
     """
-    fee_bps = calculate_hook_fee(pool, elapsed_seconds)
-    twap_p_yes = pool.p_yes_bps  # Assume TWAP ~ spot for simulation
+    fee_bps = engine.hook_fee(pool, elapsed_seconds)
+    twap_p_yes = engine.p_yes_bps(pool) if twap_p_yes_bps is None else twap_p_yes_bps
 
     # Try AMM
-    amm_shares, amm_impact, amm_ok = simulate_amm_buy(pool, collateral_in, buy_yes, fee_bps)
+    amm_shares, amm_impact, amm_ok = engine.amm_buy(pool, collateral_in, buy_yes, fee_bps)
 
     # Try Vault OTC
-    otc_shares, otc_collateral, otc_ok = simulate_vault_otc(
-        vault, collateral_in, buy_yes, twap_p_yes, hours_to_close
-    )
+    if twap_p_yes:
+        otc_shares, otc_collateral, otc_ok = engine.vault_otc(
+            vault, collateral_in, buy_yes, twap_p_yes, hours_to_close
+        )
+    else:
+        otc_shares, otc_collateral, otc_ok = 0, 0, False
 
     # Determine best execution
     if not amm_ok and not otc_ok:
@@ -302,7 +419,7 @@ def simulate_trade(pool: PoolState, vault: VaultState, collateral_in: float,
             remaining = collateral_in - otc_collateral
             if remaining > 0:
                 # Fill remainder with AMM
-                amm2_shares, amm2_impact, amm2_ok = simulate_amm_buy(
+                amm2_shares, amm2_impact, amm2_ok = engine.amm_buy(
                     pool, remaining, buy_yes, fee_bps
                 )
                 if amm2_ok:
@@ -364,7 +481,11 @@ def print_header(title: str):
     print('='*80)
 
 
-def run_simulations():
+def run_simulations(results=None):
+    """
+    Print the default-settings tables. `results` (a results.ResultWriter)
+    additionally receives every simulate_trade call as a row.
+    """
     print("\n" + "="*80)
     print(" PMHookRouter + PMFeeHook Simulation")
     print(" Default Settings Analysis")
@@ -392,6 +513,8 @@ def run_simulations():
                 continue
 
             result = simulate_trade(pool, vault, size, buy_yes=True, elapsed_seconds=3600)
+            if results is not None:
+                results.append_trade(result, pool, vault, size, True, 3600)
 
             status = "OK" if result.succeeded else f"REJECTED"
             impact_str = f"{result.price_impact_bps}bps"
@@ -414,20 +537,15 @@ def run_simulations():
     for liq in liquidity_levels:
         pool = PoolState(liq/2, liq/2)
 
-        # Binary search for max trade size
-        lo, hi = 1, liq * 3
-        max_trade = 0
-        max_impact = 0
-
-        while lo <= hi:
-            mid = (lo + hi) // 2
-            _, impact, ok = simulate_amm_buy(pool, mid, True, MIN_FEE_BPS)
-            if ok:
-                max_trade = mid
-                max_impact = impact
-                lo = mid + 1
-            else:
-                hi = mid - 1
+        # Closed-form max trade size, floored to whole dollars. The float root can
+        # land a hair past the cap edge, so step back once if the check fails.
+        max_trade = int(min(max_amm_collateral_under_impact(pool, True, MIN_FEE_BPS), liq * 3))
+        _, max_impact, ok = simulate_amm_buy(pool, max_trade, True, MIN_FEE_BPS)
+        if not ok and max_trade > 0:
+            max_trade -= 1
+            _, max_impact, ok = simulate_amm_buy(pool, max_trade, True, MIN_FEE_BPS)
+        if not ok:
+            max_trade, max_impact = 0, 0
 
         pct = (max_trade / liq) * 100 if liq > 0 else 0
         print(f"${liq:<11} | ${max_trade:<11} | {pct:.1f}%{'':<14} | {max_impact}bps")
@@ -625,8 +743,8 @@ if __name__ == "__main__":
     run_simulations()
 
 
-def run_multivenue_demo():
-    """Demonstrate multi-venue execution in detail"""
+def run_multivenue_demo(results=None):
+    """Demonstrate multi-venue execution in detail (rows also go to `results`)"""
     print_header("8. Multi-Venue Execution Deep Dive")
     
     pool = PoolState(500, 500)  # $1000 pool
@@ -671,6 +789,17 @@ def run_multivenue_demo():
         else:
             source = "rejected"
         
+        if results is not None:
+            result = TradeResult(
+                venue=source,
+                shares_out=total,
+                collateral_in=size,
+                effective_price_bps=int(size * 10000 / total) if total > 0 else 0,
+                price_impact_bps=amm_impact,
+                fee_bps=fee_bps
+            )
+            results.append_trade(result, pool, vault, size, True, 3600)
+
         vault_str = f"{otc_shares:.1f} for ${otc_coll:.1f}" if otc_ok else "-"
         amm_str = f"{amm_shares:.1f} ({amm_impact}bps)" if amm_shares > 0 else "-"
         total_str = f"{total:.1f}" if total > 0 else "-"
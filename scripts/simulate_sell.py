@@ -0,0 +1,700 @@
+#!/usr/bin/env python3
+"""
+Sell-side routing: MasterRouter bid pools -> PMHookRouter.sellWithBootstrap.
+
+Venue order (MasterRouter.sellWithSweep, PMHookQuoter.quoteSellWithBootstrap):
+1. Bid pools, highest price first down to min_price_bps. A pool is either
+   taken whole or partially filled with collateral rounded up.
+2. Vault OTC, for the scarce side only and outside the close window. The vault
+   pays from the rebalance budget at TWAP minus a 2% spread (10 bps minimum),
+   capped at 30% of its opposite-side inventory.
+3. AMM swap-then-merge. Swap just enough shares that the swap output matches
+   the shares kept, then merge the pairs 1:1 into collateral.
+
+The swap amount X is the positive root of (_calcSwapAmountForMerge)
+
+    fm*X^2 + (rIn*10000 + fm*(rOut - S))*X - S*rIn*10000 = 0,   fm = 10000 - fee
+
+The exact helpers mirror the contract (floor Newton sqrt, overflow guards
+return 0). The float and NumPy solvers use the cancellation-free form of the
+root, so a whole array of positions is quoted per call without Python loops.
+
+Requires: numpy
+"""
+
+import math
+import random
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from simulate_router import (
+    MAX_PRICE_IMPACT_BPS, FLOAT_ENGINE, PoolState, VaultState, print_header, reserves_p_yes_bps,
+)
+from simulate_exact import (
+    WAD, BPS, UINT256_MAX, ceil_div, exact_hook_fee, exact_p_yes_bps,
+)
+from simulate_batch import _f64, _flat, p_yes_bps_kernel, _run_chunked
+
+# =============================================================================
+# Constants (mirror PMHookRouter.sellWithBootstrap)
+# =============================================================================
+SELL_SPREAD_DIVISOR = 50        # 2% of the share price
+MIN_SELL_SPREAD_BPS = 10        # 0.1% floor
+CLOSE_WINDOW_SECONDS = 3600     # _isInCloseWindow default
+HALTED_FEE_BPS = 10000          # Pool fee >= 100% signals a halted market
+
+# price_bps -> collateral depth of the bid pool at that price (one side)
+BidBook = Dict[int, float]
+
+
+# =============================================================================
+# Swap-for-Merge Solver
+# =============================================================================
+
+def newton_sqrt(x: int) -> int:
+    """The Newton loop in _calcSwapAmountForMerge (returns floor(sqrt(x)))"""
+    if x == 0:
+        return 0
+    r = (x >> 1) + 1
+    while True:
+        r_new = (r + x // r) >> 1
+        if r_new >= r:
+            return r
+        r = r_new
+
+
+def exact_swap_amount_for_merge(shares_in: int, r_in: int, r_out: int, fee_bps: int) -> int:
+    """Integer _calcSwapAmountForMerge; every overflow guard returns 0"""
+    if shares_in == 0 or r_in == 0 or r_out == 0 or fee_bps >= BPS:
+        return 0
+    fm = BPS - fee_bps
+    if r_in > UINT256_MAX // BPS:
+        return 0
+    r_in_10k = r_in * BPS
+
+    # b = rIn * 10000 + fm * (rOut - sharesIn), sign tracked separately
+    if r_out > shares_in:
+        b, b_positive = r_in_10k + fm * (r_out - shares_in), True
+    else:
+        diff = shares_in - r_out
+        if diff and fm > UINT256_MAX // diff:
+            return 0
+        fm_diff = fm * diff
+        if fm_diff > r_in_10k:
+            b, b_positive = fm_diff - r_in_10k, False
+        else:
+            b, b_positive = r_in_10k - fm_diff, True
+
+    if shares_in > UINT256_MAX // r_in_10k:
+        return 0
+    abs_c = shares_in * r_in_10k
+    if b and b > UINT256_MAX // b:
+        return 0
+    if abs_c and fm > UINT256_MAX // abs_c:
+        return 0
+    if fm * abs_c > UINT256_MAX >> 2:
+        return 0
+    discriminant = b * b + 4 * fm * abs_c
+    if discriminant > UINT256_MAX:
+        return 0
+
+    # math.isqrt == newton_sqrt (floor); main() checks this
+    root = math.isqrt(discriminant)
+    if b_positive:
+        numerator = root - b if root > b else 0
+    else:
+        numerator = root + b
+
+    swap = numerator // (2 * fm)
+    return shares_in if swap > shares_in else swap
+
+
+def swap_amount_for_merge(shares_in: float, r_in: float, r_out: float, fee_bps: int) -> float:
+    """Float positive root; b > 0 uses 2|c| / (b + sqrt(D)) to avoid cancellation"""
+    if shares_in <= 0 or r_in <= 0 or r_out <= 0 or fee_bps >= 10000:
+        return 0.0
+    fm = 10000 - fee_bps
+    b = r_in * 10000 + fm * (r_out - shares_in)
+    abs_c = shares_in * r_in * 10000
+    root = math.sqrt(b * b + 4 * fm * abs_c)
+    swap = 2 * abs_c / (b + root) if b > 0 else (root - b) / (2 * fm)
+    return min(swap, shares_in)
+
+
+# =============================================================================
+# AMM Sell (swap-then-merge)
+# =============================================================================
+
+def simulate_amm_sell(pool: PoolState, shares_in: float, sell_yes: bool,
+                      fee_bps: int) -> Tuple[float, float, int, bool]:
+    """
+    Swap part of the position for the opposite side, merge the pairs.
+
+    A zero or full swap amount skips the AMM (the shares are returned); a
+    swap over the impact limit reverts the whole sell.
+
+    Returns: (collateral_out, shares_swapped, price_impact_bps, would_succeed)
+    """
+    yes, no = pool.yes_reserve, pool.no_reserve
+    r_in, r_out = (yes, no) if sell_yes else (no, yes)
+
+    swap = swap_amount_for_merge(shares_in, r_in, r_out, fee_bps)
+    if swap == 0 or swap >= shares_in:
+        return 0, 0, 0, True
+
+    amount_in_with_fee = swap * (10000 - fee_bps)
+    swap_out = amount_in_with_fee * r_out / (r_in * 10000 + amount_in_with_fee)
+    if swap_out == 0:
+        return 0, 0, 0, False  # swapExactIn requires at least 1 out
+
+    if sell_yes:
+        p_after = reserves_p_yes_bps(yes + swap, no - swap_out)
+    else:
+        p_after = reserves_p_yes_bps(yes - swap_out, no + swap)
+    price_impact = abs(p_after - reserves_p_yes_bps(yes, no))
+
+    collateral_out = min(shares_in - swap, swap_out)
+    return collateral_out, swap, price_impact, price_impact <= MAX_PRICE_IMPACT_BPS
+
+
+def exact_amm_sell(pool: PoolState, shares_in: int, sell_yes: bool,
+                   fee_bps: int) -> Tuple[int, int, int, bool]:
+    """
+    Integer simulate_amm_sell (_quoteAMMSell rounding).
+
+    Returns: (collateral_out, shares_swapped, price_impact_bps, would_succeed)
+    """
+    yes, no = pool.yes_reserve, pool.no_reserve
+    r_in, r_out = (yes, no) if sell_yes else (no, yes)
+
+    swap = exact_swap_amount_for_merge(shares_in, r_in, r_out, fee_bps)
+    if swap == 0 or swap >= shares_in:
+        return 0, 0, 0, True
+
+    amount_in_with_fee = swap * (BPS - fee_bps)
+    swap_out = amount_in_with_fee * r_out // (r_in * BPS + amount_in_with_fee)
+    if swap_out == 0:
+        return 0, 0, 0, False
+
+    # swap_out > 0 implies nonzero reserves, before and after
+    p_before = no * BPS // (yes + no)
+    if sell_yes:
+        yes_after, no_after = yes + swap, no - swap_out
+    else:
+        yes_after, no_after = yes - swap_out, no + swap
+    p_after = no_after * BPS // (yes_after + no_after)
+    price_impact = p_after - p_before if p_after > p_before else p_before - p_after
+
+    kept = shares_in - swap
+    collateral_out = kept if kept < swap_out else swap_out
+    return collateral_out, swap, price_impact, price_impact <= MAX_PRICE_IMPACT_BPS
+
+
+# =============================================================================
+# Vault OTC Sell (vault buys the scarce side from the rebalance budget)
+# =============================================================================
+
+def simulate_vault_otc_sell(vault: VaultState, shares_in: float, sell_yes: bool,
+                            twap_p_yes_bps: int, budget: float) -> Tuple[float, float, bool]:
+    """
+    Vault bid at TWAP minus spread. LP shares on the buying side are assumed
+    to exist (VaultState does not track them).
+
+    Returns: (shares_filled, collateral_out, filled)
+    """
+    if sell_yes != (vault.yes_shares < vault.no_shares) or budget <= 0:
+        return 0, 0, False
+
+    share_price_bps = twap_p_yes_bps if sell_yes else 10000 - twap_p_yes_bps
+    spread_bps = max(share_price_bps // SELL_SPREAD_DIVISOR, MIN_SELL_SPREAD_BPS)
+    if share_price_bps <= spread_bps:
+        return 0, 0, False
+    price_bps = share_price_bps - spread_bps
+
+    cap = (vault.no_shares if sell_yes else vault.yes_shares) * 3 / 10
+    filled = min(shares_in, cap)
+    collateral_out = filled * price_bps / 10000
+    if collateral_out > budget:
+        filled = budget * 10000 / price_bps
+        collateral_out = filled * price_bps / 10000
+
+    if collateral_out == 0 or filled == 0:
+        return 0, 0, False
+    return filled, collateral_out, True
+
+
+def exact_vault_otc_sell(vault: VaultState, shares_in: int, sell_yes: bool,
+                         twap_p_yes_bps: int, budget: int) -> Tuple[int, int, bool]:
+    """Integer simulate_vault_otc_sell (floor on shares and collateral)"""
+    if sell_yes != (vault.yes_shares < vault.no_shares) or budget == 0:
+        return 0, 0, False
+
+    share_price_bps = twap_p_yes_bps if sell_yes else BPS - twap_p_yes_bps
+    spread_bps = max(share_price_bps // SELL_SPREAD_DIVISOR, MIN_SELL_SPREAD_BPS)
+    if share_price_bps <= spread_bps:
+        return 0, 0, False
+    price_bps = share_price_bps - spread_bps
+
+    cap = (vault.no_shares if sell_yes else vault.yes_shares) * 3 // 10
+    filled = shares_in if shares_in < cap else cap
+    collateral_out = filled * price_bps // BPS
+    if collateral_out > budget:
+        filled = budget * BPS // price_bps
+        collateral_out = filled * price_bps // BPS
+
+    if collateral_out == 0 or filled == 0:
+        return 0, 0, False
+    return filled, collateral_out, True
+
+
+# =============================================================================
+# Bid Pools (MasterRouter.sellWithSweep)
+# =============================================================================
+
+def sweep_bid_pools(book: BidBook, shares_in, min_price_bps: int,
+                    exact: bool = False) -> Tuple[float, float, int]:
+    """
+    Fill bid pools from the highest price down to min_price_bps (quote only;
+    the book is not modified).
+
+    Returns: (shares_sold, collateral_out, levels_filled)
+    """
+    remaining = shares_in
+    collateral_out = 0
+    levels = 0
+    for price in sorted(book, reverse=True):
+        if remaining <= 0:
+            break
+        depth = book[price]
+        if price < min_price_bps or price <= 0 or price >= BPS or depth <= 0:
+            continue
+
+        max_shares = depth * BPS // price if exact else depth * BPS / price
+        if remaining >= max_shares:
+            sold, received = max_shares, depth
+        else:
+            sold = remaining
+            received = ceil_div(sold * price, BPS) if exact else sold * price / BPS
+        if sold == 0 or received == 0:
+            continue
+
+        collateral_out += received
+        remaining -= sold
+        levels += 1
+    return shares_in - remaining, collateral_out, levels
+
+
+# =============================================================================
+# Full Sell Routing
+# =============================================================================
+
+@dataclass(frozen=True)
+class SellEngine:
+    """Sell-side venue pricing functions (float or exact integer)"""
+    name: str
+    p_yes_bps: Callable[[PoolState], int]
+    hook_fee: Callable[..., int]
+    amm_sell: Callable[..., Tuple[float, float, int, bool]]
+    vault_otc_sell: Callable[..., Tuple[float, float, bool]]
+    bid_sweep: Callable[..., Tuple[float, float, int]]
+
+
+FLOAT_SELL_ENGINE = SellEngine(
+    name="float",
+    p_yes_bps=FLOAT_ENGINE.p_yes_bps,
+    hook_fee=FLOAT_ENGINE.hook_fee,
+    amm_sell=simulate_amm_sell,
+    vault_otc_sell=simulate_vault_otc_sell,
+    bid_sweep=sweep_bid_pools,
+)
+
+EXACT_SELL_ENGINE = SellEngine(
+    name="exact",
+    p_yes_bps=exact_p_yes_bps,
+    hook_fee=exact_hook_fee,
+    amm_sell=exact_amm_sell,
+    vault_otc_sell=exact_vault_otc_sell,
+    bid_sweep=partial(sweep_bid_pools, exact=True),
+)
+
+
+@dataclass
+class SellResult:
+    """Result of a simulated sell"""
+    source: str                 # "bidpool", "otc", "amm", "mult", "none", "rejected"
+    collateral_out: float
+    bid_collateral: float = 0
+    otc_collateral: float = 0
+    amm_collateral: float = 0
+    shares_returned: float = 0  # Unsold sell-side shares sent back to the seller
+    price_impact_bps: int = 0
+    fee_bps: int = 0
+    rejected_reason: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.source != "rejected"
+
+
+def quote_sell(pool: PoolState, vault: VaultState, shares_in, sell_yes: bool,
+               budget=0, elapsed_seconds: int = 3600,
+               seconds_to_close: Optional[int] = None,
+               bid_pools: Optional[BidBook] = None, min_price_bps: int = 0,
+               engine: SellEngine = FLOAT_SELL_ENGINE,
+               twap_p_yes_bps: Optional[int] = None) -> SellResult:
+    """
+    Route one sell: bid pools, then vault OTC, then AMM swap-then-merge.
+    twap_p_yes_bps defaults to spot, as in simulate_trade (0 = no TWAP yet).
+    """
+    if twap_p_yes_bps is None:
+        twap_p_yes_bps = engine.p_yes_bps(pool)
+    fee_bps = engine.hook_fee(pool, elapsed_seconds)
+    remaining = shares_in
+    venues = []
+    bid_collateral = otc_collateral = amm_collateral = 0
+    price_impact = 0
+
+    if bid_pools and 0 < min_price_bps < BPS:
+        sold, bid_collateral, levels = engine.bid_sweep(bid_pools, remaining, min_price_bps)
+        if levels:
+            remaining -= sold
+            venues.append("bidpool")
+
+    if remaining > 0:
+        in_close_window = seconds_to_close is not None and 0 < seconds_to_close < CLOSE_WINDOW_SECONDS
+        if not in_close_window and budget > 0 and twap_p_yes_bps and fee_bps < HALTED_FEE_BPS:
+            filled, otc_collateral, otc_ok = engine.vault_otc_sell(
+                vault, remaining, sell_yes, twap_p_yes_bps, budget
+            )
+            if otc_ok:
+                remaining -= filled
+                venues.append("otc")
+
+    if remaining > 0:
+        amm_collateral, swapped, price_impact, amm_ok = engine.amm_sell(
+            pool, remaining, sell_yes, fee_bps
+        )
+        if not amm_ok:
+            return SellResult(
+                source="rejected",
+                collateral_out=0,
+                shares_returned=shares_in,
+                price_impact_bps=price_impact,
+                fee_bps=fee_bps,
+                rejected_reason=f"AMM impact {price_impact}bps > {MAX_PRICE_IMPACT_BPS}bps limit"
+                                if price_impact > MAX_PRICE_IMPACT_BPS else "Zero swap output",
+            )
+        if swapped:
+            remaining -= swapped + amm_collateral
+            venues.append("amm")
+
+    if len(venues) > 1:
+        source = "mult"
+    else:
+        source = venues[0] if venues else "none"
+    return SellResult(
+        source=source,
+        collateral_out=bid_collateral + otc_collateral + amm_collateral,
+        bid_collateral=bid_collateral,
+        otc_collateral=otc_collateral,
+        amm_collateral=amm_collateral,
+        shares_returned=remaining,
+        price_impact_bps=price_impact,
+        fee_bps=fee_bps,
+    )
+
+
+# =============================================================================
+# Vectorized Quotes (one pass over arrays of positions)
+# =============================================================================
+
+def _swap_kernel(shares_in, r_in, r_out, fee):
+    fm = 10000 - fee
+    b = r_in * 10000
+    b += fm * (r_out - shares_in)
+    abs_c = shares_in * r_in * 10000
+    root = np.sqrt(b * b + 4 * fm * abs_c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swap = np.where(b > 0, 2 * abs_c / (b + root), (root - b) / (2 * fm))
+    np.minimum(swap, shares_in, out=swap)
+
+    valid = (shares_in > 0) & (r_in > 0) & (r_out > 0) & (fee < 10000)
+    if not valid.all():
+        swap[~valid] = 0.0
+    return swap
+
+
+def _amm_sell_kernel(yes, no, shares_in, sell_yes, fee, p_before):
+    r_in = np.where(sell_yes, yes, no)
+    r_out = np.where(sell_yes, no, yes)
+    swap = _swap_kernel(shares_in, r_in, r_out, fee)
+    active = (swap > 0) & (swap < shares_in)
+
+    amount_in_with_fee = swap * (10000 - fee)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swap_out = amount_in_with_fee * r_out / (r_in * 10000 + amount_in_with_fee)
+    collateral_out = np.minimum(shares_in - swap, swap_out)
+
+    yes_after = np.where(sell_yes, yes + swap, yes - swap_out)
+    no_after = np.where(sell_yes, no - swap_out, no + swap)
+    price_impact = np.abs(p_yes_bps_kernel(yes_after, no_after) - p_before)
+
+    would_succeed = ~active | ((swap_out > 0) & (price_impact <= MAX_PRICE_IMPACT_BPS))
+    filled = active & would_succeed
+    return (np.where(filled, collateral_out, 0.0), np.where(filled, swap, 0.0),
+            np.where(active, price_impact, 0).astype(np.int64), would_succeed)
+
+
+def batch_swap_amount_for_merge(shares_in, r_in, r_out, fee_bps) -> np.ndarray:
+    """Vectorized swap_amount_for_merge; all arguments broadcast"""
+    args = (_f64(shares_in), _f64(r_in), _f64(r_out), _f64(fee_bps))
+    shape = np.broadcast_shapes(*(a.shape for a in args))
+    return _run_chunked(_swap_kernel, 1, *_flat(shape, *args)).reshape(shape)
+
+
+def batch_amm_sell(yes_reserve, no_reserve, shares_in, sell_yes,
+                   fee_bps) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized simulate_amm_sell. All arguments broadcast against each other.
+
+    Returns: (collateral_out, shares_swapped, price_impact_bps, would_succeed)
+    """
+    args = (_f64(yes_reserve), _f64(no_reserve), _f64(shares_in),
+            np.asarray(sell_yes, bool), _f64(fee_bps))
+    shape = np.broadcast_shapes(*(a.shape for a in args))
+
+    def kernel(yes, no, shares_in, sell_yes, fee):
+        return _amm_sell_kernel(yes, no, shares_in, sell_yes, fee, p_yes_bps_kernel(yes, no))
+
+    out = _run_chunked(kernel, 4, *_flat(shape, *args))
+    return tuple(a.reshape(shape) for a in out)
+
+
+def batch_vault_otc_sell(vault_yes, vault_no, shares_in, sell_yes, twap_p_yes_bps,
+                         budget) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized simulate_vault_otc_sell.
+
+    Returns: (shares_filled, collateral_out, filled)
+    """
+    vault_yes, vault_no, shares_in, budget = np.broadcast_arrays(
+        _f64(vault_yes), _f64(vault_no), _f64(shares_in), _f64(budget))
+    sell_yes = np.broadcast_to(np.asarray(sell_yes, bool), shares_in.shape)
+    twap = np.broadcast_to(np.asarray(twap_p_yes_bps, np.int64), shares_in.shape)
+
+    share_price_bps = np.where(sell_yes, twap, 10000 - twap)
+    spread_bps = np.maximum(share_price_bps // SELL_SPREAD_DIVISOR, MIN_SELL_SPREAD_BPS)
+    price_bps = (share_price_bps - spread_bps).astype(np.float64)
+
+    cap = np.where(sell_yes, vault_no, vault_yes) * 3 / 10
+    filled = np.minimum(shares_in, cap)
+    collateral_out = filled * price_bps / 10000
+    over = collateral_out > budget
+    with np.errstate(divide="ignore", invalid="ignore"):
+        filled = np.where(over, budget * 10000 / price_bps, filled)
+    collateral_out = np.where(over, filled * price_bps / 10000, collateral_out)
+
+    ok = ((sell_yes == (vault_yes < vault_no)) & (budget > 0) & (price_bps > 0)
+          & (collateral_out != 0) & (filled != 0))
+    return np.where(ok, filled, 0.0), np.where(ok, collateral_out, 0.0), ok
+
+
+def batch_sweep_bid_pools(book: BidBook, shares_in,
+                          min_price_bps: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized sweep_bid_pools: cumulative depth per level, then one
+    searchsorted for the number of levels each position takes whole.
+
+    Returns: (shares_sold, collateral_out)
+    """
+    shares_in = _f64(shares_in)
+    prices = np.array(sorted((p for p, d in book.items()
+                              if 0 < p < BPS and p >= min_price_bps and d > 0), reverse=True),
+                      dtype=np.float64)
+    if prices.size == 0:
+        return np.zeros_like(shares_in), np.zeros_like(shares_in)
+
+    depth = np.array([book[int(p)] for p in prices], dtype=np.float64)
+    cum_shares = np.concatenate(([0.0], np.cumsum(depth * BPS / prices)))
+    cum_collateral = np.concatenate(([0.0], np.cumsum(depth)))
+
+    full = np.searchsorted(cum_shares[1:], shares_in, side="right")
+    partial_level = full < prices.size
+    next_price = np.append(prices, 0.0)[full]
+    partial_shares = np.where(partial_level, shares_in - cum_shares[full], 0.0)
+
+    shares_sold = cum_shares[full] + partial_shares
+    collateral_out = cum_collateral[full] + partial_shares * next_price / BPS
+    return shares_sold, collateral_out
+
+
+def batch_quote_sell(pool: PoolState, vault: VaultState, shares_in, sell_yes,
+                     budget=0, elapsed_seconds: int = 3600,
+                     seconds_to_close: Optional[int] = None,
+                     bid_pools: Optional[BidBook] = None, min_price_bps: int = 0):
+    """
+    Vectorized quote_sell for many positions against one market state (each
+    position quoted independently, like PMHookQuoter within one block).
+
+    Returns: (collateral_out, bid_collateral, otc_collateral, amm_collateral,
+              shares_returned, would_succeed)
+    """
+    shares_in, sell_yes = np.broadcast_arrays(_f64(shares_in), np.asarray(sell_yes, bool))
+    fee_bps = FLOAT_SELL_ENGINE.hook_fee(pool, elapsed_seconds)
+    remaining = shares_in
+
+    if bid_pools and 0 < min_price_bps < BPS:
+        sold, bid_collateral = batch_sweep_bid_pools(bid_pools, remaining, min_price_bps)
+        remaining = remaining - sold
+    else:
+        bid_collateral = np.zeros_like(shares_in)
+
+    in_close_window = seconds_to_close is not None and 0 < seconds_to_close < CLOSE_WINDOW_SECONDS
+    if not in_close_window and budget > 0 and fee_bps < HALTED_FEE_BPS:
+        filled, otc_collateral, _ = batch_vault_otc_sell(
+            vault.yes_shares, vault.no_shares, remaining, sell_yes, pool.p_yes_bps, budget
+        )
+        remaining = remaining - filled
+    else:
+        otc_collateral = np.zeros_like(shares_in)
+
+    amm_collateral, swapped, _, ok = batch_amm_sell(
+        pool.yes_reserve, pool.no_reserve, remaining, sell_yes, fee_bps
+    )
+    remaining = remaining - swapped - amm_collateral
+
+    collateral_out = np.where(ok, bid_collateral + otc_collateral + amm_collateral, 0.0)
+    return (collateral_out, bid_collateral, otc_collateral, amm_collateral,
+            np.where(ok, remaining, shares_in), ok)
+
+
+# =============================================================================
+# Demo + Checks
+# =============================================================================
+
+def check_solvers(trials: int = 20000, seed: int = 0):
+    """
+    Newton sqrt vs isqrt, float root vs exact root, and exact merge dust.
+
+    Returns: (sqrt_mismatches, worst_relative_error, max_dust_wei)
+    """
+    rng = random.Random(seed)
+    sqrt_mismatches = 0
+    worst = 0.0
+    max_dust = 0
+    for _ in range(trials):
+        x = rng.getrandbits(rng.randint(1, 255))
+        sqrt_mismatches += newton_sqrt(x) != math.isqrt(x)
+
+        r_in = rng.randint(1, 10**6) * WAD // rng.randint(1, 1000)
+        r_out = rng.randint(1, 10**6) * WAD // rng.randint(1, 1000)
+        shares = rng.randint(1, 10**6) * WAD // rng.randint(1, 1000)
+        fee = rng.randint(0, 300)
+
+        exact = exact_swap_amount_for_merge(shares, r_in, r_out, fee)
+        approx = swap_amount_for_merge(shares / WAD, r_in / WAD, r_out / WAD, fee) * WAD
+        if exact > 10**6:
+            worst = max(worst, abs(approx - exact) / exact)
+
+        if 0 < exact < shares:
+            amount_in_with_fee = exact * (BPS - fee)
+            swap_out = amount_in_with_fee * r_out // (r_in * BPS + amount_in_with_fee)
+            max_dust = max(max_dust, abs((shares - exact) - swap_out))
+    return sqrt_mismatches, worst, max_dust
+
+
+def scalar_quote_sell(pool, vault, shares_in, sell_yes, **kwargs):
+    """Reference loop over quote_sell"""
+    n = len(shares_in)
+    out = np.empty(n)
+    ok = np.empty(n, dtype=bool)
+    for i in range(n):
+        result = quote_sell(pool, vault, float(shares_in[i]), bool(sell_yes[i]), **kwargs)
+        out[i], ok[i] = result.collateral_out, result.succeeded
+    return out, ok
+
+
+def main():
+    print_header("Sell-Side Routing (swap-then-merge, $1000 pool at 50/50)")
+    pool = PoolState(500, 500)
+    exact_pool = PoolState(500 * WAD, 500 * WAD)
+    fee = FLOAT_SELL_ENGINE.hook_fee(pool, 3600)
+    exact_fee = exact_hook_fee(exact_pool, 3600)
+
+    print(f"\n{'Sell YES':<9} | {'Swapped':<8} | {'Collateral':<11} | {'Avg price':<9} | "
+          f"{'Impact':<7} | {'Exact collateral (wei)':<24} | {'Dust':<6}")
+    print("-" * 95)
+    for shares in [10, 50, 100, 250, 500, 1000]:
+        coll, swapped, impact, ok = simulate_amm_sell(pool, shares, True, fee)
+        exact_coll, _, _, _ = exact_amm_sell(exact_pool, shares * WAD, True, exact_fee)
+        status = f"{impact}bps" if ok else "REJECT"
+        print(f"{shares:<9} | {swapped:<8.2f} | ${coll:<10.2f} | {coll / shares * 10000:>7.0f}bp | "
+              f"{status:<7} | {exact_coll:<24} | {abs(int(coll * WAD) - exact_coll) / WAD:.0e}")
+
+    print_header("Routed Exit: bid pools -> vault OTC -> AMM (P(YES) = 70%)")
+    pool = PoolState(300, 700)
+    vault = VaultState(600, 1000)     # YES scarce: vault bids for YES
+    book = {6800: 50, 6700: 100, 6500: 200, 6000: 500}
+    budget = 100
+    print(f"   Bid book (YES): {book}, min price 6500bps; vault budget ${budget}")
+    print(f"\n{'Engine':<7} | {'Source':<7} | {'Bids':<9} | {'OTC':<9} | {'AMM':<9} | "
+          f"{'Total':<9} | {'Returned':<8}")
+    print("-" * 75)
+    for engine, scale in [(FLOAT_SELL_ENGINE, 1), (EXACT_SELL_ENGINE, WAD)]:
+        def s(x):
+            return x * scale if scale == 1 else int(x * scale)
+        r = quote_sell(PoolState(s(pool.yes_reserve), s(pool.no_reserve)),
+                       VaultState(s(vault.yes_shares), s(vault.no_shares)),
+                       s(900), True, budget=s(budget),
+                       bid_pools={p: s(d) for p, d in book.items()}, min_price_bps=6500,
+                       engine=engine)
+        print(f"{engine.name:<7} | {r.source:<7} | ${r.bid_collateral / scale:<8.2f} | "
+              f"${r.otc_collateral / scale:<8.2f} | ${r.amm_collateral / scale:<8.2f} | "
+              f"${r.collateral_out / scale:<8.2f} | {r.shares_returned / scale:<8.2g}")
+
+    print_header("Solver Checks (20,000 random inputs)")
+    sqrt_mismatches, worst, max_dust = check_solvers()
+    print(f"\n   Newton sqrt != isqrt:          {sqrt_mismatches}")
+    print(f"   Float vs exact swap amount:    {worst:.1e} worst relative error")
+    print(f"   Exact merge dust |kept - out|: {max_dust} wei max")
+
+    n = 200_000
+    print_header(f"Vectorized Exit Quotes ({n:,} positions, one block)")
+    rng = np.random.default_rng(0)
+    shares = rng.uniform(1, 400, n)
+    sell_yes = rng.random(n) < 0.5
+    kwargs = dict(budget=budget, bid_pools=book, min_price_bps=6500)
+
+    batch_secs = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        batch = batch_quote_sell(pool, vault, shares, sell_yes, **kwargs)
+        batch_secs = min(batch_secs, time.perf_counter() - t0)
+
+    sample = 20_000
+    t0 = time.perf_counter()
+    scalar_out, scalar_ok = scalar_quote_sell(pool, vault, shares[:sample], sell_yes[:sample], **kwargs)
+    scalar_secs = (time.perf_counter() - t0) * n / sample
+
+    mismatches = int(np.count_nonzero(~np.isclose(batch[0][:sample], scalar_out, rtol=1e-12, atol=0)))
+    mismatches += int(np.count_nonzero(batch[5][:sample] != scalar_ok))
+
+    swap_args = (shares, 700.0, 300.0, fee)
+    scalar_swaps = np.array([swap_amount_for_merge(float(s), 700.0, 300.0, fee) for s in shares[:sample]])
+    swap_mismatches = int(np.count_nonzero(batch_swap_amount_for_merge(*swap_args)[:sample] != scalar_swaps))
+
+    print(f"\n   Batch:               {n / batch_secs:,.0f} quotes/s ({batch_secs * 1000:.0f}ms)")
+    print(f"   Scalar loop:         {n / scalar_secs:,.0f} quotes/s")
+    print(f"   Speedup:             {scalar_secs / batch_secs:.0f}x")
+    print(f"   Quote mismatches:    {mismatches} of {sample:,} (rtol 1e-12)")
+    print(f"   Solver mismatches:   {swap_mismatches} of {sample:,} (bit-exact)")
+    print(f"   Rejected (impact):   {int(np.count_nonzero(~batch[5])):,}")
+    print(f"   Mean exit price:     {batch[0].sum() / shares.sum() * 10000:.0f}bps")
+
+
+if __name__ == "__main__":
+    main()
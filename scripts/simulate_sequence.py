@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Stateful multi-trade sequencer: applies every fill back to the market.
+
+`simulate_trade` prices each trade against an untouched pool/vault. Here the
+pool reserves and vault inventory are mutated in place after every fill, so a
+flow of trades moves the price, depletes the vault's 30% per-fill cap and
+escalates skew fees. One PoolState/VaultState pair is allocated per market and
+reused for the whole stream; running totals are O(1), so streams of 10^7
+trades run in a single pass without storing traces.
+"""
+
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+from simulate_rebalance import Rebalancer
+from simulate_router import (
+    MAX_PRICE_IMPACT_BPS, Engine, FLOAT_ENGINE, PoolState, VaultState, print_header,
+)
+from simulate_twap import TwapOracle
+
+# (collateral_in, buy_yes, elapsed_seconds since market start)
+Trade = Tuple[float, bool, int]
+
+VENUES = ("amm", "otc", "mult", "rejected")
+
+
+@dataclass
+class SequenceStats:
+    """Running totals over a trade stream (constant size)"""
+    trades: int = 0
+    amm: int = 0
+    otc: int = 0
+    mult: int = 0
+    rejected: int = 0
+    collateral_in: float = 0
+    shares_out: float = 0
+    amm_collateral: float = 0
+    amm_fees: float = 0           # Collateral-equivalent fees paid to the AMM
+    otc_collateral: float = 0     # Proceeds paid into the vault
+    otc_shares: float = 0
+    max_fee_bps: int = 0
+    max_price_impact_bps: int = 0
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.rejected / self.trades if self.trades else 0.0
+
+
+class MarketSequencer:
+    """
+    One market's pool + vault, updated in place trade by trade.
+
+    Routing mirrors simulate_trade (best of vault OTC vs AMM, OTC remainder
+    topped up on the AMM); the difference is that each fill is written back.
+    With a TwapOracle, vault fills are priced off the oracle (checkpoints
+    rolled on each trade once 30 minutes have passed) instead of spot. With a
+    Rebalancer (requires the oracle), OTC spreads feed the rebalance budget
+    and the keeper is offered a rebalanceBootstrapVault after each trade.
+    With `close_window` (seconds), vault OTC is off inside the final window
+    before `close_seconds` (_isInCloseWindow).
+    """
+
+    __slots__ = ("pool", "vault", "engine", "close_seconds", "close_window", "twap", "rebalancer",
+                 "stats")
+
+    def __init__(self, pool: PoolState, vault: VaultState, engine: Engine = FLOAT_ENGINE,
+                 close_seconds: Optional[int] = None, twap: Optional[TwapOracle] = None,
+                 rebalancer: Optional[Rebalancer] = None, close_window: Optional[int] = None):
+        if rebalancer is not None and twap is None:
+            raise ValueError("rebalancing requires a TWAP oracle")
+        self.pool = pool
+        self.vault = vault
+        self.engine = engine
+        self.close_seconds = close_seconds
+        self.close_window = close_window
+        self.twap = twap
+        self.rebalancer = rebalancer
+        self.stats = SequenceStats()
+
+    # -------------------------------------------------------------------------
+    # State updates
+    # -------------------------------------------------------------------------
+
+    def _fill_amm(self, amount_in, shares_out, buy_yes: bool, fee_bps: int, impact: int):
+        # Split mints amount_in of each side; the opposite side is swapped in
+        swap_out = shares_out - amount_in
+        pool = self.pool
+        if buy_yes:
+            pool.yes_reserve -= swap_out
+            pool.no_reserve += amount_in
+        else:
+            pool.no_reserve -= swap_out
+            pool.yes_reserve += amount_in
+
+        stats = self.stats
+        stats.amm_collateral += amount_in
+        stats.amm_fees += amount_in * fee_bps / 10000
+        if impact > stats.max_price_impact_bps:
+            stats.max_price_impact_bps = impact
+
+    def _fill_otc(self, shares_out, collateral_used, buy_yes: bool, twap_p_yes: int):
+        if self.rebalancer is not None:
+            self.rebalancer.on_otc_fill(self.vault.yes_shares, self.vault.no_shares, buy_yes,
+                                        shares_out, collateral_used, twap_p_yes)
+        if buy_yes:
+            self.vault.yes_shares -= shares_out
+        else:
+            self.vault.no_shares -= shares_out
+
+        stats = self.stats
+        stats.otc_shares += shares_out
+        stats.otc_collateral += collateral_used
+
+    # -------------------------------------------------------------------------
+    # Routing
+    # -------------------------------------------------------------------------
+
+    def apply(self, collateral_in, buy_yes: bool, elapsed_seconds: int = 3600) -> str:
+        """
+        Route one buy and write the fills back to pool/vault.
+
+        Returns: venue ("amm", "otc", "mult", "rejected")
+        """
+        engine, pool, vault, stats = self.engine, self.pool, self.vault, self.stats
+        hours_to_close = 168 if self.close_seconds is None else \
+            (self.close_seconds - elapsed_seconds) / 3600
+
+        fee_bps = engine.hook_fee(pool, elapsed_seconds)
+        twap = self.twap
+        if twap is None:
+            twap_p_yes = engine.p_yes_bps(pool)  # Assume TWAP ~ spot, as in simulate_trade
+        else:
+            twap.update(elapsed_seconds)
+            twap_p_yes = twap.price(elapsed_seconds)
+
+        amm_shares, amm_impact, amm_ok = engine.amm_buy(pool, collateral_in, buy_yes, fee_bps)
+        in_close_window = self.close_window is not None and self.close_seconds is not None \
+            and self.close_seconds - elapsed_seconds < self.close_window
+        if twap_p_yes and not in_close_window:
+            otc_shares, otc_collateral, otc_ok = engine.vault_otc(
+                vault, collateral_in, buy_yes, twap_p_yes, hours_to_close
+            )
+        else:
+            otc_shares, otc_collateral, otc_ok = 0, 0, False
+
+        stats.trades += 1
+        if fee_bps > stats.max_fee_bps:
+            stats.max_fee_bps = fee_bps
+
+        if not amm_ok and not otc_ok:
+            stats.rejected += 1
+            return "rejected"
+
+        if otc_ok and (not amm_ok or (otc_shares >= amm_shares and otc_collateral <= collateral_in)):
+            remaining = collateral_in - otc_collateral
+            venue = "otc"
+            spent = otc_collateral
+            shares = otc_shares
+            if amm_ok and remaining > 0:
+                # Vault fill leaves the pool untouched, so quote the remainder as-is
+                amm2_shares, amm2_impact, amm2_ok = engine.amm_buy(pool, remaining, buy_yes, fee_bps)
+                if amm2_ok:
+                    self._fill_amm(remaining, amm2_shares, buy_yes, fee_bps, amm2_impact)
+                    venue = "mult"
+                    spent = collateral_in
+                    shares += amm2_shares
+            self._fill_otc(otc_shares, otc_collateral, buy_yes, twap_p_yes)
+        else:
+            self._fill_amm(collateral_in, amm_shares, buy_yes, fee_bps, amm_impact)
+            venue = "amm"
+            spent = collateral_in
+            shares = amm_shares
+
+        if twap is not None and venue != "otc":
+            twap.sync(pool, elapsed_seconds)
+
+        stats.collateral_in += spent
+        stats.shares_out += shares
+        if venue == "amm":
+            stats.amm += 1
+        elif venue == "otc":
+            stats.otc += 1
+        else:
+            stats.mult += 1
+
+        if self.rebalancer is not None:
+            self.rebalancer.after_trade(self, elapsed_seconds)
+        return venue
+
+    def run(self, trades: Iterable[Trade]) -> SequenceStats:
+        """Consume a trade stream in a single pass"""
+        apply = self.apply
+        for collateral_in, buy_yes, elapsed_seconds in trades:
+            apply(collateral_in, buy_yes, elapsed_seconds)
+        return self.stats
+
+
+# =============================================================================
+# Order Flow
+# =============================================================================
+
+def random_order_flow(n: int, seed: int = 0, mean_size: float = 25,
+                      p_buy_yes: float = 0.5, seconds_between: float = 60,
+                      start_seconds: int = 0) -> Iterator[Trade]:
+    """Lazily generated trades: exponential sizes and inter-arrival times"""
+    rng = random.Random(seed)
+    t = float(start_seconds)
+    for _ in range(n):
+        t += rng.expovariate(1 / seconds_between)
+        yield rng.expovariate(1 / mean_size), rng.random() < p_buy_yes, int(t)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(n_trades: int = 1_000_000):
+    print_header("Stateful Trade Sequence ($1000 pool, $1000 vault, repeated $50 YES buys)")
+    print(f"\n{'#':<4} | {'Venue':<9} | {'Pool YES/NO':<17} | {'P(YES)':<8} | {'Vault YES':<10} | {'Fee':<6}")
+    print("-" * 70)
+
+    market = MarketSequencer(PoolState(500, 500), VaultState(500, 500))
+    for i in range(1, 13):
+        fee = market.engine.hook_fee(market.pool, 3600)
+        venue = market.apply(50, True, 3600)
+        pool = market.pool
+        print(f"{i:<4} | {venue:<9} | {pool.yes_reserve:>7.1f}/{pool.no_reserve:<8.1f} | "
+              f"{pool.p_yes_bps / 100:>6.2f}% | {market.vault.yes_shares:<10.1f} | {fee}bps")
+
+    print_header(f"Random Order Flow ({n_trades:,} trades, one pass)")
+    market = MarketSequencer(PoolState(2_000, 2_000), VaultState(5_000, 5_000),
+                             close_seconds=n_trades * 60 + 86400)
+    t0 = time.perf_counter()
+    stats = market.run(random_order_flow(n_trades, seed=1, mean_size=60))
+    secs = time.perf_counter() - t0
+
+    print(f"\n   Throughput:       {n_trades / secs:,.0f} trades/s ({secs:.1f}s)")
+    for venue in VENUES:
+        print(f"   {venue:<17} {getattr(stats, venue):,}")
+    print(f"   Rejection rate:   {stats.rejection_rate * 100:.2f}% (>{MAX_PRICE_IMPACT_BPS}bps impact)")
+    print(f"   AMM fees:         ${stats.amm_fees:,.2f} on ${stats.amm_collateral:,.0f}")
+    print(f"   Vault proceeds:   ${stats.otc_collateral:,.2f} for {stats.otc_shares:,.0f} shares")
+    print(f"   Final P(YES):     {market.pool.p_yes_bps / 100:.2f}%")
+    print(f"   Final vault:      {market.vault.yes_shares:,.0f} YES / {market.vault.no_shares:,.0f} NO")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Compact market state for large portfolios.
+
+simulate_router's PoolState / VaultState / TradeResult are mutable dict-backed
+dataclasses whose derived values (total, p_yes_bps, imbalance_bps) are
+recomputed on every read. This module adds:
+
+- FrozenPool / FrozenVault / FrozenTrade: slotted, immutable variants with no
+  per-instance __dict__ (~56 B per pool vs ~96 B, floats aside). Derived
+  values stay computed: a cached int would cost what the slots save. They
+  duck-type the originals, so every engine function (simulate_trade,
+  quote_sell, ...) accepts them.
+- PoolArray / VaultArray: struct-of-arrays containers holding N pools or
+  vaults in contiguous float64 columns. `arr[i]` is a slotted view that reads
+  and writes the columns in place (so mutating code such as the rebalancer
+  works on it unchanged); `arr[a:b]` is a zero-copy sub-array; derived values
+  come back as whole NumPy columns.
+
+Requires: numpy
+"""
+
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from simulate_batch import batch_p_yes_bps
+from simulate_router import (
+    PoolState, TradeResult, VaultState, print_header, reserves_p_yes, reserves_p_yes_bps,
+    simulate_trade,
+)
+
+# =============================================================================
+# Frozen Variants
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class FrozenPool:
+    """Immutable PoolState: two slots, derived values computed on read"""
+    yes_reserve: float
+    no_reserve: float
+
+    @property
+    def total(self) -> float:
+        return self.yes_reserve + self.no_reserve
+
+    @property
+    def p_yes(self) -> float:
+        return reserves_p_yes(self.yes_reserve, self.no_reserve)
+
+    @property
+    def p_yes_bps(self) -> int:
+        return reserves_p_yes_bps(self.yes_reserve, self.no_reserve)
+
+    def replace(self, yes_reserve: float, no_reserve: float) -> "FrozenPool":
+        return FrozenPool(yes_reserve, no_reserve)
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenVault:
+    """Immutable VaultState: two slots, derived values computed on read"""
+    yes_shares: float
+    no_shares: float
+
+    @property
+    def total(self) -> float:
+        return self.yes_shares + self.no_shares
+
+    @property
+    def imbalance_bps(self) -> int:
+        total = self.yes_shares + self.no_shares
+        return 5000 if total == 0 else int((max(self.yes_shares, self.no_shares) / total) * 10000)
+
+    def replace(self, yes_shares: float, no_shares: float) -> "FrozenVault":
+        return FrozenVault(yes_shares, no_shares)
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenTrade:
+    """Immutable TradeResult"""
+    venue: str
+    shares_out: float
+    collateral_in: float
+    effective_price_bps: int
+    price_impact_bps: int
+    fee_bps: int
+    rejected_reason: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.venue != "rejected"
+
+    @classmethod
+    def of(cls, result: TradeResult) -> "FrozenTrade":
+        return cls(result.venue, result.shares_out, result.collateral_in,
+                   result.effective_price_bps, result.price_impact_bps, result.fee_bps,
+                   result.rejected_reason)
+
+
+# =============================================================================
+# Struct-of-Arrays Containers
+# =============================================================================
+
+class PoolView:
+    """PoolState-compatible view of one row of a PoolArray (reads/writes in place)"""
+
+    __slots__ = ("_yes", "_no", "index")
+
+    def __init__(self, array: "PoolArray", index: int):
+        self._yes, self._no, self.index = array.yes_reserve, array.no_reserve, index
+
+    @property
+    def yes_reserve(self) -> float:
+        return float(self._yes[self.index])
+
+    @yes_reserve.setter
+    def yes_reserve(self, value: float):
+        self._yes[self.index] = value
+
+    @property
+    def no_reserve(self) -> float:
+        return float(self._no[self.index])
+
+    @no_reserve.setter
+    def no_reserve(self, value: float):
+        self._no[self.index] = value
+
+    @property
+    def total(self) -> float:
+        return self.yes_reserve + self.no_reserve
+
+    @property
+    def p_yes(self) -> float:
+        return reserves_p_yes(self.yes_reserve, self.no_reserve)
+
+    @property
+    def p_yes_bps(self) -> int:
+        return reserves_p_yes_bps(self.yes_reserve, self.no_reserve)
+
+    def __repr__(self) -> str:
+        return f"PoolView({self.index}, yes={self.yes_reserve}, no={self.no_reserve})"
+
+
+class VaultView:
+    """VaultState-compatible view of one row of a VaultArray (reads/writes in place)"""
+
+    __slots__ = ("_yes", "_no", "index")
+
+    def __init__(self, array: "VaultArray", index: int):
+        self._yes, self._no, self.index = array.yes_shares, array.no_shares, index
+
+    @property
+    def yes_shares(self) -> float:
+        return float(self._yes[self.index])
+
+    @yes_shares.setter
+    def yes_shares(self, value: float):
+        self._yes[self.index] = value
+
+    @property
+    def no_shares(self) -> float:
+        return float(self._no[self.index])
+
+    @no_shares.setter
+    def no_shares(self, value: float):
+        self._no[self.index] = value
+
+    @property
+    def total(self) -> float:
+        return self.yes_shares + self.no_shares
+
+    @property
+    def imbalance_bps(self) -> int:
+        total = self.total
+        if total == 0:
+            return 5000
+        return int((max(self.yes_shares, self.no_shares) / total) * 10000)
+
+    def __repr__(self) -> str:
+        return f"VaultView({self.index}, yes={self.yes_shares}, no={self.no_shares})"
+
+
+class _StateArray:
+    """Two float64 columns; int index -> view, slice -> zero-copy sub-array"""
+
+    __slots__ = ()
+    VIEW = None
+    FROZEN = None
+
+    def _columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return len(self._columns()[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            return self.VIEW(self, int(index))
+        yes, no = self._columns()
+        return type(self)(yes[index], no[index], copy=False)
+
+    def __iter__(self):
+        return (self.VIEW(self, i) for i in range(len(self)))
+
+    @property
+    def total(self) -> np.ndarray:
+        yes, no = self._columns()
+        return yes + no
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self._columns())
+
+    def freeze(self, index: int):
+        """Immutable snapshot of one row"""
+        yes, no = self._columns()
+        return self.FROZEN(float(yes[index]), float(no[index]))
+
+    @classmethod
+    def zeros(cls, n: int):
+        return cls(np.zeros(n), np.zeros(n), copy=False)
+
+    @classmethod
+    def from_states(cls, states: Iterable):
+        """Pack PoolState/VaultState-like objects (one pass, no per-object arrays)"""
+        pairs = np.array([cls._pair(s) for s in states], dtype=np.float64).reshape(-1, 2)
+        return cls(pairs[:, 0], pairs[:, 1])
+
+
+class PoolArray(_StateArray):
+    """N AMM pools as contiguous yes_reserve / no_reserve columns"""
+
+    __slots__ = ("yes_reserve", "no_reserve")
+    VIEW = PoolView
+    FROZEN = FrozenPool
+
+    def __init__(self, yes_reserve, no_reserve, copy: bool = True):
+        convert = np.array if copy else np.asarray
+        self.yes_reserve = convert(yes_reserve, dtype=np.float64)
+        self.no_reserve = convert(no_reserve, dtype=np.float64)
+        if self.yes_reserve.shape != self.no_reserve.shape or self.yes_reserve.ndim != 1:
+            raise ValueError("reserve columns must be 1-D and the same length")
+
+    def _columns(self):
+        return self.yes_reserve, self.no_reserve
+
+    @staticmethod
+    def _pair(pool) -> Tuple[float, float]:
+        return pool.yes_reserve, pool.no_reserve
+
+    @property
+    def p_yes_bps(self) -> np.ndarray:
+        """Vectorized PoolState.p_yes_bps"""
+        return batch_p_yes_bps(self.yes_reserve, self.no_reserve)
+
+
+class VaultArray(_StateArray):
+    """N vault inventories as contiguous yes_shares / no_shares columns"""
+
+    __slots__ = ("yes_shares", "no_shares")
+    VIEW = VaultView
+    FROZEN = FrozenVault
+
+    def __init__(self, yes_shares, no_shares, copy: bool = True):
+        convert = np.array if copy else np.asarray
+        self.yes_shares = convert(yes_shares, dtype=np.float64)
+        self.no_shares = convert(no_shares, dtype=np.float64)
+        if self.yes_shares.shape != self.no_shares.shape or self.yes_shares.ndim != 1:
+            raise ValueError("share columns must be 1-D and the same length")
+
+    def _columns(self):
+        return self.yes_shares, self.no_shares
+
+    @staticmethod
+    def _pair(vault) -> Tuple[float, float]:
+        return vault.yes_shares, vault.no_shares
+
+    @property
+    def imbalance_bps(self) -> np.ndarray:
+        """Vectorized VaultState.imbalance_bps"""
+        total = self.yes_shares + self.no_shares
+        larger = np.maximum(self.yes_shares, self.no_shares)
+        ratio = np.divide(larger, total, out=np.full(total.shape, 0.5), where=total != 0)
+        return (ratio * 10000).astype(np.int64)
+
+
+# =============================================================================
+# Checks
+# =============================================================================
+
+def check_equivalence(n: int = 20_000, seed: int = 7) -> int:
+    """simulate_trade on PoolState/VaultState vs frozen variants vs array views"""
+    rng = np.random.default_rng(seed)
+    yes, no = rng.uniform(10, 5_000, (2, n))
+    vault_yes, vault_no = rng.uniform(0, 2_000, (2, n))
+    vault_no[rng.random(n) < 0.05] = 0
+    sizes = rng.uniform(1, 500, n)
+    buy = rng.random(n) < 0.5
+    pools, vaults = PoolArray(yes, no), VaultArray(vault_yes, vault_no)
+
+    mismatches = 0
+    for i in range(n):
+        args = (float(sizes[i]), bool(buy[i]), 3600)
+        pool, vault = PoolState(yes[i], no[i]), VaultState(vault_yes[i], vault_no[i])
+        base = simulate_trade(pool, vault, *args)
+        frozen = simulate_trade(pools.freeze(i), vaults.freeze(i), *args)
+        view = simulate_trade(pools[i], vaults[i], *args)
+        mismatches += FrozenTrade.of(base) != FrozenTrade.of(frozen)
+        mismatches += FrozenTrade.of(base) != FrozenTrade.of(view)
+
+    scalar_p = np.array([PoolState(y, x).p_yes_bps for y, x in zip(yes, no)])
+    scalar_imb = np.array([VaultState(y, x).imbalance_bps for y, x in zip(vault_yes, vault_no)])
+    mismatches += int(np.count_nonzero(scalar_p != pools.p_yes_bps))
+    mismatches += int(np.count_nonzero(scalar_imb != vaults.imbalance_bps))
+    return mismatches
+
+
+def _allocated(build) -> Tuple[int, object]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, obj
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main(n_markets: int = 1_000_000):
+    rng = np.random.default_rng(42)
+    yes, no = rng.uniform(100, 10_000, (2, n_markets))
+
+    print_header(f"Memory for {n_markets:,} Pools")
+    print(f"\n{'Layout':<24} | {'Bytes':>14} | {'Per pool':>10}")
+    print("-" * 55)
+    yes_list, no_list = yes.tolist(), no.tolist()
+    for label, build in [
+        ("PoolState list", lambda: [PoolState(y, x) for y, x in zip(yes_list, no_list)]),
+        ("FrozenPool list", lambda: [FrozenPool(y, x) for y, x in zip(yes_list, no_list)]),
+        ("PoolArray", lambda: PoolArray(yes, no)),
+    ]:
+        size, obj = _allocated(build)
+        print(f"{label:<24} | {size:>14,} | {size / n_markets:>9.1f}B")
+        del obj
+
+    print_header("Derived Values: p_yes_bps Over Every Pool")
+    states = [PoolState(y, x) for y, x in zip(yes_list, no_list)]
+    frozen = [FrozenPool(y, x) for y, x in zip(yes_list, no_list)]
+    pools = PoolArray(yes, no)
+    print(f"\n{'Layout':<24} | {'Time':>10} | {'Per pool':>10}")
+    print("-" * 51)
+    for label, run in [
+        ("PoolState.p_yes_bps", lambda: [p.p_yes_bps for p in states]),
+        ("FrozenPool.p_yes_bps", lambda: [p.p_yes_bps for p in frozen]),
+        ("PoolArray.p_yes_bps", lambda: pools.p_yes_bps),
+    ]:
+        t0 = time.perf_counter()
+        run()
+        secs = time.perf_counter() - t0
+        print(f"{label:<24} | {secs * 1e3:>8.1f}ms | {secs / n_markets * 1e9:>8.1f}ns")
+
+    print_header("Equivalence: simulate_trade on Each Layout")
+    mismatches = check_equivalence()
+    print("\n   Random trades x 3 layouts: 20,000")
+    print(f"   Mismatched results / derived values: {mismatches}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
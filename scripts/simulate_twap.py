@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+TWAP observation model (PMHookRouter.TWAPObservations over ZAMM cumulatives).
+
+- ZAMM accrues price0/1CumulativeLast (NO/YES in UQ112x112) whenever reserves
+  change, weighting the pre-update price by the seconds it was live.
+- The router keeps two checkpoints (obs0 -> obs1). Checkpoints roll at most
+  once per MIN_TWAP_UPDATE_INTERVAL (30 minutes), and each roll caches the
+  window TWAP in cachedTwapBps.
+- Reads return the cached window TWAP while obs1 is fresh (< 30 minutes old).
+  Once obs1 is stale they return the TWAP from obs1 to the current cumulative.
+
+All state is O(1) per market: the two checkpoints form a 2-slot ring and
+nothing is rescanned, so reads stay constant-time on arbitrarily long series.
+Cumulatives are exact Python ints.
+"""
+
+import random
+import time
+from typing import List, Tuple
+
+from simulate_router import PoolState, print_header
+
+# =============================================================================
+# Constants (mirror PMHookRouter)
+# =============================================================================
+Q112 = 1 << 112
+MIN_TWAP_UPDATE_INTERVAL = 30 * 60       # 30 minutes
+MAX_SPOT_TWAP_DEVIATION_BPS = 500        # _validateRebalanceConditions
+BLOCK_TIME = 12                          # Seconds per block (simulated time -> block number)
+
+
+def uq112_price(pool: PoolState) -> int:
+    """NO/YES reserve ratio in UQ112x112 (exact for integer reserves)"""
+    yes, no = pool.yes_reserve, pool.no_reserve
+    if isinstance(yes, int) and isinstance(no, int):
+        return (no << 112) // yes
+    return int(no / yes * Q112)
+
+
+def uq112_to_bps(twap_uq112: int) -> int:
+    """_convertUQ112x112ToBps: P(YES) = 10000 * r / (2^112 + r), clamped to [1, 9999]"""
+    bps = 10000 * twap_uq112 // (Q112 + twap_uq112)
+    return 1 if bps == 0 else min(bps, 9999)
+
+
+def spot_twap_deviation_bps(pool: PoolState, twap_bps: int) -> int:
+    """|spot - TWAP| as checked by _validateRebalanceConditions (spot clamped to [1, 9999])"""
+    total = pool.yes_reserve + pool.no_reserve
+    spot = int(pool.no_reserve * 10000 // total)
+    spot = 1 if spot == 0 else min(spot, 9999)
+    return abs(spot - twap_bps)
+
+
+def rebalance_allowed(pool: PoolState, twap_bps: int) -> bool:
+    """TWAP available and spot within 500 bps of it (else SpotDeviantFromTWAP)"""
+    return twap_bps != 0 and spot_twap_deviation_bps(pool, twap_bps) <= MAX_SPOT_TWAP_DEVIATION_BPS
+
+
+# =============================================================================
+# Oracle
+# =============================================================================
+
+class TwapOracle:
+    """
+    One market's ZAMM cumulative plus the router's two TWAP checkpoints.
+
+    Call `sync(pool, timestamp)` after every reserve change (ZAMM._update),
+    `update(timestamp)` to roll checkpoints (keeper / rebalanceBootstrapVault)
+    and `price(timestamp)` to read (_getTWAPPrice).
+    """
+
+    __slots__ = ("cumulative", "last_timestamp", "last_price",
+                 "timestamp0", "timestamp1", "cumulative0", "cumulative1",
+                 "cached_twap_bps")
+
+    def __init__(self, pool: PoolState, timestamp: int = 0):
+        # ZAMM pool accumulator
+        self.cumulative = 0
+        self.last_timestamp = timestamp
+        self.last_price = uq112_price(pool)
+
+        # Router checkpoints, both initialised at pool creation
+        self.timestamp0 = self.timestamp1 = timestamp
+        self.cumulative0 = self.cumulative1 = 0
+        self.cached_twap_bps = 0
+
+    def current_cumulative(self, timestamp: int) -> int:
+        """_getCurrentCumulative: stored cumulative plus the live price since last sync"""
+        return self.cumulative + self.last_price * (timestamp - self.last_timestamp)
+
+    def sync(self, pool: PoolState, timestamp: int):
+        """Accrue the old price up to timestamp, then adopt the new reserves"""
+        self.cumulative += self.last_price * (timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+        self.last_price = uq112_price(pool)
+
+    def update(self, timestamp: int) -> bool:
+        """
+        Roll obs1 -> obs0 and checkpoint now, if obs1 is at least 30 minutes
+        old (_updateTWAPObservation). Returns whether the roll happened.
+        """
+        if timestamp - self.timestamp1 < MIN_TWAP_UPDATE_INTERVAL:
+            return False
+        current = self.current_cumulative(timestamp)
+        self.timestamp0, self.cumulative0 = self.timestamp1, self.cumulative1
+        self.timestamp1, self.cumulative1 = timestamp, current
+
+        elapsed = timestamp - self.timestamp0
+        if elapsed != 0 and self.cumulative1 >= self.cumulative0:
+            self.cached_twap_bps = uq112_to_bps((self.cumulative1 - self.cumulative0) // elapsed)
+        else:
+            self.cached_twap_bps = 0
+        return True
+
+    def price(self, timestamp: int) -> int:
+        """TWAP P(YES) in bps, or 0 if unavailable (_getTWAPPrice)"""
+        if timestamp < self.timestamp1:
+            return 0
+        if timestamp - self.timestamp1 < MIN_TWAP_UPDATE_INTERVAL:
+            # Fresh window: obs0 -> obs1, already computed when obs1 was written
+            return self.cached_twap_bps
+
+        elapsed = timestamp - self.timestamp1
+        return uq112_to_bps((self.current_cumulative(timestamp) - self.cumulative1) // elapsed)
+
+
+# =============================================================================
+# Reference (full-history rescan, for checking)
+# =============================================================================
+
+def rescan_twap(history: List[Tuple[int, int]], start: int, end: int) -> int:
+    """
+    Time-weighted NO/YES over [start, end) from (timestamp, uq112_price)
+    segments sorted by timestamp, converted to bps. O(len(history)).
+    """
+    total = 0
+    for i, (t, price) in enumerate(history):
+        t_next = history[i + 1][0] if i + 1 < len(history) else end
+        lo, hi = max(t, start), min(t_next, end)
+        if hi > lo:
+            total += price * (hi - lo)
+    return uq112_to_bps(total // (end - start))
+
+
+def check_against_rescan(n_checks: int = 2000, seed: int = 0) -> Tuple[int, int]:
+    """
+    Oracle reads vs rescan_twap over the full history on a random reserve
+    path with random keeper rolls.
+
+    Returns: (mismatches, history length)
+    """
+    rng = random.Random(seed)
+    pool = PoolState(500 * 10**18, 500 * 10**18)
+    oracle = TwapOracle(pool, 0)
+    history = [(0, uq112_price(pool))]
+    t = 0
+    mismatches = 0
+    for _ in range(n_checks):
+        t += rng.randint(1, 900)
+        if rng.random() < 0.7:
+            bps = rng.randint(-300, 300)  # Shift up to 3% of the side being sold down
+            shift = (pool.yes_reserve if bps > 0 else pool.no_reserve) * bps // 10000
+            pool = PoolState(pool.yes_reserve - shift, pool.no_reserve + shift)
+            oracle.sync(pool, t)
+            history.append((t, uq112_price(pool)))
+        if rng.random() < 0.2:
+            oracle.update(t)
+        got = oracle.price(t)
+        if t - oracle.timestamp1 < MIN_TWAP_UPDATE_INTERVAL:
+            expected = rescan_twap(history, oracle.timestamp0, oracle.timestamp1) \
+                if oracle.timestamp1 > oracle.timestamp0 else 0
+        else:
+            expected = rescan_twap(history, oracle.timestamp1, t)
+        mismatches += got != expected
+    return mismatches, len(history)
+
+
+# =============================================================================
+# Demo
+# =============================================================================
+
+def main():
+    print_header("TWAP vs Spot: a 50% -> 62.5% jump at 2h, keeper rolling every 30 min")
+    print(f"\n{'Time':<7} | {'Spot':<7} | {'TWAP':<7} | {'Deviation':<9} | {'Rebalance':<9} | {'Window'}")
+    print("-" * 70)
+
+    pool = PoolState(500 * 10**18, 500 * 10**18)
+    oracle = TwapOracle(pool, 0)
+    for t in range(0, 4 * 3600 + 1, 900):
+        if t == 2 * 3600:
+            shift = pool.yes_reserve // 4
+            pool = PoolState(pool.yes_reserve - shift, pool.no_reserve + shift)
+            oracle.sync(pool, t)
+        oracle.update(t)
+        twap = oracle.price(t)
+        fresh = t - oracle.timestamp1 < MIN_TWAP_UPDATE_INTERVAL
+        print(f"{t / 3600:>5.2f}h | {pool.p_yes_bps / 100:>6.2f}% | {twap / 100:>6.2f}% | "
+              f"{spot_twap_deviation_bps(pool, twap) if twap else '-':>7}bp | "
+              f"{'ok' if rebalance_allowed(pool, twap) else 'blocked':<9} | "
+              f"{'obs0->obs1' if fresh else 'obs1->now'}")
+
+    print_header("Oracle vs Full-History Rescan (random reserve path, 2,000 checks)")
+    mismatches, history_length = check_against_rescan()
+    print(f"\n   Mismatches: {mismatches} (history length {history_length:,})")
+
+    n = 1_000_000
+    t0 = time.perf_counter()
+    price = oracle.price
+    for i in range(n):
+        price(t + i)
+    secs = time.perf_counter() - t0
+    print(f"   Reads:      {n / secs:,.0f}/s, O(1) regardless of history length")
+
+    print_header("Trending Order Flow: vault priced at spot vs at TWAP (200,000 trades)")
+    from simulate_router import VaultState
+    from simulate_sequence import MarketSequencer, random_order_flow
+
+    print(f"\n{'Vault pricing':<14} | {'OTC fills':<10} | {'Vault proceeds':<15} | "
+          f"{'Per share':<10} | {'Final P(YES)':<12}")
+    print("-" * 75)
+    for label, with_oracle in [("spot", False), ("TWAP oracle", True)]:
+        pool = PoolState(2_000, 2_000)
+        market = MarketSequencer(pool, VaultState(5_000, 5_000),
+                                 twap=TwapOracle(pool, 0) if with_oracle else None)
+        stats = market.run(random_order_flow(200_000, seed=1, mean_size=60, p_buy_yes=0.52))
+        print(f"{label:<14} | {stats.otc + stats.mult:<10,} | ${stats.otc_collateral:<14,.0f} | "
+              f"${stats.otc_collateral / max(stats.otc_shares, 1):<9.4f} | "
+              f"{market.pool.p_yes_bps / 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Batch kernels vs the scalar simulate_router loop (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_batch import (
+    CHUNK, batch_hook_fee, batch_max_amm_under_impact, batch_quote, batch_vault_otc,
+    count_mismatches, scalar_quote,
+)
+from simulate_router import (
+    BOOTSTRAP_WINDOW, PoolState, VaultState, calculate_hook_fee, max_amm_collateral_under_impact,
+    simulate_vault_otc,
+)
+
+
+def random_grid(n, seed):
+    rng = np.random.default_rng(seed)
+    liq = rng.uniform(10, 20_000, n)
+    no = liq * rng.integers(100, 9900, n) / 10000
+    yes = liq - no
+    size = rng.uniform(1, 5_000, n)
+    elapsed = rng.integers(0, 3 * BOOTSTRAP_WINDOW, n)
+    buy_yes = rng.random(n) < 0.5
+    return yes, no, size, elapsed, buy_yes
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_batch_quote_matches_scalar(seed):
+    # Spans several chunks, so the chunked path is covered too
+    yes, no, size, elapsed, buy_yes = random_grid(3 * CHUNK + 17, seed)
+    batch = batch_quote(yes, no, size, buy_yes, elapsed)
+    assert count_mismatches(batch, scalar_quote(yes, no, size, elapsed, buy_yes)) == 0
+
+
+def test_batch_quote_edge_pools():
+    yes = np.array([0.0, 500, 0, 500, 1e-9, 500, 500, 500])
+    no = np.array([500.0, 0, 0, 500, 500, 500, 500, 500])
+    size = np.array([10.0, 10, 10, 0, 10, 1e12, 10, 10])
+    elapsed = np.array([0, 0, 0, 0, 0, 0, BOOTSTRAP_WINDOW - 1, BOOTSTRAP_WINDOW])
+    buy_yes = np.array([True, True, False, True, False, True, False, True])
+    batch = batch_quote(yes, no, size, buy_yes, elapsed)
+    assert count_mismatches(batch, scalar_quote(yes, no, size, elapsed, buy_yes)) == 0
+
+
+def test_batch_hook_fee_matches_scalar():
+    yes, no, _, elapsed, _ = random_grid(5_000, 2)
+    fees = batch_hook_fee(yes, no, elapsed)
+    expected = [calculate_hook_fee(PoolState(float(y), float(n)), int(e))
+                for y, n, e in zip(yes, no, elapsed)]
+    np.testing.assert_array_equal(fees, expected)
+
+
+def test_batch_max_amm_under_impact_matches_scalar():
+    yes, no, _, elapsed, buy_yes = random_grid(5_000, 3)
+    fees = batch_hook_fee(yes, no, elapsed)
+    safe = batch_max_amm_under_impact(yes, no, buy_yes, fees)
+    expected = [max_amm_collateral_under_impact(PoolState(float(y), float(n)), bool(b), int(f))
+                for y, n, b, f in zip(yes, no, buy_yes, fees)]
+    np.testing.assert_allclose(safe, expected, rtol=1e-12)
+
+
+def test_batch_vault_otc_matches_scalar():
+    rng = np.random.default_rng(4)
+    n = 5_000
+    vault_yes = rng.uniform(0, 2_000, n)
+    vault_no = rng.uniform(0, 2_000, n)
+    # Empty, one-sided and near-empty vaults (the 1-share depletion floor)
+    vault_yes[:4] = 0, 0, 2.5, 500
+    vault_no[:4] = 0, 800, 0, 500
+    amount_in = rng.uniform(0, 1_000, n)
+    amount_in[4] = 0
+    buy_yes = rng.random(n) < 0.5
+    twap = rng.integers(1, 10_000, n)
+    hours = rng.uniform(0, 48, n)
+    batch = batch_vault_otc(vault_yes, vault_no, amount_in, buy_yes, twap, hours)
+    scalar = zip(*(simulate_vault_otc(VaultState(float(y), float(no)), float(c), bool(b), int(t),
+                                      float(h))
+                   for y, no, c, b, t, h in zip(vault_yes, vault_no, amount_in, buy_yes,
+                                                twap, hours)))
+    assert count_mismatches(batch, [np.array(s) for s in scalar]) == 0
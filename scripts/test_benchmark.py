@@ -0,0 +1,29 @@
+"""Baseline comparison in the benchmark suite (run: python -m pytest scripts)"""
+
+import math
+
+import pytest
+
+from benchmark import compare
+
+
+def results(quick=False, name_filter="", **per_op_ns):
+    return {"meta": {"quick": quick, "filter": name_filter},
+            "benchmarks": {name: {"per_op_ns": ns} for name, ns in per_op_ns.items()}}
+
+
+def test_missing_baseline_benchmark_fails():
+    baseline = results(quote_amm=100, grid_amm=100, sequence_replay=100)
+    regressions = compare(results(quote_amm=105, grid_amm=200), baseline, 10)
+    assert regressions[0] == ("grid_amm", pytest.approx(100))
+    assert regressions[1][0] == "sequence_replay" and math.isinf(regressions[1][1])
+
+
+def test_filtered_run_ignores_unselected_baseline():
+    baseline = results(quote_amm=100, grid_amm=100)
+    assert compare(results(name_filter="grid", grid_amm=100), baseline, 10) == []
+
+
+def test_quick_and_full_are_not_compared():
+    with pytest.raises(ValueError):
+        compare(results(quick=True, quote_amm=1), results(quote_amm=1), 10)
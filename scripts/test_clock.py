@@ -0,0 +1,64 @@
+"""Event-driven clock, cached timed fees and cooldown scheduling (run: python -m pytest scripts)"""
+
+from dataclasses import replace
+
+import pytest
+
+from simulate_clock import (
+    PRIORITY_PHASE, PRIORITY_TRADE, CooldownFlow, Scheduler, check_timed_fee, timed_market,
+)
+from simulate_fee_hook import DEFAULT_FEE_CONFIG, FLAG_VOLATILITY, FeeConfig
+from simulate_vault import VaultLedger
+
+VOLATILITY = FeeConfig(flags=0x37 | FLAG_VOLATILITY, volatility_fee_bps=100,
+                       volatility_window=3600)
+
+
+@pytest.mark.parametrize("cfg", [
+    DEFAULT_FEE_CONFIG, VOLATILITY, replace(DEFAULT_FEE_CONFIG, flags=0x33, extra_flags=0x09),
+])
+def test_timed_fee_matches_compiled_fee(cfg):
+    assert check_timed_fee(cfg, n=10_000) == 0
+
+
+def test_events_run_in_block_then_priority_order():
+    sched, ran = Scheduler(block_time=12), []
+    sched.at(25, ran.append, "trade@36")
+    sched.at(30, ran.append, "phase@36", priority=PRIORITY_PHASE)
+    sched.at(1, ran.append, "trade@12", priority=PRIORITY_TRADE)
+    cancelled = sched.at(2, ran.append, "cancelled")
+    sched.cancel(cancelled)
+    assert sched.run(until=24) == 1 and sched.now == 24
+    sched.run()
+    assert ran == ["trade@12", "phase@36", "trade@36"] and sched.now == 36
+    # Never schedules into the past
+    sched.at(0, ran.append, "late")
+    sched.run()
+    assert ran[-1] == "late" and sched.now == 36
+
+
+@pytest.mark.parametrize("cfg, halts", [(DEFAULT_FEE_CONFIG, False),
+                                        (replace(DEFAULT_FEE_CONFIG, flags=0x33), True)])
+def test_market_lifecycle(cfg, halts):
+    close = 2 * 86400
+    sched = Scheduler()
+    market = timed_market(sched, close, cfg, seed=1)
+    market.start()
+    sched.run()
+    s = market.stats
+    assert (s.close_window_at, s.closed_at) == (close - cfg.close_window, close)
+    assert s.outcome_yes is not None
+    assert s.twap_rolls > 0 and market.market.stats.trades == s.arrivals - s.halted
+    assert (s.halted > 0) == halts
+    # Cached fees are recomputed only when an input changes
+    assert market.fee.base.evaluations < market.fee.base.reads / 10
+
+
+def test_withdrawals_never_hit_the_cooldown():
+    sched = Scheduler()
+    flow = CooldownFlow(sched, VaultLedger(close=3 * 86400), 50, seed=3)
+    flow.start()
+    sched.run()
+    s = flow.stats
+    assert s.reverts == 0 and s.withdrawals and s.moved
+    assert s.withdrawals < s.polling_checks() / 100
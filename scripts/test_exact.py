@@ -0,0 +1,84 @@
+"""Limb arithmetic and batched exact quotes vs Python ints (run: python -m pytest scripts)"""
+
+import random
+
+import numpy as np
+import pytest
+
+from simulate_exact import (
+    UINT256_MAX, WAD, batch_exact_quote, exact_amm_buy, exact_hook_fee, exact_vault_otc,
+    from_limbs, limb_divmod, limb_mul, limb_vault_otc, limb_width, to_limbs,
+)
+from simulate_router import PoolState, VaultState
+
+
+def random_uints(rng, n, max_bits=256):
+    return [rng.getrandbits(rng.randint(0, max_bits)) for _ in range(n)]
+
+
+def test_limb_mul_and_divmod_match_python_ints():
+    rng = random.Random(0)
+    a, b = random_uints(rng, 2_000), random_uints(rng, 2_000)
+    d = [max(x, 1) for x in random_uints(rng, 2_000)]
+    d[:3] = 1, 3, UINT256_MAX
+    product = limb_mul(to_limbs(a), to_limbs(b))
+    assert list(from_limbs(product)) == [x * y for x, y in zip(a, b)]
+    q, r = limb_divmod(product, to_limbs(d, 16))
+    assert list(from_limbs(q)) == [x * y // z for x, y, z in zip(a, b, d)]
+    assert list(from_limbs(r)) == [x * y % z for x, y, z in zip(a, b, d)]
+
+
+def scalar_exact_quote(yes, no, size, buy_yes, elapsed):
+    rows = []
+    for y, n, s, b, e in zip(yes, no, size, buy_yes, elapsed):
+        pool = PoolState(y, n)
+        fee = exact_hook_fee(pool, e)
+        rows.append((*exact_amm_buy(pool, s, b, fee), fee))
+    shares, impact, ok, fees = zip(*rows)
+    return list(shares), list(impact), list(fees), list(ok)
+
+
+@pytest.mark.parametrize("max_bits", [96, 256])
+def test_batch_exact_quote_matches_scalar(max_bits):
+    rng = random.Random(max_bits)
+    n = 3_000
+    yes, no, size = (random_uints(rng, n, max_bits) for _ in range(3))
+    # Empty, one-sided, dust and uint256-overflow pools
+    yes[:5] = 0, 0, 500 * WAD, 1, UINT256_MAX // 2
+    no[:5] = 0, 500 * WAD, 500 * WAD, 1, UINT256_MAX // 2
+    size[:5] = WAD, WAD, 0, 10 ** 9, UINT256_MAX // 10_000
+    buy_yes = [rng.random() < 0.5 for _ in range(n)]
+    elapsed = [rng.randint(-100, 200_000) for _ in range(n)]
+    batch = batch_exact_quote(yes, no, size, buy_yes, elapsed)
+    scalar = scalar_exact_quote(yes, no, size, buy_yes, elapsed)
+    for b, s in zip(batch, scalar):
+        assert b.tolist() == s
+
+
+def test_limb_width():
+    assert limb_width([]) == 1
+    assert limb_width([2 ** 32 - 1]) == 1
+    assert limb_width([0, 2 ** 32]) == 2
+    assert limb_width([UINT256_MAX]) == 8
+    np.testing.assert_array_equal(to_limbs([2 ** 32 + 5], 2), [[5], [1]])
+
+
+def test_limb_vault_otc_matches_scalar():
+    rng = random.Random(7)
+    n = 3_000
+    yes, no, collateral = (random_uints(rng, n, 96) for _ in range(3))
+    # Empty and one-sided vaults, dust (the 1-share depletion floor), zero collateral
+    yes[:5] = 0, 0, 3, 10 * WAD, 5 * WAD
+    no[:5] = 0, 10 * WAD, 0, 10 * WAD, 5 * WAD
+    collateral[:5] = WAD, WAD, WAD, 0, 10 ** 40
+    buy_yes = [rng.random() < 0.5 for _ in range(n)]
+    twap = [rng.randint(0, 9_999) for _ in range(n)]
+    seconds = [rng.randint(-3_600, 200_000) for _ in range(n)]
+    width = limb_width(yes + no + collateral)
+    shares, used, filled = limb_vault_otc(
+        to_limbs(yes, width), to_limbs(no, width), to_limbs(collateral, width),
+        np.array(buy_yes), np.array(twap), np.array(seconds))
+    expected = [exact_vault_otc(VaultState(y, n_), c, b, t, s)
+                for y, n_, c, b, t, s in zip(yes, no, collateral, buy_yes, twap, seconds)]
+    assert list(zip(from_limbs(shares).tolist(), from_limbs(used).tolist(),
+                    filled.tolist())) == [(s, u, bool(f)) for s, u, f in expected]
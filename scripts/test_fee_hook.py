@@ -0,0 +1,114 @@
+"""PMFeeHook configs, lookup tables and the router's fee model (run: python -m pytest scripts)"""
+
+import random
+
+import numpy as np
+import pytest
+
+from simulate_exact import exact_hook_fee
+from simulate_fee_hook import (
+    BPS, FLAG_VOLATILITY, HALTED, FeeConfig, PriceHistory, _build_asymmetric, _build_bootstrap,
+    _build_skew, compile_fee_config, fee_table, validate_config,
+)
+from simulate_router import ROUTER_FEE_CONFIG, PoolState, calculate_hook_fee
+
+
+@pytest.mark.parametrize("pool, elapsed, fee", [
+    (PoolState(5777.296954761747, 43240.55990577232), 96466, 127),
+    (PoolState(0, 100), 100_000, 138),
+    (PoolState(500, 500), 0, 75),
+])
+def test_default_fee_is_the_float_model(pool, elapsed, fee):
+    # No config: the float model, as before lookup tables existed
+    assert calculate_hook_fee(pool, elapsed) == fee
+
+
+def test_config_fee_reads_the_table():
+    rng = np.random.default_rng(0)
+    for cfg in (ROUTER_FEE_CONFIG, FeeConfig(close_window=0, extra_flags=0x0e)):
+        table = fee_table(cfg)
+        assert fee_table(cfg) is table
+        for _ in range(2_000):
+            yes, no = rng.uniform(0, 20_000, 2)
+            elapsed = int(rng.integers(-10, 3 * cfg.bootstrap_window))
+            assert calculate_hook_fee(PoolState(yes, no), elapsed, config=cfg) == \
+                table.fee(yes, no, elapsed)
+
+
+def test_batch_fee_matches_table_fee():
+    table = fee_table(ROUTER_FEE_CONFIG)
+    rng = np.random.default_rng(1)
+    p = rng.integers(0, 10_001, 5_000)
+    elapsed = rng.integers(-100, 2 * ROUTER_FEE_CONFIG.bootstrap_window, 5_000)
+    elapsed[:3] = 0, ROUTER_FEE_CONFIG.bootstrap_window, ROUTER_FEE_CONFIG.bootstrap_window - 1
+    expected = [table.fee(10_000 - int(q), int(q), int(e)) if 0 < q < 10_000
+                else table.fee(0, 1, int(e)) for q, e in zip(p, elapsed)]
+    # fee() prices pools at no * 10000 // (yes + no); batch_fee takes that price directly
+    p[(p == 0) | (p == 10_000)] = 5000
+    np.testing.assert_array_equal(table.batch_fee(p, elapsed), expected)
+
+
+def test_default_config_matches_exact_hook_fee():
+    fee = compile_fee_config()
+    rng = random.Random(2)
+    for _ in range(5_000):
+        yes, no = rng.randrange(0, 10 ** 22), rng.randrange(1, 10 ** 22)
+        elapsed = rng.randrange(-100, 4 * 86400)
+        assert fee(yes, no, elapsed) == exact_hook_fee(PoolState(yes, no), elapsed)
+
+
+@pytest.mark.parametrize("decay", range(4))
+@pytest.mark.parametrize("exponent", range(4))
+def test_tabulated_fee_matches_components(decay, exponent):
+    cfg = FeeConfig(extra_flags=exponent | decay << 2)
+    fee = compile_fee_config(cfg)
+    bootstrap, skew_fee, asym_fee = _build_bootstrap(cfg), _build_skew(cfg), _build_asymmetric(cfg)
+    rng = random.Random(decay * 4 + exponent)
+    for _ in range(2_000):
+        yes, no = rng.randrange(1, 10 ** 6), rng.randrange(1, 10 ** 6)
+        elapsed = rng.randrange(-10, cfg.bootstrap_window + 10)
+        skew = abs(no * BPS // (yes + no) - 5000)
+        expected = bootstrap(elapsed) + skew_fee(skew) + asym_fee(skew)
+        assert fee(yes, no, elapsed) == min(expected, cfg.fee_cap_bps)
+    assert bootstrap(0) == cfg.max_fee_bps and bootstrap(cfg.bootstrap_window) == cfg.min_fee_bps
+
+
+@pytest.mark.parametrize("mode, expected", [(0, HALTED), (1, 40), (2, 10), (3, None)])
+def test_close_window_modes(mode, expected):
+    fee = compile_fee_config(FeeConfig(flags=0x33 | mode << 2))
+    dynamic = fee(400, 600, 10 ** 9)
+    assert fee(400, 600, 10 ** 9, seconds_to_close=1800) == (expected or dynamic)
+    assert fee(400, 600, 10 ** 9, seconds_to_close=7200) == dynamic
+    assert fee(400, 600, 10 ** 9, seconds_to_close=0) == HALTED
+
+
+def test_volatility_fee_scales_with_dispersion():
+    fee = compile_fee_config(FeeConfig(flags=0x37 | FLAG_VOLATILITY, volatility_fee_bps=100,
+                                       volatility_window=3600))
+    base = fee(500, 500, 10 ** 9)
+    charged = []
+    for path in ([5000, 5010, 4995, 5005, 5000], [5000, 5300, 4700, 5250, 4750],
+                 [5000, 6000, 4200, 5800, 4400]):
+        history = PriceHistory()
+        for i, p in enumerate(path):
+            history.record(1000 + 60 * i, p)
+        charged.append(fee(500, 500, 10 ** 9, history=history, now=1300) - base)
+    assert charged[0] == 0 and 0 < charged[1] < 100 and charged[2] == 100
+    # Snapshots older than the window are ignored
+    assert fee(500, 500, 10 ** 9, history=history, now=1000 + 3600 * 2) == base
+
+
+def test_one_snapshot_per_block():
+    history = PriceHistory()
+    history.record(100, 5000, block=7)
+    history.record(101, 9000, block=7)
+    assert history.prices[:2] == [5000, 0] and history.index == 1
+
+
+@pytest.mark.parametrize("cfg", [
+    FeeConfig(min_fee_bps=80), FeeConfig(fee_cap_bps=0), FeeConfig(skew_ref_bps=6000),
+    FeeConfig(flags=0x37, close_window_fee_bps=0), FeeConfig(volatility_window=-1),
+])
+def test_invalid_configs_are_rejected(cfg):
+    with pytest.raises(ValueError):
+        validate_config(cfg)
@@ -0,0 +1,64 @@
+"""Vectorized GasPM resolution surfaces vs scalar replays (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_gas_backtest import (
+    BANDS_BPS, BPS, LEVELS_BPS, MARKET_TYPES, MARKETS, GasBacktest, check_against_scalar,
+    close_modes, resolve_scalar,
+)
+from simulate_gas_oracle import GasOracle, synthetic_history
+
+
+@pytest.fixture(scope="module")
+def backtest():
+    t, fee = synthetic_history(8_000, seed=2)
+    keep = np.sort(np.random.default_rng(2).choice(len(t), len(t) // 4, replace=False))
+    return GasBacktest(GasOracle(t[keep], fee[keep], block=16), step=600)
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_outcomes_match_scalar(seed):
+    assert check_against_scalar(n_blocks=10_000, n_markets=150, seed=seed) == 0
+
+
+@pytest.mark.parametrize("market, can_close",
+                         [(m, c) for m in MARKET_TYPES for c in close_modes(m)],
+                         ids=lambda x: getattr(x, "name", str(x)))
+def test_every_market_type(backtest, market, can_close):
+    thresholds = BANDS_BPS[:2] if market.op in ("in", "out") else LEVELS_BPS[2:5]
+    starts, durations = np.arange(0, 60, 7), np.array([1, 6, 24])
+    yes, creatable = backtest.outcomes(market, starts, durations, thresholds, can_close)
+    oracle, step = backtest.oracle, backtest.step
+    for i, start in enumerate(starts.tolist()):
+        spot, t0 = int(backtest.spot[start]), int(backtest.times[start])
+        for j, d in enumerate(durations.tolist()):
+            for k, level in enumerate(thresholds[:1] if market.op == "up" else thresholds):
+                threshold = (tuple(spot * b // BPS for b in level) if isinstance(level, tuple)
+                             else spot * level // BPS)
+                expected = resolve_scalar(oracle, market, t0, t0 + d * step, step, threshold,
+                                          can_close)
+                assert (bool(yes[i, j, k]) if creatable[i, j, k] else None) == expected
+
+
+def test_surface(backtest):
+    s = backtest.surface(MARKETS["peak"], True, durations_s=(3600, 6 * 3600))
+    assert s.hit_rate.shape == (2, len(LEVELS_BPS)) and np.all(s.samples > 0)
+    # Running max: a lower level or a longer window can only hit more often
+    assert np.all(np.diff(s.hit_rate, axis=1) <= 0) and np.all(np.diff(s.hit_rate, axis=0) >= 0)
+    assert np.all(s.hit_rate[:, LEVELS_BPS.index(9000)] == 1)
+
+    window_peak = backtest.surface(MARKETS["window_peak"], True, durations_s=(3600,))
+    # Creation reverts unless spot < threshold: no samples at or below the spot
+    assert window_peak.samples[0, :LEVELS_BPS.index(11000)].sum() == 0
+
+
+def test_invalid_arguments(backtest):
+    with pytest.raises(ValueError):
+        backtest.outcomes(MARKETS["comparison"], [0], [1], [], True)
+    with pytest.raises(ValueError):
+        backtest.outcomes(MARKETS["window_peak"], [0], [1], [12500], False)
+    with pytest.raises(ValueError):
+        backtest.surface(MARKETS["spot"], False, durations_s=(60,))
+    with pytest.raises(ValueError):
+        GasBacktest(backtest.oracle, step=0)
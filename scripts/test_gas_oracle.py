@@ -0,0 +1,62 @@
+"""Indexed GasPM views vs a replay of update() (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_gas_oracle import (
+    GasOracle, RangeExtremum, check_against_scan, load_history, synthetic_history,
+    write_history,
+)
+
+
+@pytest.mark.parametrize("block", [4, 16, 64])
+def test_window_views_match_replay(block):
+    assert check_against_scan(n_blocks=1_500, n_windows=200, seed=block, block=block) == 0
+
+
+@pytest.mark.parametrize("ufunc", [np.maximum, np.minimum])
+def test_range_extremum_matches_slices(ufunc):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 10 ** 9, 1_001)
+    index = RangeExtremum(values, ufunc, block=8)
+    lo = rng.integers(0, len(values), 2_000)
+    hi = np.minimum(lo + rng.integers(0, 300, 2_000), len(values) - 1)
+    expected = [int(ufunc.reduce(values[a:b + 1])) for a, b in zip(lo.tolist(), hi.tolist())]
+    assert index.query_many(lo, hi).tolist() == expected
+    assert [index.query(a, b) for a, b in zip(lo.tolist(), hi.tolist())] == expected
+
+
+def test_all_time_views():
+    oracle = GasOracle([100, 110, 110, 130], [5, 9, 1, 3])
+    # The repeated timestamp is dropped, as update() returns early
+    assert len(oracle) == 3 and oracle.base_fee.tolist() == [5, 9, 3]
+    assert oracle.cumulative_at(140) == 5 * 10 + 9 * 20 + 3 * 10
+    assert oracle.average(140) == 260 // 40 and oracle.average(100) == 5
+    assert (oracle.max(120), oracle.min(120), oracle.spread(140)) == (9, 5, 6)
+    assert oracle.average_since(110, 110) == 9
+    assert oracle.average_since(105, 125) == (5 * 5 + 9 * 15) // 20
+    assert oracle.higher_than_start(5, 140) == 1 and oracle.higher_than_start(0, 140) == 0
+    assert oracle.in_range_since(105, 125, 7, 8) == 1 and oracle.out_of_range_since(105, 125, 9, 10)
+    with pytest.raises(ValueError):
+        oracle.spot(99)
+    with pytest.raises(ValueError):
+        GasOracle([2, 1], [1, 1])
+
+
+def test_large_cumulative_uses_python_ints():
+    t = np.arange(0, 40_000, 12, dtype=np.int64)
+    oracle = GasOracle(t, np.full(len(t), 10 ** 15, np.int64))
+    assert oracle.cumulative.dtype == object
+    assert oracle.cumulative_at(int(t[-1])) == 10 ** 15 * int(t[-1])
+    assert oracle.average_since_many(t[:3], t[-3:]).tolist() == [10 ** 15] * 3
+
+
+@pytest.mark.parametrize("name", ["history.csv", "history.csv.gz", "history.npz"])
+def test_history_round_trip(tmp_path, name):
+    t, fee = synthetic_history(500, seed=1)
+    path = str(tmp_path / name)
+    write_history(path, t, fee)
+    loaded = load_history(path)
+    np.testing.assert_array_equal(loaded[0], t)
+    np.testing.assert_array_equal(loaded[1], fee)
+    assert np.all(fee >= 7) and np.all(np.abs(np.diff(np.log(fee))) <= np.log(1.125) + 1e-9)
@@ -0,0 +1,71 @@
+"""Heap-indexed PMRouter book vs the contract's hash-list loop (run: python -m pytest scripts)"""
+
+import pytest
+
+from simulate_exact import WAD
+from simulate_limit_book import (
+    COMPACT_MIN_ENTRIES, LimitBook, check_against_scan, run_backtest, seed_book,
+)
+from simulate_router import PoolState
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_heap_matches_scan(seed):
+    assert check_against_scan(n_orders=500, n_takers=150, seed=seed) == 0
+
+
+def test_price_time_priority():
+    book = LimitBook(close=10_000)
+    late = book.place_order(1, True, False, 10 * WAD, 4 * WAD, 5_000, True, now=0)
+    early_worse = book.place_order(2, True, False, 10 * WAD, 5 * WAD, 5_000, True, now=0)
+    cheap = book.place_order(3, True, False, 20 * WAD, 7 * WAD, 5_000, True, now=0)
+    same_price = book.place_order(4, True, False, 5 * WAD, 2 * WAD, 5_000, True, now=0)
+    assert [o.order_hash for o in book.live_orders(True, False, 0)] == \
+        [cheap, late, same_price, early_worse]
+
+    # 10 WAD of collateral: all of `cheap` (7 WAD at 0.35), then 3 WAD of `late` at 0.4
+    r = book.fill_orders_then_swap(PoolState(1000 * WAD, 1000 * WAD), True, True, 10 * WAD, 1)
+    assert r.succeeded and r.book_in == 10 * WAD and r.orders_filled == 2 and r.amm_in == 0
+    assert r.amount_out == 20 * WAD + 75 * WAD // 10
+    assert book.orders[cheap].filled and book.best_ask(True, 1).order_hash == late
+
+
+def test_place_and_cancel_errors():
+    book = LimitBook(close=1_000)
+    h = book.place_order(1, False, True, WAD, WAD // 2, 5_000, False, now=0)
+    assert h[4] == 1_000    # Deadline clamped to close
+    for args, error in [((0, WAD, 500), ValueError), ((WAD, WAD, 0), ValueError),
+                        ((2 ** 96, WAD, 500), OverflowError)]:
+        with pytest.raises(error):
+            book.place_order(1, False, True, *args, False, now=0)
+    with pytest.raises(ValueError, match="OrderExists"):
+        book.place_order(1, False, True, WAD, WAD // 2, 5_000, False, now=0)
+    with pytest.raises(ValueError, match="NotOrderOwner"):
+        book.cancel_order(h, 2)
+    assert book.cancel_order(h, 1) == WAD // 2
+    with pytest.raises(ValueError, match="OrderNotFound"):
+        book.cancel_order(h, 1)
+    with pytest.raises(ValueError, match="MarketClosed"):
+        book.place_order(1, False, True, WAD, WAD, 2_000, False, now=1_000)
+
+
+def test_cancels_compact_and_expiries_prune():
+    book = seed_book(4 * COMPACT_MIN_ENTRIES, seed=1)
+    side = next(s for s, heap in book.heaps.items() if len(heap) >= COMPACT_MIN_ENTRIES)
+    for order in [e[2] for e in book.heaps[side]]:
+        book.cancel_order(order.order_hash, order.owner)
+    assert book.stats.compactions >= 1 and book.depth(*side) == 0
+    best = book.best_bid if side[1] else book.best_ask
+    assert best(side[0], 0) is None
+
+    live = sum(book.depth(*s) for s in book.heaps)
+    expired = book.prune(5 * 86400)
+    assert 0 < expired < live and sum(book.depth(*s) for s in book.heaps) == live - expired
+
+
+def test_backtest_conserves_book_state():
+    book = seed_book(300, seed=2)
+    stats = run_backtest(book, PoolState(1000 * WAD, 1000 * WAD), 2_000, seed=3)
+    assert stats.takers > 0 and 0 < stats.book_share < 1
+    for order in book.orders.values():
+        assert 0 <= order.in_done <= order.amt_in and 0 <= order.out_done <= order.amt_out
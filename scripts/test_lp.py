@@ -0,0 +1,44 @@
+"""Accumulator LP accounting vs per-LP pro-rata rewards (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_lp import LPPool, NaiveLPPool, random_lp_stream, run_stream
+
+
+@pytest.mark.parametrize("side", ["ask", "bid"])
+def test_accumulator_matches_pro_rata(side):
+    events = list(random_lp_stream(4_000, 200, seed=1))
+    fast, slow = LPPool(side, 4000), NaiveLPPool(side, 4000)
+    run_stream(fast, events)
+    run_stream(slow, events)
+    rewards = fast.claimed[:fast.n_lps] + fast.pending_all()
+    expected = np.array([slow.reward.get(lp, 0.0) for lp in range(fast.n_lps)])
+    np.testing.assert_allclose(rewards, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(fast.withdrawable_all(),
+                               [slow.withdrawable(lp) for lp in range(fast.n_lps)], atol=1e-9)
+    assert fast.total_depth == pytest.approx(slow.total_depth, abs=1e-9)
+
+
+@pytest.mark.parametrize("side", ["ask", "bid"])
+@pytest.mark.parametrize("mean_fill", [3, 15])
+def test_exact_pool_never_overpays(side, mean_fill):
+    pool = LPPool(side, 5500, exact=True)
+    run_stream(pool, random_lp_stream(10_000, 500, seed=2, mean_fill=mean_fill),
+               exact_scale=10 ** 18)
+    owed = sum(pool.claimed[:pool.n_lps]) + sum(pool.pending_all())
+    assert 0 <= pool.earned - owed
+    assert sum(pool.withdrawable_all()) <= pool.total_depth
+
+
+def test_batched_claims_match_per_lp():
+    rng = np.random.default_rng(3)
+    pool = LPPool("ask", 5000)
+    for lp, amount in enumerate(rng.uniform(1, 100, 2_000)):
+        pool.deposit(lp, float(amount))
+        if lp % 100 == 0:
+            pool.fill(pool.total_depth * 0.01)
+    np.testing.assert_array_equal(pool.pending_all(), [pool.pending(lp) for lp in range(2_000)])
+    paid = pool.claim_all()
+    assert paid.sum() == pytest.approx(pool.earned)
+    assert pool.pending_all().max() < 1e-9
@@ -0,0 +1,12 @@
+"""Sharded Monte Carlo runs vs one in-process run (run: python -m pytest scripts)"""
+
+from simulate_montecarlo import MonteCarloConfig, run_monte_carlo
+
+CONFIG = MonteCarloConfig(trades_per_path=40)
+
+
+def test_worker_count_does_not_change_results():
+    # Uneven shards, so pool workers finish out of order
+    single = run_monte_carlo(50, CONFIG, seed=3, workers=1, shard_size=7)
+    assert single.paths == 50
+    assert run_monte_carlo(50, CONFIG, seed=3, workers=3, shard_size=7) == single
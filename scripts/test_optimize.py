@@ -0,0 +1,54 @@
+"""Config sweep evaluator vs scalar routing, Pareto pruning (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_fee_hook import FeeConfig
+from simulate_optimize import (
+    Candidate, Evaluator, RouterParams, check_against_router, epsilon_dominated, expand,
+    make_workload, optimize, pareto_front,
+)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_evaluator_matches_router(seed):
+    # Float sums in a different order: agreement to rounding, not bit-for-bit
+    assert check_against_router(n_orders=2_000, seed=seed) < 1e-9
+
+
+def test_legs_are_cached_per_config():
+    evaluator = Evaluator(make_workload(500, seed=1))
+    a = Candidate(FeeConfig(), RouterParams())
+    b = Candidate(FeeConfig(), RouterParams(max_vault_depletion_pct=10))
+    first = evaluator.evaluate(a)
+    evaluator.evaluate(b)
+    assert evaluator.evaluate(a) == first
+    assert (evaluator.hits, evaluator.misses) == (3, 3)
+
+
+def test_expand_counts_invalid():
+    candidates, invalid = expand({"skew_ref_bps": [4000, 6000], "max_vault_depletion_pct": [0, 30]})
+    assert len(candidates) == 1 and invalid == 3
+    with pytest.raises(ValueError):
+        expand({"no_such_field": [1]})
+
+
+def test_pareto_front():
+    points = np.array([[3, 1], [1, 3], [2, 2], [1, 1], [2, 2], [0.97, 2.99], [0.5, 2.9]])
+    front = pareto_front(points)
+    # Exact duplicates keep one row
+    assert len(front) == 3 and set(front.tolist()) - {2, 4} == {0, 1}
+    # Margins (0.05, 0.04): (0.97, 2.99) is within them of (1, 3), (0.5, 2.9) is not
+    assert epsilon_dominated(points, front, 0.02).tolist() == \
+        [False, False, False, True, False, False, True]
+
+
+def test_optimize_screens_then_scores():
+    space = {"min_fee_bps": [5, 10, 20], "max_vault_depletion_pct": [10, 30]}
+    result = optimize(space, n_orders=2_000, seed=2, workers=1)
+    assert len(result.candidates) == 6 and result.invalid == 0
+    scored = [o for o in result.objectives if o is not None]
+    assert len(scored) == 6 - result.pruned
+    evaluator = Evaluator(make_workload(2_000, seed=2))
+    for i in result.front.tolist():
+        assert result.objectives[i] == evaluator.evaluate(result.candidates[i])
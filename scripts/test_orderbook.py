@@ -0,0 +1,106 @@
+"""Bitmap-indexed pooled orderbook vs sorted-level scans (run: python -m pytest scripts)"""
+
+import random
+
+import pytest
+
+from simulate_exact import ceil_div
+from simulate_orderbook import BPS, PooledOrderbook, PriceBitmap, random_book
+
+
+def bitmaps_match_levels(book):
+    return all(list(book.ask_bitmaps[side].ascending()) == sorted(book.asks[side])
+               and list(book.bid_bitmaps[side].descending()) == sorted(book.bids[side],
+                                                                       reverse=True)
+               for side in (True, False))
+
+
+def scan_asks(levels, collateral_in, max_price_bps):
+    """Exact buyWithSweep step 1 over sorted prices (mutates levels)"""
+    remaining, shares_out, filled = collateral_in, 0, 0
+    for price in sorted(levels):
+        if remaining <= 0 or price > max_price_bps:
+            break
+        depth = levels[price]
+        cost = ceil_div(depth * price, BPS)
+        if remaining >= cost:
+            shares, spent = depth, cost
+        else:
+            shares = remaining * BPS // price
+            if shares == 0:
+                continue
+            spent = ceil_div(shares * price, BPS)
+        levels[price] -= shares
+        if not levels[price]:
+            del levels[price]
+        shares_out += shares
+        remaining -= spent
+        filled += 1
+    return shares_out, collateral_in - remaining, filled
+
+
+def scan_bids(levels, shares_in, min_price_bps):
+    """Exact sellWithSweep step 1 over prices high to low (mutates levels)"""
+    remaining, collateral_out, filled = shares_in, 0, 0
+    for price in sorted(levels, reverse=True):
+        if remaining <= 0 or price < min_price_bps:
+            break
+        depth = levels[price]
+        max_shares = depth * BPS // price
+        if remaining >= max_shares:
+            sold, received = max_shares, depth
+        else:
+            sold, received = remaining, ceil_div(remaining * price, BPS)
+        if sold == 0 or received == 0:
+            continue
+        levels[price] -= received
+        if levels[price] <= 0:
+            del levels[price]
+        collateral_out += received
+        remaining -= sold
+        filled += 1
+    return shares_in - remaining, collateral_out, filled
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_exact_sweeps_match_sorted_scan(seed):
+    rng = random.Random(seed)
+    book = random_book(800, seed=seed, exact=True)
+    asks, bids = dict(book.asks[True]), dict(book.bids[True])
+    for _ in range(300):
+        if rng.random() < 0.5:
+            collateral, limit = rng.randint(1, 400), rng.randint(5000, BPS - 1)
+            assert book.sweep_asks(True, collateral, limit) == scan_asks(asks, collateral, limit)
+        else:
+            shares, limit = rng.randint(1, 400), rng.randint(1, 5000)
+            assert book.sweep_bids(True, shares, limit) == scan_bids(bids, shares, limit)
+        price = rng.randint(1, BPS - 1)
+        book.add_ask(True, price, 7)
+        asks[price] = asks.get(price, 0) + 7
+    assert book.asks[True] == asks and book.bids[True] == bids
+    assert bitmaps_match_levels(book)
+
+
+def test_bitmap_tracks_adds_and_removes():
+    rng = random.Random(2)
+    book = PooledOrderbook(exact=True)
+    for _ in range(5_000):
+        side, price = rng.random() < 0.5, rng.randint(1, BPS - 1)
+        depth = book.asks[side].get(price, 0)
+        if depth and rng.random() < 0.6:
+            book.remove_ask(side, price, rng.randint(1, depth))
+        else:
+            book.add_ask(side, price, rng.randint(1, 50))
+    assert bitmaps_match_levels(book)
+    best = min(book.asks[True])
+    assert book.best_ask(True) == (best, book.asks[True][best])
+
+
+def test_bounded_scans():
+    bitmap = PriceBitmap()
+    for price in (1, 255, 256, 5000, 9999):
+        bitmap.set(price, True)
+    assert list(bitmap.ascending(256)) == [256, 5000, 9999]
+    assert list(bitmap.descending(5000)) == [5000, 256, 255, 1]
+    with pytest.raises(ValueError):
+        PooledOrderbook().add_ask(True, BPS, 1)
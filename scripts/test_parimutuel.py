@@ -0,0 +1,69 @@
+"""Vectorized PM parimutuel flows and settlement vs scalar calls (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_parimutuel import (
+    GWEI, Q, OrderFlow, ParimutuelMarket, check_against_calls, random_flow,
+)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_apply_and_settle_match_calls(seed):
+    assert check_against_calls(n_holders=100, n_orders=2_000, seed=seed) == 0
+
+
+def test_sells_see_earlier_buys_of_the_same_holder():
+    flow = OrderFlow(time=np.arange(5), holder=np.zeros(5, np.int64),
+                     is_yes=np.array([True, True, True, False, True]),
+                     is_buy=np.array([True, False, False, True, False]),
+                     amount=np.array([10, 4, 7, 3, 6], np.int64))
+    result = ParimutuelMarket(1, close=100).apply(flow)
+    # Oversell of 7 reverts, the later sell of 6 fits
+    assert result.ok.tolist() == [True, True, False, True, True]
+    assert result.yes_supply.tolist() == [10, 6, 6, 6, 0]
+    assert result.odds_bps.tolist() == [10000, 10000, 10000, 6666, 0]
+
+
+@pytest.mark.parametrize("outcome", [True, False])
+def test_float_settlement_tracks_exact(outcome):
+    market = ParimutuelMarket(200, close=86400, resolver_fee_bps=100)
+    market.apply(random_flow(200, 3_000, 86400, seed=4, sell_share=0.2))
+    market.resolve(outcome, 86400)
+    exact, approx = market.settle(), market.settle(exact=False)
+    # Flooring payoutPerShare loses < 1 wei per Q of winning supply, each claim < 1 wei
+    winning = (market.yes_supply if outcome else market.no_supply) * GWEI
+    assert 0 <= exact.dust <= winning // Q + exact.winners and exact.paid + exact.dust == market.pot
+    np.testing.assert_allclose(approx.payout, exact.payout.astype(float), rtol=1e-12)
+
+
+def test_one_sided_market_refunds_at_par():
+    market = ParimutuelMarket(3, close=10, resolver_fee_bps=500)
+    market.apply(OrderFlow(np.array([1, 2]), np.array([0, 2]), np.array([False, False]),
+                           np.array([True, True]), np.array([5, 7], np.int64)))
+    market.resolve(True, 10)
+    settlement = market.settle()
+    assert market.fee_paid == 0 and settlement.payout.tolist() == [5 * GWEI, 0, 7 * GWEI]
+    assert settlement.dust == 0
+
+
+def test_lifecycle_errors():
+    with pytest.raises(ValueError, match="FeeOverflow"):
+        ParimutuelMarket(1, close=10, resolver_fee_bps=1_001)
+    market = ParimutuelMarket(1, close=100)
+    with pytest.raises(ValueError, match="CannotClose"):
+        market.close_market(50)
+    with pytest.raises(ValueError, match="MarketNotClosed"):
+        market.resolve(True, 99)
+    with pytest.raises(ValueError, match="MarketNotResolved"):
+        market.settle()
+
+    market = ParimutuelMarket(1, close=100, can_close=True)
+    market.close_market(50)
+    late = market.apply(OrderFlow(np.array([60]), np.array([0]), np.array([True]),
+                                  np.array([True]), np.array([1], np.int64)))
+    assert not late.ok[0]
+    market.resolve(True, 50)
+    with pytest.raises(ValueError, match="AlreadyResolved"):
+        market.resolve(True, 50)
+    assert market.payout_per_share == 0
@@ -0,0 +1,22 @@
+"""Property tests for the closed-form AMM impact solver (run: python -m pytest scripts)"""
+
+import pytest
+
+from simulate_partial_fill import (
+    PoolState, bisect_max_amm_under_impact, check_closed_form_vs_bisection,
+    find_max_amm_under_impact,
+)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_closed_form_within_bisection_tolerance(seed):
+    failures, worst = check_closed_form_vs_bisection(trials=20000, seed=seed)
+    assert failures == 0, f"{failures} pools outside tolerance (worst {worst:.2f}x)"
+
+
+@pytest.mark.parametrize("buy_yes", [True, False])
+def test_closed_form_matches_bisection_on_balanced_pool(buy_yes):
+    pool = PoolState(500, 500)
+    closed = find_max_amm_under_impact(pool, buy_yes, 1000, 30, 1200)
+    bisect = bisect_max_amm_under_impact(pool, buy_yes, 1000, 30, 1200)
+    assert closed == pytest.approx(bisect, abs=999 / 65536)
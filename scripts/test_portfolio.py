@@ -0,0 +1,41 @@
+"""Struct-of-arrays portfolio vs one sequencer per market (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_portfolio import Portfolio, PortfolioConfig, check_against_sequencer, run_portfolio
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tick_matches_sequencers(seed):
+    assert check_against_sequencer(n_markets=20, n_ticks=100, seed=seed) == 0
+
+
+def test_closed_and_unknown_orders_are_dropped():
+    portfolio = Portfolio(2)
+    ids = portfolio.open_markets(0, [500, 500, 500], [500, 500, 500], 0, 0, [100, 100, 10])
+    venues = portfolio.tick(50, [ids[0], ids[2], 99], [10, 10, 10], [True, True, True])
+    assert venues.tolist()[1:] == [-1, -1] and venues[0] >= 0
+    assert portfolio.stats.dropped == 2 and portfolio.capacity >= 3
+
+    assert portfolio.resolve(portfolio.due(200), True) == 3
+    assert portfolio.n_live == 0 and portfolio.stats.markets_resolved == 3
+    with pytest.raises(KeyError):
+        portfolio.slots_of(ids[:1])
+    # Freed slots are reused without growing
+    capacity = portfolio.capacity
+    portfolio.open_markets(300, [500] * 3, [500] * 3, 0, 0, 100)
+    assert portfolio.capacity == capacity and portfolio.n_live == 3
+
+
+def test_steady_state_book():
+    config = PortfolioConfig(live_markets=200, lifetime_seconds=6 * 3600, resolve_delay=1800,
+                             orders_per_tick=400)
+    live = []
+    portfolio = run_portfolio(200, config, seed=1,
+                              on_tick=lambda tick, p: live.append(len(p.trading(tick * 300)[0])))
+    stats = portfolio.stats
+    assert set(live) == {config.live_markets} and stats.markets_resolved > 0
+    assert stats.trades == stats.amm + stats.otc + stats.mult + stats.rejected
+    assert stats.markets_opened == stats.markets_resolved + portfolio.n_live
+    assert np.all(portfolio.live[portfolio._id_slots])
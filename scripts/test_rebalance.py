@@ -0,0 +1,59 @@
+"""Rebalance budget and keeper scheduling (run: python -m pytest scripts)"""
+
+import pytest
+
+from simulate_rebalance import KEEPER_BOUNTY_BPS, OUTCOMES, Rebalancer, run_market
+from simulate_router import PoolState, VaultState
+from simulate_sequence import MarketSequencer
+from simulate_twap import TwapOracle
+
+
+def market_with(pool, vault, budget, close_seconds=None):
+    keeper = Rebalancer(budget=budget)
+    market = MarketSequencer(pool, vault, twap=TwapOracle(pool, 0), rebalancer=keeper,
+                             close_seconds=close_seconds)
+    return market, keeper
+
+
+@pytest.mark.parametrize("kwargs", [dict(poll=True), dict(budget_step=1.0)])
+def test_budget_and_outcomes_balance(kwargs):
+    keeper = Rebalancer(**kwargs)
+    run_market(5_000, keeper)
+    s = keeper.stats
+    assert s.checks == 5_000
+    assert s.attempts == sum(getattr(s, outcome) for outcome in OUTCOMES)
+    assert s.budget_in - s.budget_spent == pytest.approx(keeper.budget)
+    assert s.bounties == pytest.approx(s.budget_spent * KEEPER_BOUNTY_BPS / 10000)
+    assert s.rebalanced
+    if keeper.poll:
+        assert s.attempts == s.checks
+
+
+def test_events_attempt_less_than_polling():
+    polled, events = Rebalancer(poll=True), Rebalancer(budget_step=5.0, price_step_bps=500)
+    run_market(5_000, polled)
+    run_market(5_000, events)
+    assert events.stats.attempts < polled.stats.attempts / 10
+
+
+@pytest.mark.parametrize("scale", [1, 10 ** 18])
+def test_rebalance_buys_the_scarce_side(scale):
+    market, keeper = market_with(PoolState(500 * scale, 500 * scale),
+                                 VaultState(100 * scale, 500 * scale), 50 * scale)
+    assert keeper.attempt(market, 3600) == "rebalanced"
+    vault = market.vault
+    assert vault.no_shares == 400 * scale and vault.yes_shares > 0
+    assert keeper.budget < 50 * scale and market.pool.p_yes_bps > 5000
+
+
+def test_guards():
+    market, keeper = market_with(PoolState(500, 500), VaultState(100, 500), 50)
+    assert keeper.attempt(market, 60) == "no_twap"
+    market.twap.update(3600)
+    market.pool = PoolState(300, 700)  # Spot 70% vs TWAP 50%
+    assert keeper.attempt(market, 3600 + 60) == "deviant"
+    assert keeper.retry_at == 3600 + 1800
+
+    market, keeper = market_with(PoolState(500, 500), VaultState(100, 500), 50,
+                                 close_seconds=4000)
+    assert keeper.attempt(market, 3600) == "close_window"
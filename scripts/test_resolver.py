@@ -0,0 +1,62 @@
+"""Batched Resolver conditions and seeding vs scalar replays (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+import simulate_resolver
+from simulate_resolver import (
+    OP_EQ, OP_GT, OP_GTE, OP_LT, UINT256_MAX, WAD, ConditionEngine, calibrate_swaps,
+    check_against_scalar, describe, skew_pools,
+)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batched_views_match_scalar(seed):
+    assert check_against_scalar(n_checks=120, n_conditions=80, seed=seed) == 0
+
+
+def test_small_chunks_match(monkeypatch):
+    # Several kernel passes per call, as with long series in the real sweep
+    monkeypatch.setattr(simulate_resolver, "CHUNK_CELLS", 500)
+    assert check_against_scalar(n_checks=100, n_conditions=60, seed=9) == 0
+
+
+def test_ratio_and_uint256_conditions():
+    engine = ConditionEngine([0, 1, 2], {"a": [6, 2 ** 200, 5], "b": [3, 0, 10]})
+    conds = engine.conditions([(("a", "b"), OP_GTE, 2 * WAD, False),
+                               (("a", "b"), OP_EQ, UINT256_MAX, False),
+                               ("a", OP_GT, 2 ** 199, True),
+                               ("b", OP_LT, 5, True)])
+    assert engine.cond_true(conds).tolist() == [[True, True, False], [False, True, False],
+                                                [False, True, False], [True, True, False]]
+    res = engine.resolve(conds, created=[0, 0, 0, 2], close=[2, 2, 5, 5])
+    assert res.outcome.tolist() == [0, 0, 1, -1]
+    assert res.resolved_at.tolist() == [2, 2, 1, -1] and res.early.tolist()[2:] == [True, False]
+
+
+def test_invalid_inputs():
+    with pytest.raises(ValueError):
+        ConditionEngine([1, 0], {"a": [1, 1]})
+    with pytest.raises(ValueError):
+        ConditionEngine([0, 1], {"a": [1]})
+    with pytest.raises(ValueError):
+        ConditionEngine([0], {"a": [-1]})
+    with pytest.raises(ValueError):
+        ConditionEngine([0], {"a": [1]}).conditions([("a", 6, 0, False)])
+    with pytest.raises(ValueError):
+        skew_pools([0], [1], [True], [30])
+
+
+def test_describe():
+    assert describe("ETH/USD", OP_GTE, 5000, 1_700_000_000, True) == (
+        "ETH/USD >= 5000 by 1700000000 Unix time. "
+        "Note: market may close early once condition is met.")
+
+
+def test_calibrated_swap_is_minimal():
+    seed = np.array([10 ** 18, 5 * 10 ** 20, 3 * 10 ** 21], dtype=object)
+    swap, side = calibrate_swaps(seed, [7500, 2000, 5000], [30, 0, 100])
+    p = skew_pools(seed, swap, side, [30, 0, 100]).p_yes_bps.tolist()
+    short = skew_pools(seed, np.maximum(swap - 1, 0), side, [30, 0, 100]).p_yes_bps.tolist()
+    assert side.tolist() == [False, True, False] and swap[2] == 0
+    assert p[0] >= 7500 > short[0] and p[1] <= 2000 < short[1] and p[2] == 5000
@@ -0,0 +1,69 @@
+"""Columnar result export vs scalar quotes and across formats (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from results import (
+    PARTIAL_FILL_COLUMNS, TRADE_COLUMNS, VENUES, ResultWriter, read_csv_columns, sweep_amm,
+)
+from simulate_batch import count_mismatches, scalar_quote
+from simulate_router import PoolState, VaultState, simulate_trade
+
+AXES = (np.geomspace(100, 100_000, 4), np.linspace(1000, 9000, 5), np.geomspace(1, 10_000, 6),
+        np.linspace(0, 3 * 86400, 3), (True, False))
+
+
+def test_sweep_csv_matches_scalar_quotes(tmp_path):
+    path = str(tmp_path / "sweep.csv")
+    # A chunk size that does not divide the grid: partial chunks on both ends of a write
+    with ResultWriter(path, chunk_rows=37) as writer:
+        rows = sweep_amm(writer, *AXES)
+    assert rows == writer.rows == 4 * 5 * 6 * 3 * 2 and writer.chunks == -(-rows // 37)
+
+    cols = read_csv_columns(path)
+    yes, no = cols["yes_reserve"].astype(float), cols["no_reserve"].astype(float)
+    size, elapsed = cols["order_size"].astype(float), cols["elapsed_seconds"].astype(np.int64)
+    buy_yes = cols["buy_yes"] == "1"
+    shares, impact, fee, ok = scalar_quote(yes, no, size, elapsed, buy_yes)
+    written = (cols["shares_out"].astype(float), cols["price_impact_bps"].astype(np.int64),
+               cols["fee_bps"].astype(np.int64), cols["venue"] == "amm")
+    assert count_mismatches(written, (np.where(ok, shares, 0.0), impact, fee, ok)) == 0
+    assert set(cols["venue"]) == {"amm", "rejected"}
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_arrow_formats_match_csv(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    paths = {ext: str(tmp_path / f"sweep.{ext}") for ext in ("csv", fmt)}
+    for path in paths.values():
+        with ResultWriter(path, chunk_rows=50) as writer:
+            sweep_amm(writer, *AXES)
+    table = (pq.read_table if fmt == "parquet" else feather.read_table)(paths[fmt])
+    csv_cols = read_csv_columns(paths["csv"])
+    assert table.column_names == [name for name, _ in TRADE_COLUMNS]
+    for name, kind in TRADE_COLUMNS:
+        values = table.column(name).to_pylist()
+        expected = csv_cols[name].tolist() if isinstance(kind, tuple) else \
+            csv_cols[name].astype(float if kind.kind == "f" else np.int64).tolist()
+        assert values == expected or values == [bool(int(v)) for v in csv_cols[name]]
+
+
+def test_scalar_rows(tmp_path):
+    path = str(tmp_path / "trades.csv")
+    pool, vault = PoolState(500, 500), VaultState(300, 200)
+    results = []
+    with ResultWriter(path, chunk_rows=4) as writer:
+        for size, buy_yes in ((10, True), (100, False), (1000, True), (10 ** 6, True), (50, False)):
+            results.append(simulate_trade(pool, vault, size, buy_yes))
+            writer.append_trade(results[-1], pool, vault, size, buy_yes, 3600)
+    cols = read_csv_columns(path)
+    assert cols["venue"].tolist() == [r.venue for r in results]
+    assert set(cols["venue"]) <= set(VENUES)
+    assert cols["shares_out"].astype(float).tolist() == [r.shares_out for r in results]
+    assert cols["fee_bps"].astype(np.int64).tolist() == [r.fee_bps for r in results]
+
+    with pytest.raises(ValueError):
+        ResultWriter(str(tmp_path / "trades.xlsx"), PARTIAL_FILL_COLUMNS)
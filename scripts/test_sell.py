@@ -0,0 +1,47 @@
+"""Sell-side solvers and batch exit quotes vs the scalar router (run: python -m pytest scripts)"""
+
+import numpy as np
+import pytest
+
+from simulate_sell import (
+    WAD, PoolState, VaultState, batch_quote_sell, batch_swap_amount_for_merge, check_solvers,
+    exact_amm_sell, scalar_quote_sell, simulate_amm_sell, swap_amount_for_merge,
+)
+
+BOOK = {6800: 50, 6700: 100, 6500: 200, 6000: 500}
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_solvers(seed):
+    sqrt_mismatches, worst, max_dust = check_solvers(trials=5_000, seed=seed)
+    assert sqrt_mismatches == 0
+    assert worst < 1e-9
+    assert max_dust < 10 ** 6  # wei: swap-then-merge leaves at most dust unmerged
+
+
+def test_batch_quote_sell_matches_scalar():
+    rng = np.random.default_rng(3)
+    shares = rng.uniform(1, 2_000, 4_000)
+    sell_yes = rng.random(4_000) < 0.5
+    pool, vault = PoolState(300, 700), VaultState(600, 1000)
+    kwargs = dict(budget=100, bid_pools=BOOK, min_price_bps=6500)
+    batch = batch_quote_sell(pool, vault, shares, sell_yes, **kwargs)
+    scalar_out, scalar_ok = scalar_quote_sell(pool, vault, shares, sell_yes, **kwargs)
+    np.testing.assert_allclose(batch[0], scalar_out, rtol=1e-12, atol=0)
+    np.testing.assert_array_equal(batch[5], scalar_ok)
+    assert scalar_ok.any() and not scalar_ok.all()
+
+
+def test_batch_swap_amount_is_bit_exact():
+    shares = np.random.default_rng(4).uniform(1, 400, 4_000)
+    expected = [swap_amount_for_merge(float(s), 700.0, 300.0, 30) for s in shares]
+    np.testing.assert_array_equal(batch_swap_amount_for_merge(shares, 700.0, 300.0, 30), expected)
+
+
+@pytest.mark.parametrize("shares", [10, 100, 500])
+def test_float_sell_tracks_exact_sell(shares):
+    collateral, swapped, impact, ok = simulate_amm_sell(PoolState(500, 500), shares, True, 30)
+    exact = exact_amm_sell(PoolState(500 * WAD, 500 * WAD), shares * WAD, True, 30)
+    assert exact[0] / WAD == pytest.approx(collateral, rel=1e-12)
+    assert exact[1] / WAD == pytest.approx(swapped, rel=1e-12)
+    assert (exact[2], exact[3]) == (impact, ok)
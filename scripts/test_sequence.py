@@ -0,0 +1,37 @@
+"""Stateful sequencer vs simulate_trade on each pre-trade state (run: python -m pytest scripts)"""
+
+import pytest
+
+from simulate_router import PoolState, VaultState, simulate_trade
+from simulate_sequence import VENUES, MarketSequencer, random_order_flow
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_each_fill_matches_simulate_trade(seed):
+    close = 4_000 * 60 + 86400
+    market = MarketSequencer(PoolState(2_000, 2_000), VaultState(3_000, 3_000),
+                             close_seconds=close)
+    stats = market.stats
+    mismatches = 0
+    for size, buy_yes, t in random_order_flow(4_000, seed=seed, mean_size=60):
+        pool = PoolState(market.pool.yes_reserve, market.pool.no_reserve)
+        vault = VaultState(market.vault.yes_shares, market.vault.no_shares)
+        expected = simulate_trade(pool, vault, size, buy_yes, t, (close - t) / 3600)
+        shares, spent = stats.shares_out, stats.collateral_in
+        venue = market.apply(size, buy_yes, t)
+        mismatches += venue != expected.venue
+        if venue != "rejected":
+            mismatches += stats.shares_out - shares != pytest.approx(expected.shares_out)
+            mismatches += stats.collateral_in - spent != pytest.approx(expected.collateral_in)
+    assert mismatches == 0
+    assert stats.trades == sum(getattr(stats, venue) for venue in VENUES) == 4_000
+    assert stats.otc and stats.amm
+
+
+def test_amm_fills_move_the_pool():
+    market = MarketSequencer(PoolState(500, 500), VaultState(0, 0))
+    for _ in range(5):
+        before = market.pool.p_yes_bps
+        assert market.apply(20, True) == "amm"
+        assert market.pool.p_yes_bps > before
+    assert market.pool.yes_reserve * market.pool.no_reserve > 500 * 500
@@ -0,0 +1,36 @@
+"""TWAP oracle vs a full-history rescan (run: python -m pytest scripts)"""
+
+import pytest
+
+from simulate_router import PoolState
+from simulate_twap import (
+    MIN_TWAP_UPDATE_INTERVAL, TwapOracle, check_against_rescan, rebalance_allowed,
+)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_oracle_matches_rescan(seed):
+    mismatches, history_length = check_against_rescan(n_checks=1_000, seed=seed)
+    assert mismatches == 0
+    assert history_length > 500
+
+
+def test_rolls_at_most_once_per_interval():
+    pool = PoolState(500 * 10**18, 500 * 10**18)
+    oracle = TwapOracle(pool, 0)
+    assert oracle.price(0) == 0  # No window yet
+    assert not oracle.update(MIN_TWAP_UPDATE_INTERVAL - 1)
+    assert oracle.update(MIN_TWAP_UPDATE_INTERVAL)
+    assert not oracle.update(MIN_TWAP_UPDATE_INTERVAL + 1)
+    assert oracle.price(MIN_TWAP_UPDATE_INTERVAL) == 5000
+
+
+def test_jump_blocks_rebalance_until_twap_catches_up():
+    pool = PoolState(500 * 10**18, 500 * 10**18)
+    oracle = TwapOracle(pool, 0)
+    oracle.update(3600)
+    pool = PoolState(375 * 10**18, 625 * 10**18)  # 50% -> 62.5%
+    oracle.sync(pool, 3600)
+    assert not rebalance_allowed(pool, oracle.price(3600 + 60))
+    oracle.update(3600 * 4)
+    assert rebalance_allowed(pool, oracle.price(3600 * 4 + 60))